@@ -6,10 +6,14 @@ from main.service.comment_service import CommentService
 from main.service.confirmation_service import ConfirmationService
 from main.service.password_reset_service import PasswordResetService
 from main.service.download_service import DownloadService
+from main.service.export_service import ExportService
+from main.service.upload_service import UploadService
+from main.service.email_service import EmailService
 from main.service.downvote_service import DownvoteService
 from main.service.follow_service import FollowService
 from main.service.idea_service import IdeaService
 from main.service.performance_service import PerformanceService
+from main.service.leaderboard_service import LeaderboardService
 from main.service.review_service import ReviewService
 from main.service.upvote_service import UpvoteService
 from main.service.user_service import UserService
@@ -30,7 +34,11 @@ def create_services():
         'downvote': DownvoteService(),
         'bookmark': BookmarkService(),
         'subscription': SubscriptionService(),
-        'performance': PerformanceService()
+        'performance': PerformanceService(),
+        'leaderboard': LeaderboardService(),
+        'export': ExportService(),
+        'upload': UploadService(),
+        'email': EmailService()
     }
     return services
 
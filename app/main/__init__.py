@@ -1,3 +1,4 @@
+import datetime
 from flask import Flask, jsonify
 from flask_restful import Api
 from flask_cors import CORS
@@ -6,23 +7,28 @@ from marshmallow import ValidationError
 from flask_apscheduler import APScheduler
 
 from main.config import app_config
-from main.db import db
+from main.db import db, begin_unit_of_work, end_unit_of_work, in_unit_of_work
+from main.libs import market_calendar
 from main.ma import ma
 
 # Controllers
-from main.controller.user_controller import UserRegister, UserLogin, User, AnalystLeaderboard
+from main.controller.user_controller import UserRegister, UserLogin, User, UserIdeas, AnalystLeaderboard
 from main.controller.confirmation_controller import Confirmation, ResendConfirmation
 from main.controller.password_reset_controller import SendPasswordReset, PasswordReset
-from main.controller.idea_controller import NewIdea, Idea, IdeaFeed, DownloadReport
+from main.controller.idea_controller import NewIdea, Idea, AdminIdeas, IdeaFeed, DownloadReport
 from main.controller.follow_controller import Follow, FollowingList, FollowerList
 from main.controller.review_controller import NewReview, Review, AnalystReviews
 from main.controller.comment_controller import NewComment, Comment, IdeaComments
 from main.controller.upvote_controller import Upvote, UpvoteFeed
-from main.controller.downvote_controller import Downvote
+from main.controller.downvote_controller import Downvote, DownvoteFeed
 from main.controller.bookmark_controller import Bookmark, BookmarkFeed
 from main.controller.stock_data_controller import StockData, SearchAutocomplete
 from main.controller.subscription_controller import CreateSubscription, RetryInvoice, StripeWebhook, CancelSubscription
 from main.controller.health_controller import HealthCheck
+from main.controller.download_controller import IdeaDownloads, AnalystDownloads
+from main.controller.export_controller import AdminExport
+from main.controller.upload_controller import NewUpload, ConfirmUpload
+from main.controller.email_controller import AdminEmails
 
 # Services
 from main.service.user_service import UserService
@@ -30,6 +36,9 @@ from main.service.confirmation_service import ConfirmationService
 from main.service.password_reset_service import PasswordResetService
 from main.service.idea_service import IdeaService
 from main.service.download_service import DownloadService
+from main.service.export_service import ExportService
+from main.service.upload_service import UploadService
+from main.service.email_service import EmailService
 from main.service.follow_service import FollowService
 from main.service.review_service import ReviewService
 from main.service.comment_service import CommentService
@@ -38,6 +47,10 @@ from main.service.downvote_service import DownvoteService
 from main.service.bookmark_service import BookmarkService
 from main.service.subscription_service import SubscriptionService
 from main.service.performance_service import PerformanceService
+from main.service.leaderboard_service import LeaderboardService
+from main.service.counter_service import CounterService, init_counter_buffer
+from main.service.job_service import JobService
+from main.service.quote_scheduler_service import QuoteSchedulerService
 
 
 def create_app(services, config_name):
@@ -45,22 +58,90 @@ def create_app(services, config_name):
     CORS(app)
     app.config.from_object(app_config[config_name])
     api = Api(app)
+    if app.config["VOTE_WRITE_BEHIND"]:
+        init_counter_buffer(app)
 
     scheduler = APScheduler()
 
+    def run_job(name: str, job, min_gap: datetime.timedelta, trading_days_only: bool = False) -> None:
+        """Runs job in one worker only (see JobService), optionally only on days the market is open"""
+        with app.app_context():
+            today = datetime.datetime.now(market_calendar.MARKET_TIMEZONE).date()
+            if trading_days_only and not market_calendar.is_trading_day(today):
+                return
+            JobService.run_exclusively(name, job, min_gap)
+
+    def refresh_leaderboard() -> None:
+        """
+        Runs in every worker, not only the one that updated performance.  The others pick up an update
+        they don't see yet within LeaderboardService.CHECK_INTERVAL.
+        """
+        with app.app_context():
+            services["leaderboard"].refresh()
+
+    @scheduler.task('cron', day_of_week='0-4', hour='9-16', minute='*', timezone="America/New_York")
+    def refresh_quotes():
+        """Refreshes the prices that are due, hot symbols every minute and cold ones hourly"""
+        run_job("refresh_quotes", QuoteSchedulerService.refresh_due_quotes, datetime.timedelta(seconds=30))
+
+    @scheduler.task('interval', seconds=30, timezone="America/New_York")
+    def send_emails():
+        """Retries failed sends that are due, and sends anything the background sender missed"""
+        run_job("send_emails", EmailService.send_pending, datetime.timedelta(seconds=15))
+
     @scheduler.task('cron', day_of_week='0-4', hour='10-16', timezone="America/New_York")
     def update_performance():
-        with app.app_context():
+        def job():
+            performance_service = services["performance"]
+            performance_service.update_performance(incremental=True, refresh_prices=False)
+
+        run_job("update_performance", job, datetime.timedelta(minutes=30), trading_days_only=True)
+        refresh_leaderboard()
+
+    @scheduler.task('cron', day_of_week='0-4', hour=17, timezone="America/New_York")
+    def rebuild_performance():
+        """Full recompute after the close so any drift in the running sums is corrected daily"""
+        def job():
             performance_service = services["performance"]
             performance_service.update_performance()
 
-    scheduler.init_app(app)
-    scheduler.start()
+        run_job("rebuild_performance", job, datetime.timedelta(hours=12), trading_days_only=True)
+        refresh_leaderboard()
+
+    @scheduler.task('cron', hour=3, timezone="America/New_York")
+    def reconcile_counters():
+        """Recomputes denormalized counters from the rows they count, logging any drift that is corrected"""
+        def job():
+            drift = CounterService.reconcile()
+            if drift:
+                app.logger.warning("Corrected %d drifted counters: %s", len(drift), drift[:20])
+
+        run_job("reconcile_counters", job, datetime.timedelta(hours=12))
+
+    if app.config["SCHEDULER_ENABLED"]:
+        scheduler.init_app(app)
+        scheduler.start()
 
     @app.before_first_request
     def create_tables():
         db.create_all()
 
+    @app.before_request
+    def start_transaction():
+        """Every write made while handling a request goes into one transaction"""
+        begin_unit_of_work()
+
+    @app.after_request
+    def finish_transaction(response):
+        # 4xx responses still commit (e.g. an expired confirmation is replaced before returning 400)
+        end_unit_of_work(success=response.status_code < 500)
+        return response
+
+    @app.teardown_request
+    def discard_transaction(exc):
+        if in_unit_of_work():
+            end_unit_of_work(success=False)
+
     @app.errorhandler(ValidationError)
     def handle_marshmallow_validation(err):
         return jsonify(err.messages), 400
@@ -84,8 +165,13 @@ def create_app(services, config_name):
                          'user_service': services["user"],
                          'follow_service': services['follow']
                      })
+    api.add_resource(UserIdeas, '/user/<int:user_id>/ideas',
+                     resource_class_kwargs={
+                         'user_service': services["user"],
+                         'idea_service': services['idea']
+                     })
     api.add_resource(AnalystLeaderboard, '/leaderboard',
-                     resource_class_kwargs={'user_service': services["user"]})
+                     resource_class_kwargs={'leaderboard_service': services["leaderboard"]})
     api.add_resource(Confirmation, '/user/confirm/<string:confirmation_code>',
                      resource_class_kwargs={
                          'user_service': services["user"],
@@ -110,16 +196,42 @@ def create_app(services, config_name):
                      resource_class_kwargs={
                         'user_service': services['user'],
                         'idea_service': services['idea']})
+    api.add_resource(AdminIdeas, '/admin/ideas',
+                     resource_class_kwargs={
+                        'user_service': services['user'],
+                        'idea_service': services['idea']})
+    api.add_resource(NewUpload, '/uploads',
+                     resource_class_kwargs={
+                        'user_service': services['user'],
+                        'upload_service': services['upload']})
+    api.add_resource(ConfirmUpload, '/uploads/confirm',
+                     resource_class_kwargs={'upload_service': services['upload']})
+    api.add_resource(AdminExport, '/admin/export/<string:kind>',
+                     resource_class_kwargs={
+                        'user_service': services['user'],
+                        'export_service': services['export']})
+    api.add_resource(AdminEmails, '/admin/emails',
+                     resource_class_kwargs={
+                        'user_service': services['user'],
+                        'email_service': services['email']})
     api.add_resource(IdeaFeed, '/ideas/<string:feed_type>',
                      resource_class_kwargs={
                          'idea_service': services['idea'],
-                         'user_service': services['user'],
-                         'follow_service': services['follow']
+                         'user_service': services['user']
                      })
     api.add_resource(DownloadReport, '/idea/<int:idea_id>/download',
                      resource_class_kwargs={
                          'idea_service': services['idea'],
                          'download_service': services['download']})
+    api.add_resource(IdeaDownloads, '/idea/<int:idea_id>/downloads',
+                     resource_class_kwargs={
+                         'user_service': services['user'],
+                         'idea_service': services['idea'],
+                         'download_service': services['download']})
+    api.add_resource(AnalystDownloads, '/analyst/<int:analyst_id>/downloads',
+                     resource_class_kwargs={
+                         'user_service': services['user'],
+                         'download_service': services['download']})
     api.add_resource(Follow, '/analyst/<int:analyst_id>/follow',
                      resource_class_kwargs={
                          'follow_service': services['follow'],
@@ -167,6 +279,10 @@ def create_app(services, config_name):
                          "idea_service": services["idea"],
                          "upvote_service": services["upvote"],
                          "downvote_service": services["downvote"]})
+    api.add_resource(DownvoteFeed, '/user/<string:username>/downvotes',
+                     resource_class_kwargs={
+                         "downvote_service": services["downvote"],
+                         "user_service": services["user"]})
     api.add_resource(Bookmark, '/idea/<int:idea_id>/bookmark',
                      resource_class_kwargs={
                          "idea_service": services["idea"],
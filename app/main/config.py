@@ -13,6 +13,20 @@ class Config(object):
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     PROPAGATE_EXCEPTIONS = True
     JWT_SECRET_KEY = os.environ["JWT_SECRET_KEY"]
+    # batch idea score/vote counter updates in memory (see CounterService)
+    VOTE_WRITE_BEHIND = os.environ.get("VOTE_WRITE_BEHIND", "false").lower() == "true"
+    VOTE_FLUSH_INTERVAL_MS = int(os.environ.get("VOTE_FLUSH_INTERVAL_MS", 200))
+    VOTE_FLUSH_MAX_EVENTS = int(os.environ.get("VOTE_FLUSH_MAX_EVENTS", 500))
+    SCHEDULER_ENABLED = True
+    # quote refresh budget and bounds (see QuoteSchedulerService), IEX charges a credit per quote
+    QUOTE_CREDITS_PER_HOUR = int(os.environ.get("QUOTE_CREDITS_PER_HOUR", 6000))
+    QUOTE_MIN_INTERVAL = int(os.environ.get("QUOTE_MIN_INTERVAL", 60))
+    QUOTE_MAX_INTERVAL = int(os.environ.get("QUOTE_MAX_INTERVAL", 3600))
+    # thumbnails and metadata stripping for uploaded images (see ImageService)
+    IMAGE_PROCESSING_ENABLED = True
+    IMAGE_WORKERS = int(os.environ.get("IMAGE_WORKERS", 2))
+    # send queued emails in the background as soon as they're committed (see EmailService)
+    EMAIL_DELIVERY_ENABLED = True
 
 
 class DevelopmentConfig(Config):
@@ -35,6 +49,12 @@ class TestingConfig(Config):
     DEBUG = False
     TESTING = True
     SQLALCHEMY_DATABASE_URI = os.environ['TEST_DATABASE_URI']
+    # jobs would otherwise fire against the test database in the middle of tests
+    SCHEDULER_ENABLED = False
+    # tests that check images turn it on with a local S3 stand-in
+    IMAGE_PROCESSING_ENABLED = False
+    # emails stay in the outbox unless a test sends them
+    EMAIL_DELIVERY_ENABLED = False
 
 
 class ProductionConfig(Config):
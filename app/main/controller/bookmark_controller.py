@@ -1,7 +1,8 @@
-from flask_restful import Resource
+from flask_restful import Resource, request
 
 from main.libs.strings import get_text
 from main.libs.util import get_error
+from main.libs.pagination import parse_page_size, is_paged, CursorException
 from flask_jwt_extended import get_jwt_identity, jwt_required
 from main.schema.idea_schema import idea_schema, idea_list_schema
 
@@ -56,6 +57,15 @@ class BookmarkFeed(Resource):
         user = self.user_service.get_user_by_username(username)
         if not user:
             return get_error(404, get_text("not_found").format("User"))
-        ideas = self.bookmark_service.get_users_bookmarked_ideas(user.id)
-        return {"ideas": self.idea_list_schema.dump(ideas)}, 200
+        if not is_paged(request.args):
+            ideas = self.bookmark_service.get_users_bookmarked_ideas(user.id)
+            return {"ideas": self.idea_list_schema.dump(ideas), "nextCursor": None}, 200
+        try:
+            ideas, next_cursor = self.bookmark_service.get_users_bookmarked_ideas_page(
+                user.id,
+                cursor=request.args.get("cursor"),
+                page_size=parse_page_size(request.args.get("pageSize")))
+        except CursorException:
+            return get_error(400, get_text("invalid_cursor"))
+        return {"ideas": self.idea_list_schema.dump(ideas), "nextCursor": next_cursor}, 200
 
@@ -0,0 +1,103 @@
+import datetime
+from flask_restful import Resource, request
+from flask_jwt_extended import get_jwt_identity, jwt_required
+
+from main.libs.strings import get_text
+from main.libs.util import get_error
+from main.libs.time_buckets import DAY, PERIODS, PERIOD_LENGTHS
+
+MAX_SERIES_BUCKETS = 1000
+# range returned when no start is given
+DEFAULT_SERIES_BUCKETS = {"hour": 48, "day": 30}
+
+
+class SeriesArgsException(Exception):
+    def __init__(self, message: str):
+        super().__init__(message)
+
+
+def parse_datetime(value: str) -> datetime.datetime:
+    """ISO 8601 as a naive UTC datetime, like the ones stored.  Without an offset it's taken to be UTC already."""
+    moment = datetime.datetime.fromisoformat(value)
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return moment
+
+
+def parse_series_args():
+    """
+    Reads period ("hour" or "day", default "day"), start and end (ISO 8601, default the latest
+    DEFAULT_SERIES_BUCKETS periods) from the query string and returns (period, start, end).
+    Raises SeriesArgsException with the error message if they're invalid.
+    """
+    period = request.args.get("period", DAY)
+    if period not in PERIODS:
+        raise SeriesArgsException(get_text("invalid_period").format(", ".join(PERIODS)))
+    try:
+        end = parse_datetime(request.args["end"]) if "end" in request.args \
+            else datetime.datetime.utcnow()
+        start = parse_datetime(request.args["start"]) if "start" in request.args \
+            else end - DEFAULT_SERIES_BUCKETS[period] * PERIOD_LENGTHS[period]
+    except ValueError:
+        raise SeriesArgsException(get_text("invalid_date_range").format(MAX_SERIES_BUCKETS))
+    if start >= end or (end - start) / PERIOD_LENGTHS[period] > MAX_SERIES_BUCKETS:
+        raise SeriesArgsException(get_text("invalid_date_range").format(MAX_SERIES_BUCKETS))
+    return period, start, end
+
+
+def series_response(period: str, series: list) -> dict:
+    return {
+        "period": period,
+        "totalDownloads": sum(point["count"] for point in series),
+        "downloads": [{"bucket": point["bucket"].isoformat(), "count": point["count"]} for point in series]
+    }
+
+
+class IdeaDownloads(Resource):
+    def __init__(self, **kwargs):
+        self.user_service = kwargs["user_service"]
+        self.idea_service = kwargs["idea_service"]
+        self.download_service = kwargs["download_service"]
+
+    @jwt_required
+    def get(self, idea_id: int):
+        """
+        Downloads of an idea per period, for its analyst or an admin.
+        parameters:
+            period (str) -> "hour" or "day"
+            start, end (str) -> ISO 8601 dates or datetimes (UTC)
+        """
+        user = self.user_service.get_user_by_id(get_jwt_identity())
+        idea = self.idea_service.get_idea_by_id(idea_id)
+        if not idea:
+            return get_error(404, get_text("not_found").format("Idea"))
+        if idea.analyst_id != user.id and not user.is_admin:
+            return get_error(400, get_text("unauthorized"))
+        try:
+            period, start, end = parse_series_args()
+        except SeriesArgsException as e:
+            return get_error(400, str(e))
+        return series_response(
+            period, self.download_service.get_idea_download_series(idea_id, period, start, end)), 200
+
+
+class AnalystDownloads(Resource):
+    def __init__(self, **kwargs):
+        self.user_service = kwargs["user_service"]
+        self.download_service = kwargs["download_service"]
+
+    @jwt_required
+    def get(self, analyst_id: int):
+        """Downloads of all of an analyst's reports per period, for the analyst or an admin (see IdeaDownloads)"""
+        user = self.user_service.get_user_by_id(get_jwt_identity())
+        analyst = self.user_service.get_user_by_id(analyst_id)
+        if not analyst or not analyst.is_analyst:
+            return get_error(404, get_text("not_found").format("Analyst"))
+        if analyst.id != user.id and not user.is_admin:
+            return get_error(400, get_text("unauthorized"))
+        try:
+            period, start, end = parse_series_args()
+        except SeriesArgsException as e:
+            return get_error(400, str(e))
+        return series_response(
+            period, self.download_service.get_analyst_download_series(analyst_id, period, start, end)), 200
@@ -1,9 +1,10 @@
-from flask_restful import Resource
+from flask_restful import Resource, request
 
 from main.libs.strings import get_text
 from main.libs.util import get_error
+from main.libs.pagination import parse_page_size, CursorException
 from flask_jwt_extended import get_jwt_identity, jwt_required
-from main.schema.idea_schema import idea_schema
+from main.schema.idea_schema import idea_schema, idea_list_schema
 
 
 class Downvote(Resource):
@@ -44,4 +45,25 @@ class Downvote(Resource):
                 "idea": self.idea_schema.dump(idea)
             }
         except Exception as e:
-            return get_error(500, str(e))
\ No newline at end of file
+            return get_error(500, str(e))
+
+
+class DownvoteFeed(Resource):
+    def __init__(self, **kwargs):
+        self.downvote_service = kwargs["downvote_service"]
+        self.user_service = kwargs["user_service"]
+        self.idea_list_schema = idea_list_schema
+
+    @jwt_required
+    def get(self, username: str):
+        user = self.user_service.get_user_by_username(username)
+        if not user:
+            return get_error(404, get_text("not_found").format("User"))
+        try:
+            ideas, next_cursor = self.downvote_service.get_users_downvoted_ideas_page(
+                user.id,
+                cursor=request.args.get("cursor"),
+                page_size=parse_page_size(request.args.get("pageSize")))
+        except CursorException:
+            return get_error(400, get_text("invalid_cursor"))
+        return {"ideas": self.idea_list_schema.dump(ideas), "nextCursor": next_cursor}, 200
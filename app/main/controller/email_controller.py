@@ -0,0 +1,28 @@
+from flask_restful import Resource, request
+from flask_jwt_extended import get_jwt_identity, jwt_required
+
+from main.libs.strings import get_text
+from main.libs.util import get_error
+from main.schema.email_outbox_schema import email_outbox_list_schema
+
+
+class AdminEmails(Resource):
+    def __init__(self, **kwargs):
+        self.user_service = kwargs["user_service"]
+        self.email_service = kwargs["email_service"]
+
+    @jwt_required
+    def get(self):
+        """
+        Delivery status of the email outbox, for admins: counts by status and the most recent emails.
+        parameters:
+            status (str) -> only emails that are "pending", "sent" or "failed"
+        """
+        user = self.user_service.get_user_by_id(get_jwt_identity())
+        if not user.is_admin:
+            return get_error(400, get_text("unauthorized"))
+        status = request.args.get("status")
+        return {
+            "stats": self.email_service.stats(),
+            "emails": email_outbox_list_schema.dump(self.email_service.get_messages(status))
+        }, 200
@@ -0,0 +1,38 @@
+from flask import Response, stream_with_context
+from flask_restful import Resource, request
+from flask_jwt_extended import get_jwt_identity, jwt_required
+
+from main.libs.strings import get_text
+from main.libs.util import get_error
+
+MIMETYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+class AdminExport(Resource):
+    def __init__(self, **kwargs):
+        self.user_service = kwargs["user_service"]
+        self.export_service = kwargs["export_service"]
+
+    @jwt_required
+    def get(self, kind: str):
+        """
+        Streams every row of an export (ideas, votes, downloads or analysts), for admins.
+        parameters:
+            format (str) -> "ndjson" (default) or "csv"
+            gzip (str) -> "true" to download it gzipped
+        """
+        user = self.user_service.get_user_by_id(get_jwt_identity())
+        if not user.is_admin:
+            return get_error(400, get_text("unauthorized"))
+        if kind not in self.export_service.KINDS:
+            return get_error(404, get_text("not_found").format("Export"))
+        export_format = request.args.get("format", "ndjson")
+        if export_format not in self.export_service.FORMATS:
+            return get_error(400, get_text("invalid_export_format").format(", ".join(self.export_service.FORMATS)))
+        compress = request.args.get("gzip", "").lower() == "true"
+        filename = f"{kind}.{export_format}" + (".gz" if compress else "")
+        # the body is generated after the request has returned, with its app and request contexts kept alive
+        return Response(
+            stream_with_context(self.export_service.stream(kind, export_format, compress)),
+            mimetype="application/gzip" if compress else MIMETYPES[export_format],
+            headers={"Content-Disposition": f"attachment; filename={filename}"})
@@ -1,7 +1,8 @@
-from flask_restful import Resource
+from flask_restful import Resource, request
 
 from main.libs.strings import get_text
 from main.libs.util import get_error
+from main.libs.pagination import parse_page_size, is_paged, CursorException
 from flask_jwt_extended import get_jwt_identity, jwt_required
 from main.schema.user_schema import user_schema, user_follow_list_schema
 
@@ -67,8 +68,17 @@ class FollowingList(Resource):
         if not user:
             return get_error(404, get_text("not_found").format("User"))
 
-        following = self.follow_service.get_following(user_id)
-        return {"following": self.user_follow_list_schema.dump(following)}, 200
+        if not is_paged(request.args):
+            following = self.follow_service.get_following(user_id)
+            return {"following": self.user_follow_list_schema.dump(following), "nextCursor": None}, 200
+        try:
+            following, next_cursor = self.follow_service.get_following_page(
+                user_id,
+                cursor=request.args.get("cursor"),
+                page_size=parse_page_size(request.args.get("pageSize")))
+        except CursorException:
+            return get_error(400, get_text("invalid_cursor"))
+        return {"following": self.user_follow_list_schema.dump(following), "nextCursor": next_cursor}, 200
 
 
 class FollowerList(Resource):
@@ -83,6 +93,15 @@ class FollowerList(Resource):
         if not analyst:
             return get_error(404, get_text("not_found").format("analyst"))
 
-        followers = self.follow_service.get_followers(analyst_id)
-        return {"followers": self.user_follow_list_schema.dump(followers)}, 200
+        if not is_paged(request.args):
+            followers = self.follow_service.get_followers(analyst_id)
+            return {"followers": self.user_follow_list_schema.dump(followers), "nextCursor": None}, 200
+        try:
+            followers, next_cursor = self.follow_service.get_followers_page(
+                analyst_id,
+                cursor=request.args.get("cursor"),
+                page_size=parse_page_size(request.args.get("pageSize")))
+        except CursorException:
+            return get_error(400, get_text("invalid_cursor"))
+        return {"followers": self.user_follow_list_schema.dump(followers), "nextCursor": next_cursor}, 200
 
@@ -1,8 +1,10 @@
 from flask_restful import Resource
 
+from main.libs.stock import Stock
+
 
 class HealthCheck(Resource):
     @classmethod
     def get(cls):
-        """Just a health check endpoint to make sure API is working"""
-        return {"status": "working"}, 200
+        """Just a health check endpoint to make sure API is working, with this worker's stock lookup counters"""
+        return {"status": "working", "stockRequests": Stock.FLIGHTS.stats(), "stockCache": Stock.CACHE.stats()}, 200
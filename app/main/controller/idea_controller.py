@@ -5,6 +5,7 @@ from flask_jwt_extended import get_jwt_identity, jwt_required
 
 from main.libs.strings import get_text
 from main.libs.util import get_error
+from main.libs.pagination import parse_page_size, CursorException
 from main.schema.idea_schema import (
     idea_schema,
     new_idea_schema,
@@ -36,6 +37,11 @@ class NewIdea(Resource):
 
         exhibits = request.files.getlist('exhibits')
         exhibit_title_map = json.loads(request.form.get("exhibitTitleMap")) if request.form.get("exhibitTitleMap") else None
+        try:
+            # exhibits uploaded with /uploads, [{"key": ..., "title": ...}]
+            uploaded_exhibits = json.loads(request.form.get("exhibitUploads") or "[]")
+        except ValueError:
+            return get_error(400, get_text("incorrect_fields"), exhibitUploads="List of uploads required.")
         try:
             new_idea = self.idea_service.save_new_idea(
                 analyst_id=analyst_id,
@@ -47,7 +53,8 @@ class NewIdea(Resource):
                 thesis_summary=request.form.get("thesisSummary"),
                 full_report=request.form.get("fullReport"),
                 exhibits=exhibits,
-                exhibit_title_map=exhibit_title_map
+                exhibit_title_map=exhibit_title_map,
+                uploaded_exhibits=uploaded_exhibits
             )
         except Exception as e:
             return get_error(400, str(e))
@@ -103,19 +110,42 @@ class Idea(Resource):
             return get_error(500, str(e))
 
 
+class AdminIdeas(Resource):
+    def __init__(self, **kwargs):
+        self.user_service = kwargs['user_service']
+        self.idea_service = kwargs['idea_service']
+
+    @jwt_required
+    def delete(self):
+        """Admin bulk deletion.  Takes json with ideaIds (list of ints)"""
+        user_id = get_jwt_identity()
+        user = self.user_service.get_user_by_id(user_id)
+        if not user.is_admin:
+            return get_error(400, get_text("unauthorized_delete"))
+        idea_ids = (request.get_json(silent=True) or {}).get("ideaIds")
+        if not isinstance(idea_ids, list) or not idea_ids or \
+                not all(isinstance(idea_id, int) and not isinstance(idea_id, bool) for idea_id in idea_ids):
+            return get_error(400, get_text("incorrect_fields"), ideaIds="List of idea ids required.")
+        try:
+            num_deleted = self.idea_service.delete_ideas(idea_ids)
+            return {"message": get_text("successfully_deleted").format("Ideas"), "numDeleted": num_deleted}, 200
+        except Exception as e:
+            return get_error(500, str(e))
+
+
 class IdeaFeed(Resource):
     def __init__(self, **kwargs):
         self.idea_service = kwargs['idea_service']
         self.user_service = kwargs['user_service']
-        self.follow_service = kwargs['follow_service']
         self.idea_list_schema = idea_list_schema
 
     @jwt_required
     def get(self, feed_type: str):
         """
-        Returns idea feed for user.  feed_type can be either 'following' or 'discover'.
+        Returns a page of the idea feed for user.  feed_type can be either 'following' or 'discover'.
         Can be filtered with a querystring
         (sort, symbol, positionType, timePeriod, marketCap, sector)
+        and paged with cursor (nextCursor from the previous page) and pageSize
         """
         user_id = get_jwt_identity()
         query_string = {}
@@ -126,17 +156,26 @@ class IdeaFeed(Resource):
                     query_string[key] = request.args[key]
             query_string["marketCap"] = request.args.getlist('marketCap')
             query_string["sector"] = request.args.getlist('sector')
-        if feed_type == "following":
-            following = self.follow_service.get_following(user_id)
-            analyst_ids = [analyst.id for analyst in following]
-            analyst_ids.append(user_id) # if analyst, own ideas should show in follow feed
-            ideas = self.idea_service.query_ideas(analyst_ids=analyst_ids, query_string=query_string)
-            return self.idea_list_schema.dump(ideas), 200
-        elif feed_type == "discover":
-            ideas = self.idea_service.query_ideas(query_string=query_string)
-            return self.idea_list_schema.dump(ideas), 200
-        else:
-            return get_error(400, get_text("invalid_feed_type"))
+        cursor = request.args.get("cursor")
+        page_size = parse_page_size(request.args.get("pageSize"))
+        try:
+            if feed_type == "following":
+                # timeline includes the user's own ideas, so an analyst sees them in their follow feed
+                ideas, next_cursor = self.idea_service.query_following_page(
+                    user_id=user_id,
+                    query_string=query_string,
+                    cursor=cursor,
+                    page_size=page_size)
+            elif feed_type == "discover":
+                ideas, next_cursor = self.idea_service.query_idea_page(
+                    query_string=query_string,
+                    cursor=cursor,
+                    page_size=page_size)
+            else:
+                return get_error(400, get_text("invalid_feed_type"))
+        except CursorException:
+            return get_error(400, get_text("invalid_cursor"))
+        return {"ideas": self.idea_list_schema.dump(ideas), "nextCursor": next_cursor}, 200
 
 
 class DownloadReport(Resource):
@@ -153,8 +192,6 @@ class DownloadReport(Resource):
             return get_error(404, get_text("not_found").format("Idea"))
         financial_metrics = self.idea_service.get_idea_financial_metrics(idea.symbol)
         self.download_service.save_new_download(user_id=user_id, idea_id=idea.id)
-        idea.num_downloads = idea.num_downloads + 1
-        self.idea_service.save_changes(idea)
         return {
             **self.idea_with_report_schema.dump(idea),
             **financial_metrics
@@ -0,0 +1,62 @@
+from flask_restful import Resource, request
+from flask_jwt_extended import get_jwt_identity, jwt_required
+
+from main.libs.s3 import S3
+from main.libs.strings import get_text
+from main.libs.util import get_error
+from main.schema.upload_schema import new_upload_schema, confirm_upload_schema
+
+
+class NewUpload(Resource):
+    def __init__(self, **kwargs):
+        self.user_service = kwargs["user_service"]
+        self.upload_service = kwargs["upload_service"]
+        self.new_upload_schema = new_upload_schema
+
+    @jwt_required
+    def post(self):
+        """
+        Returns a presigned POST for uploading an image straight to S3: post a multipart form to url
+        with every field in fields, then the image as "file".  Then confirm it with /uploads/confirm.
+        parameters:
+            kind (str) -> "profileImage" or "exhibit"
+            filename (str) -> jpg or png file name
+            contentType (str) -> "image/png" or "image/jpeg"
+        """
+        upload_json = request.get_json(silent=True) or {}
+        errors = self.new_upload_schema.validate(upload_json)
+        if errors:
+            return get_error(400, get_text("incorrect_fields"), **errors)
+        user = self.user_service.get_user_by_id(get_jwt_identity())
+        if upload_json["kind"] == "exhibit" and not user.is_analyst:
+            return get_error(400, get_text("not_an_analyst"))
+        try:
+            upload = self.upload_service.create_upload(
+                user, upload_json["kind"], upload_json["filename"], upload_json["contentType"])
+        except ValueError as e:
+            return get_error(400, str(e))
+        return upload, 201
+
+
+class ConfirmUpload(Resource):
+    def __init__(self, **kwargs):
+        self.upload_service = kwargs["upload_service"]
+        self.confirm_upload_schema = confirm_upload_schema
+
+    @jwt_required
+    def post(self):
+        """
+        Records an image uploaded with a presigned POST from /uploads.  A profile image becomes the user's image,
+        an exhibit's key can then be given to /new-idea in exhibitUploads.
+        """
+        confirm_json = request.get_json(silent=True) or {}
+        errors = self.confirm_upload_schema.validate(confirm_json)
+        if errors:
+            return get_error(400, get_text("incorrect_fields"), **errors)
+        try:
+            upload = self.upload_service.confirm_upload(get_jwt_identity(), confirm_json["key"])
+        except ValueError as e:
+            return get_error(400, str(e))
+        if upload is None:
+            return get_error(404, get_text("not_found").format("Upload"))
+        return {"key": upload.key, "kind": upload.kind, "fileUrl": S3.public_url(upload.key)}, 200
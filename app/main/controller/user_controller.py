@@ -1,18 +1,66 @@
 import datetime
 
 from flask_restful import Resource, request
+from werkzeug.http import quote_etag
 from flask_jwt_extended import create_access_token, get_jwt_identity, jwt_required
 
 from main.libs.strings import get_text
 from main.libs.util import get_error
+from main.libs.pagination import parse_page_size, CursorException
+from main.libs.leaderboard import SORT_COLUMNS, DEFAULT_SORT_COLUMN
 from main.schema.user_schema import (
     user_schema,
+    user_compact_schema,
     user_register_schema,
     user_login_schema,
     user_follow_list_schema,
-    analyst_leaderboard_schema,
 )
 from main.schema.idea_schema import idea_list_schema
+from main.schema.upvote_schema import upvote_list_schema
+from main.schema.downvote_schema import downvote_list_schema
+from main.schema.bookmark_schema import bookmark_list_schema
+
+
+def user_payload(user, user_service, follow_service) -> dict:
+    """
+    Returns the user's full profile, including every follower, followed analyst, idea and vote.
+
+    With ?compact=true, returns counts and only the first page (pageSize, default 20) of each list instead,
+    with nextCursors for the rest: /user/<id>/following, /analyst/<id>/followers, /user/<id>/ideas
+    and /user/<username>/upvotes, /downvotes and /bookmarks.
+    """
+    if request.args.get("compact", "").lower() != "true":
+        following = follow_service.get_following(user.id)
+        followers = follow_service.get_followers(user.id)
+        return {
+            **user_schema.dump(user),
+            "following": user_follow_list_schema.dump(following),
+            "followers": user_follow_list_schema.dump(followers),
+            "ideas": idea_list_schema.dump(user.ideas.all())
+        }
+
+    page_size = parse_page_size(request.args.get("pageSize"))
+    following, following_cursor = follow_service.get_following_page(user.id, page_size=page_size)
+    followers, followers_cursor = follow_service.get_followers_page(user.id, page_size=page_size)
+    pages = user_service.get_profile_pages(user, page_size)
+    vote_counts = user_service.get_vote_counts(user)
+    return {
+        **user_compact_schema.dump(user),
+        "numUpvotes": vote_counts["upvotes"],
+        "numDownvotes": vote_counts["downvotes"],
+        "numBookmarks": vote_counts["bookmarks"],
+        "following": user_follow_list_schema.dump(following),
+        "followers": user_follow_list_schema.dump(followers),
+        "ideas": idea_list_schema.dump(pages["ideas"][0]),
+        "upvotes": upvote_list_schema.dump(pages["upvotes"][0]),
+        "downvotes": downvote_list_schema.dump(pages["downvotes"][0]),
+        "bookmarks": bookmark_list_schema.dump(pages["bookmarks"][0]),
+        "nextCursors": {
+            "following": following_cursor,
+            "followers": followers_cursor,
+            **{name: next_cursor for name, (rows, next_cursor) in pages.items()}
+        }
+    }
 
 
 class UserRegister(Resource):
@@ -81,14 +129,7 @@ class User(Resource):
             user = self.user_service.get_user_by_username(username_or_id)
 
         if user:
-            following = self.follow_service.get_following(user.id)
-            followers = self.follow_service.get_followers(user.id)
-            return {
-                **user_schema.dump(user),
-                "following": user_follow_list_schema.dump(following),
-                "followers": user_follow_list_schema.dump(followers),
-                "ideas": idea_list_schema.dump(user.ideas.all())
-            }, 200
+            return user_payload(user, self.user_service, self.follow_service), 200
         else:
             return get_error(404, get_text("not_found").format("User"))
 
@@ -131,14 +172,7 @@ class User(Resource):
                 return get_error(400, str(e))
 
         self.user_service.save_changes(user)
-        following = self.follow_service.get_following(user.id)
-        followers = self.follow_service.get_followers(user.id)
-        return {
-            **user_schema.dump(user),
-            "following": user_follow_list_schema.dump(following),
-            "followers": user_follow_list_schema.dump(followers),
-            "ideas": idea_list_schema.dump(user.ideas.all())
-        }, 201
+        return user_payload(user, self.user_service, self.follow_service), 201
 
 
 class UserLogin(Resource):
@@ -160,24 +194,38 @@ class UserLogin(Resource):
         if user and user.check_password(credentials["password"]):
             expires = datetime.timedelta(days=30)
             access_token = create_access_token(identity=user.id, expires_delta=expires, fresh=True)
-            following = self.follow_service.get_following(user.id)
-            followers = self.follow_service.get_followers(user.id)
             return {
-               "user": {
-                   **user_schema.dump(user),
-                   "following": user_follow_list_schema.dump(following),
-                   "followers": user_follow_list_schema.dump(followers),
-                   "ideas": idea_list_schema.dump(user.ideas.all())
-                },
+               "user": user_payload(user, self.user_service, self.follow_service),
                "accessToken": access_token,
             }, 200
 
         return get_error(401, get_text("user_invalid_credentials"), field="general")
 
 
-class AnalystLeaderboard(Resource):
+class UserIdeas(Resource):
     def __init__(self, **kwargs):
         self.user_service = kwargs['user_service']
+        self.idea_service = kwargs['idea_service']
+
+    @jwt_required
+    def get(self, user_id: int):
+        """Returns a page of the user's ideas, most recent first.  Paged with cursor and pageSize"""
+        user = self.user_service.get_user_by_id(user_id)
+        if not user:
+            return get_error(404, get_text("not_found").format("User"))
+        try:
+            ideas, next_cursor = self.idea_service.get_analyst_ideas_page(
+                user_id,
+                cursor=request.args.get("cursor"),
+                page_size=parse_page_size(request.args.get("pageSize")))
+        except CursorException:
+            return get_error(400, get_text("invalid_cursor"))
+        return {"ideas": idea_list_schema.dump(ideas), "nextCursor": next_cursor}, 200
+
+
+class AnalystLeaderboard(Resource):
+    def __init__(self, **kwargs):
+        self.leaderboard_service = kwargs['leaderboard_service']
 
     def get(self):
         """
@@ -188,8 +236,12 @@ class AnalystLeaderboard(Resource):
             orderType (str) -> "desc" or "asc
             page (int)
             pageSize (int)
+        Served from the latest leaderboard snapshot, with its ETag and version in the response headers.
         """
         query_string = request.args
+        sort_column = query_string.get("sortColumn", DEFAULT_SORT_COLUMN)
+        if sort_column not in SORT_COLUMNS:
+            return get_error(400, get_text("invalid_sort_column").format(", ".join(SORT_COLUMNS)))
         page = 0
         page_size = None
         if "page" in query_string:
@@ -197,12 +249,13 @@ class AnalystLeaderboard(Resource):
         if "pageSize" in query_string:
             page_size = int(query_string["pageSize"])
 
-        try:
-            analysts = self.user_service.get_analysts_for_leaderboard(
-                query_string=query_string,
-                page=page,
-                page_size=page_size)
-            return analyst_leaderboard_schema.dump(analysts), 200
-        except Exception as e:
-            return get_error(500, str(e))
-
+        snapshot = self.leaderboard_service.get_snapshot()
+        headers = {"ETag": quote_etag(snapshot.etag), "X-Leaderboard-Version": str(snapshot.version)}
+        if request.if_none_match.contains(snapshot.etag):
+            return None, 304, headers
+        analysts = snapshot.page(
+            sort_column=sort_column,
+            descending=query_string.get("orderType") == "desc",
+            page=page,
+            page_size=page_size)
+        return analysts, 200, headers
@@ -1,3 +1,129 @@
+import hashlib
+import os
+import tempfile
+import zlib
+from contextlib import contextmanager
+from typing import Callable, Iterable, List
+
+from flask import g, has_app_context
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import text
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
 
 db = SQLAlchemy()
+
+
+def in_unit_of_work() -> bool:
+    return has_app_context() and g.get("unit_of_work", False)
+
+
+def begin_unit_of_work() -> None:
+    g.unit_of_work = True
+
+
+def end_unit_of_work(success: bool) -> None:
+    """Commits (or rolls back) everything written since begin_unit_of_work"""
+    if not in_unit_of_work():
+        return
+    g.unit_of_work = False
+    callbacks = g.pop("after_commit", [])
+    if success:
+        db.session.commit()
+        for callback in callbacks:
+            callback()
+    else:
+        db.session.rollback()
+
+
+def after_commit(callback: Callable[[], None]) -> None:
+    """
+    Calls callback once the current unit of work has committed, or right away outside one.
+    e.g. for starting background work that reads what was just written.  Dropped if it rolls back.
+    """
+    if in_unit_of_work():
+        g.setdefault("after_commit", []).append(callback)
+    else:
+        callback()
+
+
+@contextmanager
+def unit_of_work():
+    """
+    Groups every write inside the block into a single transaction.
+    Nested blocks (and blocks inside a request) join the outer transaction
+    through a savepoint, so an error inside one only undoes its own writes.
+    """
+    if in_unit_of_work():
+        savepoint = db.session.begin_nested()
+        try:
+            yield
+        except Exception:
+            savepoint.rollback()
+            raise
+        savepoint.commit()
+        return
+    begin_unit_of_work()
+    try:
+        yield
+    except Exception:
+        end_unit_of_work(success=False)
+        raise
+    end_unit_of_work(success=True)
+
+
+def commit_or_flush() -> None:
+    """Flushes pending writes inside a unit of work (committed when it ends), otherwise commits"""
+    if in_unit_of_work():
+        db.session.flush()
+    else:
+        db.session.commit()
+
+
+def save_all(objects: Iterable) -> None:
+    """Adds many objects and writes them with a single flush"""
+    db.session.add_all(objects)
+    commit_or_flush()
+
+
+def bulk_update(model, mappings: List[dict]) -> None:
+    """Updates rows from dicts that include the primary key, without loading them into the session"""
+    db.session.bulk_update_mappings(model, mappings)
+    commit_or_flush()
+
+
+@contextmanager
+def advisory_lock(name: str):
+    """
+    Tries to take a lock shared by every process using the database, without waiting.
+    Yields whether it was acquired, it is held until the block ends.
+    On Postgres this is a session level advisory lock on a connection of its own, on other databases
+    (local development and tests) an flock on a file, which only covers processes on the same host.
+    """
+    if db.engine.dialect.name == "postgresql":
+        key = zlib.crc32(name.encode())
+        with db.engine.connect() as connection:
+            acquired = connection.execute(text("SELECT pg_try_advisory_lock(:key)"), key=key).scalar()
+            try:
+                yield acquired
+            finally:
+                if acquired:
+                    connection.execute(text("SELECT pg_advisory_unlock(:key)"), key=key)
+        return
+    if fcntl is None:
+        yield True
+        return
+    digest = hashlib.sha1(f"{db.engine.url}:{name}".encode()).hexdigest()
+    with open(os.path.join(tempfile.gettempdir(), f"advisory-lock-{digest}"), "a") as file:
+        try:
+            fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(file, fcntl.LOCK_UN)
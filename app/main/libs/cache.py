@@ -0,0 +1,360 @@
+"""
+Size bounded caches for upstream responses, with interchangeable backends.
+
+- MemoryBackend: LRU dict in the process, the default.
+- MmapBackend: set associative table in a memory mapped file, shared by every worker on the host.
+- RedisBackend: any server speaking the Redis protocol, shared by every dyno.  Bound its size with maxmemory
+  and an allkeys-lru eviction policy on the server.
+
+Backends store bytes with a ttl in seconds.  Cache sits on top of one, storing JSON values and counting hits
+and misses, and treats backend errors as misses so an unavailable cache only costs latency.
+"""
+import hashlib
+import json
+import logging
+import mmap
+import os
+import queue
+import socket
+import struct
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+try:
+    import fcntl
+except ImportError:  # not on Windows, where MmapBackend isn't available
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class CacheError(Exception):
+    def __init__(self, message: str):
+        super().__init__(message)
+
+
+class CacheBackend:
+    def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+
+class MemoryBackend(CacheBackend):
+    """Least recently used entries are evicted beyond max_entries"""
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.time():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        with self.lock:
+            self.entries[key] = (time.time() + ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+
+
+class MmapBackend(CacheBackend):
+    """
+    A fixed size file of num_sets * ways slots of slot_size bytes, mapped into every process that opens it.
+    A key can only live in the ways slots of the set its hash picks, so a new key replaces an empty or expired
+    slot there, or else the one closest to expiring.  Values too big for a slot aren't cached.
+    Each set is guarded by a byte range lock on the file (and a lock within the process).
+    """
+    # key digest, expiry (unix time), value length
+    SLOT_HEADER = struct.Struct("<20sdI")
+
+    def __init__(self, path: str, num_sets: int = 256, ways: int = 4, slot_size: int = 65536):
+        if fcntl is None:
+            raise CacheError("MmapBackend needs fcntl")
+        self.path = path
+        self.num_sets = num_sets
+        self.ways = ways
+        self.slot_size = slot_size
+        self.set_size = ways * slot_size
+        size = num_sets * self.set_size
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(self.fd).st_size != size:
+            # sparse, so unused slots don't take up disk or memory
+            os.ftruncate(self.fd, size)
+        self.map = mmap.mmap(self.fd, size)
+        self.lock = threading.Lock()
+
+    def _set_for(self, key: str) -> Tuple[bytes, int]:
+        digest = hashlib.sha1(key.encode()).digest()
+        return digest, int.from_bytes(digest[:8], "little") % self.num_sets * self.set_size
+
+    @contextmanager
+    def _locked(self, offset: int, exclusive: bool):
+        with self.lock:
+            fcntl.lockf(self.fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH, self.set_size, offset)
+            try:
+                yield
+            finally:
+                fcntl.lockf(self.fd, fcntl.LOCK_UN, self.set_size, offset)
+
+    def _slots(self, set_offset: int):
+        for way in range(self.ways):
+            offset = set_offset + way * self.slot_size
+            yield offset, self.SLOT_HEADER.unpack_from(self.map, offset)
+
+    def get(self, key: str) -> Optional[bytes]:
+        digest, set_offset = self._set_for(key)
+        with self._locked(set_offset, exclusive=False):
+            for offset, (slot_digest, expires_at, length) in self._slots(set_offset):
+                if slot_digest == digest and expires_at > time.time():
+                    start = offset + self.SLOT_HEADER.size
+                    return bytes(self.map[start:start + length])
+        return None
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        if len(value) > self.slot_size - self.SLOT_HEADER.size:
+            return
+        digest, set_offset = self._set_for(key)
+        now = time.time()
+        with self._locked(set_offset, exclusive=True):
+            victim = None
+            for offset, (slot_digest, expires_at, _) in self._slots(set_offset):
+                if slot_digest == digest or expires_at <= now:
+                    victim = (offset, expires_at)
+                    if slot_digest == digest:
+                        break
+                elif victim is None or expires_at < victim[1]:
+                    victim = (offset, expires_at)
+            offset = victim[0]
+            start = offset + self.SLOT_HEADER.size
+            self.map[start:start + len(value)] = value
+            self.SLOT_HEADER.pack_into(self.map, offset, digest, now + ttl, len(value))
+
+    def delete(self, key: str) -> None:
+        digest, set_offset = self._set_for(key)
+        with self._locked(set_offset, exclusive=True):
+            for offset, (slot_digest, _, _) in self._slots(set_offset):
+                if slot_digest == digest:
+                    self.SLOT_HEADER.pack_into(self.map, offset, bytes(20), 0, 0)
+
+    def clear(self) -> None:
+        for set_offset in range(0, self.num_sets * self.set_size, self.set_size):
+            with self._locked(set_offset, exclusive=True):
+                for offset, _ in self._slots(set_offset):
+                    self.SLOT_HEADER.pack_into(self.map, offset, bytes(20), 0, 0)
+
+
+class RedisBackend(CacheBackend):
+    """Minimal Redis protocol (RESP) client with a pool of connections, keys are prefixed with prefix"""
+
+    def __init__(self, host: str = "localhost", port: int = 6379, db: int = 0, password: Optional[str] = None,
+                 prefix: str = "cache:", timeout: float = 0.5, pool_size: int = 10):
+        self.address = (host, port)
+        self.db = db
+        self.password = password
+        self.prefix = prefix
+        self.timeout = timeout
+        self.pool: "queue.LifoQueue" = queue.LifoQueue(maxsize=pool_size)
+
+    def _connect(self) -> "RespConnection":
+        connection = RespConnection(socket.create_connection(self.address, timeout=self.timeout))
+        if self.password:
+            connection.command("AUTH", self.password)
+        if self.db:
+            connection.command("SELECT", self.db)
+        return connection
+
+    def command(self, *args) -> Any:
+        try:
+            connection = self.pool.get_nowait()
+        except queue.Empty:
+            connection = None
+        try:
+            if connection is None:
+                connection = self._connect()
+            reply = connection.command(*args)
+        except (OSError, CacheError) as e:
+            # the connection may be half way through a reply, so it can't be reused
+            if connection is not None:
+                connection.close()
+            raise CacheError(f"Redis command {args[0]} failed: {e}")
+        try:
+            self.pool.put_nowait(connection)
+        except queue.Full:
+            connection.close()
+        return reply
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.command("GET", self.prefix + key)
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        self.command("SET", self.prefix + key, value, "PX", max(int(ttl * 1000), 1))
+
+    def delete(self, key: str) -> None:
+        self.command("DEL", self.prefix + key)
+
+    def clear(self) -> None:
+        """Deletes every key with this backend's prefix"""
+        cursor = b"0"
+        while True:
+            cursor, keys = self.command("SCAN", cursor, "MATCH", self.prefix + "*", "COUNT", 1000)
+            if keys:
+                self.command("DEL", *keys)
+            if cursor == b"0":
+                return
+
+
+class RespConnection:
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self.reader = sock.makefile("rb")
+
+    def command(self, *args) -> Any:
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        self.sock.sendall(b"".join(parts))
+        return self.read_reply()
+
+    def read_reply(self) -> Any:
+        line = self.reader.readline()
+        if not line.endswith(b"\r\n"):
+            raise CacheError("Connection closed")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest
+        if kind == b"-":
+            raise CacheError(rest.decode(errors="replace"))
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            length = int(rest)
+            if length < 0:
+                return None
+            data = self.reader.read(length + 2)
+            return data[:-2]
+        if kind == b"*":
+            length = int(rest)
+            return None if length < 0 else [self.read_reply() for _ in range(length)]
+        raise CacheError(f"Unexpected reply {line!r}")
+
+    def close(self) -> None:
+        try:
+            self.reader.close()
+            self.sock.close()
+        except OSError:
+            pass
+
+
+# the query string options each backend takes, and their types
+BACKEND_OPTIONS = {
+    "memory": {"max_entries": int},
+    "mmap": {"num_sets": int, "ways": int, "slot_size": int},
+    "redis": {"prefix": str, "timeout": float, "pool_size": int},
+}
+
+
+def backend_from_url(url: str) -> CacheBackend:
+    """
+    memory://?max_entries=4096
+    mmap:///path/to/file?num_sets=256&ways=4&slot_size=65536
+    redis://[:password@]host[:port][/db][?prefix=cache:&timeout=0.5&pool_size=10]
+    Raises CacheError for an unknown backend or option, or an option that isn't a number when it should be.
+    """
+    parsed = urlparse(url)
+    if parsed.scheme not in BACKEND_OPTIONS:
+        raise CacheError(f"Unknown cache backend {parsed.scheme!r}")
+    option_types = BACKEND_OPTIONS[parsed.scheme]
+    options = {}
+    for name, values in parse_qs(parsed.query).items():
+        if name not in option_types:
+            raise CacheError(f"Unknown {parsed.scheme} cache option {name!r}")
+        try:
+            options[name] = option_types[name](values[-1])
+        except ValueError:
+            raise CacheError(f"Invalid {parsed.scheme} cache option {name}={values[-1]!r}")
+    if parsed.scheme == "memory":
+        return MemoryBackend(**options)
+    if parsed.scheme == "mmap":
+        return MmapBackend(parsed.path, **options)
+    try:
+        db = int(parsed.path.strip("/") or 0)
+    except ValueError:
+        raise CacheError(f"Invalid redis database {parsed.path.strip('/')!r}")
+    return RedisBackend(host=parsed.hostname or "localhost", port=parsed.port or 6379,
+                        db=db, password=parsed.password, **options)
+
+
+class Cache:
+    def __init__(self, backend: CacheBackend):
+        self.backend = backend
+        self.lock = threading.Lock()
+        self.counters = Counter()
+
+    def _count(self, name: str) -> None:
+        with self.lock:
+            self.counters[name] += 1
+
+    def get(self, key: str) -> Optional[Any]:
+        try:
+            value = self.backend.get(key)
+        except CacheError:
+            logger.exception("Cache read failed")
+            self._count("errors")
+            value = None
+        self._count("misses" if value is None else "hits")
+        return None if value is None else json.loads(value)
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        if ttl <= 0:
+            return
+        try:
+            self.backend.set(key, json.dumps(value, separators=(",", ":")).encode(), ttl)
+        except CacheError:
+            logger.exception("Cache write failed")
+            self._count("errors")
+
+    def get_or_load(self, key: str, ttl: float, load: Callable[[], Any]) -> Any:
+        value = self.get(key)
+        if value is None:
+            value = load()
+            self.set(key, value, ttl)
+        return value
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {"backend": type(self.backend).__name__,
+                    **{name: self.counters[name] for name in ("hits", "misses", "errors")}}
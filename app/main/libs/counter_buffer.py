@@ -0,0 +1,93 @@
+"""
+Write-behind buffer for counter deltas.
+
+Deltas for the same row are summed in memory and handed to a flush function in batches, either every
+interval or as soon as max_events deltas have piled up, from one background thread.  Until a batch has
+been written, pending() still reports it, so reads can overlay counts that aren't in the database yet.
+The flush function commits the batch inside committing(), which stops reporting it in the same step,
+so a read never sees deltas both in the database and pending.
+"""
+import logging
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Callable, ContextManager, Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (table name, row id) -> {column: delta}
+Deltas = Dict[Tuple[str, int], Dict[str, int]]
+
+
+class CounterBuffer:
+    def __init__(self, flush: Callable[[Deltas, Callable[[], ContextManager]], None], interval: float = 0.2,
+                 max_events: int = 500):
+        self.flush_deltas = flush
+        self.interval = interval
+        self.max_events = max_events
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.buffered: Deltas = defaultdict(lambda: defaultdict(int))
+        self.flushing: Deltas = {}
+        self.num_events = 0
+        self.wakeup = threading.Event()
+        self.thread = None
+
+    def add(self, table: str, row_id: int, deltas: Dict[str, int]) -> None:
+        with self.lock:
+            row = self.buffered[(table, row_id)]
+            for column, delta in deltas.items():
+                row[column] += delta
+            self.num_events += 1
+            if self.num_events >= self.max_events:
+                self.wakeup.set()
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name="counter-buffer", daemon=True)
+                self.thread.start()
+
+    def pending(self, table: str, row_id: int) -> Dict[str, int]:
+        """Deltas for a row that aren't in the database yet"""
+        key = (table, row_id)
+        with self.lock:
+            totals = defaultdict(int)
+            for deltas in (self.flushing.get(key, {}), self.buffered.get(key, {})):
+                for column, delta in deltas.items():
+                    totals[column] += delta
+            return dict(totals)
+
+    @contextmanager
+    def committing(self):
+        """Wraps the commit of the batch being flushed, which is no longer pending once it succeeds"""
+        with self.lock:
+            yield
+            self.flushing = {}
+
+    def flush(self) -> None:
+        """Writes everything buffered so far.  Flushes are serialized, so deltas are never applied twice."""
+        with self.flush_lock:
+            with self.lock:
+                if not self.buffered:
+                    return
+                self.flushing, self.buffered = self.buffered, defaultdict(lambda: defaultdict(int))
+                self.num_events = 0
+            try:
+                self.flush_deltas(self.flushing, self.committing)
+            except Exception:
+                # put the batch back so it's retried with the next one
+                with self.lock:
+                    for key, deltas in self.flushing.items():
+                        for column, delta in deltas.items():
+                            self.buffered[key][column] += delta
+                    self.flushing = {}
+                raise
+            with self.lock:
+                self.flushing = {}
+
+    def run(self) -> None:
+        while True:
+            self.wakeup.wait(self.interval)
+            self.wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Failed to flush counter deltas, retrying with the next batch")
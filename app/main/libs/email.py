@@ -1,44 +1,62 @@
+import json
 import os
-from typing import List
+from typing import Dict, List
 
-from requests import Response, post
+from requests import RequestException, Response, post
 
 from main.libs.strings import get_text
 
 
 class EmailException(Exception):
-    def __init__(self, message: str):
+    def __init__(self, message: str, retryable: bool = True):
         super().__init__(message)
+        self.retryable = retryable
 
 
 class Email:
     MAILGUN_API_KEY = os.environ.get("MAILGUN_API_KEY", None)
     MAILGUN_DOMAIN = os.environ.get("MAILGUN_DOMAIN", None)
+    # a local stand-in in tests
+    MAILGUN_API_URL = os.environ.get("MAILGUN_API_URL", "https://api.mailgun.net/v3")
+    TIMEOUT = 10
 
     FROM_TITLE = "hayek.ai"
     FROM_EMAIL = f"no-reply@{MAILGUN_DOMAIN}"
 
     @classmethod
     def send_email(cls, email: List[str], subject: str, text: str, html: str) -> Response:
+        return cls._post({"to": email, "subject": subject, "text": text, "html": html})
+
+    @classmethod
+    def send_batch(cls, recipient_variables: Dict[str, dict], subject: str, text: str, html: str) -> Response:
+        """
+        One message to each recipient (they don't see each other), in a single request.
+        %recipient.name% in subject, text or html is replaced by the recipient's variables[name].
+        """
+        return cls._post({"to": list(recipient_variables), "subject": subject, "text": text, "html": html,
+                          "recipient-variables": json.dumps(recipient_variables)})
+
+    @classmethod
+    def _post(cls, data: dict) -> Response:
         if cls.MAILGUN_API_KEY is None:
             raise EmailException(get_text("env_fail").format("Mailgun API Key"))
 
         if cls.MAILGUN_DOMAIN is None:
             raise EmailException(get_text("env_fail").format("Mailgun Domain"))
 
-        response = post(
-            f"https://api.mailgun.net/v3/{cls.MAILGUN_DOMAIN}/messages",
-            auth=("api", cls.MAILGUN_API_KEY),
-            data={
-                "from": f"{cls.FROM_TITLE} <{cls.FROM_EMAIL}>",
-                "to": email,
-                "subject": subject,
-                "text": text,
-                "html": html,
-            }
-        )
+        try:
+            response = post(
+                f"{cls.MAILGUN_API_URL}/{cls.MAILGUN_DOMAIN}/messages",
+                auth=("api", cls.MAILGUN_API_KEY),
+                data={"from": f"{cls.FROM_TITLE} <{cls.FROM_EMAIL}>", **data},
+                timeout=cls.TIMEOUT
+            )
+        except RequestException:
+            raise EmailException(get_text("error_sending_email"))
 
         if response.status_code != 200:
-            raise EmailException(get_text("error_sending_email"))
+            # other client errors would fail the same way again
+            retryable = response.status_code == 429 or response.status_code >= 500
+            raise EmailException(get_text("error_sending_email"), retryable=retryable)
 
         return response
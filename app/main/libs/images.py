@@ -0,0 +1,84 @@
+"""
+Image checks and resized variants.
+
+Formats are told by their magic bytes, not by file names or declared content types.  make_variants is CPU bound
+and only takes and returns bytes, so it can run in a process pool (it imports nothing from the app).
+"""
+import io
+from typing import Dict, Optional, Tuple
+
+from PIL import Image, ImageOps
+
+# leading bytes of the formats accepted
+SIGNATURES = {b"\x89PNG\r\n\x1a\n": "png", b"\xff\xd8\xff": "jpeg"}
+SNIFF_LENGTH = max(len(signature) for signature in SIGNATURES)
+CONTENT_TYPES = {"png": "image/png", "jpeg": "image/jpeg"}
+# bigger images are refused rather than decoded (a small file can decode to gigabytes)
+MAX_PIXELS = 40_000_000
+WEBP_QUALITY = 80
+
+
+class ImageError(Exception):
+    def __init__(self, message: str):
+        super().__init__(message)
+
+
+def sniff_format(head: bytes) -> Optional[str]:
+    """"png" or "jpeg" from the first SNIFF_LENGTH bytes of a file, None for anything else"""
+    for signature, image_format in SIGNATURES.items():
+        if head.startswith(signature):
+            return image_format
+    return None
+
+
+def _open(data: bytes) -> Image.Image:
+    image_format = sniff_format(data[:SNIFF_LENGTH])
+    if image_format is None:
+        raise ImageError("Not a PNG or JPEG image")
+    try:
+        image = Image.open(io.BytesIO(data))
+        if image.width * image.height > MAX_PIXELS:
+            raise ImageError(f"Image is over {MAX_PIXELS} pixels")
+        image.load()
+    except (OSError, SyntaxError, Image.DecompressionBombError) as e:
+        raise ImageError(f"Unreadable image: {e}")
+    return image
+
+
+def _webp(image: Image.Image) -> bytes:
+    has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+    output = io.BytesIO()
+    image.convert("RGBA" if has_alpha else "RGB").save(output, "WEBP", quality=WEBP_QUALITY, method=4)
+    return output.getvalue()
+
+
+def make_variants(data: bytes, sizes: Tuple[int, ...], square: bool) -> Tuple[bytes, Dict[int, bytes]]:
+    """
+    Returns the image re-encoded in its own format without metadata (EXIF, comments, text chunks; the colour
+    profile is kept), and a WebP variant per size: cropped to size x size if square, else size wide.
+    Images are never scaled up.  Raises ImageError if data isn't a readable PNG or JPEG.
+    """
+    image = _open(data)
+    image_format = sniff_format(data[:SNIFF_LENGTH])
+    icc_profile = image.info.get("icc_profile")
+    # EXIF orientation is applied to the pixels, since the EXIF is dropped
+    image = ImageOps.exif_transpose(image)
+
+    stripped = io.BytesIO()
+    if image_format == "jpeg":
+        image.convert("RGB" if image.mode not in ("RGB", "L") else image.mode).save(
+            stripped, "JPEG", quality=90, optimize=True, icc_profile=icc_profile)
+    else:
+        image.save(stripped, "PNG", optimize=True, icc_profile=icc_profile)
+
+    variants = {}
+    for size in sizes:
+        if square:
+            side = min(size, image.width, image.height)
+            variant = ImageOps.fit(image, (side, side), Image.LANCZOS)
+        elif image.width > size:
+            variant = image.resize((size, max(1, round(image.height * size / image.width))), Image.LANCZOS)
+        else:
+            variant = image
+        variants[size] = _webp(variant)
+    return stripped.getvalue(), variants
@@ -0,0 +1,54 @@
+"""
+Immutable, in-memory leaderboard.
+
+A snapshot holds the serialized analysts in one list, plus for every sortable column the row positions
+pre-sorted ascending and descending in compact int arrays.  Serving a page is then a slice of one of those
+arrays, and a new snapshot is swapped in whole, so readers never see a half built leaderboard.
+"""
+import hashlib
+import json
+from array import array
+from typing import List, Optional
+
+from main.libs.util import camelcase
+
+SORT_COLUMNS = ("analyst_rank", "success_rate", "avg_return", "num_ideas", "avg_holding_period", "num_followers")
+DEFAULT_SORT_COLUMN = "analyst_rank"
+
+
+class LeaderboardSnapshot:
+    def __init__(self, analysts: List[dict], version: int):
+        """
+        analysts are serialized analysts (as returned by analyst_leaderboard_schema)
+        keyed by camelCase field names.
+        """
+        self.rows = analysts
+        self.version = version
+        # content based, so every process serving the same rankings hands out the same etag
+        self.etag = hashlib.sha1(json.dumps(analysts, sort_keys=True).encode()).hexdigest()
+        self.ascending = {}
+        self.descending = {}
+        for column in SORT_COLUMNS:
+            self.ascending[column], self.descending[column] = self._sort_positions(column)
+
+    def _sort_positions(self, column: str):
+        """Positions of rows sorted on column with ties broken by id.  Analysts without a value come last."""
+        key = camelcase(column)
+        present = [idx for idx, row in enumerate(self.rows) if row.get(key) is not None]
+        absent = [idx for idx, row in enumerate(self.rows) if row.get(key) is None]
+        present.sort(key=lambda idx: (self.rows[idx][key], self.rows[idx]["id"]))
+        absent.sort(key=lambda idx: self.rows[idx]["id"])
+        descending = sorted(present, key=lambda idx: (-self.rows[idx][key], self.rows[idx]["id"]))
+        return array("l", present + absent), array("l", descending + absent)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def page(self, sort_column: str = DEFAULT_SORT_COLUMN, descending: bool = False,
+             page: int = 0, page_size: Optional[int] = None) -> List[dict]:
+        """Returns a page of serialized analysts.  Without page_size every analyst is returned."""
+        positions = self.descending[sort_column] if descending else self.ascending[sort_column]
+        if page_size:
+            positions = positions[page * page_size:(page + 1) * page_size]
+        rows = self.rows
+        return [rows[idx] for idx in positions]
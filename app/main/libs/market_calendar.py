@@ -0,0 +1,103 @@
+"""
+NYSE trading calendar: regular hours, holidays and early closes, computed from the exchange's rules
+so it needs no yearly update.  Times are New York local, functions taking a moment expect an aware datetime.
+"""
+import datetime
+from functools import lru_cache
+from typing import Dict, Optional
+
+import pytz
+
+MARKET_TIMEZONE = pytz.timezone("America/New_York")
+MARKET_OPEN = datetime.time(9, 30)
+MARKET_CLOSE = datetime.time(16)
+EARLY_CLOSE = datetime.time(13)
+
+
+def nth_weekday(year: int, month: int, weekday: int, n: int) -> datetime.date:
+    """n-th (1 based, -1 for last) weekday (Monday is 0) of a month"""
+    if n > 0:
+        first = datetime.date(year, month, 1)
+        return first + datetime.timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = datetime.date(year + month // 12, month % 12 + 1, 1) - datetime.timedelta(days=1)
+    return last - datetime.timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def easter(year: int) -> datetime.date:
+    """Gregorian Easter Sunday (Meeus/Jones/Butcher algorithm)"""
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = divmod(b, 4)
+    g = (b - (b + 8) // 25 + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    weekday_offset = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * weekday_offset) // 451
+    month, day = divmod(h + weekday_offset - 7 * m + 114, 31)
+    return datetime.date(year, month, day + 1)
+
+
+def observed(date: datetime.date) -> datetime.date:
+    """Saturday holidays are observed on Friday, Sunday ones on Monday"""
+    if date.weekday() == 5:
+        return date - datetime.timedelta(days=1)
+    if date.weekday() == 6:
+        return date + datetime.timedelta(days=1)
+    return date
+
+
+@lru_cache(maxsize=16)
+def holidays(year: int) -> Dict[datetime.date, str]:
+    days = {
+        nth_weekday(year, 1, 0, 3): "Martin Luther King Jr. Day",
+        nth_weekday(year, 2, 0, 3): "Washington's Birthday",
+        easter(year) - datetime.timedelta(days=2): "Good Friday",
+        nth_weekday(year, 5, 0, -1): "Memorial Day",
+        observed(datetime.date(year, 7, 4)): "Independence Day",
+        nth_weekday(year, 9, 0, 1): "Labor Day",
+        nth_weekday(year, 11, 3, 4): "Thanksgiving Day",
+        observed(datetime.date(year, 12, 25)): "Christmas Day",
+    }
+    # a Saturday New Year's Day isn't observed on the Friday before, which is in the previous year
+    new_year = datetime.date(year, 1, 1)
+    if new_year.weekday() != 5:
+        days[observed(new_year)] = "New Year's Day"
+    if year >= 2022:
+        days[observed(datetime.date(year, 6, 19))] = "Juneteenth"
+    return days
+
+
+def is_trading_day(date: datetime.date) -> bool:
+    return date.weekday() < 5 and date not in holidays(date.year)
+
+
+def close_time(date: datetime.date) -> Optional[datetime.time]:
+    """When the market closes on date, None if it doesn't open"""
+    if not is_trading_day(date):
+        return None
+    day_after_thanksgiving = nth_weekday(date.year, 11, 3, 4) + datetime.timedelta(days=1)
+    independence_eve = datetime.date(date.year, 7, 3)
+    christmas_eve = datetime.date(date.year, 12, 24)
+    if date == day_after_thanksgiving or date == christmas_eve or \
+            (date == independence_eve and datetime.date(date.year, 7, 4).weekday() < 5):
+        return EARLY_CLOSE
+    return MARKET_CLOSE
+
+
+def localize(date: datetime.date, time: datetime.time) -> datetime.datetime:
+    return MARKET_TIMEZONE.localize(datetime.datetime.combine(date, time))
+
+
+def is_open(now: datetime.datetime) -> bool:
+    local_now = now.astimezone(MARKET_TIMEZONE)
+    close = close_time(local_now.date())
+    return close is not None and MARKET_OPEN <= local_now.time() < close
+
+
+def next_close(now: datetime.datetime) -> datetime.datetime:
+    """The first close after now"""
+    day = now.astimezone(MARKET_TIMEZONE).date()
+    while True:
+        close = close_time(day)
+        if close is not None and localize(day, close) > now:
+            return localize(day, close)
+        day += datetime.timedelta(days=1)
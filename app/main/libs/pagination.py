@@ -0,0 +1,118 @@
+"""
+Keyset (cursor) pagination.
+
+A cursor is the sort key of the last row of a page, e.g. (created_at, id), encoded as url safe base64 json
+so clients treat it as opaque.  The next page is every row whose sort key comes after it, which the
+database finds with an index seek instead of counting past an offset.
+"""
+import base64
+import binascii
+import datetime
+import json
+from typing import Callable, List, Optional
+
+from sqlalchemy import and_, tuple_
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+class CursorException(Exception):
+    def __init__(self, message: str):
+        super().__init__(message)
+
+
+def _encode_value(value):
+    if isinstance(value, datetime.datetime):
+        return {"datetime": value.isoformat()}
+    raise TypeError(f"Cannot encode {type(value).__name__} in a cursor")
+
+
+def _decode_value(obj):
+    if "datetime" in obj:
+        return datetime.datetime.fromisoformat(obj["datetime"])
+    return obj
+
+
+def encode_cursor(values: list) -> str:
+    data = json.dumps(values, default=_encode_value, separators=(",", ":"))
+    return base64.urlsafe_b64encode(data.encode()).decode()
+
+
+def _has_type(value, python_type: Optional[type]) -> bool:
+    if python_type is None:
+        return True
+    if isinstance(value, bool):
+        return python_type is bool
+    if python_type is float:
+        return isinstance(value, (int, float))
+    return isinstance(value, python_type)
+
+
+def column_type(column) -> Optional[type]:
+    """The Python type of a column's values, None if SQLAlchemy doesn't know it"""
+    try:
+        return column.type.python_type
+    except NotImplementedError:
+        return None
+
+
+def decode_cursor(cursor: str, num_values: int, types: Optional[List[Optional[type]]] = None) -> list:
+    """
+    Raises CursorException if the cursor is malformed or doesn't hold num_values values,
+    or with types, if a value isn't of its type (e.g. a cursor from another sort)
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()), object_hook=_decode_value)
+    except (binascii.Error, UnicodeError, ValueError, TypeError):
+        raise CursorException("Invalid cursor")
+    if not isinstance(values, list) or len(values) != num_values:
+        raise CursorException("Invalid cursor")
+    if types and not all(_has_type(value, python_type) for value, python_type in zip(values, types)):
+        raise CursorException("Invalid cursor")
+    return values
+
+
+def parse_page_size(page_size: Optional[str]) -> int:
+    """Returns the requested page size clamped to [1, MAX_PAGE_SIZE], or DEFAULT_PAGE_SIZE"""
+    if page_size is None:
+        return DEFAULT_PAGE_SIZE
+    try:
+        return min(max(int(page_size), 1), MAX_PAGE_SIZE)
+    except ValueError:
+        return DEFAULT_PAGE_SIZE
+
+
+def is_paged(args) -> bool:
+    """
+    Whether a request for a list that used to be returned whole asked for pages (pageSize or cursor),
+    such lists are still returned whole otherwise
+    """
+    return "pageSize" in args or "cursor" in args
+
+
+def after_cursor(columns: List, values: list):
+    """
+    Filter for rows after the cursor when ordering by columns descending.
+    The bound on the leading column is redundant but lets the planner seek on its index.
+    """
+    return and_(columns[0] <= values[0], tuple_(*columns) < tuple_(*values))
+
+
+def paginate(query, columns: List, cursor: Optional[str], page_size: int,
+             key: Optional[Callable[[object], list]] = None):
+    """
+    Returns (rows, next_cursor) for query ordered by columns descending.
+    next_cursor is None on the last page.  key returns a row's values for columns
+    (by default the row attributes named like the columns).
+    """
+    if cursor:
+        values = decode_cursor(cursor, len(columns), [column_type(column) for column in columns])
+        query = query.filter(after_cursor(columns, values))
+    rows = query.order_by(*[column.desc() for column in columns]).limit(page_size + 1).all()
+    if len(rows) <= page_size:
+        return rows, None
+    rows = rows[:page_size]
+    last = rows[-1]
+    values = key(last) if key else [getattr(last, column.key) for column in columns]
+    return rows, encode_cursor(values)
@@ -0,0 +1,45 @@
+"""
+Refresh intervals for quotes under a credit budget.
+
+Each symbol gets a weight (open ideas on it, scaled up by its recent volatility) and an interval between
+min_interval and max_interval.  Refreshing every interval seconds costs 3600 / interval credits an hour, and
+the expected staleness a weight sees is proportional to weight * interval, so for a fixed budget staleness is
+lowest with intervals proportional to 1 / sqrt(weight).  The scale is found by bisection so that the clamped
+intervals spend at most the budget.  If even max_interval for everything is over budget, that's what is used.
+"""
+import math
+from typing import Dict, Optional
+
+# weight multiplier per unit of hourly volatility (absolute log return per sqrt hour), 1% an hour doubles it
+VOLATILITY_WEIGHT = 100
+
+
+def symbol_weight(num_open_ideas: int, volatility: Optional[float]) -> float:
+    return num_open_ideas * (1 + VOLATILITY_WEIGHT * (volatility or 0))
+
+
+def hourly_cost(intervals: Dict[str, float]) -> float:
+    """Credits an hour, one per symbol refreshed"""
+    return sum(3600 / interval for interval in intervals.values())
+
+
+def plan_intervals(weights: Dict[str, float], credits_per_hour: float,
+                   min_interval: float = 60, max_interval: float = 3600) -> Dict[str, float]:
+    """Returns the refresh interval in seconds for every symbol in weights"""
+    weights = {symbol: max(weight, 1e-9) for symbol, weight in weights.items()}
+
+    def intervals_for(scale: float) -> Dict[str, float]:
+        return {symbol: min(max(scale / math.sqrt(weight), min_interval), max_interval)
+                for symbol, weight in weights.items()}
+
+    if not weights or hourly_cost(intervals_for(0)) <= credits_per_hour:
+        return intervals_for(0)
+    # big enough that every interval is clamped to max_interval
+    low, high = 0.0, max_interval * math.sqrt(max(weights.values()))
+    for _ in range(50):
+        middle = (low + high) / 2
+        if hourly_cost(intervals_for(middle)) <= credits_per_hour:
+            high = middle
+        else:
+            low = middle
+    return intervals_for(high)
@@ -1,18 +1,111 @@
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Optional
 
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+MB = 1024 * 1024
 
 
 class S3:
     S3_ACCESS_KEY = os.environ.get("S3_KEY")
     S3_SECRET_KEY = os.environ.get("S3_SECRET")
+    # public base url of the bucket, for the urls of uploaded files
     S3_ENDPOINT_URL = os.environ.get("S3_ENDPOINT_URL")
+    # S3 API to call if not AWS, e.g. MinIO or a local stand-in in tests
+    S3_API_URL = os.environ.get("S3_API_URL")
     S3_BUCKET = os.environ.get("S3_BUCKET")
+    UPLOAD_WORKERS = int(os.environ.get("S3_UPLOAD_WORKERS", 8))
+    # files bigger than the threshold are uploaded in parts, max_concurrency parts at a time
+    TRANSFER_CONFIG = TransferConfig(multipart_threshold=8 * MB, multipart_chunksize=8 * MB, max_concurrency=4)
+
+    _lock = threading.Lock()
+    _pid = None
+    _client = None
+    _executor = None
+
+    @classmethod
+    def _check_pid(cls) -> None:
+        # a forked worker can't use its parent's connections or threads
+        if cls._pid != os.getpid():
+            cls._pid = os.getpid()
+            cls._client = None
+            cls._executor = None
 
     @classmethod
     def get_client(cls):
-        return boto3.client(
-            's3',
-            aws_access_key_id=cls.S3_ACCESS_KEY,
-            aws_secret_access_key=cls.S3_SECRET_KEY
-        )
+        """The process's client, boto3 clients are thread safe and keep a pool of connections"""
+        with cls._lock:
+            cls._check_pid()
+            if cls._client is None:
+                cls._client = boto3.client(
+                    's3',
+                    aws_access_key_id=cls.S3_ACCESS_KEY,
+                    aws_secret_access_key=cls.S3_SECRET_KEY,
+                    endpoint_url=cls.S3_API_URL,
+                    config=Config(
+                        max_pool_connections=cls.UPLOAD_WORKERS * cls.TRANSFER_CONFIG.max_concurrency,
+                        s3={"addressing_style": "path"} if cls.S3_API_URL else None)
+                )
+            return cls._client
+
+    @classmethod
+    def get_executor(cls) -> ThreadPoolExecutor:
+        """Threads for running uploads concurrently"""
+        with cls._lock:
+            cls._check_pid()
+            if cls._executor is None:
+                cls._executor = ThreadPoolExecutor(max_workers=cls.UPLOAD_WORKERS, thread_name_prefix="s3-upload")
+            return cls._executor
+
+    @classmethod
+    def reset(cls) -> None:
+        """Drops the client, e.g. after changing S3_API_URL"""
+        with cls._lock:
+            cls._client = None
+
+    @classmethod
+    def public_url(cls, key: str) -> str:
+        return f"{cls.S3_ENDPOINT_URL}/{key}"
+
+    @classmethod
+    def upload_fileobj(cls, file: BinaryIO, key: str, content_type: str) -> str:
+        """Uploads a public file, in parts if it's large, and returns its url"""
+        cls.get_client().upload_fileobj(
+            file, cls.S3_BUCKET, key,
+            ExtraArgs={"ACL": "public-read", "ContentType": content_type},
+            Config=cls.TRANSFER_CONFIG)
+        return cls.public_url(key)
+
+    @classmethod
+    def presigned_post(cls, key: str, content_type: str, max_size: int, expires_in: int) -> dict:
+        """
+        {"url", "fields"} for a browser to POST a public file to key directly (a multipart form with fields,
+        then the file), which S3 only accepts with content_type, at most max_size bytes, within expires_in seconds
+        """
+        return cls.get_client().generate_presigned_post(
+            cls.S3_BUCKET, key,
+            Fields={"acl": "public-read", "Content-Type": content_type},
+            Conditions=[{"acl": "public-read"}, {"Content-Type": content_type},
+                        ["content-length-range", 1, max_size]],
+            ExpiresIn=expires_in)
+
+    @classmethod
+    def get_object(cls, key: str, length: Optional[int] = None) -> bytes:
+        """The object's bytes, only the first length if given"""
+        kwargs = {"Range": f"bytes=0-{length - 1}"} if length else {}
+        return cls.get_client().get_object(Bucket=cls.S3_BUCKET, Key=key, **kwargs)["Body"].read()
+
+    @classmethod
+    def head_object(cls, key: str) -> Optional[dict]:
+        """The object's metadata (ContentLength, ContentType...), None if there's no such object"""
+        try:
+            return cls.get_client().head_object(Bucket=cls.S3_BUCKET, Key=key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
@@ -0,0 +1,103 @@
+"""
+In-memory autocomplete index.
+
+Prefix lookups go through a sorted array of lowercase keys: every key starting with a prefix sits in one
+contiguous run found with two binary searches.  Substring lookups (3+ characters) intersect the posting
+lists of the query's trigrams and only check the few candidates left.  Neither grows with the number of
+ideas, since only distinct symbols and analyst usernames are indexed.
+"""
+import heapq
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Set, Tuple
+
+DEFAULT_LIMIT = 10
+
+# match ranks, lower is better
+EXACT, PREFIX, WORD_PREFIX, SUBSTRING = range(4)
+
+
+def trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class PrefixIndex:
+    """Sorted (key, entry id) pairs for prefix range lookups"""
+
+    def __init__(self, pairs: List[Tuple[str, int]]):
+        pairs = sorted(pairs)
+        self.keys = [key for key, _ in pairs]
+        self.ids = [entry_id for _, entry_id in pairs]
+
+    def search(self, prefix: str) -> List[Tuple[str, int]]:
+        """Returns (key, entry id) for every key starting with prefix"""
+        start = bisect_left(self.keys, prefix)
+        end = bisect_right(self.keys, prefix + "\uffff", lo=start)
+        return list(zip(self.keys[start:end], self.ids[start:end]))
+
+
+class TrigramIndex:
+    """Maps trigrams to the entries whose text contains them"""
+
+    def __init__(self, texts: List[str]):
+        self.texts = texts
+        self.postings: Dict[str, Set[int]] = {}
+        for entry_id, text in enumerate(texts):
+            for trigram in trigrams(text):
+                self.postings.setdefault(trigram, set()).add(entry_id)
+
+    def search(self, query: str) -> Set[int]:
+        """Returns the entries whose text contains query (which must be at least 3 characters)"""
+        posting_lists = sorted((self.postings.get(trigram, set()) for trigram in trigrams(query)), key=len)
+        candidates = set.intersection(*posting_lists) if posting_lists else set()
+        return {entry_id for entry_id in candidates if query in self.texts[entry_id]}
+
+
+class SearchIndex:
+    def __init__(self, stocks: List[dict], analysts: List[str]):
+        """
+        stocks are dicts with symbol, company_name and num_ideas, analysts are usernames.
+        Results are ranked by how well they match, then by number of ideas / shortest username.
+        """
+        self.stocks = stocks
+        self.analysts = analysts
+        company_names = [stock["company_name"].lower() for stock in stocks]
+
+        self.symbol_prefixes = PrefixIndex([(stock["symbol"].lower(), idx) for idx, stock in enumerate(stocks)])
+        # every word of a company name, so short queries still find "motors" in "General Motors"
+        self.word_prefixes = PrefixIndex([
+            (name[start:], idx)
+            for idx, name in enumerate(company_names)
+            for start in [0] + [i + 1 for i, char in enumerate(name) if char == " "]])
+        self.company_trigrams = TrigramIndex(company_names)
+        self.username_prefixes = PrefixIndex([(username.lower(), idx) for idx, username in enumerate(analysts)])
+
+    def search_stocks(self, query: str, limit: int = DEFAULT_LIMIT) -> List[dict]:
+        query = query.strip().lower()
+        if not query:
+            return []
+        ranks = {}
+
+        def add(idx: int, rank: int):
+            if rank < ranks.get(idx, SUBSTRING + 1):
+                ranks[idx] = rank
+
+        for symbol, idx in self.symbol_prefixes.search(query):
+            add(idx, EXACT if symbol == query else PREFIX)
+        for name, idx in self.word_prefixes.search(query):
+            add(idx, PREFIX if name == self.company_trigrams.texts[idx] else WORD_PREFIX)
+        if len(query) >= 3:
+            for idx in self.company_trigrams.search(query):
+                add(idx, SUBSTRING)
+
+        best = heapq.nsmallest(limit, ranks, key=lambda idx: (
+            ranks[idx], -self.stocks[idx]["num_ideas"], self.stocks[idx]["symbol"]))
+        return [{"symbol": self.stocks[idx]["symbol"], "companyName": self.stocks[idx]["company_name"]}
+                for idx in best]
+
+    def search_analysts(self, query: str, limit: int = DEFAULT_LIMIT) -> List[dict]:
+        query = query.strip().lower()
+        if not query:
+            return []
+        matches = heapq.nsmallest(limit, self.username_prefixes.search(query),
+                                  key=lambda match: (len(match[0]), match[0]))
+        return [{"username": self.analysts[idx]} for _, idx in matches]
@@ -0,0 +1,99 @@
+"""
+Compiled serializers for hot marshmallow schemas.
+
+compile_schema(schema) reads the schema's dump fields once and generates a plain python function that
+builds the same dicts as schema.dump, without marshmallow's per-field dispatch.  Field types it doesn't
+know are still serialized by the field itself, so the output is always identical to schema.dump.
+"""
+from collections.abc import Mapping
+from typing import Any
+
+from marshmallow import fields, missing, Schema
+from marshmallow.decorators import PRE_DUMP, POST_DUMP
+from marshmallow.utils import ensure_text_type
+
+
+class CompiledSchema:
+    """Drop-in replacement for a schema instance where only dump is used"""
+
+    def __init__(self, schema: Schema):
+        self.schema = schema
+        self.many = schema.many
+        # processors can do anything, so those schemas keep going through marshmallow
+        self.has_processors = schema._has_processors(PRE_DUMP) or schema._has_processors(POST_DUMP)
+        self.dump_one = None if self.has_processors else _compile(schema)
+
+    def dump(self, obj: Any, *, many: bool = None):
+        many = self.many if many is None else bool(many)
+        if self.has_processors:
+            return self.schema.dump(obj, many=many)
+        if many:
+            dump_one = self.dump_one
+            return [dump_one(item) for item in obj]
+        return self.dump_one(obj)
+
+
+def compile_schema(schema: Schema) -> CompiledSchema:
+    return CompiledSchema(schema)
+
+
+def _compile(schema: Schema):
+    """Generates def dump_one(obj) -> dict for schema"""
+    namespace = {"missing": missing, "ensure_text_type": ensure_text_type, "no_dict": {}, "Mapping": Mapping,
+                 "schema": schema}
+    # loaded column values live in the instance dict, reading it directly skips the sqlalchemy descriptors
+    lines = ["def dump_one(obj):",
+             "    if isinstance(obj, Mapping):",
+             "        return schema.dump(obj, many=False)",
+             "    d = getattr(obj, '__dict__', no_dict)",
+             "    ret = {}"]
+
+    for idx, (attr_name, field) in enumerate(schema.dump_fields.items()):
+        key = field.data_key if field.data_key is not None else attr_name
+        attribute = field.attribute or attr_name
+        value = _value_expression(field, idx, namespace)
+
+        if value is None or "." in attribute or not attribute.isidentifier():
+            # let the field serialize itself (same call marshmallow makes)
+            namespace[f"field_{idx}"] = field
+            lines.append(f"    v = field_{idx}.serialize({attr_name!r}, obj, accessor=get_attribute)")
+            lines.append(f"    if v is not missing:")
+            lines.append(f"        ret[{key!r}] = v")
+            namespace["get_attribute"] = schema.get_attribute
+            continue
+
+        lines.append(f"    v = d[{attribute!r}] if {attribute!r} in d else getattr(obj, {attribute!r}, missing)")
+        lines.append(f"    if v is not missing:")
+        lines.append(f"        ret[{key!r}] = {value}")
+
+    lines.append("    return ret")
+    exec("\n".join(lines), namespace)
+    return namespace["dump_one"]
+
+
+def _value_expression(field: fields.Field, idx: int, namespace: dict):
+    """Expression serializing v the way field._serialize does, or None if field needs marshmallow"""
+    if field.default is not missing:
+        return None
+    field_type = type(field)
+
+    if field_type is fields.Integer and not field.as_string:
+        return "v if v is None or v.__class__ is int else int(v)"
+    if field_type is fields.Float and not field.as_string:
+        return "v if v is None or v.__class__ is float else float(v)"
+    if field_type is fields.String:
+        return "v if v is None or v.__class__ is str else ensure_text_type(v)"
+    if field_type is fields.Boolean:
+        namespace[f"serialize_{idx}"] = field._serialize
+        return f"v if v is None or v is True or v is False else serialize_{idx}(v, None, None)"
+    if field_type is fields.DateTime and field.format in (None, "iso", "iso8601"):
+        return "None if v is None else v.isoformat()"
+    if field_type is fields.Nested:
+        nested = field.schema
+        if nested._has_processors(PRE_DUMP) or nested._has_processors(POST_DUMP):
+            return None
+        namespace[f"nested_{idx}"] = _compile(nested)
+        if nested.many or field.many:
+            return f"None if v is None else [nested_{idx}(item) for item in v]"
+        return f"None if v is None else nested_{idx}(v)"
+    return None
@@ -0,0 +1,95 @@
+"""
+Request coalescing ("single flight").
+
+Concurrent calls for the same key in a process share one in-flight call: the first caller runs it and the
+others wait on its future.  With a shared_dir, the caller running it also holds an exclusive flock on a file
+per key, and writes the result there, so a call that waited on another worker's lock reuses the result it
+wrote rather than calling upstream again.  Only results written while a caller was waiting are reused, this
+coalesces concurrent calls but never caches.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Optional
+
+try:
+    import fcntl
+except ImportError:  # not on Windows, calls are then only coalesced within a process
+    fcntl = None
+
+
+class SingleFlight:
+    def __init__(self, shared_dir: Optional[str] = None):
+        """Results must be JSON serializable when shared_dir is set"""
+        self.shared_dir = shared_dir if fcntl is not None else None
+        if self.shared_dir:
+            os.makedirs(self.shared_dir, exist_ok=True)
+        self.lock = threading.Lock()
+        self.in_flight: Dict[Hashable, Future] = {}
+        self.counters = Counter()
+
+    def do(self, key: Hashable, call: Callable[[], Any]) -> Any:
+        """Returns call(), or the result of an identical call already in flight.  Callers share the result."""
+        with self.lock:
+            self.counters["calls"] += 1
+            future = self.in_flight.get(key)
+            leading = future is None
+            if leading:
+                future = self.in_flight[key] = Future()
+            else:
+                self.counters["deduplicated"] += 1
+        if not leading:
+            return future.result()
+        try:
+            value = self._call_shared(key, call) if self.shared_dir else self._call(call)
+        except BaseException as e:
+            with self.lock:
+                del self.in_flight[key]
+            future.set_exception(e)
+            raise
+        with self.lock:
+            del self.in_flight[key]
+        future.set_result(value)
+        return value
+
+    def _call(self, call: Callable[[], Any]) -> Any:
+        with self.lock:
+            self.counters["executed"] += 1
+        return call()
+
+    def _call_shared(self, key: Hashable, call: Callable[[], Any]) -> Any:
+        name = hashlib.sha1(repr(key).encode()).hexdigest()
+        waiting_since = time.time()
+        with open(os.path.join(self.shared_dir, name), "a+") as file:
+            fcntl.flock(file, fcntl.LOCK_EX)
+            try:
+                file.seek(0)
+                try:
+                    shared = json.loads(file.read() or "null")
+                except ValueError:
+                    shared = None
+                if shared and shared["written_at"] >= waiting_since:
+                    with self.lock:
+                        self.counters["deduplicated"] += 1
+                        self.counters["shared"] += 1
+                    return shared["value"]
+                value = self._call(call)
+                file.seek(0)
+                file.truncate()
+                json.dump({"written_at": time.time(), "value": value}, file)
+                file.flush()
+                return value
+            finally:
+                fcntl.flock(file, fcntl.LOCK_UN)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        calls made, calls executed, calls deduplicated (served by a call in flight),
+        and shared (the deduplicated calls served by another process)
+        """
+        with self.lock:
+            return {name: self.counters[name] for name in ("calls", "executed", "deduplicated", "shared")}
@@ -1,8 +1,19 @@
+import datetime
 import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
 
-import requests_cache
-from requests import get
+import pytz
+from requests import Response, Session, RequestException
+from requests.adapters import HTTPAdapter
+from main.libs import market_calendar
+from main.libs.cache import Cache, backend_from_url
+from main.libs.single_flight import SingleFlight
 from main.libs.strings import get_text
+from main.libs.ttl_cache import TTLCache
 
 
 def to_float(s):
@@ -14,6 +25,20 @@ def to_float(s):
     return 0
 
 
+def seconds_until_next_close(now: Optional[datetime.datetime] = None) -> float:
+    """Seconds until the market next closes (skipping weekends and holidays)"""
+    now = now or datetime.datetime.now(pytz.utc)
+    return (market_calendar.next_close(now) - now).total_seconds()
+
+
+def pooled(session: Session, pool_size: int) -> Session:
+    """Mounts a keep-alive connection pool so connections are reused across requests"""
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
 class StockException(Exception):
     def __init__(self, message: str):
         super().__init__(message)
@@ -23,36 +48,142 @@ class Stock:
     IEX_API_KEY = os.environ.get("IEX_API_KEY", None)
     IEX_URI = os.environ.get("IEX_URI", None)
 
-    CACHE_SESSION = requests_cache.CachedSession(
-            cache_name="stock_cache",
-            backend='sqlite',
-            allowable_methods='GET',
-            allowable_codes=[200],
-            expire_after=86_400)
+    # max number of symbols IEX accepts in a single market/batch request
+    BATCH_SYMBOL_LIMIT = 100
+
+    # seconds to wait on IEX before giving up on a request
+    REQUEST_TIMEOUT = float(os.environ.get("IEX_TIMEOUT", 10))
+    # max in-flight requests per upstream host (also sizes the connection pool and thread pool)
+    MAX_CONNECTIONS_PER_HOST = int(os.environ.get("IEX_MAX_CONNECTIONS", 10))
+
+    SESSION = pooled(Session(), MAX_CONNECTIONS_PER_HOST)
+
+    # upstream responses, cached for a ttl per endpoint (charts until the next close), see main.libs.cache
+    CACHE = Cache(backend_from_url(os.environ.get("STOCK_CACHE_URL", "memory://?max_entries=4096")))
+    QUOTE_TTL = float(os.environ.get("IEX_QUOTE_TTL", 5))
+    COMPANY_TTL = float(os.environ.get("IEX_COMPANY_TTL", 86_400))
+
+    # financial metrics are cached per symbol, price fields briefly and fundamentals for hours.
+    # Expired metrics are still served (and refreshed in the background) for STALE_FACTOR times their ttl.
+    PRICE_METRICS_TTL = float(os.environ.get("IEX_PRICE_METRICS_TTL", 60))
+    FUNDAMENTAL_METRICS_TTL = float(os.environ.get("IEX_FUNDAMENTAL_METRICS_TTL", 6 * 3600))
+    STALE_FACTOR = 4
+    PRICE_METRICS = TTLCache(ttl=PRICE_METRICS_TTL, stale_ttl=PRICE_METRICS_TTL * STALE_FACTOR)
+    FUNDAMENTAL_METRICS = TTLCache(ttl=FUNDAMENTAL_METRICS_TTL, stale_ttl=FUNDAMENTAL_METRICS_TTL * STALE_FACTOR)
+
+    # concurrent requests for the same endpoint and symbol share one upstream request, across workers too
+    FLIGHTS = SingleFlight(shared_dir=os.environ.get(
+        "IEX_SINGLE_FLIGHT_DIR", os.path.join(tempfile.gettempdir(), "hayek-stock-flights")))
+
+    EXECUTOR = ThreadPoolExecutor(max_workers=MAX_CONNECTIONS_PER_HOST, thread_name_prefix="stock")
+    _host_limits = {}
+    _host_limits_lock = threading.Lock()
+
+    @classmethod
+    def _host_limit(cls, url: str) -> threading.BoundedSemaphore:
+        host = urlparse(url).netloc
+        with cls._host_limits_lock:
+            if host not in cls._host_limits:
+                cls._host_limits[host] = threading.BoundedSemaphore(cls.MAX_CONNECTIONS_PER_HOST)
+            return cls._host_limits[host]
+
+    @classmethod
+    def _get(cls, url: str, **kwargs) -> Response:
+        """GET through the pooled session, bounded by the per-host concurrency limit"""
+        try:
+            with cls._host_limit(url):
+                return cls.SESSION.get(url=url, timeout=cls.REQUEST_TIMEOUT, **kwargs)
+        except RequestException as e:
+            raise StockException(str(e))
+
+    @classmethod
+    def _get_json(cls, key: Tuple[str, ...], url: str, ttl: float = 0) -> Any:
+        """
+        Returns the JSON body of a GET, from the response cache for ttl seconds if ttl is given.
+        key names the request (e.g. ("quote", "AAPL")) for the cache and for coalescing concurrent misses.
+        Raises StockException unless IEX answers with a 200, errors aren't cached.
+        """
+        cache_key = ":".join(key)
+        if ttl:
+            cached = cls.CACHE.get(cache_key)
+            if cached is not None:
+                return cached
+
+        def fetch():
+            response = cls._get(url=url)
+            if response.status_code != 200:
+                raise StockException(response.content)
+            body = response.json()
+            cls.CACHE.set(cache_key, body, ttl)
+            return body
+
+        return cls.FLIGHTS.do(key, fetch)
+
+    @classmethod
+    def fetch_concurrently(cls, calls: Dict[str, Callable[[], dict]]) -> Dict[str, dict]:
+        """
+        Runs each call on the shared thread pool and returns results under the same keys.
+        Total latency is that of the slowest call.  The first error is re-raised.
+        """
+        futures = {name: cls.EXECUTOR.submit(call) for name, call in calls.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+    @classmethod
+    def fetch_stock_data(cls, symbol: str, with_chart: bool = False, chart_range: str = "1y") -> dict:
+        """
+        Returns {"quote": ..., "company": ...} (plus "chart" if with_chart)
+        with all upstream requests made in parallel
+        """
+        calls = {
+            "quote": lambda: cls.fetch_stock_quote(symbol),
+            "company": lambda: cls.fetch_company_info(symbol)
+        }
+        if with_chart:
+            calls["chart"] = lambda: cls.fetch_chart_info(symbol, chart_range)
+        return cls.fetch_concurrently(calls)
 
     @classmethod
     def fetch_stock_quote(cls, symbol: str) -> dict:
         if cls.IEX_API_KEY is None or cls.IEX_URI is None:
             raise StockException(get_text("env_fail").format("IEX API Key"))
 
-        response = get(url=f"{cls.IEX_URI}v1/stock/{symbol}/quote?token={cls.IEX_API_KEY}")
+        return cls._get_json(("quote", symbol.upper()),
+                             f"{cls.IEX_URI}v1/stock/{symbol}/quote?token={cls.IEX_API_KEY}", ttl=cls.QUOTE_TTL)
+
+    @classmethod
+    def fetch_batch_quotes(cls, symbols: List[str]) -> Dict[str, dict]:
+        """
+        Returns quotes for many symbols keyed by upper case symbol.
+        Symbols are deduplicated and requested in chunks of BATCH_SYMBOL_LIMIT.
+        """
+        if cls.IEX_API_KEY is None or cls.IEX_URI is None:
+            raise StockException(get_text("env_fail").format("IEX API Key"))
+
+        unique_symbols = sorted({symbol.upper() for symbol in symbols})
+        quotes = {}
+        for i in range(0, len(unique_symbols), cls.BATCH_SYMBOL_LIMIT):
+            chunk = unique_symbols[i:i + cls.BATCH_SYMBOL_LIMIT]
+            response = cls._get(
+                url=f"{cls.IEX_URI}v1/stock/market/batch",
+                params={"symbols": ",".join(chunk), "types": "quote", "token": cls.IEX_API_KEY})
 
-        if response.status_code != 200:
-            raise StockException(response.content)
+            if response.status_code != 200:
+                raise StockException(response.content)
 
-        return response.json()
+            for symbol, data in response.json().items():
+                if "quote" in data:
+                    quotes[symbol.upper()] = data["quote"]
+
+        return quotes
 
     @classmethod
     def fetch_company_info(cls, symbol: str) -> dict:
         if cls.IEX_API_KEY is None or cls.IEX_URI is None:
             raise StockException(get_text("env_fail").format("IEX API Key"))
 
-        response = cls.CACHE_SESSION.get(url=f"{cls.IEX_URI}v1/stock/{symbol}/company?token={cls.IEX_API_KEY}")
-
-        if response.status_code != 200:
-            raise StockException(response.content)
-
-        company_info = response.json()
+        company_info = dict(cls._get_json(("company", symbol.upper()),
+                                          f"{cls.IEX_URI}v1/stock/{symbol}/company?token={cls.IEX_API_KEY}",
+                                          ttl=cls.COMPANY_TTL))
 
         # rename sectors
         sector_map = {
@@ -104,43 +235,68 @@ class Stock:
         if cls.IEX_API_KEY is None:
             raise StockException(get_text("env_fail").format("IEX API Key"))
 
-        response = cls.CACHE_SESSION.get(
-            url=f"{cls.IEX_URI}v1/stock/{symbol}/chart/{date}?token={cls.IEX_API_KEY}&chartCloseOnly=true")
+        return cls._get_json(
+            ("chart", symbol.upper(), date),
+            f"{cls.IEX_URI}v1/stock/{symbol}/chart/{date}?token={cls.IEX_API_KEY}&chartCloseOnly=true",
+            ttl=seconds_until_next_close())
 
-        if response.status_code != 200:
-            raise StockException(response.content)
+    @classmethod
+    def fetch_advanced_stats(cls, symbol: str) -> dict:
+        if cls.IEX_API_KEY is None:
+            raise StockException(get_text("env_fail").format("IEX API Key"))
 
-        return response.json()
+        # not through the response cache, callers cache the metrics derived from it (see FUNDAMENTAL_METRICS)
+        return cls._get_json(("advanced-stats", symbol.upper()),
+                             f"{cls.IEX_URI}v1/stock/{symbol}/advanced-stats?token={cls.IEX_API_KEY}")
 
     @classmethod
     def fetch_financial_metrics(cls, symbol: str) -> dict:
-        """Returns key financial metrics for a given symbol"""
+        """
+        Returns key financial metrics for a given symbol, from the metrics caches when possible.
+        Symbols missing from both caches are fetched with their quote and advanced stats in parallel.
+        """
         if cls.IEX_API_KEY is None:
             raise StockException(get_text("env_fail").format("IEX API Key"))
 
-        metrics = {}
-        quote_info = get(url=f"{cls.IEX_URI}v1/stock/{symbol}/quote?token={cls.IEX_API_KEY}")
-        if quote_info.status_code != 200:
-            raise StockException(quote_info.content)
-        quote_info = quote_info.json()
-
-        advanced_stats = cls.CACHE_SESSION.get(
-            url=f"{cls.IEX_URI}v1/stock/{symbol}/advanced-stats?token={cls.IEX_API_KEY}")
-
-        if advanced_stats.status_code != 200:
-            raise StockException(advanced_stats.content)
+        symbol = symbol.upper()
+        calls = {
+            "fundamentals": lambda: cls.FUNDAMENTAL_METRICS.get(symbol, lambda: cls.fetch_fundamental_metrics(symbol)),
+            "price": lambda: cls.PRICE_METRICS.get(symbol, lambda: cls.fetch_price_metrics(symbol))
+        }
+        if symbol in cls.FUNDAMENTAL_METRICS or symbol in cls.PRICE_METRICS:
+            # at most one upstream request left, not worth a trip through the thread pool
+            responses = {name: call() for name, call in calls.items()}
+        else:
+            responses = cls.fetch_concurrently(calls)
+        return {**responses["fundamentals"], **responses["price"]}
 
-        advanced_stats = advanced_stats.json()
+    @classmethod
+    def fetch_fundamental_metrics(cls, symbol: str) -> dict:
+        """The slow moving metrics, from advanced stats"""
+        advanced_stats = cls.fetch_advanced_stats(symbol)
         ev_to_ebitda = advanced_stats["enterpriseValue"] / advanced_stats["EBITDA"] if advanced_stats[
                                                                                            "EBITDA"] > 0 else "n/a"
-        metrics["forwardPE"] = advanced_stats["forwardPERatio"]
-        metrics["evToEBITDA"] = ev_to_ebitda
-        metrics["priceToSales"] = advanced_stats["priceToSales"]
-        metrics["netDebt"] = (to_float(advanced_stats["currentDebt"]) - to_float(advanced_stats["totalCash"])) / 1000000
-        metrics["putCallRatio"] = advanced_stats["putCallRatio"]
-        metrics["marketCap"] = to_float(quote_info["marketCap"]) / 1000000
-        metrics["latestPrice"] = quote_info["latestPrice"]
-        metrics["week52High"] = quote_info["week52High"]
-        metrics["week52Low"] = quote_info["week52Low"]
-
-        return metrics
+        return {
+            "forwardPE": advanced_stats["forwardPERatio"],
+            "evToEBITDA": ev_to_ebitda,
+            "priceToSales": advanced_stats["priceToSales"],
+            "netDebt": (to_float(advanced_stats["currentDebt"]) - to_float(advanced_stats["totalCash"])) / 1000000,
+            "putCallRatio": advanced_stats["putCallRatio"]
+        }
+
+    @classmethod
+    def fetch_price_metrics(cls, symbol: str) -> dict:
+        """The metrics that move with the price, from the live quote"""
+        quote_info = cls.fetch_stock_quote(symbol)
+        return {
+            "marketCap": to_float(quote_info["marketCap"]) / 1000000,
+            "latestPrice": quote_info["latestPrice"],
+            "week52High": quote_info["week52High"],
+            "week52Low": quote_info["week52Low"]
+        }
+
+    @classmethod
+    def clear_caches(cls) -> None:
+        cls.CACHE.clear()
+        cls.PRICE_METRICS.clear()
+        cls.FUNDAMENTAL_METRICS.clear()
@@ -0,0 +1,68 @@
+"""
+Encoders for streamed responses.  Each takes an iterable of rows (dicts) and returns an iterator of byte chunks
+of about CHUNK_SIZE, so memory use doesn't depend on the number of rows.
+"""
+import csv
+import datetime
+import io
+import json
+import zlib
+from typing import Any, Iterable, Iterator, List
+
+CHUNK_SIZE = 64 * 1024
+
+
+def encode_value(value: Any) -> Any:
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    return value
+
+
+def chunked(lines: Iterable[str]) -> Iterator[bytes]:
+    """Joins lines into chunks of about CHUNK_SIZE bytes"""
+    buffer, size = [], 0
+    for line in lines:
+        data = line.encode()
+        buffer.append(data)
+        size += len(data)
+        if size >= CHUNK_SIZE:
+            yield b"".join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield b"".join(buffer)
+
+
+def ndjson_chunks(rows: Iterable[dict]) -> Iterator[bytes]:
+    """One JSON object per line"""
+    return chunked(json.dumps({key: encode_value(value) for key, value in row.items()},
+                              separators=(",", ":")) + "\n" for row in rows)
+
+
+def csv_chunks(rows: Iterable[dict], columns: List[str]) -> Iterator[bytes]:
+    """A header line with columns, then one line per row"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def line(values: list) -> str:
+        writer.writerow(values)
+        text = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return text
+
+    def lines() -> Iterator[str]:
+        yield line(columns)
+        for row in rows:
+            yield line([encode_value(row[column]) for column in columns])
+
+    return chunked(lines())
+
+
+def gzip_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Compresses a stream of chunks into a single gzip member"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
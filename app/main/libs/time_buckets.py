@@ -0,0 +1,73 @@
+"""
+Hour and day buckets for rollup tables.
+
+A count over an arbitrary range is split into whole days, the whole hours either side of them, and the
+partial hours at the two ends.  Whole buckets come from the rollups and only the partial hours are counted
+from raw rows, so the work grows with the number of days in the range rather than the number of rows.
+"""
+import datetime
+from typing import List, NamedTuple, Optional, Tuple
+
+HOUR = "hour"
+DAY = "day"
+PERIODS = (HOUR, DAY)
+PERIOD_LENGTHS = {HOUR: datetime.timedelta(hours=1), DAY: datetime.timedelta(days=1)}
+
+# (start, start inclusive, end), end is always exclusive and None means unbounded
+RawRange = Tuple[Optional[datetime.datetime], bool, Optional[datetime.datetime]]
+BucketRange = Tuple[Optional[datetime.datetime], Optional[datetime.datetime]]
+
+
+def bucket_start(time: datetime.datetime, period: str) -> datetime.datetime:
+    if period == DAY:
+        return time.replace(hour=0, minute=0, second=0, microsecond=0)
+    return time.replace(minute=0, second=0, microsecond=0)
+
+
+def next_bucket(time: datetime.datetime, period: str) -> datetime.datetime:
+    """Start of the first bucket after the one containing time"""
+    return bucket_start(time, period) + PERIOD_LENGTHS[period]
+
+
+def bucket_starts(start: datetime.datetime, end: datetime.datetime, period: str) -> List[datetime.datetime]:
+    """Every bucket from the one containing start up to (excluding) end"""
+    buckets = []
+    bucket = bucket_start(start, period)
+    while bucket < end:
+        buckets.append(bucket)
+        bucket += PERIOD_LENGTHS[period]
+    return buckets
+
+
+class RangeSplit(NamedTuple):
+    raw: List[RawRange]
+    hours: List[BucketRange]
+    days: List[BucketRange]
+
+
+def split_range(start: Optional[datetime.datetime], end: Optional[datetime.datetime]) -> RangeSplit:
+    """
+    Splits start < t < end (either may be None) into raw ranges and ranges of whole hour and day buckets,
+    each bucket range covering bucket >= start and bucket < end.
+    """
+    if start is not None and end is not None and end <= start:
+        return RangeSplit([], [], [])
+    raw = []
+    # the hour holding start isn't whole, since rows at exactly start are excluded
+    first_hour = next_bucket(start, HOUR) if start is not None else None
+    last_hour = bucket_start(end, HOUR) if end is not None else None
+    if first_hour is not None and last_hour is not None and first_hour > last_hour:
+        return RangeSplit([(start, False, end)], [], [])
+    if start is not None:
+        raw.append((start, False, first_hour))
+    if end is not None and last_hour < end:
+        raw.append((last_hour, True, end))
+
+    first_day = first_hour if first_hour is None or first_hour == bucket_start(first_hour, DAY) \
+        else next_bucket(first_hour, DAY)
+    last_day = bucket_start(last_hour, DAY) if last_hour is not None else None
+    if first_day is not None and last_day is not None and first_day >= last_day:
+        return RangeSplit(raw, [(first_hour, last_hour)] if first_hour < last_hour else [], [])
+    hours = [(low, high) for low, high in ((first_hour, first_day), (last_day, last_hour))
+             if low is not None and high is not None and low < high]
+    return RangeSplit(raw, hours, [(first_day, last_day)])
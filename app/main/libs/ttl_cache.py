@@ -0,0 +1,90 @@
+"""
+In-process cache with expiry, request coalescing and stale-while-revalidate.
+
+An entry is fresh for ttl seconds and is then served stale for up to stale_ttl more seconds while a single
+background refresh replaces it.  Concurrent misses for the same key wait on one call of the loader instead of
+each going upstream, and failed loads aren't cached, so the next caller simply tries again.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, NamedTuple
+
+logger = logging.getLogger(__name__)
+
+
+class Entry(NamedTuple):
+    value: Any
+    fresh_until: float
+    stale_until: float
+
+
+class TTLCache:
+    def __init__(self, ttl: float, stale_ttl: float = 0, max_entries: int = 10_000,
+                 clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.entries: Dict[Hashable, Entry] = {}
+        self.in_flight: Dict[Hashable, Future] = {}
+
+    def __contains__(self, key: Hashable) -> bool:
+        """True if key can be served without waiting on the loader (fresh or stale)"""
+        entry = self.entries.get(key)
+        return entry is not None and self.clock() < entry.stale_until
+
+    def get(self, key: Hashable, load: Callable[[], Any]) -> Any:
+        """
+        Returns the cached value for key, calling load() if there is none.
+        A stale value is returned straight away and refreshed in the background.
+        """
+        now = self.clock()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and now < entry.fresh_until:
+                return entry.value
+            future = self.in_flight.get(key)
+            loading = future is None
+            if loading:
+                future = self.in_flight[key] = Future()
+            if entry is not None and now < entry.stale_until:
+                if loading:
+                    threading.Thread(target=self._refresh, args=(key, load, future),
+                                     name="cache-refresh", daemon=True).start()
+                return entry.value
+        if not loading:
+            return future.result()
+        return self._load(key, load, future)
+
+    def _load(self, key: Hashable, load: Callable[[], Any], future: Future) -> Any:
+        try:
+            value = load()
+        except BaseException as e:
+            with self.lock:
+                del self.in_flight[key]
+            future.set_exception(e)
+            raise
+        now = self.clock()
+        with self.lock:
+            self.entries.pop(key, None)
+            if len(self.entries) >= self.max_entries:
+                # entries are kept in load order, so this drops the one loaded longest ago
+                del self.entries[next(iter(self.entries))]
+            self.entries[key] = Entry(value, now + self.ttl, now + self.ttl + self.stale_ttl)
+            del self.in_flight[key]
+        future.set_result(value)
+        return value
+
+    def _refresh(self, key: Hashable, load: Callable[[], Any], future: Future) -> None:
+        try:
+            self._load(key, load, future)
+        except Exception:
+            # keep serving the stale value until it expires, the next get after that retries
+            logger.exception("Failed to refresh cached value for %r", key)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
@@ -1,4 +1,5 @@
 import io
+from PIL import Image
 from main.model.idea import IdeaModel
 from main.service.idea_service import IdeaService
 
@@ -19,7 +20,14 @@ def get_error(status_code, message, **kwargs):
 
 
 def create_image_file(filename, content_type):
-    file = io.BytesIO(b"abcdef")
+    """A small image file as uploaded, a real PNG or JPEG for those extensions"""
+    image_format = {"png": "PNG", "jpg": "JPEG", "jpeg": "JPEG"}.get(filename.rsplit(".", 1)[-1].lower())
+    file = io.BytesIO()
+    if image_format:
+        Image.new("RGB", (40, 30), (200, 60, 20)).save(file, image_format)
+    else:
+        file.write(b"abcdef")
+    file.seek(0)
     file.filename = filename
     file.content_type = content_type
     return file
@@ -9,4 +9,12 @@ from main.model.upvote import UpvoteModel
 from main.model.downvote import DownvoteModel
 from main.model.bookmark import BookmarkModel
 from main.model.password_reset import PasswordResetModel
-from main.model.subscription import SubscriptionModel
\ No newline at end of file
+from main.model.subscription import SubscriptionModel
+from main.model.analyst_stats import AnalystStatsModel
+from main.model.timeline import TimelineModel
+from main.model.search_symbol import SearchSymbolModel
+from main.model.download_rollup import IdeaDownloadRollupModel, UserDownloadRollupModel
+from main.model.quote_schedule import QuoteScheduleModel
+from main.model.scheduled_job_run import ScheduledJobRunModel
+from main.model.upload import UploadModel
+from main.model.email_outbox import EmailOutboxModel
@@ -0,0 +1,62 @@
+import datetime
+
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+
+from main.db import db
+
+EPOCH = datetime.date(1970, 1, 1)
+
+
+def epoch_day(date: datetime.date) -> int:
+    return (date - EPOCH).days
+
+
+class epoch_day_of(FunctionElement):
+    """epoch_day of a date or datetime column computed in SQL (the time of day is dropped), NULL stays NULL"""
+    type = db.Integer()
+    name = "epoch_day_of"
+
+
+@compiles(epoch_day_of)
+def compile_epoch_day_of(element, compiler, **kw) -> str:
+    return "(CAST(%s AS DATE) - DATE '1970-01-01')" % compiler.process(element.clauses, **kw)
+
+
+@compiles(epoch_day_of, "sqlite")
+def compile_sqlite_epoch_day_of(element, compiler, **kw) -> str:
+    # 2440587.5 is the julian day of 1970-01-01 at midnight
+    return "CAST(julianday(date(%s)) - 2440587.5 AS INTEGER)" % compiler.process(element.clauses, **kw)
+
+
+class AnalystStatsModel(db.Model):
+    """Running per-analyst sums used to update performance metrics incrementally"""
+    __tablename__ = "analyst_stats"
+
+    analyst_id = db.Column(db.Integer, db.ForeignKey("users.id"), primary_key=True)
+    num_ideas = db.Column(db.Integer, nullable=False, default=0)
+    return_sum = db.Column(db.Float, nullable=False, default=0)
+    pt_capture_sum = db.Column(db.Float, nullable=False, default=0)
+    success_count = db.Column(db.Integer, nullable=False, default=0)
+    closed_holding_days = db.Column(db.Integer, nullable=False, default=0)
+    # holding days of open ideas = num_open_ideas * epoch_day(today) - open_created_day_sum
+    num_open_ideas = db.Column(db.Integer, nullable=False, default=0)
+    open_created_day_sum = db.Column(db.BigInteger, nullable=False, default=0)
+    is_dirty = db.Column(db.Boolean, nullable=False, default=True)
+    computed_on = db.Column(db.Date)
+
+    analyst = db.relationship("UserModel")
+
+    def holding_day_sum(self, today: datetime.date) -> int:
+        return self.closed_holding_days + self.num_open_ideas * epoch_day(today) - self.open_created_day_sum
+
+    def averages(self, today: datetime.date) -> dict:
+        if not self.num_ideas:
+            return {"avg_return": None, "avg_price_target_capture": None,
+                    "success_rate": None, "avg_holding_period": None}
+        return {
+            "avg_return": self.return_sum / self.num_ideas,
+            "avg_price_target_capture": self.pt_capture_sum / self.num_ideas,
+            "success_rate": self.success_count / self.num_ideas,
+            "avg_holding_period": self.holding_day_sum(today) / self.num_ideas
+        }
@@ -5,6 +5,11 @@ from main.db import db
 
 class BookmarkModel(db.Model):
     __tablename__ = "bookmarks"
+    __table_args__ = (
+        db.UniqueConstraint("user_id", "idea_id", name="uq_bookmarks_user_id_idea_id"),
+        db.Index("ix_bookmarks_idea_id_created_at", "idea_id", "created_at"),
+        db.Index("ix_bookmarks_user_id_created_at", "user_id", "created_at"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
@@ -5,6 +5,9 @@ from main.db import db
 
 class CommentModel(db.Model):
     __tablename__ = "comments"
+    __table_args__ = (
+        db.Index("ix_comments_idea_id_created_at", "idea_id", "created_at"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
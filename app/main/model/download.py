@@ -5,6 +5,10 @@ from main.db import db
 
 class DownloadModel(db.Model):
     __tablename__ = "downloads"
+    __table_args__ = (
+        db.Index("ix_downloads_idea_id_created_at", "idea_id", "created_at"),
+        db.Index("ix_downloads_user_id_created_at", "user_id", "created_at"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
@@ -0,0 +1,34 @@
+from main.db import db
+
+
+class IdeaDownloadRollupModel(db.Model):
+    """
+    Downloads of an idea per hour and per day (period is "hour" or "day", bucket is the period's start).
+    analyst_id is copied from the idea so analyst totals don't need a join.
+    """
+    __tablename__ = "idea_download_rollups"
+    __table_args__ = (
+        db.UniqueConstraint("idea_id", "period", "bucket"),
+        db.Index("ix_idea_download_rollups_analyst_id_period_bucket", "analyst_id", "period", "bucket"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    idea_id = db.Column(db.Integer, db.ForeignKey("ideas.id"), nullable=False)
+    analyst_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    period = db.Column(db.String(4), nullable=False)
+    bucket = db.Column(db.DateTime, nullable=False)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class UserDownloadRollupModel(db.Model):
+    """Downloads made by a user per hour and per day"""
+    __tablename__ = "user_download_rollups"
+    __table_args__ = (
+        db.UniqueConstraint("user_id", "period", "bucket"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    period = db.Column(db.String(4), nullable=False)
+    bucket = db.Column(db.DateTime, nullable=False)
+    count = db.Column(db.Integer, nullable=False, default=0)
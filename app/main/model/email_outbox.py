@@ -0,0 +1,33 @@
+import datetime
+
+from main.db import db
+
+
+class EmailOutboxModel(db.Model):
+    """
+    An email waiting to be sent (or sent, or given up on) by EmailService.
+    subject, text and html may hold %recipient.name% placeholders, filled from variables when it's sent.
+    """
+    __tablename__ = "email_outbox"
+    __table_args__ = (
+        db.Index("ix_email_outbox_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+
+    PENDING = "pending"
+    SENT = "sent"
+    FAILED = "failed"
+
+    id = db.Column(db.Integer, primary_key=True)
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    to_address = db.Column(db.String(256), nullable=False)
+    subject = db.Column(db.String(256), nullable=False)
+    text = db.Column(db.Text, nullable=False)
+    html = db.Column(db.Text, nullable=False)
+    variables = db.Column(db.JSON)
+    status = db.Column(db.String(10), nullable=False, default=PENDING)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
+    last_error = db.Column(db.String(256))
+    # Mailgun's message id, shared by the messages of a batch
+    provider_id = db.Column(db.String(256))
@@ -5,6 +5,11 @@ from main.db import db
 
 class FollowModel(db.Model):
     __tablename__ = "follows"
+    __table_args__ = (
+        db.UniqueConstraint("user_id", "analyst_id", name="uq_follows_user_id_analyst_id"),
+        db.Index("ix_follows_analyst_id_created_at", "analyst_id", "created_at"),
+        db.Index("ix_follows_user_id_created_at", "user_id", "created_at"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
@@ -1,10 +1,17 @@
 import datetime
 
+from sqlalchemy import func
+
 from main.db import db
 
 
 class IdeaModel(db.Model):
     __tablename__ = "ideas"
+    __table_args__ = (
+        db.Index("ix_ideas_created_at", "created_at"),
+        db.Index("ix_ideas_analyst_id_created_at", "analyst_id", "created_at"),
+        db.Index("ix_ideas_score_created_at", "score", "created_at"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
@@ -32,3 +39,4 @@ class IdeaModel(db.Model):
     comments = db.relationship("CommentModel", lazy="dynamic", cascade="all, delete-orphan")
 
 
+db.Index("ix_ideas_lower_symbol", func.lower(IdeaModel.symbol))
@@ -0,0 +1,14 @@
+from main.db import db
+
+
+class QuoteScheduleModel(db.Model):
+    """
+    When each symbol with open ideas was last refreshed by the quote scheduler, at what price,
+    and its volatility: a moving average of absolute log returns per sqrt hour between refreshes.
+    """
+    __tablename__ = "quote_schedule"
+
+    symbol = db.Column(db.String(10), primary_key=True)
+    last_price = db.Column(db.Float)
+    refreshed_at = db.Column(db.DateTime)
+    volatility = db.Column(db.Float)
@@ -5,6 +5,10 @@ from main.db import db
 
 class ReviewModel(db.Model):
     __tablename__ = "reviews"
+    __table_args__ = (
+        db.Index("ix_reviews_analyst_id_created_at", "analyst_id", "created_at"),
+        db.Index("ix_reviews_user_id_analyst_id", "user_id", "analyst_id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
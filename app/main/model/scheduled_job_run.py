@@ -0,0 +1,9 @@
+from main.db import db
+
+
+class ScheduledJobRunModel(db.Model):
+    """Last time each scheduled job ran in any worker, so a job that fires in several workers only runs once"""
+    __tablename__ = "scheduled_job_runs"
+
+    name = db.Column(db.String(80), primary_key=True)
+    last_run_at = db.Column(db.DateTime, nullable=False)
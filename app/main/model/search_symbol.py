@@ -0,0 +1,14 @@
+from main.db import db
+
+
+class SearchSymbolModel(db.Model):
+    """
+    One row per distinct symbol with ideas, for autocomplete.
+    num_ideas counts the ideas on the symbol, the row is removed when the last one is deleted.
+    """
+    __tablename__ = "search_symbols"
+
+    id = db.Column(db.Integer, primary_key=True)
+    symbol = db.Column(db.String(10), nullable=False, unique=True)
+    company_name = db.Column(db.String, nullable=False)
+    num_ideas = db.Column(db.Integer, nullable=False, default=0)
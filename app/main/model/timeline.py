@@ -0,0 +1,22 @@
+from main.db import db
+
+
+class TimelineModel(db.Model):
+    """
+    One row per idea in a user's following feed: ideas from the analysts they follow, plus their own.
+    Rows are written when an idea is created or a follow changes, so reading the feed is a range scan.
+    """
+    __tablename__ = "timelines"
+    __table_args__ = (
+        db.UniqueConstraint("user_id", "idea_id", name="uq_timelines_user_id_idea_id"),
+        db.Index("ix_timelines_user_id_created_at_idea_id", "user_id", "created_at", "idea_id"),
+        db.Index("ix_timelines_user_id_analyst_id", "user_id", "analyst_id"),
+        db.Index("ix_timelines_idea_id", "idea_id"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    idea_id = db.Column(db.Integer, db.ForeignKey("ideas.id"), nullable=False)
+    analyst_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    # copy of the idea's created_at, so the feed can be ordered without reading ideas
+    created_at = db.Column(db.DateTime, nullable=False)
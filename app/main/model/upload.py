@@ -0,0 +1,21 @@
+import datetime
+
+from main.db import db
+
+
+class UploadModel(db.Model):
+    """A file a user was given a presigned POST for, confirmed once it's in the bucket"""
+    __tablename__ = "uploads"
+    __table_args__ = (
+        db.Index("ix_uploads_user_id_created_at", "user_id", "created_at"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    key = db.Column(db.String(256), nullable=False, unique=True)
+    kind = db.Column(db.String(20), nullable=False)
+    content_type = db.Column(db.String(80), nullable=False)
+    confirmed_at = db.Column(db.DateTime)
+
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    user = db.relationship("UserModel")
@@ -1,4 +1,5 @@
 import datetime
+from sqlalchemy import func
 from main.db import db
 from main.libs.security import encrypt_password, check_encrypted_password
 from main.model.confirmation import ConfirmationModel
@@ -15,6 +16,8 @@ class UserModel(db.Model):
     username = db.Column(db.String(80), nullable=False, unique=True)
     password_hash = db.Column(db.String(100), nullable=False)
     image_url = db.Column(db.String(256))
+    # {size: url} of WebP versions of the image (see ImageService)
+    image_variants = db.Column(db.JSON)
     is_analyst = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
     is_confirmed = db.Column(db.Boolean, default=False)
@@ -78,3 +81,9 @@ class UserModel(db.Model):
 
     def __repr__(self):
         return "<User '{}'>".format(self.username)
+
+
+# case-insensitive lookups in UserService filter on lower(...)
+db.Index("ix_users_lower_username", func.lower(UserModel.username))
+db.Index("ix_users_lower_email", func.lower(UserModel.email))
+db.Index("ix_users_lower_stripe_cust_id", func.lower(UserModel.stripe_cust_id))
@@ -9,7 +9,7 @@ from main.schema.user_schema import UserSchema
 
 
 class CommentSchema(ma.SQLAlchemyAutoSchema):
-    user = ma.Nested(UserSchema(only=("id", "username", "image_url")))
+    user = ma.Nested(UserSchema(only=("id", "username", "image_url", "image_variants")))
 
     class Meta:
         model = CommentModel
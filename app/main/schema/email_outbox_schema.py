@@ -0,0 +1,17 @@
+from main.ma import ma
+
+from main.libs.util import camelcase
+from main.model.email_outbox import EmailOutboxModel
+
+
+class EmailOutboxSchema(ma.SQLAlchemyAutoSchema):
+    class Meta:
+        model = EmailOutboxModel
+        # variables hold confirmation codes and password reset links
+        exclude = ("text", "html", "variables")
+
+    def on_bind_field(self, field_name, field_obj):
+        field_obj.data_key = camelcase(field_obj.data_key or field_name)
+
+
+email_outbox_list_schema = EmailOutboxSchema(many=True)
@@ -1,6 +1,7 @@
 from marshmallow import Schema, fields, validates, validates_schema, ValidationError
 from marshmallow.validate import Length, Range
 
+from main.libs.serializer import compile_schema
 from main.libs.strings import get_text
 from main.libs.util import camelcase
 from main.ma import ma
@@ -11,7 +12,7 @@ from main.schema.comment_schema import CommentSchema
 
 class IdeaSchema(ma.SQLAlchemyAutoSchema):
     analyst = ma.Nested(UserSchema(only=(
-        'id', 'username', "image_url", "num_ideas", "analyst_rank",
+        'id', 'username', "image_url", "image_variants", "num_ideas", "analyst_rank",
         "analyst_rank_percentile", 'avg_return', 'success_rate',
         'avg_holding_period', "review_star_total", "num_reviews")))
     comments = ma.Nested(CommentSchema(many=True))
@@ -34,6 +35,7 @@ class NewIdeaSchema(Schema):
     thesisSummary = fields.Str(required=True, validate=Length(min=1))
     fullReport = fields.Str(required=True, validate=Length(min=1))
     exhibitTitleMap = fields.Str()
+    exhibitUploads = fields.Str()
 
     @validates('positionType')
     def must_be_long_or_short(self, value):
@@ -59,6 +61,6 @@ class NewIdeaSchema(Schema):
 
 
 idea_schema = IdeaSchema(exclude=("full_report", "exhibits", "comments"))
-idea_list_schema = IdeaSchema(many=True, exclude=("full_report", "exhibits", "comments"))
+idea_list_schema = compile_schema(IdeaSchema(many=True, exclude=("full_report", "exhibits", "comments")))
 new_idea_schema = NewIdeaSchema()
 idea_with_report_schema = IdeaSchema()
@@ -8,7 +8,7 @@ from main.schema.user_schema import UserSchema
 
 
 class ReviewSchema(ma.SQLAlchemyAutoSchema):
-    user = ma.Nested(lambda: UserSchema(only=("id", "username", "image_url")))
+    user = ma.Nested(lambda: UserSchema(only=("id", "username", "image_url", "image_variants")))
 
     class Meta:
         model = ReviewModel
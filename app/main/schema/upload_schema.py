@@ -0,0 +1,16 @@
+from marshmallow import Schema, fields
+from marshmallow.validate import Length
+
+
+class NewUploadSchema(Schema):
+    kind = fields.Str(required=True)
+    filename = fields.Str(required=True, validate=Length(min=1, max=200))
+    contentType = fields.Str(required=True, validate=Length(min=1, max=80))
+
+
+class ConfirmUploadSchema(Schema):
+    key = fields.Str(required=True, validate=Length(min=1, max=256))
+
+
+new_upload_schema = NewUploadSchema()
+confirm_upload_schema = ConfirmUploadSchema()
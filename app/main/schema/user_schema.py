@@ -1,6 +1,7 @@
 from marshmallow import Schema, fields, validates, ValidationError
 from marshmallow.validate import Length
 
+from main.libs.serializer import compile_schema
 from main.libs.strings import get_text
 from main.libs.util import camelcase
 from main.ma import ma
@@ -45,8 +46,10 @@ class UserLoginSchema(Schema):
 
 
 user_schema = UserSchema()
+user_compact_schema = UserSchema(exclude=('upvotes', 'downvotes', 'bookmarks'))
 user_list_schema = UserSchema(many=True)
 user_register_schema = UserRegisterSchema()
 user_login_schema = UserLoginSchema()
-user_follow_list_schema = UserSchema(many=True, only=("id", "username", "image_url", "is_analyst"))
-analyst_leaderboard_schema = UserSchema(many=True, exclude=('upvotes', 'downvotes', 'bookmarks'))
+user_follow_list_schema = compile_schema(UserSchema(
+    many=True, only=("id", "username", "image_url", "image_variants", "is_analyst")))
+analyst_leaderboard_schema = compile_schema(UserSchema(many=True, exclude=('upvotes', 'downvotes', 'bookmarks')))
@@ -1,5 +1,6 @@
-from typing import List
-from main.db import db
+from typing import List, Optional, Tuple
+from main.db import db, commit_or_flush
+from main.libs.pagination import paginate, DEFAULT_PAGE_SIZE
 from main.model.bookmark import BookmarkModel
 from main.model.idea import IdeaModel
 
@@ -28,12 +29,22 @@ class BookmarkService:
         return IdeaModel.query.join(BookmarkModel).order_by(db.desc(BookmarkModel.created_at))\
             .filter(BookmarkModel.user_id == user_id).all()
 
+    @classmethod
+    def get_users_bookmarked_ideas_page(cls, user_id: int, cursor=None, page_size=DEFAULT_PAGE_SIZE) \
+            -> Tuple[List["IdeaModel"], Optional[str]]:
+        """Like get_users_bookmarked_ideas, one page at a time"""
+        query = db.session.query(IdeaModel, BookmarkModel.created_at, BookmarkModel.id).join(BookmarkModel)\
+            .filter(BookmarkModel.user_id == user_id)
+        rows, next_cursor = paginate(query, [BookmarkModel.created_at, BookmarkModel.id], cursor, page_size,
+                                     key=lambda row: list(row[1:]))
+        return [row[0] for row in rows], next_cursor
+
     @classmethod
     def delete_from_db(cls, data) -> None:
         db.session.delete(data)
-        db.session.commit()
+        commit_or_flush()
 
     @classmethod
     def save_changes(cls, data) -> None:
         db.session.add(data)
-        db.session.commit()
+        commit_or_flush()
@@ -1,16 +1,16 @@
 from typing import List
-from main.db import db
+from main.db import db, commit_or_flush, unit_of_work
 from main.model.comment import CommentModel
 from main.model.idea import IdeaModel
+from main.service.counter_service import CounterService
 
 
 class CommentService:
     def save_new_comment(self, body: str, user_id: int, idea_id: int) -> "CommentModel":
         comment = CommentModel(body=body, user_id=user_id, idea_id=idea_id)
-        idea = IdeaModel.query.filter_by(id=idea_id).first()
-        idea.num_comments = idea.num_comments + 1
-        self.save_changes(idea)
-        self.save_changes(comment)
+        with unit_of_work():
+            self.save_changes(comment)
+            CounterService.increment(IdeaModel, idea_id, num_comments=1)
         return comment
 
     @classmethod
@@ -19,10 +19,9 @@ class CommentService:
 
     def delete_comment_by_id(self, comment_id: int) -> None:
         comment = self.get_comment_by_id(comment_id)
-        idea = IdeaModel.query.filter_by(id=comment.idea_id).first()
-        idea.num_comments = idea.num_comments - 1
-        self.save_changes(idea)
-        self.delete_from_db(comment)
+        with unit_of_work():
+            CounterService.increment(IdeaModel, comment.idea_id, num_comments=-1)
+            self.delete_from_db(comment)
 
     @classmethod
     def get_all_comments_for_idea(cls, idea_id: int) -> List["CommentModel"]:
@@ -31,9 +30,9 @@ class CommentService:
     @classmethod
     def delete_from_db(cls, data) -> None:
         db.session.delete(data)
-        db.session.commit()
+        commit_or_flush()
 
     @classmethod
     def save_changes(cls, data) -> None:
         db.session.add(data)
-        db.session.commit()
+        commit_or_flush()
@@ -1,10 +1,10 @@
-from requests import Response
 from time import time
 
-from main.db import db
+from main.db import db, commit_or_flush
 from main.model.user import UserModel
 from main.model.confirmation import ConfirmationModel
-from main.libs.email import Email
+from main.model.email_outbox import EmailOutboxModel
+from main.service.email_service import EmailService
 
 
 class ConfirmationService:
@@ -14,13 +14,15 @@ class ConfirmationService:
         return new_confirmation
 
     @classmethod
-    def send_confirmation_email(cls, user_id: int) -> Response:
+    def send_confirmation_email(cls, user_id: int) -> "EmailOutboxModel":
+        """Queues the email with the user's most recent confirmation code (see EmailService)"""
         user = UserModel.query.filter_by(id=user_id).first()
-        subject = f"Hi {user.username}! Please confirm your registration"
-        code = user.most_recent_confirmation.code
-        text = f"Welcome to hayek.ai! Your signup passcode is {code}"
-        html = f"<html>Welcome to hayek.ai! Your signup passcode is {code}</html>"
-        return Email.send_email([user.email], subject, text, html)
+        # the same for every user so they're sent in batches, Mailgun fills in the recipient's variables
+        subject = "Hi %recipient.username%! Please confirm your registration"
+        text = "Welcome to hayek.ai! Your signup passcode is %recipient.code%"
+        html = "<html>Welcome to hayek.ai! Your signup passcode is %recipient.code%</html>"
+        variables = {"username": user.username, "code": user.most_recent_confirmation.code}
+        return EmailService.enqueue(user.email, subject, text, html, variables)
 
     @classmethod
     def get_confirmation_by_id(cls, confirmation_id: int) -> "ConfirmationModel":
@@ -35,4 +37,4 @@ class ConfirmationService:
     @classmethod
     def save_changes(cls, data) -> None:
         db.session.add(data)
-        db.session.commit()
+        commit_or_flush()
@@ -0,0 +1,263 @@
+import atexit
+from collections import defaultdict
+from contextlib import nullcontext
+from typing import Callable, ContextManager, Dict, List
+from flask import current_app, has_app_context
+from sqlalchemy import bindparam, event, func
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.util import identity_key
+from main.db import db, commit_or_flush, bulk_update
+from main.libs.counter_buffer import CounterBuffer, Deltas
+from main.model.idea import IdeaModel
+from main.model.user import UserModel
+from main.model.upvote import UpvoteModel
+from main.model.downvote import DownvoteModel
+from main.model.comment import CommentModel
+from main.model.download import DownloadModel
+from main.model.follow import FollowModel
+from main.model.review import ReviewModel
+
+
+class CounterService:
+    """
+    Denormalized counters (idea votes, comments and downloads, user follows, reviews and ideas).
+    Counters are changed with UPDATE ... SET col = col + delta in the caller's transaction, so concurrent
+    writers can't lose each other's updates, and reconcile() recomputes them from the source tables.
+
+    With VOTE_WRITE_BEHIND on, increment_later leaves the UPDATE to a write-behind CounterBuffer instead,
+    so a burst of votes on one idea becomes one UPDATE per flush rather than one row lock per vote.
+    Ideas loaded in the meantime have the pending deltas added to their counters.
+    """
+
+    @classmethod
+    def increment(cls, model, row_id: int, **deltas: int) -> None:
+        """
+        e.g. increment(IdeaModel, idea_id, num_upvotes=1, score=1)
+        Raises ValueError if there is no such row, so the caller's unit of work is rolled back.
+        """
+        updated = model.query.filter_by(id=row_id).update(
+            {getattr(model, column): getattr(model, column) + delta for column, delta in deltas.items()},
+            synchronize_session=False)
+        if not updated:
+            raise ValueError(f"{model.__name__} {row_id} not found")
+        # a copy loaded earlier in this session would now be stale, so reload it on next access
+        loaded = db.session.identity_map.get(identity_key(model, row_id))
+        if loaded is not None:
+            db.session.expire(loaded, list(deltas))
+        commit_or_flush()
+
+    @classmethod
+    def increment_later(cls, model, row_id: int, **deltas: int) -> None:
+        """
+        Like increment, through the write-behind buffer if the app has one.
+        The deltas are buffered once the current transaction commits, and dropped if it rolls back.
+        """
+        buffer = get_buffer()
+        if buffer is None:
+            cls.increment(model, row_id, **deltas)
+            return
+        queue_deltas(db.session(), model.__tablename__, row_id, deltas)
+        # so the caller sees its own change straight away
+        loaded = db.session.identity_map.get(identity_key(model, row_id))
+        if loaded is not None:
+            add_to_loaded_counters(loaded, deltas)
+
+    @classmethod
+    def increment_many(cls, model, deltas: Dict[int, Dict[str, int]]) -> None:
+        """increment for many rows ({row_id: {column: delta}}) in the current transaction, in one round trip each"""
+        for statement, params in cls.update_batches({(model.__tablename__, row_id): row
+                                                     for row_id, row in deltas.items()}):
+            db.session.execute(statement, params)
+        for row_id, row in deltas.items():
+            loaded = db.session.identity_map.get(identity_key(model, row_id))
+            if loaded is not None:
+                db.session.expire(loaded, list(row))
+        commit_or_flush()
+
+    @classmethod
+    def write_deltas(cls, deltas: Deltas, committing: Callable[[], ContextManager] = nullcontext) -> None:
+        """Applies buffered deltas in a transaction of their own, committed inside committing()"""
+        with db.engine.connect() as connection:
+            transaction = connection.begin()
+            try:
+                for statement, params in cls.update_batches(deltas):
+                    connection.execute(statement, params)
+                with committing():
+                    transaction.commit()
+            except Exception:
+                if transaction.is_active:
+                    transaction.rollback()
+                raise
+
+    @classmethod
+    def update_batches(cls, deltas: Deltas) -> list:
+        """(statement, params) for one executemany UPDATE per table and set of columns"""
+        batches = defaultdict(list)
+        for (table, row_id), row in sorted(deltas.items()):
+            columns = tuple(sorted(column for column, delta in row.items() if delta))
+            if columns:
+                batches[(table, columns)].append(
+                    {"row_id": row_id, **{f"delta_{column}": row[column] for column in columns}})
+        statements = []
+        for (table_name, columns), params in batches.items():
+            table = db.metadata.tables[table_name]
+            statement = table.update().where(table.c.id == bindparam("row_id")).values({
+                column: table.c[column] + bindparam(f"delta_{column}") for column in columns})
+            statements.append((statement, params))
+        return statements
+
+    @classmethod
+    def actual_idea_counters(cls) -> Dict[int, dict]:
+        upvotes = cls.count_by(UpvoteModel.idea_id)
+        downvotes = cls.count_by(DownvoteModel.idea_id)
+        comments = cls.count_by(CommentModel.idea_id)
+        downloads = cls.count_by(DownloadModel.idea_id)
+        return {
+            idea_id: {
+                "num_upvotes": upvotes.get(idea_id, 0),
+                "num_downvotes": downvotes.get(idea_id, 0),
+                "score": upvotes.get(idea_id, 0) - downvotes.get(idea_id, 0),
+                "num_comments": comments.get(idea_id, 0),
+                "num_downloads": downloads.get(idea_id, 0)
+            }
+            for idea_id, in db.session.query(IdeaModel.id)
+        }
+
+    @classmethod
+    def actual_user_counters(cls) -> Dict[int, dict]:
+        followers = cls.count_by(FollowModel.analyst_id)
+        following = cls.count_by(FollowModel.user_id)
+        reviews = cls.count_by(ReviewModel.analyst_id)
+        stars = dict(db.session.query(ReviewModel.analyst_id, func.sum(ReviewModel.stars))
+                     .group_by(ReviewModel.analyst_id))
+        ideas = cls.count_by(IdeaModel.analyst_id)
+        return {
+            user_id: {
+                "num_followers": followers.get(user_id, 0),
+                "num_following": following.get(user_id, 0),
+                "num_reviews": reviews.get(user_id, 0),
+                "review_star_total": int(stars.get(user_id, 0)),
+                "num_ideas": ideas.get(user_id, 0)
+            }
+            for user_id, in db.session.query(UserModel.id)
+        }
+
+    @classmethod
+    def count_by(cls, column) -> Dict[int, int]:
+        return dict(db.session.query(column, func.count()).group_by(column))
+
+    @classmethod
+    def reconcile(cls, fix: bool = True) -> List[dict]:
+        """
+        Compares every counter with the rows it counts and returns the drift,
+        as dicts with table, id, column, stored and actual.  If fix, drifted counters are set to actual.
+        """
+        buffer = get_buffer()
+        if buffer is not None:
+            buffer.flush()
+        drift = []
+        for model, actual_counters in ((IdeaModel, cls.actual_idea_counters()),
+                                       (UserModel, cls.actual_user_counters())):
+            columns = list(next(iter(actual_counters.values()), {}))
+            if not columns:
+                continue
+            stored = db.session.query(model.id, *[getattr(model, column) for column in columns])
+            fixes = []
+            for row in stored:
+                actual = actual_counters.get(row.id)
+                if actual is None:
+                    continue
+                changed = {column: actual[column] for column in columns if getattr(row, column) != actual[column]}
+                for column, value in changed.items():
+                    drift.append({"table": model.__tablename__, "id": row.id, "column": column,
+                                  "stored": getattr(row, column), "actual": value})
+                if changed:
+                    fixes.append({"id": row.id, **changed})
+            if fix and fixes:
+                bulk_update(model, fixes)
+        return drift
+
+
+# models whose counters can be buffered
+BUFFERED_MODELS = (IdeaModel,)
+
+
+def get_buffer():
+    return current_app.extensions.get("counter_buffer") if has_app_context() else None
+
+
+def init_counter_buffer(app) -> CounterBuffer:
+    """Sets up write-behind counters for app (see CounterService)"""
+    def flush(deltas: Deltas, committing: Callable[[], ContextManager]) -> None:
+        with app.app_context():
+            CounterService.write_deltas(deltas, committing)
+
+    buffer = CounterBuffer(
+        flush,
+        interval=app.config["VOTE_FLUSH_INTERVAL_MS"] / 1000,
+        max_events=app.config["VOTE_FLUSH_MAX_EVENTS"])
+    app.extensions["counter_buffer"] = buffer
+    atexit.register(buffer.flush)
+    return buffer
+
+
+def add_to_loaded_counters(instance, deltas: Dict[str, int], attrs=None) -> None:
+    """Adds deltas to an instance's loaded counters without marking them as changed"""
+    for column, delta in deltas.items():
+        value = instance.__dict__.get(column)
+        if delta and value is not None and (attrs is None or column in attrs):
+            set_committed_value(instance, column, value + delta)
+
+
+def overlay_pending_deltas(instance, context, attrs=None) -> None:
+    buffer = get_buffer()
+    if buffer is None:
+        return
+    table = instance.__tablename__
+    add_to_loaded_counters(instance, buffer.pending(table, instance.id), attrs)
+    for pending_table, row_id, deltas in pending_session_deltas(context.session):
+        if pending_table == table and row_id == instance.id:
+            add_to_loaded_counters(instance, deltas, attrs)
+
+
+for buffered_model in BUFFERED_MODELS:
+    event.listen(buffered_model, "load", overlay_pending_deltas)
+    event.listen(buffered_model, "refresh", overlay_pending_deltas)
+
+
+def savepoint_or_root(transaction):
+    """The transaction that decides whether a change survives: the innermost savepoint, else the root"""
+    while transaction.parent is not None and not transaction.nested:
+        transaction = transaction.parent
+    return transaction
+
+
+def queue_deltas(session, table: str, row_id: int, deltas: Dict[str, int]) -> None:
+    """Holds deltas with the current transaction until it commits"""
+    pending = session.info.setdefault("counter_deltas", {})
+    pending.setdefault(savepoint_or_root(session.transaction), []).append((table, row_id, deltas))
+
+
+def pending_session_deltas(session) -> list:
+    return [row for rows in session.info.get("counter_deltas", {}).values() for row in rows]
+
+
+@event.listens_for(db.session, "after_commit")
+def buffer_committed_deltas(session) -> None:
+    transaction = session.transaction
+    pending = session.info.get("counter_deltas", {})
+    rows = pending.pop(transaction, [])
+    if transaction.nested:
+        # a released savepoint's changes still depend on the enclosing transaction
+        pending.setdefault(savepoint_or_root(transaction.parent), []).extend(rows)
+        return
+    buffer = get_buffer()
+    if buffer is not None:
+        for table, row_id, deltas in rows:
+            buffer.add(table, row_id, deltas)
+
+
+@event.listens_for(db.session, "after_transaction_end")
+def drop_uncommitted_deltas(session, transaction) -> None:
+    # committed deltas were already moved on by after_commit, anything left was rolled back
+    session.info.get("counter_deltas", {}).pop(transaction, None)
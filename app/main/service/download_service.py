@@ -1,15 +1,51 @@
-from main.db import db
+import datetime
+from collections import Counter
+from typing import Dict, List, Tuple
+from main.db import db, commit_or_flush, unit_of_work
+from main.libs.time_buckets import HOUR, DAY, PERIODS, RangeSplit, bucket_start, bucket_starts, split_range
 from main.model.idea import IdeaModel
 from main.model.download import DownloadModel
-from sqlalchemy import and_
+from main.model.download_rollup import IdeaDownloadRollupModel, UserDownloadRollupModel
+from main.service.counter_service import CounterService
+from sqlalchemy import and_, bindparam, func, or_
+from sqlalchemy.exc import IntegrityError
 
 
 class DownloadService:
+    """
+    Every download is also added to hourly and daily rollups (per idea, with its analyst, and per user)
+    in the same transaction, so counts over a date range sum at most a few dozen buckets per day
+    and only count raw downloads for the partial hours at either end.
+    """
+
     def save_new_download(self, user_id: int, idea_id: int) -> "DownloadModel":
-        download = DownloadModel(idea_id=idea_id, user_id=user_id)
-        self.save_changes(download)
+        download = DownloadModel(idea_id=idea_id, user_id=user_id, created_at=datetime.datetime.utcnow())
+        with unit_of_work():
+            self.save_changes(download)
+            CounterService.increment(IdeaModel, idea_id, num_downloads=1)
+            analyst_id = IdeaModel.query.get(idea_id).analyst_id
+            for period in PERIODS:
+                bucket = bucket_start(download.created_at, period)
+                self.add_to_rollup(IdeaDownloadRollupModel, {"idea_id": idea_id, "period": period, "bucket": bucket},
+                                   analyst_id=analyst_id)
+                self.add_to_rollup(UserDownloadRollupModel, {"user_id": user_id, "period": period, "bucket": bucket})
         return download
 
+    @classmethod
+    def add_to_rollup(cls, model, key: dict, **columns) -> None:
+        """Adds a download to the rollup row with key, creating the row the first time"""
+        def increment() -> int:
+            return model.query.filter_by(**key).update({model.count: model.count + 1}, synchronize_session=False)
+
+        if increment():
+            return
+        try:
+            with db.session.begin_nested():
+                db.session.execute(model.__table__.insert().values(count=1, **key, **columns))
+        except IntegrityError:
+            # a concurrent download created the row first
+            increment()
+
     @classmethod
     def get_download_by_id(cls, download_id: int) -> "DownloadModel":
         return DownloadModel.query.filter_by(id=download_id).first()
@@ -17,24 +53,18 @@ class DownloadService:
     @classmethod
     def get_idea_download_count(cls, idea_id: int, start_date=None, end_date=None) -> int:
         """Returns the number of downloads of an idea for a given time period"""
-        filters = [DownloadModel.idea_id == idea_id]
-        if start_date:
-            filters.append(DownloadModel.created_at > start_date)
-        if end_date:
-            filters.append(DownloadModel.created_at < end_date)
-
-        return DownloadModel.query.filter(and_(*filters)).count()
+        return cls.count_downloads(
+            IdeaDownloadRollupModel, IdeaDownloadRollupModel.idea_id == idea_id,
+            DownloadModel.query.filter(DownloadModel.idea_id == idea_id),
+            start_date, end_date)
 
     @classmethod
     def get_user_download_count(cls, user_id: int, start_date=None, end_date=None) -> int:
         """Returns the number of times a user has downloaded a report for a given time period"""
-        filters = [DownloadModel.user_id == user_id]
-        if start_date:
-            filters.append(DownloadModel.created_at > start_date)
-        if end_date:
-            filters.append(DownloadModel.created_at < end_date)
-
-        return DownloadModel.query.filter(and_(*filters)).count()
+        return cls.count_downloads(
+            UserDownloadRollupModel, UserDownloadRollupModel.user_id == user_id,
+            DownloadModel.query.filter(DownloadModel.user_id == user_id),
+            start_date, end_date)
 
     @classmethod
     def get_analyst_download_count(cls, analyst_id: int, start_date=None, end_date=None) -> int:
@@ -42,15 +72,124 @@ class DownloadService:
         Returns the number of times an analyst's reports have been downloaded
         across all reports for a given time period
         """
-        filters = [IdeaModel.analyst_id == analyst_id]
-        if start_date:
-            filters.append(DownloadModel.created_at > start_date)
-        if end_date:
-            filters.append(DownloadModel.created_at < end_date)
+        return cls.count_downloads(
+            IdeaDownloadRollupModel, IdeaDownloadRollupModel.analyst_id == analyst_id,
+            DownloadModel.query.join(IdeaModel).filter(IdeaModel.analyst_id == analyst_id),
+            start_date, end_date)
 
-        return DownloadModel.query.join(IdeaModel).filter(and_(*filters)).count()
+    @classmethod
+    def count_downloads(cls, rollup_model, rollup_filter, downloads, start_date, end_date) -> int:
+        """
+        Counts downloads after start_date and before end_date (either optional) from the rollup rows
+        matching rollup_filter, plus the downloads query for the partial hours not covered by a bucket.
+        """
+        split = split_range(start_date, end_date)
+        count = 0
+        buckets = bucket_filter(rollup_model, split)
+        if buckets is not None:
+            count += db.session.query(func.coalesce(func.sum(rollup_model.count), 0)) \
+                .filter(rollup_filter, buckets).scalar()
+        if split.raw:
+            count += downloads.filter(or_(*[
+                and_(DownloadModel.created_at >= start if inclusive else DownloadModel.created_at > start,
+                     DownloadModel.created_at < end)
+                for start, inclusive, end in split.raw])).count()
+        return int(count)
+
+    @classmethod
+    def get_idea_download_series(cls, idea_id: int, period: str,
+                                 start_date: datetime.datetime, end_date: datetime.datetime) -> List[dict]:
+        """Downloads of an idea per hour or day, for every bucket from the one holding start_date up to end_date"""
+        return cls.download_series(IdeaDownloadRollupModel.idea_id == idea_id, period, start_date, end_date)
+
+    @classmethod
+    def get_analyst_download_series(cls, analyst_id: int, period: str,
+                                    start_date: datetime.datetime, end_date: datetime.datetime) -> List[dict]:
+        """Downloads of all of an analyst's reports per hour or day (see get_idea_download_series)"""
+        return cls.download_series(IdeaDownloadRollupModel.analyst_id == analyst_id, period, start_date, end_date)
+
+    @classmethod
+    def download_series(cls, rollup_filter, period: str,
+                        start_date: datetime.datetime, end_date: datetime.datetime) -> List[dict]:
+        model = IdeaDownloadRollupModel
+        counts = dict(db.session.query(model.bucket, func.sum(model.count)).filter(
+            rollup_filter,
+            model.period == period,
+            model.bucket >= bucket_start(start_date, period),
+            model.bucket < end_date
+        ).group_by(model.bucket))
+        return [{"bucket": bucket, "count": int(counts.get(bucket, 0))}
+                for bucket in bucket_starts(start_date, end_date, period)]
+
+    @classmethod
+    def delete_idea_downloads(cls, idea_ids: List[int]) -> None:
+        """Deletes the downloads of ideas along with their rollups, and takes them out of the user rollups"""
+        user_buckets = Counter()
+        downloads = db.session.query(DownloadModel.user_id, DownloadModel.created_at) \
+            .filter(DownloadModel.idea_id.in_(idea_ids))
+        for user_id, created_at in downloads:
+            for period in PERIODS:
+                user_buckets[(user_id, period, bucket_start(created_at, period))] += 1
+        table = UserDownloadRollupModel.__table__
+        if user_buckets:
+            db.session.execute(
+                table.update().where(and_(
+                    table.c.user_id == bindparam("key_user_id"),
+                    table.c.period == bindparam("key_period"),
+                    table.c.bucket == bindparam("key_bucket")
+                )).values(count=table.c.count - bindparam("num_downloads")),
+                [{"key_user_id": user_id, "key_period": period, "key_bucket": bucket, "num_downloads": count}
+                 for (user_id, period, bucket), count in user_buckets.items()])
+        UserDownloadRollupModel.query.filter(UserDownloadRollupModel.count <= 0).delete(synchronize_session=False)
+        IdeaDownloadRollupModel.query.filter(IdeaDownloadRollupModel.idea_id.in_(idea_ids)) \
+            .delete(synchronize_session=False)
+        DownloadModel.query.filter(DownloadModel.idea_id.in_(idea_ids)).delete(synchronize_session=False)
+        commit_or_flush()
+
+    @classmethod
+    def rebuild_rollups(cls) -> Tuple[int, int]:
+        """
+        Recomputes both rollup tables from the raw downloads, for backfills and after manual edits.
+        Returns the number of idea and user rollup rows written.
+        """
+        idea_buckets: Dict[tuple, int] = Counter()
+        user_buckets: Dict[tuple, int] = Counter()
+        downloads = db.session.query(DownloadModel.idea_id, IdeaModel.analyst_id, DownloadModel.user_id,
+                                     DownloadModel.created_at).join(IdeaModel).yield_per(10000)
+        for idea_id, analyst_id, user_id, created_at in downloads:
+            for period in PERIODS:
+                bucket = bucket_start(created_at, period)
+                idea_buckets[(idea_id, analyst_id, period, bucket)] += 1
+                user_buckets[(user_id, period, bucket)] += 1
+        with unit_of_work():
+            IdeaDownloadRollupModel.query.delete(synchronize_session=False)
+            UserDownloadRollupModel.query.delete(synchronize_session=False)
+            if idea_buckets:
+                db.session.execute(IdeaDownloadRollupModel.__table__.insert(), [
+                    {"idea_id": idea_id, "analyst_id": analyst_id, "period": period, "bucket": bucket, "count": count}
+                    for (idea_id, analyst_id, period, bucket), count in idea_buckets.items()])
+            if user_buckets:
+                db.session.execute(UserDownloadRollupModel.__table__.insert(), [
+                    {"user_id": user_id, "period": period, "bucket": bucket, "count": count}
+                    for (user_id, period, bucket), count in user_buckets.items()])
+            commit_or_flush()
+        return len(idea_buckets), len(user_buckets)
 
     @classmethod
     def save_changes(cls, data) -> None:
         db.session.add(data)
-        db.session.commit()
+        commit_or_flush()
+
+
+def bucket_filter(model, split: RangeSplit):
+    """Filter for the rollup rows of the whole hours and days in split, None if there are none"""
+    clauses = []
+    for period, ranges in ((HOUR, split.hours), (DAY, split.days)):
+        for start, end in ranges:
+            clause = [model.period == period]
+            if start is not None:
+                clause.append(model.bucket >= start)
+            if end is not None:
+                clause.append(model.bucket < end)
+            clauses.append(and_(*clause))
+    return or_(*clauses) if clauses else None
@@ -1,16 +1,16 @@
-from typing import List
-from main.db import db
+from typing import List, Optional, Tuple
+from main.db import db, commit_or_flush, unit_of_work
+from main.libs.pagination import paginate, DEFAULT_PAGE_SIZE
 from main.model.downvote import DownvoteModel
 from main.model.idea import IdeaModel
+from main.service.counter_service import CounterService
 
 class DownvoteService:
     def save_new_downvote(self, user_id: int, idea_id: int) -> "DownvoteModel":
         downvote = DownvoteModel(user_id=user_id, idea_id=idea_id)
-        idea = IdeaModel.query.filter_by(id=idea_id).first()
-        idea.num_downvotes = idea.num_downvotes + 1
-        idea.score = idea.score - 1
-        self.save_changes(idea)
-        self.save_changes(downvote)
+        with unit_of_work():
+            self.save_changes(downvote)
+            CounterService.increment_later(IdeaModel, idea_id, num_downvotes=1, score=-1)
         return downvote
 
     @classmethod
@@ -26,36 +26,38 @@ class DownvoteService:
         downvote = self.get_downvote_by_id(downvote_id)
         if downvote is None:
             return
-        idea = IdeaModel.query.filter_by(id=downvote.idea_id).first()
-        if idea is None:
-            return
-        idea.num_downvotes = idea.num_downvotes - 1
-        idea.score = idea.score + 1
-        self.save_changes(idea)
-        self.delete_from_db(downvote)
+        with unit_of_work():
+            CounterService.increment_later(IdeaModel, downvote.idea_id, num_downvotes=-1, score=1)
+            self.delete_from_db(downvote)
 
     def delete_downvote_by_user_and_idea_if_exists(self, user_id: int, idea_id: int) -> None:
         downvote = self.get_downvote_by_user_and_idea(user_id, idea_id)
         if downvote is None:
             return
-        idea = IdeaModel.query.filter_by(id=downvote.idea_id).first()
-        if idea is None:
-            return
-        idea.num_downvotes = idea.num_downvotes - 1
-        idea.score = idea.score + 1
-        self.save_changes(idea)
-        self.delete_from_db(downvote)
+        with unit_of_work():
+            CounterService.increment_later(IdeaModel, downvote.idea_id, num_downvotes=-1, score=1)
+            self.delete_from_db(downvote)
 
     @classmethod
     def get_all_downvotes_for_idea(cls, idea_id: int) -> List["DownvoteModel"]:
         return DownvoteModel.query.order_by(db.desc(DownvoteModel.created_at)).filter_by(idea_id=idea_id).all()
 
+    @classmethod
+    def get_users_downvoted_ideas_page(cls, user_id: int, cursor=None, page_size=DEFAULT_PAGE_SIZE) \
+            -> Tuple[List["IdeaModel"], Optional[str]]:
+        """Ideas the user downvoted, most recent first, one page at a time"""
+        query = db.session.query(IdeaModel, DownvoteModel.created_at, DownvoteModel.id).join(DownvoteModel)\
+            .filter(DownvoteModel.user_id == user_id)
+        rows, next_cursor = paginate(query, [DownvoteModel.created_at, DownvoteModel.id], cursor, page_size,
+                                     key=lambda row: list(row[1:]))
+        return [row[0] for row in rows], next_cursor
+
     @classmethod
     def delete_from_db(cls, data) -> None:
         db.session.delete(data)
-        db.session.commit()
+        commit_or_flush()
 
     @classmethod
     def save_changes(cls, data) -> None:
         db.session.add(data)
-        db.session.commit()
+        commit_or_flush()
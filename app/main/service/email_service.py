@@ -0,0 +1,181 @@
+import datetime
+import logging
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional
+
+from flask import current_app
+from sqlalchemy import func
+
+from main.db import db, advisory_lock, after_commit, commit_or_flush, save_all, unit_of_work
+from main.libs.email import Email, EmailException
+from main.model.email_outbox import EmailOutboxModel
+
+logger = logging.getLogger(__name__)
+
+
+class EmailService:
+    """
+    Emails are written to the outbox in the caller's transaction and sent off the request path: once it
+    commits, a background thread sends everything due, and a scheduled job picks up whatever that missed.
+    Messages with the same subject, text and html go out as one Mailgun batch send, each recipient getting
+    their own variables.  Failures are retried with exponential backoff, and given up on after MAX_ATTEMPTS
+    or when Mailgun rejects the request.  Only one worker sends at a time.
+    """
+    # Mailgun's limit on recipients of a batch send
+    BATCH_SIZE = 1000
+    MAX_ATTEMPTS = 6
+    # doubled after each failed attempt
+    RETRY_DELAY = datetime.timedelta(seconds=30)
+    MAX_RETRY_DELAY = datetime.timedelta(hours=1)
+
+    _lock = threading.Lock()
+    _pid = None
+    _executor = None
+
+    @classmethod
+    def enqueue(cls, to_address: str, subject: str, text: str, html: str,
+                variables: Optional[dict] = None) -> "EmailOutboxModel":
+        """Adds an email to the outbox, sent once the current unit of work commits"""
+        message = EmailOutboxModel(to_address=to_address, subject=subject, text=text, html=html,
+                                   variables=variables or {}, status=EmailOutboxModel.PENDING, attempts=0,
+                                   next_attempt_at=datetime.datetime.utcnow())
+        cls.save_changes(message)
+        cls.send_soon()
+        return message
+
+    @classmethod
+    def _get_executor(cls) -> ThreadPoolExecutor:
+        with cls._lock:
+            # the thread doesn't survive a fork
+            if cls._pid != os.getpid():
+                cls._pid = os.getpid()
+                cls._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="email")
+            return cls._executor
+
+    @classmethod
+    def send_soon(cls) -> Optional[Future]:
+        """Sends what's due in the background once the caller's writes are committed (None when disabled)"""
+        if not current_app.config["EMAIL_DELIVERY_ENABLED"]:
+            return None
+        app = current_app._get_current_object()
+        executor = cls._get_executor()
+        future = Future()
+
+        def run():
+            try:
+                with app.app_context():
+                    future.set_result(cls.send_pending())
+            except Exception as e:
+                logger.exception("Sending emails failed")
+                future.set_exception(e)
+
+        after_commit(lambda: executor.submit(run))
+        return future
+
+    @classmethod
+    def send_pending(cls) -> int:
+        """Sends every message that is due, returns how many were sent.  Does nothing if another worker is."""
+        num_sent = 0
+        with advisory_lock("email-outbox") as acquired:
+            if not acquired:
+                return 0
+            while True:
+                now = datetime.datetime.utcnow()
+                due = EmailOutboxModel.query \
+                    .filter(EmailOutboxModel.status == EmailOutboxModel.PENDING,
+                            EmailOutboxModel.next_attempt_at <= now) \
+                    .order_by(EmailOutboxModel.id) \
+                    .limit(cls.BATCH_SIZE) \
+                    .all()
+                if not due:
+                    return num_sent
+                for batch in cls.batches(due):
+                    num_sent += cls._send_batch(batch, now)
+
+    @classmethod
+    def batches(cls, messages: List["EmailOutboxModel"]) -> Iterator[List["EmailOutboxModel"]]:
+        """
+        Groups messages that can go in one batch send: the same subject, text and html, at most BATCH_SIZE,
+        and each address only once since recipient variables are keyed by address
+        """
+        groups = OrderedDict()
+        for message in messages:
+            groups.setdefault((message.subject, message.text, message.html), []).append(message)
+        for group in groups.values():
+            while group:
+                batch, addresses, rest = [], set(), []
+                for message in group:
+                    if message.to_address.lower() in addresses or len(batch) == cls.BATCH_SIZE:
+                        rest.append(message)
+                    else:
+                        batch.append(message)
+                        addresses.add(message.to_address.lower())
+                yield batch
+                group = rest
+
+    @classmethod
+    def _send_batch(cls, batch: List["EmailOutboxModel"], now: datetime.datetime) -> int:
+        first = batch[0]
+        try:
+            response = Email.send_batch({message.to_address: message.variables or {} for message in batch},
+                                        first.subject, first.text, first.html)
+        except EmailException as e:
+            with unit_of_work():
+                for message in batch:
+                    cls._failed(message, str(e), e.retryable, now)
+                save_all(batch)
+            return 0
+        try:
+            provider_id = response.json().get("id")
+        except ValueError:
+            provider_id = None
+        with unit_of_work():
+            for message in batch:
+                message.status = EmailOutboxModel.SENT
+                message.attempts += 1
+                message.sent_at = datetime.datetime.utcnow()
+                message.provider_id = provider_id
+            save_all(batch)
+        return len(batch)
+
+    @classmethod
+    def _failed(cls, message: "EmailOutboxModel", error: str, retryable: bool, now: datetime.datetime) -> None:
+        message.attempts += 1
+        message.last_error = error[:256]
+        if not retryable or message.attempts >= cls.MAX_ATTEMPTS:
+            message.status = EmailOutboxModel.FAILED
+        else:
+            message.next_attempt_at = now + min(cls.RETRY_DELAY * 2 ** (message.attempts - 1), cls.MAX_RETRY_DELAY)
+
+    @classmethod
+    def get_message_by_id(cls, message_id: int) -> "EmailOutboxModel":
+        return EmailOutboxModel.query.filter_by(id=message_id).first()
+
+    @classmethod
+    def get_messages(cls, status: Optional[str] = None, limit: int = 100) -> List["EmailOutboxModel"]:
+        """Most recent messages first, optionally only those with status"""
+        query = EmailOutboxModel.query
+        if status:
+            query = query.filter_by(status=status)
+        return query.order_by(EmailOutboxModel.id.desc()).limit(limit).all()
+
+    @classmethod
+    def stats(cls) -> Dict[str, Optional[float]]:
+        """Number of messages by status, and how long the oldest pending one has waited in seconds"""
+        counts = dict(db.session.query(EmailOutboxModel.status, func.count(EmailOutboxModel.id))
+                      .group_by(EmailOutboxModel.status).all())
+        oldest = db.session.query(func.min(EmailOutboxModel.created_at)) \
+            .filter(EmailOutboxModel.status == EmailOutboxModel.PENDING).scalar()
+        return {
+            **{status: counts.get(status, 0)
+               for status in (EmailOutboxModel.PENDING, EmailOutboxModel.SENT, EmailOutboxModel.FAILED)},
+            "oldestPendingSeconds": (datetime.datetime.utcnow() - oldest).total_seconds() if oldest else None
+        }
+
+    @classmethod
+    def save_changes(cls, data) -> None:
+        db.session.add(data)
+        commit_or_flush()
@@ -0,0 +1,64 @@
+from typing import Iterator, List
+from sqlalchemy import literal
+from main.db import db
+from main.libs.streaming import ndjson_chunks, csv_chunks, gzip_chunks
+from main.model.idea import IdeaModel
+from main.model.user import UserModel
+from main.model.upvote import UpvoteModel
+from main.model.downvote import DownvoteModel
+from main.model.download import DownloadModel
+
+ANALYST_COLUMNS = [
+    "id", "username", "created_at", "num_followers", "num_ideas", "num_reviews", "review_star_total",
+    "analyst_rank", "analyst_rank_percentile", "avg_return", "avg_return_percentile", "avg_price_target_capture",
+    "avg_price_target_capture_percentile", "success_rate", "success_rate_percentile", "statistical_significance",
+    "statistical_significance_percentile", "avg_holding_period", "avg_holding_period_percentile",
+    "num_ideas_percentile", "percent_buys"
+]
+
+
+class ExportService:
+    """
+    Bulk exports as NDJSON or CSV.  Rows are read with yield_per, which streams them from a server side cursor
+    on Postgres, and are encoded as they arrive, so memory use is the same for a thousand rows or millions.
+    """
+    KINDS = ("ideas", "votes", "downloads", "analysts")
+    FORMATS = ("ndjson", "csv")
+    BATCH_SIZE = 1000
+
+    @classmethod
+    def queries(cls, kind: str) -> list:
+        """Queries for the rows of an export, in order"""
+        if kind == "ideas":
+            return [db.session.query(*IdeaModel.__table__.columns).order_by(IdeaModel.id)]
+        if kind == "votes":
+            return [db.session.query(model.id, model.created_at, model.user_id, model.idea_id,
+                                     literal(vote).label("vote")).order_by(model.id)
+                    for model, vote in ((UpvoteModel, "up"), (DownvoteModel, "down"))]
+        if kind == "downloads":
+            return [db.session.query(*DownloadModel.__table__.columns).order_by(DownloadModel.id)]
+        if kind == "analysts":
+            return [db.session.query(*[getattr(UserModel, column) for column in ANALYST_COLUMNS])
+                    .filter(UserModel.is_analyst.is_(True)).order_by(UserModel.id)]
+        raise ValueError(f"Unknown export {kind!r}")
+
+    @classmethod
+    def columns(cls, kind: str) -> List[str]:
+        return [column["name"] for column in cls.queries(kind)[0].column_descriptions]
+
+    @classmethod
+    def rows(cls, kind: str) -> Iterator[dict]:
+        for query in cls.queries(kind):
+            for row in query.yield_per(cls.BATCH_SIZE):
+                yield row._asdict()
+
+    @classmethod
+    def stream(cls, kind: str, export_format: str = "ndjson", compress: bool = False) -> Iterator[bytes]:
+        """The export as chunks of bytes, gzipped if compress"""
+        if kind not in cls.KINDS:
+            raise ValueError(f"Unknown export {kind!r}")
+        if export_format not in cls.FORMATS:
+            raise ValueError(f"Unknown export format {export_format!r}")
+        rows = cls.rows(kind)
+        chunks = ndjson_chunks(rows) if export_format == "ndjson" else csv_chunks(rows, cls.columns(kind))
+        return gzip_chunks(chunks) if compress else chunks
@@ -1,20 +1,21 @@
-from typing import List
-from main.db import db
+from typing import List, Optional, Tuple
+from main.db import db, commit_or_flush, unit_of_work
+from main.libs.pagination import paginate, DEFAULT_PAGE_SIZE
 from main.model.user import UserModel
 from main.model.follow import FollowModel
+from main.service.timeline_service import TimelineService
+from main.service.counter_service import CounterService
 from sqlalchemy import and_
 
 
 class FollowService:
     def save_new_follow(self, user_id: int, analyst_id: int) -> "FollowModel":
         follow = FollowModel(user_id=user_id, analyst_id=analyst_id)
-        user = UserModel.query.filter_by(id=user_id).first()
-        analyst = UserModel.query.filter_by(id=analyst_id).first()
-        user.num_following = user.num_following + 1
-        analyst.num_followers = analyst.num_followers + 1
-        self.save_changes(user)
-        self.save_changes(analyst)
-        self.save_changes(follow)
+        with unit_of_work():
+            self.save_changes(follow)
+            CounterService.increment(UserModel, user_id, num_following=1)
+            CounterService.increment(UserModel, analyst_id, num_followers=1)
+            TimelineService.backfill(user_id, analyst_id)
         return follow
 
     @classmethod
@@ -28,13 +29,11 @@ class FollowService:
 
     def delete_follow(self, follow_id: int) -> None:
         follow = self.get_follow_by_id(follow_id)
-        user = UserModel.query.filter_by(id=follow.user_id).first()
-        analyst = UserModel.query.filter_by(id=follow.analyst_id).first()
-        user.num_following = user.num_following - 1
-        analyst.num_followers = analyst.num_followers - 1
-        self.save_changes(user)
-        self.save_changes(analyst)
-        self.delete_from_db(follow)
+        with unit_of_work():
+            CounterService.increment(UserModel, follow.user_id, num_following=-1)
+            CounterService.increment(UserModel, follow.analyst_id, num_followers=-1)
+            TimelineService.prune(follow.user_id, follow.analyst_id)
+            self.delete_from_db(follow)
 
     @classmethod
     def get_followers(cls, analyst_id: int) -> List["UserModel"]:
@@ -50,12 +49,36 @@ class FollowService:
             .order_by(db.desc(FollowModel.created_at))\
             .filter_by(user_id=user_id).all()
 
+    @classmethod
+    def get_followers_page(cls, analyst_id: int, cursor=None, page_size=DEFAULT_PAGE_SIZE) \
+            -> Tuple[List["UserModel"], Optional[str]]:
+        """Like get_followers, one page at a time"""
+        query = db.session.query(UserModel, FollowModel.created_at, FollowModel.id)\
+            .join(FollowModel, UserModel.id == FollowModel.user_id)\
+            .filter(FollowModel.analyst_id == analyst_id)
+        return cls.follow_page(query, cursor, page_size)
+
+    @classmethod
+    def get_following_page(cls, user_id: int, cursor=None, page_size=DEFAULT_PAGE_SIZE) \
+            -> Tuple[List["UserModel"], Optional[str]]:
+        """Like get_following, one page at a time"""
+        query = db.session.query(UserModel, FollowModel.created_at, FollowModel.id)\
+            .join(FollowModel, UserModel.id == FollowModel.analyst_id)\
+            .filter(FollowModel.user_id == user_id)
+        return cls.follow_page(query, cursor, page_size)
+
+    @classmethod
+    def follow_page(cls, query, cursor, page_size) -> Tuple[List["UserModel"], Optional[str]]:
+        rows, next_cursor = paginate(query, [FollowModel.created_at, FollowModel.id], cursor, page_size,
+                                     key=lambda row: list(row[1:]))
+        return [row[0] for row in rows], next_cursor
+
     @classmethod
     def delete_from_db(cls, data) -> None:
         db.session.delete(data)
-        db.session.commit()
+        commit_or_flush()
 
     @classmethod
     def save_changes(cls, data) -> None:
         db.session.add(data)
-        db.session.commit()
+        commit_or_flush()
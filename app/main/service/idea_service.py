@@ -1,37 +1,53 @@
 import datetime
 import json
-from typing import List, TextIO
+from collections import Counter
+from typing import List, Optional, TextIO, Tuple
 from sqlalchemy import or_, and_, func
+from sqlalchemy.orm.util import identity_key
 
 from main.libs.s3 import S3
+from main.libs.pagination import paginate, DEFAULT_PAGE_SIZE
 from main.libs.stock import Stock, StockException
 from main.libs.strings import get_text
-from main.db import db
+from main.db import db, commit_or_flush, unit_of_work
 from main.model.user import UserModel
 from main.model.idea import IdeaModel
 from main.model.upvote import UpvoteModel
 from main.model.downvote import DownvoteModel
 from main.model.bookmark import BookmarkModel
-from main.model.download import DownloadModel
+from main.model.comment import CommentModel
+from main.model.timeline import TimelineModel
 from main.service.user_service import UserService
+from main.service.performance_service import PerformanceService, idea_snapshot, calc_stats_delta
+from main.service.timeline_service import TimelineService
+from main.service.search_service import SearchService
+from main.service.counter_service import CounterService
+from main.service.download_service import DownloadService
+from main.service.upload_service import UploadService
+from main.service.image_service import ImageService
 
 
 class IdeaService:
     def save_new_idea(self, analyst_id: int, symbol: str, position_type: str,
                       agreed_to_terms: bool, price_target: float, entry_price: float,
                       thesis_summary: str, full_report: str, exhibits=[],
-                      exhibit_title_map=None):
+                      exhibit_title_map=None, uploaded_exhibits=None):
+        """
+        exhibits are image files to upload with exhibit_title_map their titles by filename,
+        uploaded_exhibits ({"key", "title"} dicts) are confirmed direct uploads (see UploadService)
+        """
         analyst = UserService.get_user_by_id(analyst_id)
 
+        responses = Stock.fetch_stock_data(symbol)
         stock_data = {}
-        stock_data.update(Stock.fetch_company_info(symbol))
-        stock_data.update(Stock.fetch_stock_quote(symbol))
+        stock_data.update(responses["company"])
+        stock_data.update(responses["quote"])
 
         # make sure the price isn't too far off from what API says before committing
         if abs(float(entry_price) - stock_data["latestPrice"])/stock_data["latestPrice"] > 0.01:
             raise ValueError(get_text("incorrect_price"))
 
-        exhibit_dict_list = []
+        uploads = []
         for image_file in exhibits:
             title = exhibit_title_map[image_file.filename]
             image_extension = image_file.filename.split('.')[len(image_file.filename.split(".")) - 1].lower()
@@ -41,10 +57,25 @@ class IdeaService:
             suffix = datetime.datetime.now().strftime("%y%m%d-%H%M%S")
             title_for_url = title.replace(" ", "-")
             filename = f"{analyst.username}-{symbol}-{title_for_url}-{suffix}.{image_extension}"
-            response_dict = self.upload_exhibit(title, filename, image_file)
+            uploads.append((title, filename, image_file, ImageService.check_file(image_file)))
+
+        uploaded_exhibits = uploaded_exhibits or []
+        if not isinstance(uploaded_exhibits, list) or not all(
+                isinstance(exhibit, dict) and isinstance(exhibit.get("key"), str)
+                and isinstance(exhibit.get("title"), str) for exhibit in uploaded_exhibits):
+            raise ValueError(get_text("incorrect_fields"))
+        uploaded_urls = UploadService.confirmed_exhibit_urls(
+            analyst_id, [exhibit["key"] for exhibit in uploaded_exhibits])
+
+        # every exhibit is checked before any is uploaded, then they're uploaded at the same time
+        executor = S3.get_executor()
+        futures = [executor.submit(self.upload_exhibit, *upload) for upload in uploads]
+        exhibit_dict_list = [future.result() for future in futures]
+        for response_dict in exhibit_dict_list:
             if "error" in response_dict:
                 raise ValueError(response_dict["error"])
-            exhibit_dict_list.append(response_dict)
+        exhibit_dict_list += [{"url": url, "title": exhibit["title"]}
+                              for url, exhibit in zip(uploaded_urls, uploaded_exhibits)]
 
         exhibit_dict_list = json.dumps(exhibit_dict_list)
 
@@ -53,40 +84,36 @@ class IdeaService:
             symbol=symbol.upper(),
             position_type=position_type.lower(),
             agreed_to_terms=agreed_to_terms,
-            price_target=price_target,
+            price_target=float(price_target),
             company_name=stock_data["companyName"],
             market_cap=stock_data["marketCap"],
             sector=stock_data["sector"].lower(),
-            entry_price=entry_price,
+            entry_price=float(entry_price),
             last_price=stock_data["latestPrice"],
             thesis_summary=thesis_summary,
             full_report=full_report,
             exhibits=exhibit_dict_list
         )
-        self.save_changes(new_idea)
+        with unit_of_work():
+            self.save_changes(new_idea)
 
-        # update analyst idea count
-        analyst.num_ideas = analyst.num_ideas + 1
-        self.save_changes(analyst)
+            CounterService.increment(UserModel, analyst_id, num_ideas=1)
+            PerformanceService.record_idea_change(after=new_idea)
+            TimelineService.push_idea(new_idea)
+            SearchService.add_symbol(new_idea.symbol, new_idea.company_name)
+        ImageService.process_exhibits(new_idea.id, [f"report_exhibits/{upload[1]}" for upload in uploads] +
+                                      [exhibit["key"] for exhibit in uploaded_exhibits])
         return new_idea
 
     @classmethod
-    def upload_exhibit(cls, title: str, filename, image: TextIO):
-        client = S3.get_client()
+    def upload_exhibit(cls, title: str, filename, image: TextIO, content_type: str = None):
         try:
-            # upload file to S3 bucket
-            client.put_object(
-                ACL="public-read",
-                Body=image,
-                Bucket=S3.S3_BUCKET,
-                Key=f"report_exhibits/{filename}",
-                ContentType=image.content_type
-            )
+            url = S3.upload_fileobj(image, f"report_exhibits/{filename}", content_type or image.content_type)
         except Exception as e:
             return {"error": str(e)}
 
         exhibit_dict = {
-            "url": f"{S3.S3_ENDPOINT_URL}/report_exhibits/{filename}",
+            "url": url,
             "title": title
         }
         return exhibit_dict
@@ -96,16 +123,66 @@ class IdeaService:
         return IdeaModel.query.filter_by(id=idea_id).first()
 
     @classmethod
-    def query_ideas(cls, analyst_ids=[], query_string={}, page=0, page_size=None) -> List["IdeaModel"]:
+    def query_ideas(cls, analyst_ids=[], query_string={}, cursor=None, page_size=None) -> List["IdeaModel"]:
         """
         Returns list of ideas filtered by query_string for given list of analysts (analyst_ids)
 
         If no analyst ids are specified, it returns ideas from all analysts
         If no query_string is specified, no filters are applied
+        If page_size is given, returns that page only (see query_idea_page)
+        """
+        if page_size:
+            return cls.query_idea_page(analyst_ids, query_string, cursor, page_size)[0]
+        columns = cls.feed_sort_columns(query_string)
+        return cls.filter_ideas(analyst_ids, query_string)\
+            .order_by(*[column.desc() for column in columns]).all()
+
+    @classmethod
+    def query_idea_page(cls, analyst_ids=[], query_string={}, cursor=None, page_size=DEFAULT_PAGE_SIZE) \
+            -> Tuple[List["IdeaModel"], Optional[str]]:
         """
+        Returns (ideas, next_cursor) for one page of query_ideas.  Pass next_cursor back to get
+        the following page; it is None on the last page.  Raises CursorException for a bad cursor.
+        """
+        columns = cls.feed_sort_columns(query_string)
+        return paginate(cls.filter_ideas(analyst_ids, query_string), columns, cursor, page_size)
+
+    @classmethod
+    def query_following_page(cls, user_id: int, query_string={}, cursor=None, page_size=DEFAULT_PAGE_SIZE) \
+            -> Tuple[List["IdeaModel"], Optional[str]]:
+        """
+        Like query_idea_page, for ideas from the analysts user_id follows (and their own),
+        read from the user's timeline
+        """
+        query = cls.filter_ideas(query_string=query_string)\
+            .join(TimelineModel, TimelineModel.idea_id == IdeaModel.id)\
+            .filter(TimelineModel.user_id == user_id)
+        if query_string.get("sort") == "top":
+            return paginate(query, cls.feed_sort_columns(query_string), cursor, page_size)
+        # timeline rows copy the idea's created_at, so the latest sort is a scan of the user's timeline index
+        return paginate(query, [TimelineModel.created_at, TimelineModel.idea_id], cursor, page_size,
+                        key=lambda idea: [idea.created_at, idea.id])
+
+    @classmethod
+    def get_analyst_ideas_page(cls, analyst_id: int, cursor=None, page_size=DEFAULT_PAGE_SIZE) \
+            -> Tuple[List["IdeaModel"], Optional[str]]:
+        """An analyst's ideas, most recent first"""
+        query = IdeaModel.query.filter_by(analyst_id=analyst_id)
+        return paginate(query, [IdeaModel.created_at, IdeaModel.id], cursor, page_size)
+
+    @classmethod
+    def feed_sort_columns(cls, query_string={}) -> list:
+        """Sort key (descending) for query_string["sort"], "latest" by default.  id breaks ties"""
+        if query_string.get("sort") == "top":
+            return [IdeaModel.score, IdeaModel.created_at, IdeaModel.id]
+        return [IdeaModel.created_at, IdeaModel.id]
+
+    @classmethod
+    def filter_ideas(cls, analyst_ids=[], query_string={}):
         analyst_filter = []
-        for analyst_id in analyst_ids:
-            analyst_filter.append(IdeaModel.analyst_id == analyst_id)
+        if analyst_ids:
+            # a single IN (...) lets the planner use ix_ideas_analyst_id_created_at
+            analyst_filter.append(IdeaModel.analyst_id.in_(analyst_ids))
 
         symbol_filter = []
         if "symbol" in query_string:
@@ -148,7 +225,7 @@ class IdeaService:
                     market_cap_filter.append(IdeaModel.market_cap <= 300000000)
 
         filters = and_(
-            or_(*analyst_filter),
+            *analyst_filter,
             *symbol_filter,
             *position_type_filter,
             *time_period_filter,
@@ -156,20 +233,7 @@ class IdeaService:
             or_(*market_cap_filter)
         )
 
-        # assume query_string["sort"] == "latest" (as default)
-        query = IdeaModel.query.join(UserModel).filter(filters).order_by(db.desc(IdeaModel.created_at))
-
-        if "sort" in query_string:
-            if query_string["sort"] == "top":
-                query = IdeaModel.query.join(UserModel).filter(filters)\
-                    .order_by(db.desc(IdeaModel.score), db.desc(IdeaModel.created_at))
-
-        if page_size:
-            query = query.limit(page_size)
-        if page:
-            query = query.offset(page * page_size)
-
-        return query.all()
+        return IdeaModel.query.join(UserModel).filter(filters)
 
     @classmethod
     def get_idea_financial_metrics(cls, symbol) -> dict:
@@ -180,38 +244,70 @@ class IdeaService:
 
     def close_idea_by_id(self, idea_id: int) -> None:
         idea = self.get_idea_by_id(idea_id)
+        before = idea_snapshot(idea)
         idea.closed_date = datetime.datetime.utcnow()
         idea.last_price = Stock.fetch_stock_quote(idea.symbol)["latestPrice"]
-        self.save_changes(idea)
+        with unit_of_work():
+            self.save_changes(idea)
+            PerformanceService.record_idea_change(before=before, after=idea)
 
     def delete_idea_by_id(self, idea_id: int) -> None:
-        idea = self.get_idea_by_id(idea_id)
-        comments = idea.comments.all()
-        for comment in comments:
-            self.delete_from_db(comment)
-        downloads = DownloadModel.query.filter_by(idea_id=idea.id).all()
-        for download in downloads:
-            self.delete_from_db(download)
-        upvotes = UpvoteModel.query.filter_by(idea_id=idea.id).all()
-        for upvote in upvotes:
-            self.delete_from_db(upvote)
-        downvotes = DownvoteModel.query.filter_by(idea_id=idea.id).all()
-        for downvote in downvotes:
-            self.delete_from_db(downvote)
-        bookmarks = BookmarkModel.query.filter_by(idea_id=idea.id).all()
-        for bookmark in bookmarks:
-            self.delete_from_db((bookmark))
-        analyst = UserModel.query.filter_by(id=idea.analyst_id).first()
-        analyst.num_ideas = analyst.num_ideas - 1
-        self.save_changes(analyst)
-        self.delete_from_db(idea)
+        self.delete_ideas([idea_id])
+
+    def delete_ideas(self, idea_ids: List[int]) -> int:
+        """
+        Deletes ideas with everything that references them, using one set based DELETE per table,
+        and adjusts analyst idea counts, performance stats and search in the same transaction.
+        Returns the number of ideas deleted.
+        """
+        # only the columns needed to undo the ideas' contributions, not the reports
+        ideas = db.session.query(
+            IdeaModel.id,
+            IdeaModel.symbol,
+            IdeaModel.analyst_id,
+            IdeaModel.position_type,
+            IdeaModel.entry_price,
+            IdeaModel.last_price,
+            IdeaModel.price_target,
+            IdeaModel.created_at,
+            IdeaModel.closed_date
+        ).filter(IdeaModel.id.in_(idea_ids)).all()
+        if not ideas:
+            return 0
+        idea_ids = [idea.id for idea in ideas]
+
+        stats_deltas = {}
+        num_ideas = Counter(idea.analyst_id for idea in ideas)
+        symbols = Counter(idea.symbol for idea in ideas)
+        for idea in ideas:
+            delta = calc_stats_delta(idea, None)
+            analyst_delta = stats_deltas.setdefault(idea.analyst_id, dict.fromkeys(delta, 0))
+            for column, value in delta.items():
+                analyst_delta[column] += value
+
+        with unit_of_work():
+            PerformanceService.apply_stats_deltas(stats_deltas)
+            TimelineService.remove_ideas(idea_ids)
+            SearchService.remove_symbols(dict(symbols))
+            DownloadService.delete_idea_downloads(idea_ids)
+            for model in (CommentModel, UpvoteModel, DownvoteModel, BookmarkModel):
+                model.query.filter(model.idea_id.in_(idea_ids)).delete(synchronize_session=False)
+            CounterService.increment_many(UserModel, {
+                analyst_id: {"num_ideas": -count} for analyst_id, count in num_ideas.items()})
+            IdeaModel.query.filter(IdeaModel.id.in_(idea_ids)).delete(synchronize_session=False)
+            commit_or_flush()
+            for idea_id in idea_ids:
+                loaded = db.session.identity_map.get(identity_key(IdeaModel, idea_id))
+                if loaded is not None:
+                    db.session.expunge(loaded)
+        return len(ideas)
 
     @classmethod
     def delete_from_db(cls, data) -> None:
         db.session.delete(data)
-        db.session.commit()
+        commit_or_flush()
 
     @classmethod
     def save_changes(cls, data) -> None:
         db.session.add(data)
-        db.session.commit()
+        commit_or_flush()
@@ -0,0 +1,132 @@
+import io
+import json
+import logging
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from flask import current_app
+
+from main.db import after_commit, unit_of_work
+from main.libs.images import SNIFF_LENGTH, CONTENT_TYPES, make_variants, sniff_format
+from main.libs.s3 import S3
+from main.libs.strings import get_text
+from main.model.idea import IdeaModel
+from main.model.user import UserModel
+
+logger = logging.getLogger(__name__)
+
+
+class ImageService:
+    """
+    Uploaded images are checked by their magic bytes as they arrive.  Then, off the request path, the original
+    is replaced by a copy without metadata and WebP variants are stored next to it, their urls going into
+    users.image_variants and the "variants" of each idea exhibit ({size: url}).  Resizing runs in a process
+    pool since it's CPU bound; fetching and storing run on a few threads.
+    """
+    PROFILE_IMAGE_SIZES = (64, 128, 256)
+    EXHIBIT_WIDTHS = (320, 640, 1280)
+
+    _lock = threading.Lock()
+    _pid = None
+    _threads = None
+    _processes = None
+
+    @classmethod
+    def check_image(cls, head: bytes) -> str:
+        """The content type of an image from its first bytes, raises ValueError if it isn't a PNG or JPEG"""
+        image_format = sniff_format(head[:SNIFF_LENGTH])
+        if image_format is None:
+            raise ValueError(get_text("invalid_image"))
+        return CONTENT_TYPES[image_format]
+
+    @classmethod
+    def check_file(cls, file) -> str:
+        """check_image for an uploaded file, which is left at its start"""
+        head = file.read(SNIFF_LENGTH)
+        file.seek(0)
+        return cls.check_image(head)
+
+    @classmethod
+    def _executors(cls):
+        with cls._lock:
+            # pools don't survive a fork
+            if cls._pid != os.getpid():
+                cls._pid = os.getpid()
+                workers = current_app.config["IMAGE_WORKERS"]
+                cls._threads = ThreadPoolExecutor(max_workers=2 * workers, thread_name_prefix="images")
+                cls._processes = ProcessPoolExecutor(max_workers=workers)
+            return cls._threads, cls._processes
+
+    @classmethod
+    def _submit(cls, job, *args) -> Optional[Future]:
+        """Runs job in the background once the caller's writes are committed"""
+        if not current_app.config["IMAGE_PROCESSING_ENABLED"]:
+            return None
+        app = current_app._get_current_object()
+        threads, _ = cls._executors()
+        future = Future()
+
+        def run():
+            try:
+                with app.app_context():
+                    future.set_result(job(*args))
+            except Exception as e:
+                logger.exception("Processing images failed")
+                future.set_exception(e)
+
+        after_commit(lambda: threads.submit(run))
+        return future
+
+    @classmethod
+    def process_profile_image(cls, user_id: int, key: str) -> Optional[Future]:
+        """Makes the variants of a user's new image, returns the future of its urls (None when disabled)"""
+        return cls._submit(cls._process_profile_image, user_id, key)
+
+    @classmethod
+    def process_exhibits(cls, idea_id: int, keys: List[str]) -> Optional[Future]:
+        """Makes the variants of an idea's exhibits, returns the future of their urls by key (None when disabled)"""
+        if not keys:
+            return None
+        return cls._submit(cls._process_exhibits, idea_id, keys)
+
+    @classmethod
+    def _process_profile_image(cls, user_id: int, key: str) -> Dict[str, str]:
+        urls = cls._store_variants(key, cls._start_variants(key, cls.PROFILE_IMAGE_SIZES, square=True))
+        with unit_of_work():
+            user = UserModel.query.get(user_id)
+            # unless the user has changed image again since
+            if user is not None and user.image_url == S3.public_url(key):
+                user.image_variants = urls
+        return urls
+
+    @classmethod
+    def _process_exhibits(cls, idea_id: int, keys: List[str]) -> Dict[str, Dict[str, str]]:
+        # every exhibit is resized at once
+        pending = {key: cls._start_variants(key, cls.EXHIBIT_WIDTHS, square=False) for key in keys}
+        urls = {key: cls._store_variants(key, future) for key, future in pending.items()}
+        variants_by_url = {S3.public_url(key): variants for key, variants in urls.items()}
+        with unit_of_work():
+            idea = IdeaModel.query.filter_by(id=idea_id).with_for_update().first()
+            if idea is not None:
+                exhibits = json.loads(idea.exhibits or "[]")
+                for exhibit in exhibits:
+                    if exhibit["url"] in variants_by_url:
+                        exhibit["variants"] = variants_by_url[exhibit["url"]]
+                idea.exhibits = json.dumps(exhibits)
+        return urls
+
+    @classmethod
+    def _start_variants(cls, key: str, sizes, square: bool) -> Future:
+        _, processes = cls._executors()
+        return processes.submit(make_variants, S3.get_object(key), sizes, square)
+
+    @classmethod
+    def _store_variants(cls, key: str, future: Future) -> Dict[str, str]:
+        """Replaces the original with the metadata-free copy and stores the variants, returns {size: url}"""
+        stripped, variants = future.result()
+        S3.upload_fileobj(io.BytesIO(stripped), key, cls.check_image(stripped))
+        stem = key.rsplit(".", 1)[0]
+        return {str(size): S3.upload_fileobj(io.BytesIO(data), f"{stem}-{size}.webp", "image/webp")
+                for size, data in variants.items()}
@@ -0,0 +1,33 @@
+import datetime
+from typing import Callable
+from main.db import db, commit_or_flush, advisory_lock
+from main.model.scheduled_job_run import ScheduledJobRunModel
+
+
+class JobService:
+    """
+    Every gunicorn worker starts its own scheduler, so each scheduled job fires once per worker.
+    run_exclusively lets only one of them run it: the others find the job's advisory lock taken,
+    or its last run more recent than min_gap.
+    """
+
+    @classmethod
+    def run_exclusively(cls, name: str, job: Callable[[], None], min_gap: datetime.timedelta) -> bool:
+        """Runs job unless another worker is running it or did within min_gap.  Returns whether it ran."""
+        with advisory_lock(f"scheduled-job:{name}") as acquired:
+            if not acquired:
+                return False
+            now = datetime.datetime.utcnow()
+            run = ScheduledJobRunModel.query.get(name)
+            if run is not None and now - run.last_run_at < min_gap:
+                return False
+            job()
+            run = ScheduledJobRunModel.query.get(name) or ScheduledJobRunModel(name=name)
+            run.last_run_at = now
+            cls.save_changes(run)
+            return True
+
+    @classmethod
+    def save_changes(cls, data) -> None:
+        db.session.add(data)
+        commit_or_flush()
@@ -0,0 +1,58 @@
+import calendar
+import threading
+import time
+from typing import Optional
+from sqlalchemy import func
+from main.db import db
+from main.libs.leaderboard import LeaderboardSnapshot
+from main.model.scheduled_job_run import ScheduledJobRunModel
+from main.schema.user_schema import analyst_leaderboard_schema
+from main.service.user_service import UserService
+
+
+class LeaderboardService:
+    """
+    Serves the analyst leaderboard from an in-memory snapshot, so reads don't touch the database in between.
+    Performance is updated by one worker only (see JobService), so the snapshot is versioned by the last run
+    of those jobs, which every worker reads from the database: a worker whose snapshot is older than that
+    rebuilds it, at most CHECK_INTERVAL seconds after the update.
+    """
+    # the scheduled jobs that change the rankings (see create_app)
+    JOBS = ("update_performance", "rebuild_performance")
+    CHECK_INTERVAL = 30
+
+    def __init__(self):
+        self.snapshot: Optional[LeaderboardSnapshot] = None
+        self.checked_at = 0.0
+        self.lock = threading.Lock()
+
+    @classmethod
+    def current_version(cls) -> int:
+        """When the rankings last changed in any worker (unix time), 0 before the first update"""
+        last_run_at = db.session.query(func.max(ScheduledJobRunModel.last_run_at)) \
+            .filter(ScheduledJobRunModel.name.in_(cls.JOBS)).scalar()
+        return calendar.timegm(last_run_at.utctimetuple()) if last_run_at else 0
+
+    def rebuild(self, version: Optional[int] = None) -> LeaderboardSnapshot:
+        version = self.current_version() if version is None else version
+        analysts = analyst_leaderboard_schema.dump(UserService.get_analysts_for_leaderboard())
+        with self.lock:
+            self.snapshot = LeaderboardSnapshot(analysts, version)
+            self.checked_at = time.time()
+            return self.snapshot
+
+    def refresh(self) -> LeaderboardSnapshot:
+        """Rebuilds the snapshot if performance was updated since it was built"""
+        self.checked_at = time.time()
+        version = self.current_version()
+        snapshot = self.snapshot
+        if snapshot is None or snapshot.version != version:
+            snapshot = self.rebuild(version)
+        return snapshot
+
+    def get_snapshot(self) -> LeaderboardSnapshot:
+        """Returns the current snapshot, building the first one on demand"""
+        snapshot = self.snapshot
+        if snapshot is None or time.time() - self.checked_at >= self.CHECK_INTERVAL:
+            snapshot = self.refresh()
+        return snapshot
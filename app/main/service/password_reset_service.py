@@ -1,11 +1,11 @@
 import os
-from requests import Response
 from time import time
 
-from main.db import db
+from main.db import db, commit_or_flush
 from main.model.user import UserModel
 from main.model.password_reset import PasswordResetModel
-from main.libs.email import Email
+from main.model.email_outbox import EmailOutboxModel
+from main.service.email_service import EmailService
 
 
 class PasswordResetService:
@@ -17,14 +17,15 @@ class PasswordResetService:
         return new_password_reset
 
     @classmethod
-    def send_password_reset_email(cls, user_id: int) -> Response:
+    def send_password_reset_email(cls, user_id: int) -> "EmailOutboxModel":
+        """Queues the email with a link to the user's most recent password reset (see EmailService)"""
         user = UserModel.query.filter_by(id=user_id).first()
         subject = "Reset Your Password"
+        text = "It looks like you forgot your password. Please click the link to reset it: %recipient.link%"
+        html = "<html>It looks like you forgot your password. \
+        Please click the link to reset it: <a href=%recipient.link%>reset password</a></html>"
         link = f"{cls.CLIENT_BASE_URL}/password-reset/{user.most_recent_password_reset.id}"
-        text = f"It looks like you forgot your password. Please click the link to reset it: {link}"
-        html = f"<html>It looks like you forgot your password. \
-        Please click the link to reset it: <a href={link}>reset password</a></html>"
-        return Email.send_email([user.email], subject, text, html)
+        return EmailService.enqueue(user.email, subject, text, html, {"link": link})
 
     @classmethod
     def get_password_reset_by_id(cls, password_reset_id: str) -> "PasswordResetModel":
@@ -39,4 +40,4 @@ class PasswordResetService:
     @classmethod
     def save_changes(cls, data) -> None:
         db.session.add(data)
-        db.session.commit()
+        commit_or_flush()
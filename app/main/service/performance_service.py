@@ -1,10 +1,32 @@
 import datetime
+from types import SimpleNamespace
+from typing import Dict, List
+import numpy as np
 from scipy import stats
-from functools import reduce
-from main.db import db
+from sqlalchemy import case, or_, and_, func, select
+from main.db import db, commit_or_flush, unit_of_work, bulk_update
 from main.libs.stock import Stock, StockException
 from main.model.user import UserModel
 from main.model.idea import IdeaModel
+from main.model.analyst_stats import AnalystStatsModel, epoch_day, epoch_day_of
+
+STATS_COLUMNS = ("num_ideas", "return_sum", "pt_capture_sum", "success_count",
+                 "closed_holding_days", "num_open_ideas", "open_created_day_sum")
+
+
+def idea_snapshot(idea, **overrides) -> SimpleNamespace:
+    """Copies the fields performance metrics depend on, e.g. to remember an idea's state before a change"""
+    fields = {
+        "analyst_id": idea.analyst_id,
+        "position_type": idea.position_type,
+        "entry_price": idea.entry_price,
+        "last_price": idea.last_price,
+        "price_target": idea.price_target,
+        "created_at": idea.created_at,
+        "closed_date": idea.closed_date
+    }
+    fields.update(overrides)
+    return SimpleNamespace(**fields)
 
 
 def calc_idea_return(idea: dict) -> float:
@@ -49,68 +71,369 @@ def calc_idea_profitability(idea: dict) -> int:
             return 0
 
 
+def calc_idea_returns(is_long: np.ndarray, entry_prices: np.ndarray, last_prices: np.ndarray) -> np.ndarray:
+    """Vectorized calc_idea_return"""
+    ratio = last_prices / entry_prices
+    return np.where(is_long, ratio - 1, 1 - ratio)
+
+
+def calc_holding_periods(created_days: np.ndarray, closed_days: np.ndarray, today: int) -> np.ndarray:
+    """Vectorized calc_holding_period (dates as epoch days, open ideas as NaN)"""
+    end_days = np.where(np.isnan(closed_days), today, closed_days)
+    return end_days.astype(np.int64) - created_days
+
+
+def calc_pt_captures(is_long: np.ndarray, entry_prices: np.ndarray, last_prices: np.ndarray,
+                     price_targets: np.ndarray) -> np.ndarray:
+    """Vectorized calc_pt_capture"""
+    expected_gains = np.where(is_long, price_targets / entry_prices - 1, 1 - price_targets / entry_prices)
+    actual_gains = calc_idea_returns(is_long, entry_prices, last_prices)
+    captured = (expected_gains > 0) & (actual_gains > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(captured, np.minimum(1, actual_gains / expected_gains), 0.0)
+
+
+def calc_idea_profitabilities(is_long: np.ndarray, entry_prices: np.ndarray, last_prices: np.ndarray) -> np.ndarray:
+    """Vectorized calc_idea_profitability"""
+    return (calc_idea_returns(is_long, entry_prices, last_prices) > 0).astype(np.int64)
+
+
+def calc_analyst_metrics(analyst_ids, is_long, entry_prices, last_prices, price_targets,
+                         created_days, closed_days, today=None) -> dict:
+    """
+    Computes per-analyst averages from columnar idea data (one element per idea).
+    is_long is whether the position type is long, dates are epoch days (see epoch_day)
+    and closed_days is None for open ideas.
+    Returns a dict of arrays aligned with the sorted unique "analyst_id" array,
+    including the running sums kept in analyst_stats (see STATS_COLUMNS).
+    """
+    today = epoch_day(today or datetime.date.today())
+    analyst_ids = np.asarray(analyst_ids, dtype=np.int64)
+    is_long = np.asarray(is_long, dtype=bool)
+    entry_prices = np.asarray(entry_prices, dtype=np.float64)
+    last_prices = np.asarray(last_prices, dtype=np.float64)
+    price_targets = np.asarray(price_targets, dtype=np.float64)
+    created_days = np.asarray(created_days, dtype=np.int64)
+    # None becomes NaN
+    closed_days = np.asarray(closed_days, dtype=np.float64)
+    is_open = np.isnan(closed_days)
+
+    # ids are small integers, so group by counting rather than sorting
+    id_counts = np.bincount(analyst_ids)
+    unique_ids = np.flatnonzero(id_counts)
+    group = np.cumsum(id_counts > 0)[analyst_ids] - 1
+    num_ideas = id_counts[unique_ids]
+
+    def group_sum(values):
+        return np.bincount(group, weights=values, minlength=len(unique_ids))
+
+    holding_periods = calc_holding_periods(created_days, closed_days, today)
+    return_sum = group_sum(calc_idea_returns(is_long, entry_prices, last_prices))
+    pt_capture_sum = group_sum(calc_pt_captures(is_long, entry_prices, last_prices, price_targets))
+    success_count = group_sum(calc_idea_profitabilities(is_long, entry_prices, last_prices))
+    holding_day_sum = group_sum(holding_periods)
+
+    return {
+        "analyst_id": unique_ids,
+        "num_ideas": num_ideas,
+        "avg_return": return_sum / num_ideas,
+        "avg_price_target_capture": pt_capture_sum / num_ideas,
+        "success_rate": success_count / num_ideas,
+        "avg_holding_period": holding_day_sum / num_ideas,
+        "return_sum": return_sum,
+        "pt_capture_sum": pt_capture_sum,
+        "success_count": success_count.astype(np.int64),
+        "closed_holding_days": group_sum(np.where(is_open, 0, holding_periods)).astype(np.int64),
+        "num_open_ideas": np.bincount(group, weights=is_open, minlength=len(unique_ids)).astype(np.int64),
+        "open_created_day_sum": group_sum(np.where(is_open, created_days, 0)).astype(np.int64)
+    }
+
+
+def calc_stats_contribution(idea) -> Dict[str, float]:
+    """Returns what a single idea adds to its analyst's running sums in analyst_stats"""
+    contribution = dict.fromkeys(STATS_COLUMNS, 0)
+    contribution["num_ideas"] = 1
+    contribution["return_sum"] = calc_idea_return(idea)
+    contribution["pt_capture_sum"] = calc_pt_capture(idea)
+    contribution["success_count"] = calc_idea_profitability(idea)
+    if idea.closed_date:
+        contribution["closed_holding_days"] = calc_holding_period(idea)
+    else:
+        contribution["num_open_ideas"] = 1
+        contribution["open_created_day_sum"] = epoch_day(idea.created_at.date())
+    return contribution
+
+
+def calc_stats_delta(before, after) -> Dict[str, float]:
+    """Difference in running sums when an idea goes from before to after (either may be None)"""
+    delta = dict.fromkeys(STATS_COLUMNS, 0)
+    if after is not None:
+        for column, value in calc_stats_contribution(after).items():
+            delta[column] += value
+    if before is not None:
+        for column, value in calc_stats_contribution(before).items():
+            delta[column] -= value
+    return delta
+
+
 class PerformanceService:
-    def update_performance(self):
-        """
-        First updates the last_price field for all ideas with null closed_date.
-        Then updates performance metrics for all analysts
-        """
-        # update the last_price field for all ideas with null closed_date.
-        ideas = IdeaModel.query.all()
-        for idea in ideas:
-            if not idea.closed_date:
-                idea.last_price = Stock.fetch_stock_quote(idea.symbol)["latestPrice"]
-                self.save_changes(idea)
-
-        analysts = UserModel.query.filter(UserModel.num_ideas > 0).all()
-        for analyst in analysts:
-            ideas_by_analyst = analyst.ideas.all()
-
-            cumulative_return = reduce((lambda x, y: x + y), map(calc_idea_return, ideas_by_analyst))
-            analyst.avg_return = cumulative_return / analyst.num_ideas
-
-            total_price_target_capture = reduce((lambda x, y: x + y), map(calc_pt_capture, ideas_by_analyst))
-            analyst.avg_price_target_capture = total_price_target_capture / analyst.num_ideas
-
-            successful_total = reduce((lambda x, y: x + y), map(calc_idea_profitability, ideas_by_analyst))
-            analyst.success_rate = successful_total / analyst.num_ideas
-
-            cumulative_holding_period = reduce((lambda x, y: x + y), map(calc_holding_period, ideas_by_analyst))
-            analyst.avg_holding_period = cumulative_holding_period / analyst.num_ideas
-
-        num_analysts = len(analysts)
-        all_avg_returns = [analyst.avg_return for analyst in analysts]
-        avg_return_percentiles = stats.rankdata(all_avg_returns, "average") / num_analysts
-        all_pt_captures = [analyst.avg_price_target_capture for analyst in analysts]
-        avg_price_target_capture_percentiles = stats.rankdata(all_pt_captures, "average") / num_analysts
-        all_success_rates = [analyst.success_rate for analyst in analysts]
-        success_rate_percentiles = stats.rankdata(all_success_rates, "average") / num_analysts
-        all_avg_holding_periods = [analyst.avg_holding_period for analyst in analysts]
-        avg_holding_period_percentiles = stats.rankdata(all_avg_holding_periods, "average") / num_analysts
-        all_num_ideas = [analyst.num_ideas for analyst in analysts]
-        num_ideas_percentiles = stats.rankdata(all_num_ideas, "average") / num_analysts
-
-        for idx, analyst in enumerate(analysts):
-            analyst.avg_return_percentile = avg_return_percentiles[idx]
-            analyst.avg_price_target_capture_percentile = avg_price_target_capture_percentiles[idx]
-            analyst.success_rate_percentile = success_rate_percentiles[idx]
-            analyst.avg_holding_period_percentile = avg_holding_period_percentiles[idx]
-            analyst.num_ideas_percentile = num_ideas_percentiles[idx]
-
-            # temporary score to keep track of analyst ranking
-            analyst.analyst_rank = analyst.avg_return_percentile + 0.5 * analyst.avg_price_target_capture_percentile
-
-        # sort list of analysts by ranking score, update percentile ranking, and save analyst changes
-        analysts.sort(key=lambda x: x.analyst_rank, reverse=True)
-        all_analyst_ranks = [analyst.analyst_rank for analyst in analysts]
-        analyst_rank_percentiles = stats.rankdata(all_analyst_ranks, "average") / num_analysts
-
-        for idx, analyst in enumerate(analysts):
-            analyst.analyst_rank = idx + 1
-            analyst.analyst_rank_percentile = analyst_rank_percentiles[idx]
-            self.save_changes(analyst)
+    def update_performance(self, incremental: bool = False, refresh_prices: bool = True):
+        """
+        First updates the last_price field for all ideas with null closed_date (unless not refresh_prices,
+        when the quote scheduler keeps them fresh).  Then updates performance metrics for all analysts
+
+        If incremental, metrics are only recomputed for analysts whose running sums
+        in analyst_stats changed since the last run, and percentiles only if any did.
+        Otherwise every analyst is recomputed and analyst_stats is rebuilt.
+        All user rows are written with a single bulk update at the end.
+        """
+        with unit_of_work():
+            # the new prices and their deltas to analyst_stats are committed with the metrics
+            if refresh_prices:
+                self.refresh_last_prices()
+
+            # running sums are seeded by a full run, so fall back to one until they cover every idea
+            if incremental and not self.stats_cover_all_ideas():
+                incremental = False
+
+            if incremental:
+                changed = self.apply_changed_stats()
+                if not changed:
+                    return
+                analyst_metrics = self.load_analyst_metrics()
+                for row in analyst_metrics:
+                    row.update(changed.pop(row["id"], {}))
+                # analysts left without ideas keep their new averages but are not ranked
+                unranked = [{"id": analyst_id, **averages} for analyst_id, averages in changed.items()]
+            else:
+                analyst_metrics = self.rebuild_analyst_stats()
+                unranked = []
+
+            bulk_update(UserModel, self.calc_rankings(analyst_metrics) + unranked)
+
+    @classmethod
+    def calc_rankings(cls, analyst_metrics: List[dict]) -> List[dict]:
+        """
+        Adds percentiles and analyst_rank to each analyst's metrics
+        (dicts with id, avg_return, avg_price_target_capture, success_rate, avg_holding_period and num_ideas)
+        """
+        num_analysts = len(analyst_metrics)
+        if num_analysts == 0:
+            return []
+
+        def percentiles(column: str) -> np.ndarray:
+            return stats.rankdata([row[column] for row in analyst_metrics], "average") / num_analysts
+
+        avg_return_percentiles = percentiles("avg_return")
+        avg_price_target_capture_percentiles = percentiles("avg_price_target_capture")
+        success_rate_percentiles = percentiles("success_rate")
+        avg_holding_period_percentiles = percentiles("avg_holding_period")
+        num_ideas_percentiles = percentiles("num_ideas")
+
+        rows = []
+        for idx, metrics in enumerate(analyst_metrics):
+            rows.append({
+                **metrics,
+                "avg_return_percentile": float(avg_return_percentiles[idx]),
+                "avg_price_target_capture_percentile": float(avg_price_target_capture_percentiles[idx]),
+                "success_rate_percentile": float(success_rate_percentiles[idx]),
+                "avg_holding_period_percentile": float(avg_holding_period_percentiles[idx]),
+                "num_ideas_percentile": float(num_ideas_percentiles[idx]),
+                # temporary score to keep track of analyst ranking
+                "analyst_rank": float(avg_return_percentiles[idx] + 0.5 * avg_price_target_capture_percentiles[idx])
+            })
+
+        # sort analysts by ranking score, then replace the score with rank and percentile ranking
+        rows.sort(key=lambda row: row["analyst_rank"], reverse=True)
+        analyst_rank_percentiles = stats.rankdata([row["analyst_rank"] for row in rows], "average") / num_analysts
+        for idx, row in enumerate(rows):
+            row["analyst_rank"] = idx + 1
+            row["analyst_rank_percentile"] = float(analyst_rank_percentiles[idx])
+        return rows
+
+    def rebuild_analyst_stats(self) -> List[dict]:
+        """
+        Recomputes every analyst's metrics from scratch and resets the running sums in analyst_stats.
+        Returns the metrics of analysts that have ideas.
+        """
+        today = datetime.date.today()
+        metrics = calc_analyst_metrics(**self.load_idea_columns(), today=today)
+        metric_idx = {analyst_id: idx for idx, analyst_id in enumerate(metrics["analyst_id"].tolist())}
+
+        AnalystStatsModel.query.delete(synchronize_session=False)
+        db.session.bulk_insert_mappings(AnalystStatsModel, [
+            {
+                "analyst_id": analyst_id,
+                **{column: metrics[column][idx].item() for column in STATS_COLUMNS},
+                "is_dirty": False,
+                "computed_on": today
+            }
+            for analyst_id, idx in metric_idx.items()
+        ])
+
+        analysts = db.session.query(UserModel.id, UserModel.num_ideas).filter(UserModel.num_ideas > 0)\
+            .order_by(UserModel.id).all()
+        return [
+            {
+                "id": analyst_id,
+                "num_ideas": num_ideas,
+                "avg_return": float(metrics["avg_return"][metric_idx[analyst_id]]),
+                "avg_price_target_capture": float(metrics["avg_price_target_capture"][metric_idx[analyst_id]]),
+                "success_rate": float(metrics["success_rate"][metric_idx[analyst_id]]),
+                "avg_holding_period": float(metrics["avg_holding_period"][metric_idx[analyst_id]])
+            }
+            for analyst_id, num_ideas in analysts if analyst_id in metric_idx
+        ]
+
+    def apply_changed_stats(self) -> Dict[int, dict]:
+        """
+        Returns new averages ({analyst_id: averages}) for every analyst whose running sums changed,
+        or whose holding periods moved because the day rolled over, and marks those sums clean.
+        """
+        today = datetime.date.today()
+        changed_stats = AnalystStatsModel.query.filter(or_(
+            AnalystStatsModel.is_dirty.is_(True),
+            and_(AnalystStatsModel.num_open_ideas > 0, AnalystStatsModel.computed_on != today)
+        )).all()
+
+        changed = {}
+        for analyst_stats in changed_stats:
+            changed[analyst_stats.analyst_id] = analyst_stats.averages(today)
+            analyst_stats.is_dirty = False
+            analyst_stats.computed_on = today
+        commit_or_flush()
+        return changed
+
+    @classmethod
+    def load_analyst_metrics(cls) -> List[dict]:
+        """Loads the metrics calc_rankings needs for every analyst with ideas, without loading users into the session"""
+        rows = db.session.query(
+            UserModel.id,
+            UserModel.num_ideas,
+            UserModel.avg_return,
+            UserModel.avg_price_target_capture,
+            UserModel.success_rate,
+            UserModel.avg_holding_period
+        ).join(AnalystStatsModel, AnalystStatsModel.analyst_id == UserModel.id)\
+            .filter(AnalystStatsModel.num_ideas > 0).order_by(UserModel.id).all()
+        return [row._asdict() for row in rows]
+
+    @classmethod
+    def stats_cover_all_ideas(cls) -> bool:
+        num_ideas_in_stats = db.session.query(func.coalesce(func.sum(AnalystStatsModel.num_ideas), 0)).scalar()
+        return num_ideas_in_stats == IdeaModel.query.count()
+
+    @classmethod
+    def record_idea_change(cls, before=None, after=None) -> None:
+        """
+        Applies the change of one idea (created: before=None, deleted: after=None)
+        to its analyst's running sums.  Use idea_snapshot to capture before.
+        """
+        idea = after if after is not None else before
+        cls.apply_stats_deltas({idea.analyst_id: calc_stats_delta(before, after)})
+
+    @classmethod
+    def apply_stats_deltas(cls, deltas: Dict[int, Dict[str, float]]) -> None:
+        """Adds deltas ({analyst_id: {column: delta}}) to analyst_stats and marks those analysts dirty"""
+        if not deltas:
+            return
+        existing = {analyst_id for analyst_id, in db.session.query(AnalystStatsModel.analyst_id)
+                    .filter(AnalystStatsModel.analyst_id.in_(list(deltas)))}
+        for analyst_id in deltas:
+            if analyst_id not in existing:
+                db.session.add(AnalystStatsModel(analyst_id=analyst_id, **dict.fromkeys(STATS_COLUMNS, 0)))
+        db.session.flush()
+
+        for analyst_id, delta in deltas.items():
+            values = {getattr(AnalystStatsModel, column): getattr(AnalystStatsModel, column) + value
+                      for column, value in delta.items() if value}
+            values[AnalystStatsModel.is_dirty] = True
+            AnalystStatsModel.query.filter_by(analyst_id=analyst_id).update(values, synchronize_session=False)
+        commit_or_flush()
+
+    @classmethod
+    def load_idea_columns(cls) -> dict:
+        """
+        Loads the columns calc_analyst_metrics needs for every idea in a single query.
+        Position types and dates are converted by the database and the rows skip the ORM,
+        which is much faster than building and converting Python objects per row.
+        """
+        rows = db.session.execute(select([
+            IdeaModel.analyst_id,
+            (func.lower(IdeaModel.position_type) == "long").label("is_long"),
+            IdeaModel.entry_price,
+            IdeaModel.last_price,
+            IdeaModel.price_target,
+            epoch_day_of(IdeaModel.created_at).label("created_day"),
+            epoch_day_of(IdeaModel.closed_date).label("closed_day")
+        ]).order_by(IdeaModel.id)).fetchall()
+        columns = list(zip(*rows)) if rows else [()] * 7
+        return {
+            "analyst_ids": columns[0],
+            "is_long": columns[1],
+            "entry_prices": columns[2],
+            "last_prices": columns[3],
+            "price_targets": columns[4],
+            "created_days": columns[5],
+            "closed_days": columns[6]
+        }
+
+    @classmethod
+    def refresh_last_prices(cls) -> int:
+        """
+        Updates the last_price field for all ideas with null closed_date.
+        Quotes are fetched once per distinct symbol through the batch API.
+        Returns the number of ideas updated.
+        """
+        rows = db.session.query(IdeaModel.symbol).filter(IdeaModel.closed_date.is_(None)).distinct().all()
+        if not rows:
+            return 0
+        return cls.apply_last_prices(cls.fetch_last_prices([row.symbol for row in rows]))
+
+    @classmethod
+    def fetch_last_prices(cls, symbols: List[str]) -> Dict[str, float]:
+        """Latest prices keyed by upper case symbol, symbols without one are left out"""
+        quotes = Stock.fetch_batch_quotes(symbols)
+        return {symbol: quote["latestPrice"] for symbol, quote in quotes.items()
+                if quote.get("latestPrice") is not None}
+
+    @classmethod
+    def apply_last_prices(cls, prices: Dict[str, float]) -> int:
+        """
+        Sets last_price on the open ideas of each symbol in prices with a single UPDATE.
+        Ideas whose price moved are applied to analyst_stats as deltas in the same transaction.
+        Returns the number of ideas updated.
+        """
+        if not prices:
+            return 0
+
+        new_price = case(prices, value=IdeaModel.symbol)
+        open_ideas_filter = and_(IdeaModel.closed_date.is_(None), IdeaModel.symbol.in_(list(prices)))
+        moved_ideas = db.session.query(
+            IdeaModel.symbol,
+            IdeaModel.analyst_id,
+            IdeaModel.position_type,
+            IdeaModel.entry_price,
+            IdeaModel.last_price,
+            IdeaModel.price_target,
+            IdeaModel.created_at,
+            IdeaModel.closed_date
+        ).filter(open_ideas_filter, IdeaModel.last_price != new_price).all()
+
+        deltas = {}
+        for idea in moved_ideas:
+            delta = calc_stats_delta(idea, idea_snapshot(idea, last_price=prices[idea.symbol]))
+            analyst_delta = deltas.setdefault(idea.analyst_id, dict.fromkeys(STATS_COLUMNS, 0))
+            for column, value in delta.items():
+                analyst_delta[column] += value
+
+        with unit_of_work():
+            num_updated = IdeaModel.query.filter(open_ideas_filter)\
+                .update({IdeaModel.last_price: new_price}, synchronize_session=False)
+            cls.apply_stats_deltas(deltas)
+        return num_updated
 
     @classmethod
     def save_changes(cls, data) -> None:
         db.session.add(data)
-        db.session.commit()
+        commit_or_flush()
@@ -0,0 +1,80 @@
+import datetime
+import math
+from typing import Dict, List, Optional
+import pytz
+from flask import current_app
+from sqlalchemy import func
+from main.db import db, commit_or_flush, unit_of_work
+from main.libs import market_calendar
+from main.libs.quote_scheduler import plan_intervals, symbol_weight
+from main.model.idea import IdeaModel
+from main.model.quote_schedule import QuoteScheduleModel
+from main.service.performance_service import PerformanceService
+
+# weight of the latest move in a symbol's volatility
+VOLATILITY_SMOOTHING = 0.2
+# refreshes are checked once a minute, so a symbol is due slightly before its interval is up
+DUE_SLACK = datetime.timedelta(seconds=10)
+
+
+class QuoteSchedulerService:
+    """
+    Keeps open ideas' prices fresh symbol by symbol while the market is open: symbols with many open ideas
+    and volatile prices as often as every QUOTE_MIN_INTERVAL seconds, quiet ones down to every
+    QUOTE_MAX_INTERVAL, spending at most QUOTE_CREDITS_PER_HOUR (see main.libs.quote_scheduler).
+    """
+
+    @classmethod
+    def plan(cls) -> Dict[str, float]:
+        """Refresh interval in seconds for every symbol with open ideas"""
+        open_ideas = dict(db.session.query(IdeaModel.symbol, func.count())
+                          .filter(IdeaModel.closed_date.is_(None))
+                          .group_by(IdeaModel.symbol))
+        volatility = dict(db.session.query(QuoteScheduleModel.symbol, QuoteScheduleModel.volatility))
+        config = current_app.config
+        return plan_intervals(
+            {symbol: symbol_weight(num_ideas, volatility.get(symbol)) for symbol, num_ideas in open_ideas.items()},
+            credits_per_hour=config["QUOTE_CREDITS_PER_HOUR"],
+            min_interval=config["QUOTE_MIN_INTERVAL"],
+            max_interval=config["QUOTE_MAX_INTERVAL"])
+
+    @classmethod
+    def due_symbols(cls, now: datetime.datetime) -> List[str]:
+        refreshed = dict(db.session.query(QuoteScheduleModel.symbol, QuoteScheduleModel.refreshed_at))
+        return sorted(
+            symbol for symbol, interval in cls.plan().items()
+            if refreshed.get(symbol) is None
+            or now - refreshed[symbol] >= datetime.timedelta(seconds=interval) - DUE_SLACK)
+
+    @classmethod
+    def refresh_due_quotes(cls, now: Optional[datetime.datetime] = None) -> List[str]:
+        """Refreshes the prices of symbols that are due and returns them.  Does nothing while the market is closed."""
+        now = now or datetime.datetime.utcnow()
+        if not market_calendar.is_open(pytz.utc.localize(now)):
+            return []
+        due = cls.due_symbols(now)
+        if not due:
+            return []
+        prices = PerformanceService.fetch_last_prices(due)
+        with unit_of_work():
+            PerformanceService.apply_last_prices(prices)
+            cls.record_refreshes(prices, now)
+        return sorted(prices)
+
+    @classmethod
+    def record_refreshes(cls, prices: Dict[str, float], now: datetime.datetime) -> None:
+        """Stores the new prices and folds the move since the last refresh into each symbol's volatility"""
+        rows = {row.symbol: row for row in QuoteScheduleModel.query.filter(QuoteScheduleModel.symbol.in_(list(prices)))}
+        for symbol, price in prices.items():
+            row = rows.get(symbol)
+            if row is None:
+                row = QuoteScheduleModel(symbol=symbol)
+                db.session.add(row)
+            elif row.last_price and price and row.refreshed_at and now > row.refreshed_at:
+                hours = (now - row.refreshed_at).total_seconds() / 3600
+                move = abs(math.log(price / row.last_price)) / math.sqrt(hours)
+                row.volatility = move if row.volatility is None \
+                    else VOLATILITY_SMOOTHING * move + (1 - VOLATILITY_SMOOTHING) * row.volatility
+            row.last_price = price
+            row.refreshed_at = now
+        commit_or_flush()
@@ -1,7 +1,8 @@
 from typing import List
-from main.db import db
+from main.db import db, commit_or_flush, unit_of_work
 from main.model.user import UserModel
 from main.model.review import ReviewModel
+from main.service.counter_service import CounterService
 from sqlalchemy import and_
 
 
@@ -15,11 +16,9 @@ class ReviewService:
             user_id=user_id,
             analyst_id=analyst_id)
 
-        analyst = UserModel.query.filter_by(id=analyst_id).first()
-        analyst.review_star_total = analyst.review_star_total + stars
-        analyst.num_reviews = analyst.num_reviews + 1
-        self.save_changes(analyst)
-        self.save_changes(review)
+        with unit_of_work():
+            self.save_changes(review)
+            CounterService.increment(UserModel, analyst_id, review_star_total=stars, num_reviews=1)
         return review
 
     @classmethod
@@ -33,11 +32,9 @@ class ReviewService:
 
     def delete_review_by_id(self, review_id: int) -> None:
         review = self.get_review_by_id(review_id)
-        analyst = UserModel.query.filter_by(id=review.analyst_id).first()
-        analyst.review_star_total = analyst.review_star_total - review.stars
-        analyst.num_reviews = analyst.num_reviews - 1
-        self.save_changes(analyst)
-        self.delete_from_db(review)
+        with unit_of_work():
+            CounterService.increment(UserModel, review.analyst_id, review_star_total=-review.stars, num_reviews=-1)
+            self.delete_from_db(review)
 
     @classmethod
     def get_all_reviews_for_analyst(cls, analyst_id: int) -> List["ReviewModel"]:
@@ -48,9 +45,9 @@ class ReviewService:
     @classmethod
     def delete_from_db(cls, data) -> None:
         db.session.delete(data)
-        db.session.commit()
+        commit_or_flush()
 
     @classmethod
     def save_changes(cls, data) -> None:
         db.session.add(data)
-        db.session.commit()
+        commit_or_flush()
@@ -0,0 +1,80 @@
+import time
+from typing import Dict
+from flask import current_app
+from sqlalchemy import and_, bindparam
+from sqlalchemy.exc import IntegrityError
+from main.db import db, commit_or_flush
+from main.libs.search import SearchIndex, DEFAULT_LIMIT
+from main.model.search_symbol import SearchSymbolModel
+from main.model.user import UserModel
+
+# other processes pick up symbols and analysts added elsewhere after at most this long
+INDEX_MAX_AGE = 60
+
+
+class SearchService:
+    """
+    Autocomplete over distinct symbols (search_symbols) and analyst usernames.
+    Queries are answered from an in-memory SearchIndex kept per app, rebuilt when it's stale.
+    """
+
+    @classmethod
+    def search(cls, query: str, limit: int = DEFAULT_LIMIT) -> dict:
+        index = cls.get_index()
+        return {"stocks": index.search_stocks(query, limit), "analysts": index.search_analysts(query, limit)}
+
+    @classmethod
+    def get_index(cls) -> SearchIndex:
+        index, built_at = current_app.extensions.get("search_index", (None, 0))
+        if index is None or time.monotonic() - built_at > INDEX_MAX_AGE:
+            index = cls.build_index()
+            current_app.extensions["search_index"] = (index, time.monotonic())
+        return index
+
+    @classmethod
+    def build_index(cls) -> SearchIndex:
+        stocks = db.session.query(
+            SearchSymbolModel.symbol,
+            SearchSymbolModel.company_name,
+            SearchSymbolModel.num_ideas
+        ).all()
+        analysts = db.session.query(UserModel.username).filter(UserModel.is_analyst.is_(True)).all()
+        return SearchIndex([stock._asdict() for stock in stocks], [username for username, in analysts])
+
+    @classmethod
+    def invalidate(cls) -> None:
+        current_app.extensions.pop("search_index", None)
+
+    @classmethod
+    def add_symbol(cls, symbol: str, company_name: str) -> None:
+        """Counts a new idea on symbol, adding the symbol if it's the first"""
+        def increment() -> int:
+            return SearchSymbolModel.query.filter_by(symbol=symbol)\
+                .update({SearchSymbolModel.num_ideas: SearchSymbolModel.num_ideas + 1}, synchronize_session=False)
+
+        if not increment():
+            table = SearchSymbolModel.__table__
+            try:
+                with db.session.begin_nested():
+                    db.session.execute(table.insert().values(symbol=symbol, company_name=company_name, num_ideas=1))
+            except IntegrityError:
+                # a concurrent idea added the symbol first
+                increment()
+        commit_or_flush()
+        cls.invalidate()
+
+    @classmethod
+    def remove_symbols(cls, symbol_counts: Dict[str, int]) -> None:
+        """Uncounts deleted ideas ({symbol: number of ideas}), removing symbols with their last idea"""
+        if not symbol_counts:
+            return
+        table = SearchSymbolModel.__table__
+        db.session.execute(
+            table.update().where(table.c.symbol == bindparam("symbol_"))
+                .values(num_ideas=table.c.num_ideas - bindparam("count")),
+            [{"symbol_": symbol, "count": count} for symbol, count in symbol_counts.items()])
+        SearchSymbolModel.query.filter(and_(SearchSymbolModel.symbol.in_(list(symbol_counts)),
+                                            SearchSymbolModel.num_ideas <= 0))\
+            .delete(synchronize_session=False)
+        commit_or_flush()
+        cls.invalidate()
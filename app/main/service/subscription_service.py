@@ -1,7 +1,7 @@
 import os
 import stripe
 
-from main.db import db
+from main.db import db, commit_or_flush, unit_of_work
 from main.libs.strings import get_text
 from main.model.subscription import SubscriptionModel
 from main.model.user import UserModel
@@ -38,9 +38,10 @@ class SubscriptionService:
             latest_invoice_id=subscription["latest_invoice"]["id"],
             user_id=user_id
         )
-        self.save_changes(new_subscription)
-        user.pro_tier_status = status
-        self.save_changes(user)
+        with unit_of_work():
+            self.save_changes(new_subscription)
+            user.pro_tier_status = status
+            self.save_changes(user)
         return subscription
 
     def retry_invoice(self, user_id: int, payment_method_id: str) -> dict:
@@ -65,9 +66,9 @@ class SubscriptionService:
     @classmethod
     def delete_from_db(cls, data) -> None:
         db.session.delete(data)
-        db.session.commit()
+        commit_or_flush()
 
     @classmethod
     def save_changes(cls, data) -> None:
         db.session.add(data)
-        db.session.commit()
+        commit_or_flush()
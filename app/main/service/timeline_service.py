@@ -0,0 +1,64 @@
+from typing import List
+from sqlalchemy import and_, literal, select
+from main.db import db, commit_or_flush
+from main.model.follow import FollowModel
+from main.model.idea import IdeaModel
+from main.model.timeline import TimelineModel
+
+TIMELINE_COLUMNS = ["user_id", "idea_id", "analyst_id", "created_at"]
+
+
+class TimelineService:
+    """Keeps each user's following feed (timelines) in step with ideas and follows"""
+
+    @classmethod
+    def push_idea(cls, idea: "IdeaModel") -> None:
+        """Adds a new idea to its analyst's own timeline and to the timeline of everyone following them"""
+        followers = select([
+            FollowModel.user_id,
+            literal(idea.id),
+            literal(idea.analyst_id),
+            literal(idea.created_at)
+        ]).where(and_(
+            FollowModel.analyst_id == idea.analyst_id,
+            # an analyst following themselves already gets it below
+            FollowModel.user_id != idea.analyst_id
+        ))
+        db.session.execute(TimelineModel.__table__.insert().from_select(TIMELINE_COLUMNS, followers))
+        db.session.add(TimelineModel(
+            user_id=idea.analyst_id,
+            idea_id=idea.id,
+            analyst_id=idea.analyst_id,
+            created_at=idea.created_at))
+        commit_or_flush()
+
+    @classmethod
+    def backfill(cls, user_id: int, analyst_id: int) -> None:
+        """Adds an analyst's existing ideas to the timeline of a user who just followed them"""
+        if user_id == analyst_id:
+            # analysts' own ideas are always on their timeline
+            return
+        ideas = select([
+            literal(user_id),
+            IdeaModel.id,
+            IdeaModel.analyst_id,
+            IdeaModel.created_at
+        ]).where(IdeaModel.analyst_id == analyst_id)
+        db.session.execute(TimelineModel.__table__.insert().from_select(TIMELINE_COLUMNS, ideas))
+        commit_or_flush()
+
+    @classmethod
+    def prune(cls, user_id: int, analyst_id: int) -> None:
+        """Removes an analyst's ideas from the timeline of a user who unfollowed them"""
+        if user_id == analyst_id:
+            return
+        TimelineModel.query.filter(and_(
+            TimelineModel.user_id == user_id,
+            TimelineModel.analyst_id == analyst_id
+        )).delete(synchronize_session=False)
+        commit_or_flush()
+
+    @classmethod
+    def remove_ideas(cls, idea_ids: List[int]) -> None:
+        TimelineModel.query.filter(TimelineModel.idea_id.in_(idea_ids)).delete(synchronize_session=False)
+        commit_or_flush()
@@ -0,0 +1,83 @@
+import datetime
+import uuid
+from typing import List, Optional
+
+from main.db import db, commit_or_flush, unit_of_work
+from main.libs.images import SNIFF_LENGTH
+from main.libs.s3 import S3, MB
+from main.libs.strings import get_text
+from main.model.upload import UploadModel
+from main.model.user import UserModel
+from main.service.image_service import ImageService
+
+VALID_EXTENSIONS = ["jpg", "png", "jpeg"]
+VALID_CONTENT_TYPES = ["image/png", "image/jpeg", "image/jpg"]
+
+
+class UploadService:
+    """
+    Direct uploads: create_upload gives the browser a presigned POST to put an image straight into the bucket,
+    then confirm_upload checks it's there and records its url, so image bytes never pass through the API.
+    """
+    # kind -> folder in the bucket
+    FOLDERS = {"profileImage": "user_images", "exhibit": "report_exhibits"}
+    MAX_SIZES = {"profileImage": 5 * MB, "exhibit": 10 * MB}
+    EXPIRES_IN = 600
+
+    def create_upload(self, user: "UserModel", kind: str, filename: str, content_type: str) -> dict:
+        """Returns the presigned POST (url and fields), the key and url the file will have"""
+        if kind not in self.FOLDERS:
+            raise ValueError(get_text("invalid_upload_kind").format(", ".join(self.FOLDERS)))
+        extension = filename.split(".")[-1].lower()
+        if extension not in VALID_EXTENSIONS:
+            raise ValueError(get_text("invalid_file_extension"))
+        if content_type.lower() not in VALID_CONTENT_TYPES:
+            raise ValueError(get_text("invalid_content_type").format(", ".join(VALID_CONTENT_TYPES)))
+        key = f"{self.FOLDERS[kind]}/{user.username}-{uuid.uuid4().hex}.{extension}"
+        post = S3.presigned_post(key, content_type.lower(), self.MAX_SIZES[kind], self.EXPIRES_IN)
+        self.save_changes(UploadModel(key=key, kind=kind, content_type=content_type.lower(), user_id=user.id))
+        return {"key": key, "fileUrl": S3.public_url(key), "expiresIn": self.EXPIRES_IN, **post}
+
+    def confirm_upload(self, user_id: int, key: str) -> Optional["UploadModel"]:
+        """
+        Marks the user's upload to key as done once the file is in the bucket, and a profile image as the user's
+        image.  None if the user wasn't given that key, raises ValueError if the file isn't there (yet).
+        """
+        upload = UploadModel.query.filter_by(key=key, user_id=user_id).first()
+        if upload is None or upload.confirmed_at is not None:
+            return upload
+        head = S3.head_object(key)
+        if head is None:
+            raise ValueError(get_text("upload_missing"))
+        if head["ContentLength"] > self.MAX_SIZES[upload.kind] or \
+                head.get("ContentType", "").lower() != upload.content_type:
+            raise ValueError(get_text("invalid_upload"))
+        # the declared type is only what the browser claimed
+        if ImageService.check_image(S3.get_object(key, SNIFF_LENGTH)) != upload.content_type.replace("jpg", "jpeg"):
+            raise ValueError(get_text("invalid_upload"))
+        with unit_of_work():
+            upload.confirmed_at = datetime.datetime.utcnow()
+            if upload.kind == "profileImage":
+                user = UserModel.query.get(user_id)
+                user.image_url = S3.public_url(key)
+                user.image_variants = None
+            self.save_changes(upload)
+        if upload.kind == "profileImage":
+            ImageService.process_profile_image(user_id, key)
+        return upload
+
+    @classmethod
+    def confirmed_exhibit_urls(cls, user_id: int, keys: List[str]) -> List[str]:
+        """Urls of the user's confirmed exhibit uploads, in the order of keys.  Raises ValueError for any other key."""
+        uploads = {upload.key: upload for upload in UploadModel.query.filter(
+            UploadModel.key.in_(keys), UploadModel.user_id == user_id, UploadModel.kind == "exhibit",
+            UploadModel.confirmed_at.isnot(None))}
+        missing = [key for key in keys if key not in uploads]
+        if missing:
+            raise ValueError(get_text("upload_missing"))
+        return [S3.public_url(key) for key in keys]
+
+    @classmethod
+    def save_changes(cls, data) -> None:
+        db.session.add(data)
+        commit_or_flush()
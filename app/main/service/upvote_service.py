@@ -1,17 +1,17 @@
-from typing import List
-from main.db import db
+from typing import List, Optional, Tuple
+from main.db import db, commit_or_flush, unit_of_work
+from main.libs.pagination import paginate, DEFAULT_PAGE_SIZE
 from main.model.upvote import UpvoteModel
 from main.model.idea import IdeaModel
+from main.service.counter_service import CounterService
 
 
 class UpvoteService:
     def save_new_upvote(self, user_id: int, idea_id: int) -> "UpvoteModel":
         upvote = UpvoteModel(user_id=user_id, idea_id=idea_id)
-        idea = IdeaModel.query.filter_by(id=idea_id).first()
-        idea.num_upvotes = idea.num_upvotes + 1
-        idea.score = idea.score + 1
-        self.save_changes(idea)
-        self.save_changes(upvote)
+        with unit_of_work():
+            self.save_changes(upvote)
+            CounterService.increment_later(IdeaModel, idea_id, num_upvotes=1, score=1)
         return upvote
 
     @classmethod
@@ -27,25 +27,17 @@ class UpvoteService:
         upvote = self.get_upvote_by_id(upvote_id)
         if upvote is None:
             return
-        idea = IdeaModel.query.filter_by(id=upvote.idea_id).first()
-        if idea is None:
-            return
-        idea.num_upvotes = idea.num_upvotes - 1
-        idea.score = idea.score - 1
-        self.save_changes(idea)
-        self.delete_from_db(upvote)
+        with unit_of_work():
+            CounterService.increment_later(IdeaModel, upvote.idea_id, num_upvotes=-1, score=-1)
+            self.delete_from_db(upvote)
 
     def delete_upvote_by_user_and_idea_if_exists(self, user_id: int, idea_id: int) -> None:
         upvote = self.get_upvote_by_user_and_idea(user_id, idea_id)
         if upvote is None:
             return
-        idea = IdeaModel.query.filter_by(id=upvote.idea_id).first()
-        if idea is None:
-            return
-        idea.num_upvotes = idea.num_upvotes - 1
-        idea.score = idea.score - 1
-        self.save_changes(idea)
-        self.delete_from_db(upvote)
+        with unit_of_work():
+            CounterService.increment_later(IdeaModel, upvote.idea_id, num_upvotes=-1, score=-1)
+            self.delete_from_db(upvote)
 
     @classmethod
     def get_all_upvotes_for_idea(cls, idea_id: int) -> List["UpvoteModel"]:
@@ -56,12 +48,22 @@ class UpvoteService:
         return IdeaModel.query.join(UpvoteModel).order_by(db.desc(UpvoteModel.created_at))\
             .filter(UpvoteModel.user_id == user_id).all()
 
+    @classmethod
+    def get_users_upvoted_ideas_page(cls, user_id: int, cursor=None, page_size=DEFAULT_PAGE_SIZE) \
+            -> Tuple[List["IdeaModel"], Optional[str]]:
+        """Like get_users_upvoted_ideas, one page at a time"""
+        query = db.session.query(IdeaModel, UpvoteModel.created_at, UpvoteModel.id).join(UpvoteModel)\
+            .filter(UpvoteModel.user_id == user_id)
+        rows, next_cursor = paginate(query, [UpvoteModel.created_at, UpvoteModel.id], cursor, page_size,
+                                     key=lambda row: list(row[1:]))
+        return [row[0] for row in rows], next_cursor
+
     @classmethod
     def delete_from_db(cls, data) -> None:
         db.session.delete(data)
-        db.session.commit()
+        commit_or_flush()
 
     @classmethod
     def save_changes(cls, data) -> None:
         db.session.add(data)
-        db.session.commit()
+        commit_or_flush()
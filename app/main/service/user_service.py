@@ -3,10 +3,17 @@ from typing import List, TextIO
 from sqlalchemy import func, desc, asc, and_
 import stripe
 
-from main.db import db
+from main.db import db, commit_or_flush, unit_of_work
 from main.libs.s3 import S3
+from main.service.image_service import ImageService
+from main.libs.pagination import paginate
 from main.model.user import UserModel
 from main.model.confirmation import ConfirmationModel
+from main.model.idea import IdeaModel
+from main.model.upvote import UpvoteModel
+from main.model.downvote import DownvoteModel
+from main.model.bookmark import BookmarkModel
+from main.service.search_service import SearchService
 
 stripe.api_key = os.environ.get("STRIPE_SECRET_API_KEY")
 
@@ -21,9 +28,12 @@ class UserService:
             stripe_cust_id=customer.id,
             **kwargs
         )
-        self.save_changes(new_user)
-        confirmation = ConfirmationModel(new_user.id)
-        self.save_changes(confirmation)
+        with unit_of_work():
+            self.save_changes(new_user)
+            confirmation = ConfirmationModel(new_user.id)
+            self.save_changes(confirmation)
+        if new_user.is_analyst:
+            SearchService.invalidate()
         return new_user
 
     @classmethod
@@ -47,27 +57,44 @@ class UserService:
         return UserModel.query.filter(func.lower(UserModel.stripe_cust_id) == stripe_cust_id.lower()).first()
 
     def change_user_image(self, user_id: int, image: TextIO, filename: str) -> str:
-        client = S3.get_client()
-
+        """Raises ValueError if image isn't a PNG or JPEG"""
+        content_type = ImageService.check_file(image)
         try:
             # upload file to s3 bucket
-            client.put_object(
-                ACL="public-read",
-                Body=image,
-                Bucket=S3.S3_BUCKET,
-                Key=f"user_images/{filename}",
-                ContentType=image.content_type
-            )
+            image_url = S3.upload_fileobj(image, f"user_images/{filename}", content_type)
         except Exception as e:
             print(str(e))
             return None
 
-        # update user profile image
+        # update user profile image, its thumbnails follow
         user = self.get_user_by_id(user_id)
-        user.image_url = f"{S3.S3_ENDPOINT_URL}/user_images/{filename}"
+        user.image_url = image_url
+        user.image_variants = None
         self.save_changes(user)
+        ImageService.process_profile_image(user.id, f"user_images/{filename}")
         return user.image_url
 
+    @classmethod
+    def get_profile_pages(cls, user: "UserModel", page_size: int) -> dict:
+        """
+        First page (most recent first) of a user's ideas, upvotes, downvotes and bookmarks,
+        as {name: (rows, next_cursor)}
+        """
+        return {
+            "ideas": paginate(user.ideas, [IdeaModel.created_at, IdeaModel.id], None, page_size),
+            "upvotes": paginate(user.upvotes, [UpvoteModel.created_at, UpvoteModel.id], None, page_size),
+            "downvotes": paginate(user.downvotes, [DownvoteModel.created_at, DownvoteModel.id], None, page_size),
+            "bookmarks": paginate(user.bookmarks, [BookmarkModel.created_at, BookmarkModel.id], None, page_size)
+        }
+
+    @classmethod
+    def get_vote_counts(cls, user: "UserModel") -> dict:
+        return {
+            "upvotes": user.upvotes.count(),
+            "downvotes": user.downvotes.count(),
+            "bookmarks": user.bookmarks.count()
+        }
+
     @classmethod
     def get_analysts_for_leaderboard(cls, query_string={}, page=0, page_size=None) -> List["UserModel"]:
         direction = asc
@@ -93,4 +120,4 @@ class UserService:
     @classmethod
     def save_changes(cls, data) -> None:
         db.session.add(data)
-        db.session.commit()
+        commit_or_flush()
@@ -1,4 +1,5 @@
 import os
+import sys
 import unittest
 
 from flask_migrate import Migrate, MigrateCommand
@@ -6,6 +7,10 @@ from flask_script import Manager
 
 from main import create_app, db
 from application import create_services
+from main.service.counter_service import CounterService
+from main.service.download_service import DownloadService
+from main.service.email_service import EmailService
+from main.service.export_service import ExportService
 
 config_name = os.environ['APP_SETTINGS']
 app = create_app(create_services(), config_name)
@@ -24,5 +29,43 @@ def run():
     app.run()
 
 
+@manager.option('--dry-run', dest='dry_run', action='store_true', help="Only report drift")
+def reconcile_counters(dry_run=False):
+    """Recomputes idea and user counters from the rows they count and prints any drift"""
+    drift = CounterService.reconcile(fix=not dry_run)
+    for row in drift:
+        print(f"{row['table']} {row['id']} {row['column']}: stored {row['stored']}, actual {row['actual']}")
+    print(f"{len(drift)} drifted counters" + ("" if dry_run else " corrected"))
+
+
+@manager.command
+def rebuild_download_rollups():
+    """Recomputes the hourly and daily download rollups from the downloads table"""
+    num_idea_rows, num_user_rows = DownloadService.rebuild_rollups()
+    print(f"Wrote {num_idea_rows} idea and {num_user_rows} user rollup rows")
+
+
+@manager.command
+def send_emails():
+    """Sends every email in the outbox that is due"""
+    print(f"Sent {EmailService.send_pending()} emails")
+    print(EmailService.stats())
+
+
+@manager.option('kind', choices=ExportService.KINDS, help="What to export")
+@manager.option('--format', dest='export_format', choices=ExportService.FORMATS, default="ndjson")
+@manager.option('--gzip', dest='compress', action='store_true', help="Gzip the output")
+@manager.option('-o', '--output', dest='output', help="File to write, stdout by default")
+def export(kind, export_format="ndjson", compress=False, output=None):
+    """Streams ideas, votes, downloads or analysts as NDJSON or CSV"""
+    out = open(output, "wb") if output else sys.stdout.buffer
+    try:
+        for chunk in ExportService.stream(kind, export_format, compress):
+            out.write(chunk)
+    finally:
+        if output:
+            out.close()
+
+
 if __name__ == '__main__':
     manager.run()
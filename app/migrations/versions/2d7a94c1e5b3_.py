@@ -0,0 +1,37 @@
+"""add uploads table
+
+Revision ID: 2d7a94c1e5b3
+Revises: 8f3c61d2a9e7
+Create Date: 2026-10-18 19:02:41.527310
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2d7a94c1e5b3'
+down_revision = '8f3c61d2a9e7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('uploads',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('key', sa.String(length=256), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('content_type', sa.String(length=80), nullable=False),
+    sa.Column('confirmed_at', sa.DateTime(), nullable=True),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('key')
+    )
+    op.create_index('ix_uploads_user_id_created_at', 'uploads', ['user_id', 'created_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_uploads_user_id_created_at', table_name='uploads')
+    op.drop_table('uploads')
@@ -0,0 +1,58 @@
+"""add hourly and daily download rollups
+
+Revision ID: 5b9d2e7c41f8
+Revises: e3f1a6c20d54
+Create Date: 2026-10-18 15:02:44.317208
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b9d2e7c41f8'
+down_revision = 'e3f1a6c20d54'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('idea_download_rollups',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('idea_id', sa.Integer(), nullable=False),
+    sa.Column('analyst_id', sa.Integer(), nullable=False),
+    sa.Column('period', sa.String(length=4), nullable=False),
+    sa.Column('bucket', sa.DateTime(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['analyst_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['idea_id'], ['ideas.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('idea_id', 'period', 'bucket')
+    )
+    op.create_index('ix_idea_download_rollups_analyst_id_period_bucket', 'idea_download_rollups',
+                    ['analyst_id', 'period', 'bucket'], unique=False)
+    op.create_table('user_download_rollups',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('period', sa.String(length=4), nullable=False),
+    sa.Column('bucket', sa.DateTime(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'period', 'bucket')
+    )
+    # backfill from existing downloads
+    for period in ('hour', 'day'):
+        bucket = f"date_trunc('{period}', downloads.created_at)"
+        op.execute(f"INSERT INTO idea_download_rollups (idea_id, analyst_id, period, bucket, count) "
+                   f"SELECT downloads.idea_id, ideas.analyst_id, '{period}', {bucket}, count(*) "
+                   f"FROM downloads JOIN ideas ON ideas.id = downloads.idea_id "
+                   f"GROUP BY downloads.idea_id, ideas.analyst_id, {bucket}")
+        op.execute(f"INSERT INTO user_download_rollups (user_id, period, bucket, count) "
+                   f"SELECT downloads.user_id, '{period}', {bucket}, count(*) FROM downloads "
+                   f"GROUP BY downloads.user_id, {bucket}")
+
+def downgrade():
+    op.drop_table('user_download_rollups')
+    op.drop_index('ix_idea_download_rollups_analyst_id_period_bucket', table_name='idea_download_rollups')
+    op.drop_table('idea_download_rollups')
@@ -0,0 +1,37 @@
+"""add analyst_stats table
+
+Revision ID: 65871b193d0b
+Revises: 0a299d947aa9
+Create Date: 2026-10-18 09:12:44.104210
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '65871b193d0b'
+down_revision = '0a299d947aa9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('analyst_stats',
+    sa.Column('analyst_id', sa.Integer(), nullable=False),
+    sa.Column('num_ideas', sa.Integer(), nullable=False),
+    sa.Column('return_sum', sa.Float(), nullable=False),
+    sa.Column('pt_capture_sum', sa.Float(), nullable=False),
+    sa.Column('success_count', sa.Integer(), nullable=False),
+    sa.Column('closed_holding_days', sa.Integer(), nullable=False),
+    sa.Column('num_open_ideas', sa.Integer(), nullable=False),
+    sa.Column('open_created_day_sum', sa.BigInteger(), nullable=False),
+    sa.Column('is_dirty', sa.Boolean(), nullable=False),
+    sa.Column('computed_on', sa.Date(), nullable=True),
+    sa.ForeignKeyConstraint(['analyst_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('analyst_id')
+    )
+
+
+def downgrade():
+    op.drop_table('analyst_stats')
@@ -0,0 +1,36 @@
+"""add quote_schedule and scheduled_job_runs tables
+
+Revision ID: 8f3c61d2a9e7
+Revises: 5b9d2e7c41f8
+Create Date: 2026-10-18 16:24:05.118342
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8f3c61d2a9e7'
+down_revision = '5b9d2e7c41f8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('quote_schedule',
+    sa.Column('symbol', sa.String(length=10), nullable=False),
+    sa.Column('last_price', sa.Float(), nullable=True),
+    sa.Column('refreshed_at', sa.DateTime(), nullable=True),
+    sa.Column('volatility', sa.Float(), nullable=True),
+    sa.PrimaryKeyConstraint('symbol')
+    )
+    op.create_table('scheduled_job_runs',
+    sa.Column('name', sa.String(length=80), nullable=False),
+    sa.Column('last_run_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade():
+    op.drop_table('scheduled_job_runs')
+    op.drop_table('quote_schedule')
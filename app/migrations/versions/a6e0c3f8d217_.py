@@ -0,0 +1,24 @@
+"""add users.image_variants
+
+Revision ID: a6e0c3f8d217
+Revises: 2d7a94c1e5b3
+Create Date: 2026-10-18 21:15:09.640218
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6e0c3f8d217'
+down_revision = '2d7a94c1e5b3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('users', sa.Column('image_variants', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('users', 'image_variants')
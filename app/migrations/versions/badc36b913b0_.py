@@ -0,0 +1,49 @@
+"""add timelines table for the following feed
+
+Revision ID: badc36b913b0
+Revises: c4e8d07baaf2
+Create Date: 2026-10-18 12:20:51.306114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'badc36b913b0'
+down_revision = 'c4e8d07baaf2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('timelines',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('idea_id', sa.Integer(), nullable=False),
+    sa.Column('analyst_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['analyst_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['idea_id'], ['ideas.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'idea_id', name='uq_timelines_user_id_idea_id')
+    )
+    op.create_index('ix_timelines_user_id_created_at_idea_id', 'timelines', ['user_id', 'created_at', 'idea_id'])
+    op.create_index('ix_timelines_user_id_analyst_id', 'timelines', ['user_id', 'analyst_id'])
+    op.create_index('ix_timelines_idea_id', 'timelines', ['idea_id'])
+
+    # backfill: every follower gets the ideas of the analysts they follow, and analysts get their own
+    op.execute('INSERT INTO timelines (user_id, idea_id, analyst_id, created_at) '
+               'SELECT follows.user_id, ideas.id, ideas.analyst_id, ideas.created_at '
+               'FROM follows JOIN ideas ON ideas.analyst_id = follows.analyst_id '
+               'WHERE follows.user_id <> follows.analyst_id')
+    op.execute('INSERT INTO timelines (user_id, idea_id, analyst_id, created_at) '
+               'SELECT ideas.analyst_id, ideas.id, ideas.analyst_id, ideas.created_at FROM ideas')
+
+
+def downgrade():
+    op.drop_index('ix_timelines_idea_id', table_name='timelines')
+    op.drop_index('ix_timelines_user_id_analyst_id', table_name='timelines')
+    op.drop_index('ix_timelines_user_id_created_at_idea_id', table_name='timelines')
+    op.drop_table('timelines')
@@ -0,0 +1,67 @@
+"""add indexes for hot lookups and unique vote/bookmark/follow pairs
+
+Revision ID: c4e8d07baaf2
+Revises: 65871b193d0b
+Create Date: 2026-10-18 11:02:37.518842
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4e8d07baaf2'
+down_revision = '65871b193d0b'
+branch_labels = None
+depends_on = None
+
+# (table, other column of the user pair)
+UNIQUE_PAIRS = [
+    ('follows', 'analyst_id'),
+    ('upvotes', 'idea_id'),
+    ('downvotes', 'idea_id'),
+    ('bookmarks', 'idea_id'),
+]
+
+# (index name, table, columns)
+INDEXES = [
+    ('ix_users_lower_username', 'users', [sa.text('lower(username)')]),
+    ('ix_users_lower_email', 'users', [sa.text('lower(email)')]),
+    ('ix_users_lower_stripe_cust_id', 'users', [sa.text('lower(stripe_cust_id)')]),
+    ('ix_ideas_created_at', 'ideas', ['created_at']),
+    ('ix_ideas_analyst_id_created_at', 'ideas', ['analyst_id', 'created_at']),
+    ('ix_ideas_score_created_at', 'ideas', ['score', 'created_at']),
+    ('ix_ideas_lower_symbol', 'ideas', [sa.text('lower(symbol)')]),
+    ('ix_follows_analyst_id_created_at', 'follows', ['analyst_id', 'created_at']),
+    ('ix_follows_user_id_created_at', 'follows', ['user_id', 'created_at']),
+    ('ix_upvotes_idea_id_created_at', 'upvotes', ['idea_id', 'created_at']),
+    ('ix_upvotes_user_id_created_at', 'upvotes', ['user_id', 'created_at']),
+    ('ix_downvotes_idea_id_created_at', 'downvotes', ['idea_id', 'created_at']),
+    ('ix_downvotes_user_id_created_at', 'downvotes', ['user_id', 'created_at']),
+    ('ix_bookmarks_idea_id_created_at', 'bookmarks', ['idea_id', 'created_at']),
+    ('ix_bookmarks_user_id_created_at', 'bookmarks', ['user_id', 'created_at']),
+    ('ix_comments_idea_id_created_at', 'comments', ['idea_id', 'created_at']),
+    ('ix_downloads_idea_id_created_at', 'downloads', ['idea_id', 'created_at']),
+    ('ix_downloads_user_id_created_at', 'downloads', ['user_id', 'created_at']),
+    ('ix_reviews_analyst_id_created_at', 'reviews', ['analyst_id', 'created_at']),
+    ('ix_reviews_user_id_analyst_id', 'reviews', ['user_id', 'analyst_id']),
+]
+
+
+def upgrade():
+    for table, other in UNIQUE_PAIRS:
+        # keep the oldest row of any duplicate pair so the constraint can be created
+        op.execute(f'DELETE FROM {table} WHERE id NOT IN '
+                   f'(SELECT MIN(id) FROM {table} GROUP BY user_id, {other})')
+        op.create_unique_constraint(f'uq_{table}_user_id_{other}', table, ['user_id', other])
+
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+
+
+def downgrade():
+    for name, table, columns in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
+
+    for table, other in reversed(UNIQUE_PAIRS):
+        op.drop_constraint(f'uq_{table}_user_id_{other}', table, type_='unique')
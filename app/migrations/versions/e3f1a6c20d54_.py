@@ -0,0 +1,33 @@
+"""add search_symbols table for autocomplete
+
+Revision ID: e3f1a6c20d54
+Revises: badc36b913b0
+Create Date: 2026-10-18 13:41:09.552031
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3f1a6c20d54'
+down_revision = 'badc36b913b0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('search_symbols',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('symbol', sa.String(length=10), nullable=False),
+    sa.Column('company_name', sa.String(), nullable=False),
+    sa.Column('num_ideas', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('symbol')
+    )
+    op.execute('INSERT INTO search_symbols (symbol, company_name, num_ideas) '
+               'SELECT symbol, max(company_name), count(*) FROM ideas GROUP BY symbol')
+
+
+def downgrade():
+    op.drop_table('search_symbols')
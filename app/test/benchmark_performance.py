@@ -0,0 +1,75 @@
+"""
+Times PerformanceService.load_idea_columns and calc_analyst_metrics on synthetic ideas in the test database,
+which is emptied before and after.
+Not collected by pytest, run it from the app directory with: python -m test.benchmark_performance [num_ideas]
+"""
+import datetime
+import sys
+import time
+
+import numpy as np
+
+from main.db import db
+from main.model.idea import IdeaModel
+from main.model.user import UserModel
+from main.service.performance_service import PerformanceService, calc_analyst_metrics
+from test.conftest import flask_test_client
+
+NUM_ANALYSTS = 5000
+INSERT_CHUNK_SIZE = 50000
+
+
+def seed(num_ideas: int, seed: int = 0) -> None:
+    rng = np.random.default_rng(seed)
+    now = datetime.datetime(2026, 10, 18, 12)
+    db.session.execute(UserModel.__table__.insert(), [
+        {"email": f"user{i}@email.com", "username": f"user{i}", "password_hash": "hash",
+         "stripe_cust_id": f"cus_{i}", "is_analyst": True}
+        for i in range(1, NUM_ANALYSTS + 1)])
+    for start in range(0, num_ideas, INSERT_CHUNK_SIZE):
+        size = min(INSERT_CHUNK_SIZE, num_ideas - start)
+        created_offsets = rng.integers(0, 1000 * 24 * 60, size).tolist()
+        closed_after = rng.integers(0, 365, size).tolist()
+        is_closed = (rng.random(size) < 0.5).tolist()
+        analyst_ids = rng.integers(1, NUM_ANALYSTS + 1, size).tolist()
+        prices = rng.uniform(1, 500, (size, 3)).tolist()
+        ideas = []
+        for i in range(size):
+            created_at = now - datetime.timedelta(minutes=created_offsets[i])
+            ideas.append({
+                "created_at": created_at, "symbol": "AAPL", "position_type": "long" if i % 2 else "short",
+                "agreed_to_terms": True, "company_name": "Company", "market_cap": 1000000000,
+                "sector": "technology", "entry_price": prices[i][0], "last_price": prices[i][1],
+                "price_target": prices[i][2], "thesis_summary": "summary", "full_report": "report",
+                "analyst_id": analyst_ids[i],
+                "closed_date": created_at + datetime.timedelta(days=closed_after[i]) if is_closed[i] else None})
+        db.session.execute(IdeaModel.__table__.insert(), ideas)
+    db.session.commit()
+
+
+def main(num_ideas: int = 1000000, repeat: int = 3) -> None:
+    flask_test_client()
+    db.drop_all()
+    db.create_all()
+    try:
+        seed(num_ideas)
+        load_timings, calc_timings = [], []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            columns = PerformanceService.load_idea_columns()
+            loaded = time.perf_counter()
+            calc_analyst_metrics(**columns, today=datetime.date(2026, 10, 18))
+            load_timings.append(loaded - started)
+            calc_timings.append(time.perf_counter() - loaded)
+            db.session.remove()
+        best = min(range(repeat), key=lambda idx: load_timings[idx] + calc_timings[idx])
+        print(f"{num_ideas} ideas, {NUM_ANALYSTS} analysts on {db.engine.dialect.name}, best of {repeat}: "
+              f"load_idea_columns {load_timings[best]:.3f}s + calc_analyst_metrics {calc_timings[best]:.3f}s "
+              f"= {load_timings[best] + calc_timings[best]:.3f}s")
+    finally:
+        db.session.remove()
+        db.drop_all()
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
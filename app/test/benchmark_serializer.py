@@ -0,0 +1,36 @@
+"""
+Times the compiled idea list schema against marshmallow on the serializer tests' ideas in the test database,
+which is emptied before and after.
+Not collected by pytest, run it from the app directory with: python -m test.benchmark_serializer
+"""
+import timeit
+
+from main.db import db
+from main.model.idea import IdeaModel
+from main.schema.idea_schema import IdeaSchema, idea_list_schema
+from test.conftest import flask_test_client
+from test.libs.test_serializer_lib import NUM_IDEAS, TestSerializer
+
+
+def main(repeat: int = 5) -> None:
+    flask_test_client()
+    db.drop_all()
+    db.create_all()
+    try:
+        TestSerializer.seed()
+        ideas = IdeaModel.query.all()
+        for idea in ideas:
+            idea.analyst  # load relationships up front so only serialization is timed
+        schema = IdeaSchema(many=True, exclude=("full_report", "exhibits", "comments"))
+
+        marshmallow_time = min(timeit.repeat(lambda: schema.dump(ideas), number=1, repeat=repeat))
+        compiled_time = min(timeit.repeat(lambda: idea_list_schema.dump(ideas), number=1, repeat=repeat))
+        print(f"{NUM_IDEAS} ideas, best of {repeat}: marshmallow {marshmallow_time * 1000:.1f}ms, "
+              f"compiled {compiled_time * 1000:.1f}ms ({marshmallow_time / compiled_time:.1f}x)")
+    finally:
+        db.session.remove()
+        db.drop_all()
+
+
+if __name__ == "__main__":
+    main()
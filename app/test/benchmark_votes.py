@@ -0,0 +1,87 @@
+"""
+Times votes per second on one hot idea from parallel voters, with the UPDATE of the idea's counters made in
+each vote's transaction and left to the write-behind CounterBuffer.  Meant for a postgres test database,
+which is emptied before and after.
+Not collected by pytest, run it from the app directory with: python -m test.benchmark_votes [num_voters]
+"""
+import sys
+import threading
+import time
+
+from main.db import db
+from main.model.idea import IdeaModel
+from main.model.user import UserModel
+from main.service.counter_service import init_counter_buffer
+from main.service.upvote_service import UpvoteService
+from test.conftest import flask_test_client
+
+VOTES_PER_VOTER = 40
+
+
+def seed(num_voters: int) -> int:
+    """Adds the voters and an idea, returns the idea's id"""
+    db.session.execute(UserModel.__table__.insert(), [
+        {"email": f"user{i}@email.com", "username": f"user{i}", "password_hash": "hash", "is_analyst": i == 0}
+        for i in range(num_voters + 1)])
+    analyst_id = db.session.query(UserModel.id).filter(UserModel.is_analyst.is_(True)).scalar()
+    db.session.execute(IdeaModel.__table__.insert(), {
+        "symbol": "AAPL", "position_type": "long", "agreed_to_terms": True, "price_target": 100,
+        "company_name": "Company", "market_cap": 1000000000, "sector": "technology", "entry_price": 90,
+        "last_price": 95, "thesis_summary": "summary", "full_report": "report", "analyst_id": analyst_id})
+    db.session.commit()
+    return db.session.query(IdeaModel.id).scalar()
+
+
+def votes_per_second(app, idea_id: int, voter_ids: list) -> float:
+    """Each voter upvotes the idea and takes it back VOTES_PER_VOTER times, all at once"""
+    errors = []
+
+    def vote(user_id: int) -> None:
+        with app.app_context():
+            try:
+                for _ in range(VOTES_PER_VOTER):
+                    UpvoteService().save_new_upvote(user_id, idea_id)
+                    UpvoteService().delete_upvote_by_user_and_idea_if_exists(user_id, idea_id)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                db.session.remove()
+
+    voters = [threading.Thread(target=vote, args=(user_id,)) for user_id in voter_ids]
+    started = time.perf_counter()
+    for voter in voters:
+        voter.start()
+    for voter in voters:
+        voter.join()
+    elapsed = time.perf_counter() - started
+    if errors:
+        raise errors[0]
+    return 2 * len(voter_ids) * VOTES_PER_VOTER / elapsed
+
+
+def main(num_voters: int = 50) -> None:
+    app = flask_test_client().application
+    db.drop_all()
+    db.create_all()
+    try:
+        idea_id = seed(num_voters)
+        voter_ids = [user_id for user_id, in
+                     db.session.query(UserModel.id).filter(UserModel.is_analyst.is_(False)).order_by(UserModel.id)]
+        db.session.remove()
+
+        direct = votes_per_second(app, idea_id, voter_ids)
+        buffer = init_counter_buffer(app)
+        buffered = votes_per_second(app, idea_id, voter_ids)
+        buffer.flush()
+        del app.extensions["counter_buffer"]
+        num_upvotes, score = db.session.query(IdeaModel.num_upvotes, IdeaModel.score).filter_by(id=idea_id).one()
+        assert (num_upvotes, score) == (0, 0), "votes were lost or counted twice"
+        print(f"votes/s on one idea from {num_voters} voters on {db.engine.dialect.name}: "
+              f"{direct:.0f} direct, {buffered:.0f} write-behind ({buffered / direct:.1f}x)")
+    finally:
+        db.session.remove()
+        db.drop_all()
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -1,8 +1,22 @@
+import json
 import os
-from unittest.mock import create_autospec
+import re
+import threading
+import time
+import urllib.request
+import uuid
+from contextlib import contextmanager
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import create_autospec, patch
+from urllib.parse import parse_qs, urlparse
+from sqlalchemy import event
 
 import main
 from main import create_app
+from main.libs.email import Email
+from main.libs.s3 import S3
 from test.mock_responses import aapl_quote, aapl_company, aapl_chart, aapl_advanced_stats, \
     gm_advanced_stats, gm_chart, gm_quote, gm_company
 
@@ -13,7 +27,7 @@ IEX_URL = "{}v1/stock".format(os.environ.get("IEX_URI", None))
 def services_for_test(user=None, confirmation=None, password_reset=None, idea=None,
                       download=None, follow=None, review=None, comment=None,\
                       upvote=None, downvote=None, bookmark=None, subscription=None,\
-                      performance=None):
+                      performance=None, leaderboard=None, export=None, upload=None, email=None):
     return {
         'user': user or create_autospec(main.UserService, spec_set=True, instance=True),
         'confirmation': confirmation or create_autospec(main.ConfirmationService, spec_set=True, instance=True),
@@ -27,7 +41,11 @@ def services_for_test(user=None, confirmation=None, password_reset=None, idea=No
         'downvote': downvote or create_autospec(main.DownvoteService, spec_set=True, instance=True),
         'bookmark': bookmark or create_autospec(main.BookmarkService, spec_set=True, instance=True),
         'subscription': subscription or create_autospec(main.SubscriptionService, spec_set=True, instance=True),
-        'performance': performance or create_autospec(main.PerformanceService, spec_set=True, instance=True)
+        'performance': performance or create_autospec(main.PerformanceService, spec_set=True, instance=True),
+        'leaderboard': leaderboard or create_autospec(main.LeaderboardService, spec_set=True, instance=True),
+        'export': export or create_autospec(main.ExportService, spec_set=True, instance=True),
+        'upload': upload or create_autospec(main.UploadService, spec_set=True, instance=True),
+        'email': email or create_autospec(main.EmailService, spec_set=True, instance=True)
     }
 
 
@@ -54,6 +72,261 @@ def register_mock_iex(requests_mock):
     requests_mock.get(IEX_URL + '/GM/chart', json=gm_chart)
     requests_mock.get(IEX_URL + '/GM/advanced-stats', json=gm_advanced_stats)
 
+    requests_mock.get(IEX_URL + '/market/batch', json={
+        "AAPL": {"quote": aapl_quote},
+        "GM": {"quote": gm_quote}
+    })
+
 
 def register_mock_stripe(requests_mock):
     requests_mock.pos
+
+
+class QueryPlanChecker:
+    """
+    Records the SELECTs run inside a with block so their plans can be checked with EXPLAIN.
+    full_table_scans() returns (statement, plan detail) for every query that reads a whole table.
+    """
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+
+    def __enter__(self) -> "QueryPlanChecker":
+        event.listen(self.engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *args) -> None:
+        event.remove(self.engine, "before_cursor_execute", self._record)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            self.statements.append((statement, parameters))
+
+    def full_table_scans(self) -> list:
+        scans = []
+        connection = self.engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            for statement, parameters in self.statements:
+                for detail in self._scans(cursor, statement, parameters):
+                    scans.append((statement, detail))
+        finally:
+            connection.close()
+        return scans
+
+    def _scans(self, cursor, statement, parameters) -> list:
+        if self.engine.dialect.name == "sqlite":
+            cursor.execute("EXPLAIN QUERY PLAN " + statement, parameters)
+            # e.g. "SCAN ideas" is a full scan, "SCAN ideas USING INDEX ..." and "SEARCH ..." are not
+            return [row[3] for row in cursor.fetchall()
+                    if re.match(r"SCAN (TABLE )?\w+$", row[3]) and not row[3].startswith("SCAN CONSTANT")]
+
+        cursor.execute("EXPLAIN (FORMAT JSON) " + statement, parameters)
+        plans = [cursor.fetchone()[0][0]["Plan"]]
+        scans = []
+        while plans:
+            plan = plans.pop()
+            if plan["Node Type"] == "Seq Scan":
+                scans.append("Seq Scan on " + plan["Relation Name"])
+            plans.extend(plan.get("Plans", []))
+        return scans
+
+
+class S3StandIn(ThreadingHTTPServer):
+    """
+    Local server for the S3 calls uploads make (PutObject, multipart uploads, GetObject, HeadObject and
+    browser uploads with a presigned POST), path style.  Objects end up in objects, keyed by (bucket, key), with their
+    content_types, and every request waits delay seconds.  Presigned POST policies aren't checked.
+    """
+    daemon_threads = True
+
+    def __init__(self, delay: float = 0):
+        self.delay = delay
+        self.objects = {}
+        self.content_types = {}
+        self.parts = {}
+        self.requests = []
+        self.lock = threading.Lock()
+        super().__init__(("127.0.0.1", 0), S3Handler)
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def url(self) -> str:
+        return "http://{}:{}".format(*self.server_address)
+
+
+@contextmanager
+def local_s3(delay: float = 0):
+    """Points S3 at a new S3StandIn, which is yielded"""
+    server = S3StandIn(delay)
+    with patch.multiple(S3, S3_API_URL=server.url, S3_BUCKET="bucket", S3_ACCESS_KEY="key", S3_SECRET_KEY="secret"):
+        S3.reset()
+        try:
+            yield server
+        finally:
+            S3.reset()
+            server.shutdown()
+            server.server_close()
+
+
+def post_form(url: str, fields: dict, file: bytes) -> int:
+    """Posts a multipart form as a browser would with a presigned POST and returns the status"""
+    boundary = uuid.uuid4().hex
+    parts = [b'--%s\r\nContent-Disposition: form-data; name="%s"\r\n\r\n%s\r\n'
+             % (boundary.encode(), name.encode(), value.encode()) for name, value in fields.items()]
+    parts.append(b'--%s\r\nContent-Disposition: form-data; name="file"; filename="file"\r\n'
+                 b'Content-Type: application/octet-stream\r\n\r\n%s\r\n--%s--\r\n'
+                 % (boundary.encode(), file, boundary.encode()))
+    request = urllib.request.Request(url, data=b"".join(parts), method="POST", headers={
+        "Content-Type": f"multipart/form-data; boundary={boundary}"})
+    with urllib.request.urlopen(request) as response:
+        return response.status
+
+
+class S3Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def reply(self, body: bytes = b"", **headers) -> None:
+        self.send_response(200)
+        for name, value in {"ETag": '"etag"', **headers}.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_request(self):
+        url = urlparse(self.path)
+        bucket, _, key = url.path.lstrip("/").partition("/")
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with self.server.lock:
+            self.server.requests.append((self.command, key, url.query))
+        time.sleep(self.server.delay)
+        query = {name: values[0] for name, values in parse_qs(url.query, keep_blank_values=True).items()}
+        return (bucket, key), query, body
+
+    def do_PUT(self) -> None:
+        name, query, body = self.read_request()
+        with self.server.lock:
+            if "uploadId" in query:
+                self.server.parts[query["uploadId"]][int(query["partNumber"])] = body
+            else:
+                self.server.objects[name] = body
+                self.server.content_types[name] = self.headers.get("Content-Type")
+        self.reply()
+
+    def do_GET(self) -> None:
+        name, _, _ = self.read_request()
+        with self.server.lock:
+            body = self.server.objects.get(name)
+            content_type = self.server.content_types.get(name)
+        if body is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        match = re.match(r"bytes=(\d+)-(\d+)", self.headers.get("Range", ""))
+        if match:
+            body = body[int(match.group(1)):int(match.group(2)) + 1]
+        self.send_response(206 if match else 200)
+        self.send_header("Content-Type", content_type or "binary/octet-stream")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_HEAD(self) -> None:
+        name, _, _ = self.read_request()
+        with self.server.lock:
+            body = self.server.objects.get(name)
+            content_type = self.server.content_types.get(name)
+        self.send_response(404 if body is None else 200)
+        self.send_header("Content-Length", "0" if body is None else str(len(body)))
+        if content_type:
+            self.send_header("Content-Type", content_type)
+        self.end_headers()
+
+    def do_POST(self) -> None:
+        name, query, body = self.read_request()
+        if self.headers.get("Content-Type", "").startswith("multipart/form-data"):
+            # a browser upload with a presigned POST
+            form = BytesParser(policy=HTTP).parsebytes(
+                b"Content-Type: " + self.headers["Content-Type"].encode() + b"\r\n\r\n" + body)
+            fields = {part.get_param("name", header="content-disposition"): part.get_payload(decode=True)
+                      for part in form.iter_parts()}
+            with self.server.lock:
+                object_name = (name[0], fields["key"].decode())
+                self.server.objects[object_name] = fields["file"]
+                self.server.content_types[object_name] = fields["Content-Type"].decode()
+            self.send_response(204)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        with self.server.lock:
+            if "uploads" in query:
+                self.server.content_types[name] = self.headers.get("Content-Type")
+                upload_id = uuid.uuid4().hex
+                self.server.parts[upload_id] = {}
+                self.reply(b"<InitiateMultipartUploadResult><Bucket>%s</Bucket><Key>%s</Key>"
+                           b"<UploadId>%s</UploadId></InitiateMultipartUploadResult>"
+                           % (name[0].encode(), name[1].encode(), upload_id.encode()))
+                return
+            parts = self.server.parts.pop(query["uploadId"])
+            self.server.objects[name] = b"".join(parts[number] for number in sorted(parts))
+        self.reply(b"<CompleteMultipartUploadResult><Key>%s</Key></CompleteMultipartUploadResult>"
+                   % name[1].encode())
+
+
+class MailgunStandIn(ThreadingHTTPServer):
+    """
+    Local server for Mailgun's messages endpoint.  The form of every request goes in requests (each value a list),
+    replies are 200 unless a status was queued in statuses, and every request waits delay seconds.
+    """
+    daemon_threads = True
+
+    def __init__(self, delay: float = 0):
+        self.delay = delay
+        self.requests = []
+        self.statuses = []
+        self.lock = threading.Lock()
+        super().__init__(("127.0.0.1", 0), MailgunHandler)
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def url(self) -> str:
+        return "http://{}:{}".format(*self.server_address)
+
+
+@contextmanager
+def local_mailgun(delay: float = 0):
+    """Points Email at a new MailgunStandIn, which is yielded"""
+    server = MailgunStandIn(delay)
+    with patch.multiple(Email, MAILGUN_API_URL=server.url + "/v3", MAILGUN_API_KEY="key", MAILGUN_DOMAIN="mg.test"):
+        try:
+            yield server
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+class MailgunHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def do_POST(self) -> None:
+        time.sleep(self.server.delay)
+        form = parse_qs(self.rfile.read(int(self.headers["Content-Length"])).decode())
+        with self.server.lock:
+            self.server.requests.append(form)
+            status = self.server.statuses.pop(0) if self.server.statuses else 200
+            message_id = f"<{len(self.server.requests)}@mg.test>"
+        body = json.dumps({"id": message_id, "message": "Queued. Thank you."} if status == 200
+                          else {"message": "Error"}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
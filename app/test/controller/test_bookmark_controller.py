@@ -82,6 +82,17 @@ class TestBookmarkController(unittest.TestCase):
         assert len(response_data["ideas"]) == 2
         assert response_data["ideas"][0]["analyst"]["id"] == analyst.id
         assert response_data["ideas"][1]["analyst"]["id"] == analyst.id
+        # returned whole unless a page is asked for
+        assert response_data["nextCursor"] is None
+
+        url = f'/user/{user_dict["user"].username}/bookmarks'
+        headers = {"Authorization": "Bearer {}".format(user_dict["access_token"])}
+        response_data = json.loads(self.client.get(f'{url}?pageSize=1', headers=headers).data)
+        assert [idea["id"] for idea in response_data["ideas"]] == [idea2.id]
+        response_data = json.loads(
+            self.client.get(f'{url}?pageSize=1&cursor={response_data["nextCursor"]}', headers=headers).data)
+        assert [idea["id"] for idea in response_data["ideas"]] == [idea1.id]
+        assert response_data["nextCursor"] is None
 
     def tearDown(self) -> None:
         db.session.remove()
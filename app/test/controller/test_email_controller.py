@@ -0,0 +1,76 @@
+import json
+import time
+import unittest
+
+from main.db import db
+from main.libs.strings import get_text
+from main.model.email_outbox import EmailOutboxModel
+from main.service.confirmation_service import ConfirmationService
+from main.service.email_service import EmailService
+from main.service.user_service import UserService
+from test.conftest import flask_test_client, services_for_test, local_mailgun
+
+
+class TestEmailController(unittest.TestCase):
+    def setUp(self) -> None:
+        self.client = flask_test_client(services_for_test(
+            user=UserService(), confirmation=ConfirmationService(), email=EmailService()))
+        self.user_service = UserService()
+        db.create_all()
+
+    def create_user(self, email, username, **kwargs) -> dict:
+        """helper function that creates a new user and returns dict with user and access token"""
+        new_user = self.user_service.save_new_user(email, username, "password", **kwargs)
+        response = self.client.post('/login', data=json.dumps(dict(
+            emailOrUsername=username,
+            password="password"
+        )), content_type="application/json")
+        login_data = json.loads(response.data)
+        return {"access_token": login_data["accessToken"], "user": new_user}
+
+    def test_register_doesnt_wait_for_mailgun(self) -> None:
+        self.client.application.config["EMAIL_DELIVERY_ENABLED"] = True
+        with local_mailgun(delay=1) as server:
+            started = time.time()
+            response = self.client.post('/register', data=json.dumps(dict(
+                email="email@email.com",
+                username="username",
+                password="password"
+            )), content_type="application/json")
+            assert time.time() - started < 1
+            assert response.status_code == 201
+            assert json.loads(response.data)["confirmationEmailSent"] is True
+
+            # sent in the background
+            deadline = time.time() + 10
+            while EmailService.stats()["sent"] == 0 and time.time() < deadline:
+                time.sleep(0.05)
+                db.session.remove()
+            assert server.requests[0]["to"] == ["email@email.com"]
+
+    def test_admin_emails(self) -> None:
+        user_dict = self.create_user("email1@email.com", "username1")
+        ConfirmationService.send_confirmation_email(user_dict["user"].id)
+        response = self.client.get(
+            '/admin/emails', headers={"Authorization": "Bearer {}".format(user_dict["access_token"])})
+        assert response.status_code == 400
+        assert json.loads(response.data)["errors"][0]["detail"] == get_text("unauthorized")
+
+        admin_headers = {"Authorization": "Bearer {}".format(
+            self.create_user("email2@email.com", "username2", is_admin=True)["access_token"])}
+        response = self.client.get('/admin/emails', headers=admin_headers)
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert data["stats"]["pending"] == 1
+        assert data["stats"]["oldestPendingSeconds"] >= 0
+        assert [(email["toAddress"], email["status"]) for email in data["emails"]] == [
+            ("email1@email.com", EmailOutboxModel.PENDING)]
+        # confirmation codes aren't exposed
+        assert "variables" not in data["emails"][0]
+
+        response = self.client.get('/admin/emails?status=failed', headers=admin_headers)
+        assert json.loads(response.data)["emails"] == []
+
+    def tearDown(self) -> None:
+        db.session.remove()
+        db.drop_all()
@@ -0,0 +1,62 @@
+import gzip
+import json
+import unittest
+import requests_mock
+
+from main.db import db
+from main.libs.strings import get_text
+from main.service.user_service import UserService
+from main.service.export_service import ExportService
+from test.conftest import flask_test_client, services_for_test, register_mock_iex
+from main.libs.util import create_idea
+
+
+@requests_mock.Mocker()
+class TestExportController(unittest.TestCase):
+    def setUp(self) -> None:
+        self.client = flask_test_client(services_for_test(user=UserService(), export=ExportService()))
+        self.user_service = UserService()
+        db.create_all()
+
+    def create_user(self, email, username, **kwargs) -> dict:
+        """helper function that creates a new user and returns dict with user and access token"""
+        new_user = self.user_service.save_new_user(email, username, "password", **kwargs)
+        response = self.client.post('/login', data=json.dumps(dict(
+            emailOrUsername=username,
+            password="password"
+        )), content_type="application/json")
+        login_data = json.loads(response.data)
+        return {"access_token": login_data["accessToken"], "user": new_user}
+
+    def test_admin_export(self, mock) -> None:
+        register_mock_iex(mock)
+        analyst_dict = self.create_user("email1@email.com", "username1", is_analyst=True)
+        ideas = [create_idea(analyst_dict["user"].id, symbol, False) for symbol in ("aapl", "gm")]
+        response = self.client.get(
+            '/admin/export/ideas', headers={"Authorization": "Bearer {}".format(analyst_dict["access_token"])})
+        assert response.status_code == 400
+        assert json.loads(response.data)["errors"][0]["detail"] == get_text("unauthorized")
+
+        admin_headers = {"Authorization": "Bearer {}".format(
+            self.create_user("email2@email.com", "username2", is_admin=True)["access_token"])}
+        response = self.client.get('/admin/export/ideas', headers=admin_headers)
+        assert response.status_code == 200
+        assert response.mimetype == "application/x-ndjson"
+        assert response.is_streamed
+        assert [json.loads(line)["id"] for line in response.data.decode().splitlines()] == [idea.id for idea in ideas]
+
+        response = self.client.get('/admin/export/analysts?format=csv&gzip=true', headers=admin_headers)
+        assert response.status_code == 200
+        assert response.headers["Content-Disposition"] == "attachment; filename=analysts.csv.gz"
+        lines = gzip.decompress(response.data).decode().splitlines()
+        assert lines[0].startswith("id,username,")
+        assert lines[1].startswith(f"{analyst_dict['user'].id},username1,")
+
+        response = self.client.get('/admin/export/ideas?format=xml', headers=admin_headers)
+        assert response.status_code == 400
+        response = self.client.get('/admin/export/users', headers=admin_headers)
+        assert response.status_code == 404
+
+    def tearDown(self) -> None:
+        db.session.remove()
+        db.drop_all()
@@ -14,3 +14,5 @@ class TestHealthController(unittest.TestCase):
         assert response.status_code == 200
         response_data = json.loads(response.data)
         assert response_data["status"] == "working"
+        assert set(response_data["stockRequests"]) == {"calls", "executed", "deduplicated", "shared"}
+        assert set(response_data["stockCache"]) == {"backend", "hits", "misses", "errors"}
@@ -2,10 +2,12 @@ import json
 import unittest
 import requests_mock
 import datetime
+from urllib.parse import quote
 
 from main.db import db
 from main.libs.util import create_image_file
 from main.libs.strings import get_text
+from main.libs.pagination import encode_cursor
 from main.service.download_service import DownloadService
 from main.service.idea_service import IdeaService
 from main.service.user_service import UserService
@@ -278,6 +280,34 @@ class TestIdeaController(unittest.TestCase):
         idea = self.idea_service.get_idea_by_id(idea.id)
         assert idea is None
 
+    def test_admin_delete_ideas(self, mock) -> None:
+        register_mock_iex(mock)
+        register_mock_mailgun(mock)
+
+        analyst_dict = self.create_user("email1@email.com", "username1", is_analyst=True)
+        ideas = [create_idea(analyst_dict["user"].id, symbol, False) for symbol in ("aapl", "gm", "aapl")]
+        response = self.client.delete(
+            '/admin/ideas', data=json.dumps({"ideaIds": [ideas[0].id, ideas[1].id]}),
+            content_type="application/json",
+            headers={"Authorization": "Bearer {}".format(analyst_dict["access_token"])})
+        assert response.status_code == 400
+        assert json.loads(response.data)["errors"][0]["detail"] == get_text("unauthorized_delete")
+
+        admin_dict = self.create_user("email2@email.com", "username2", is_admin=True)
+        response = self.client.delete(
+            '/admin/ideas', data=json.dumps({"ideaIds": "1"}), content_type="application/json",
+            headers={"Authorization": "Bearer {}".format(admin_dict["access_token"])})
+        assert response.status_code == 400
+
+        response = self.client.delete(
+            '/admin/ideas', data=json.dumps({"ideaIds": [ideas[0].id, ideas[1].id, 1000]}),
+            content_type="application/json",
+            headers={"Authorization": "Bearer {}".format(admin_dict["access_token"])})
+        assert response.status_code == 200
+        assert json.loads(response.data)["numDeleted"] == 2
+        assert [idea.id for idea in self.idea_service.query_ideas()] == [ideas[2].id]
+        assert self.user_service.get_user_by_id(analyst_dict["user"].id).num_ideas == 1
+
 
     def test_get_idea_feed(self, mock) -> None:
         register_mock_iex(mock)
@@ -296,7 +326,7 @@ class TestIdeaController(unittest.TestCase):
             '/ideas/following',
             headers={"Authorization": "Bearer {}".format(user_dict["access_token"])})
         assert response.status_code == 200
-        response_data = json.loads(response.data)
+        response_data = json.loads(response.data)["ideas"]
         assert len(response_data) == 2
         assert response_data[0]["analystId"] == analyst1.id
 
@@ -305,7 +335,7 @@ class TestIdeaController(unittest.TestCase):
             '/ideas/following',
             headers={"Authorization": "Bearer {}".format(user_dict["access_token"])})
         assert response.status_code == 200
-        response_data = json.loads(response.data)
+        response_data = json.loads(response.data)["ideas"]
         assert len(response_data) == 0
 
         follow1 = self.follow_service.save_new_follow(user_dict["user"].id, analyst1.id)
@@ -314,7 +344,7 @@ class TestIdeaController(unittest.TestCase):
             '/ideas/following',
             headers={"Authorization": "Bearer {}".format(user_dict["access_token"])})
         assert response.status_code == 200
-        response_data = json.loads(response.data)
+        response_data = json.loads(response.data)["ideas"]
         assert len(response_data) == 4
 
         # "discover" feed_type returns all ideas
@@ -324,7 +354,7 @@ class TestIdeaController(unittest.TestCase):
             '/ideas/discover',
             headers={"Authorization": "Bearer {}".format(user_dict["access_token"])})
         assert response.status_code == 200
-        response_data = json.loads(response.data)
+        response_data = json.loads(response.data)["ideas"]
         assert len(response_data) == 4
 
         # filter by symbol
@@ -332,7 +362,7 @@ class TestIdeaController(unittest.TestCase):
             '/ideas/discover?symbol=AAPL',
             headers={"Authorization": "Bearer {}".format(user_dict["access_token"])})
         assert response.status_code == 200
-        response_data = json.loads(response.data)
+        response_data = json.loads(response.data)["ideas"]
         assert len(response_data) == 2
         assert response_data[0]["symbol"] == "AAPL"
 
@@ -341,7 +371,7 @@ class TestIdeaController(unittest.TestCase):
             '/ideas/discover?positionType=short',
             headers={"Authorization": "Bearer {}".format(user_dict["access_token"])})
         assert response.status_code == 200
-        response_data = json.loads(response.data)
+        response_data = json.loads(response.data)["ideas"]
         assert len(response_data) == 2
         assert response_data[0]["symbol"] == "GM"
 
@@ -350,7 +380,7 @@ class TestIdeaController(unittest.TestCase):
             '/ideas/discover?sector=Consumer+Discretionary',
             headers={"Authorization": "Bearer {}".format(user_dict["access_token"])})
         assert response.status_code == 200
-        response_data = json.loads(response.data)
+        response_data = json.loads(response.data)["ideas"]
         assert len(response_data) == 2
         assert response_data[0]["symbol"] == "GM"
 
@@ -359,7 +389,7 @@ class TestIdeaController(unittest.TestCase):
             '/ideas/discover?sector=Consumer+Discretionary&sector=Technology',
             headers={"Authorization": "Bearer {}".format(user_dict["access_token"])})
         assert response.status_code == 200
-        response_data = json.loads(response.data)
+        response_data = json.loads(response.data)["ideas"]
         assert len(response_data) == 4
 
         # filter by market cap
@@ -367,7 +397,7 @@ class TestIdeaController(unittest.TestCase):
             '/ideas/discover?marketCap=mega',
             headers={"Authorization": "Bearer {}".format(user_dict["access_token"])})
         assert response.status_code == 200
-        response_data = json.loads(response.data)
+        response_data = json.loads(response.data)["ideas"]
         assert len(response_data) == 2
         assert response_data[0]["symbol"] == "AAPL"
 
@@ -376,7 +406,7 @@ class TestIdeaController(unittest.TestCase):
             '/ideas/discover?marketCap=mega&marketCap=large',
             headers={"Authorization": "Bearer {}".format(user_dict["access_token"])})
         assert response.status_code == 200
-        response_data = json.loads(response.data)
+        response_data = json.loads(response.data)["ideas"]
         assert len(response_data) == 4
         assert response_data[0]["symbol"] == "GM"
 
@@ -387,7 +417,7 @@ class TestIdeaController(unittest.TestCase):
             '/ideas/discover?timePeriod=99',
             headers={"Authorization": "Bearer {}".format(user_dict["access_token"])})
         assert response.status_code == 200
-        response_data = json.loads(response.data)
+        response_data = json.loads(response.data)["ideas"]
         assert len(response_data) == 3
 
         # sort by popularity
@@ -397,7 +427,7 @@ class TestIdeaController(unittest.TestCase):
             '/ideas/discover?sort=top',
             headers={"Authorization": "Bearer {}".format(user_dict["access_token"])})
         assert response.status_code == 200
-        response_data = json.loads(response.data)
+        response_data = json.loads(response.data)["ideas"]
         assert len(response_data) == 4
         assert response_data[0]["id"] == idea3.id
 
@@ -408,7 +438,7 @@ class TestIdeaController(unittest.TestCase):
             '/ideas/discover?sort=latest',
             headers={"Authorization": "Bearer {}".format(user_dict["access_token"])})
         assert response.status_code == 200
-        response_data = json.loads(response.data)
+        response_data = json.loads(response.data)["ideas"]
         assert len(response_data) == 4
         assert response_data[0]["id"] == idea1.id
         assert response_data[1]["id"] == idea4.id
@@ -421,6 +451,52 @@ class TestIdeaController(unittest.TestCase):
         response_data = json.loads(response.data)
         assert response_data["errors"][0]["detail"] == get_text("invalid_feed_type")
 
+    def test_get_idea_feed_pages(self, mock) -> None:
+        register_mock_iex(mock)
+
+        user_dict = self.create_user("user@email.com", "user")
+        headers = {"Authorization": "Bearer {}".format(user_dict["access_token"])}
+        analyst = self.user_service.save_new_user("analyst@email.com", "analyst", "password", is_analyst=True)
+        ideas = [create_idea(analyst.id, symbol, False) for symbol in ["AAPL", "GM", "AAPL", "GM", "AAPL"]]
+        # same created_at for two ideas, so id has to break the tie
+        ideas[3].created_at = ideas[2].created_at
+        ideas[1].score = 10
+        ideas[4].score = 10
+        for idea in ideas:
+            self.idea_service.save_changes(idea)
+
+        for sort, expected_order in [("latest", [4, 3, 2, 1, 0]), ("top", [4, 1, 3, 2, 0])]:
+            seen = []
+            cursor = None
+            while True:
+                url = f'/ideas/discover?sort={sort}&pageSize=2'
+                if cursor:
+                    url += f'&cursor={cursor}'
+                response = self.client.get(url, headers=headers)
+                assert response.status_code == 200
+                response_data = json.loads(response.data)
+                assert len(response_data["ideas"]) <= 2
+                seen += [idea["id"] for idea in response_data["ideas"]]
+                cursor = response_data["nextCursor"]
+                if cursor is None:
+                    break
+            assert seen == [ideas[idx].id for idx in expected_order]
+
+        # default page size returns everything here, with no next page
+        response = self.client.get('/ideas/discover', headers=headers)
+        response_data = json.loads(response.data)
+        assert len(response_data["ideas"]) == 5
+        assert response_data["nextCursor"] is None
+
+        response = self.client.get('/ideas/discover?cursor=not-a-cursor', headers=headers)
+        assert response.status_code == 400
+        response_data = json.loads(response.data)
+        assert response_data["errors"][0]["detail"] == get_text("invalid_cursor")
+        # values that don't match the sort columns, e.g. a "latest" cursor's created_at in place of a score
+        tampered = encode_cursor([datetime.datetime(2020, 6, 18), {"id": 1}, 7])
+        response = self.client.get(f'/ideas/discover?sort=top&cursor={tampered}', headers=headers)
+        assert response.status_code == 400
+
     def test_download_report(self, mock) -> None:
         register_mock_iex(mock)
         register_mock_mailgun(mock)
@@ -449,6 +525,54 @@ class TestIdeaController(unittest.TestCase):
         count = self.download_service.get_analyst_download_count(1)
         assert count == 1
 
+    def test_download_series(self, mock) -> None:
+        register_mock_iex(mock)
+        register_mock_mailgun(mock)
+
+        analyst_dict = self.create_user("email@email.com", "analyst", is_analyst=True)
+        user_dict = self.create_user("user@email.com", "user")
+        analyst_headers = {"Authorization": "Bearer {}".format(analyst_dict["access_token"])}
+        idea = create_idea(analyst_dict["user"].id, "aapl", False)
+        for _ in range(3):
+            self.download_service.save_new_download(user_dict["user"].id, idea.id)
+
+        for url in (f'/idea/{idea.id}/downloads', f'/analyst/{analyst_dict["user"].id}/downloads'):
+            response = self.client.get(url, headers=analyst_headers)
+            response_data = json.loads(response.data)
+            assert response.status_code == 200
+            assert response_data["period"] == "day"
+            assert response_data["totalDownloads"] == 3
+            assert len(response_data["downloads"]) == 31
+            assert response_data["downloads"][-1]["count"] == 3
+
+            response = self.client.get(url, headers={"Authorization": "Bearer {}".format(user_dict["access_token"])})
+            assert response.status_code == 400
+
+        today = datetime.datetime.utcnow().date()
+        response = self.client.get(
+            f'/idea/{idea.id}/downloads?period=hour&start={today.isoformat()}'
+            f'&end={(today + datetime.timedelta(days=1)).isoformat()}',
+            headers=analyst_headers)
+        response_data = json.loads(response.data)
+        assert response.status_code == 200
+        assert len(response_data["downloads"]) == 24
+        assert response_data["totalDownloads"] == 3
+
+        # offsets are converted to UTC, the end defaults to now
+        start = f"{(today - datetime.timedelta(days=2)).isoformat()}T02:00:00+02:00"
+        response = self.client.get(
+            f'/idea/{idea.id}/downloads?start={quote(start)}', headers=analyst_headers)
+        response_data = json.loads(response.data)
+        assert response.status_code == 200
+        assert len(response_data["downloads"]) == 3
+        assert response_data["totalDownloads"] == 3
+
+        for query in ("period=week", "start=yesterday", "start=2020-01-02&end=2020-01-01", "start=2000-01-01"):
+            response = self.client.get(f'/idea/{idea.id}/downloads?{query}', headers=analyst_headers)
+            assert response.status_code == 400
+        response = self.client.get('/idea/1000/downloads', headers=analyst_headers)
+        assert response.status_code == 404
+
     def tearDown(self) -> None:
         db.session.remove()
         db.drop_all()
@@ -0,0 +1,97 @@
+import json
+import unittest
+import requests_mock
+
+from main.db import db
+from main.libs.util import create_image_file
+from main.service.idea_service import IdeaService
+from main.service.upload_service import UploadService
+from main.service.user_service import UserService
+from test.conftest import flask_test_client, services_for_test, register_mock_iex, local_s3, post_form
+
+
+@requests_mock.Mocker()
+class TestUploadController(unittest.TestCase):
+    def setUp(self) -> None:
+        self.client = flask_test_client(services_for_test(
+            user=UserService(), idea=IdeaService(), upload=UploadService()))
+        self.user_service = UserService()
+        db.create_all()
+
+    def create_user(self, email, username, **kwargs) -> dict:
+        """helper function that creates a new user and returns dict with user and access token"""
+        new_user = self.user_service.save_new_user(email, username, "password", **kwargs)
+        response = self.client.post('/login', data=json.dumps(dict(
+            emailOrUsername=username,
+            password="password"
+        )), content_type="application/json")
+        login_data = json.loads(response.data)
+        return {"access_token": login_data["accessToken"], "user": new_user}
+
+    def upload(self, headers: dict, kind: str, filename: str) -> dict:
+        """Gets a presigned POST, uploads to it as a browser would and confirms the upload"""
+        response = self.client.post('/uploads', data=json.dumps(
+            {"kind": kind, "filename": filename, "contentType": "image/png"}),
+            content_type="application/json", headers=headers)
+        assert response.status_code == 201
+        upload = json.loads(response.data)
+        assert post_form(upload["url"], upload["fields"], create_image_file("image.png", "image/png").getvalue()) == 204
+        response = self.client.post('/uploads/confirm', data=json.dumps({"key": upload["key"]}),
+                                    content_type="application/json", headers=headers)
+        assert response.status_code == 200
+        assert json.loads(response.data)["fileUrl"] == upload["fileUrl"]
+        return upload
+
+    def test_profile_image_upload(self, mock) -> None:
+        user_dict = self.create_user("email@email.com", "username")
+        headers = {"Authorization": "Bearer {}".format(user_dict["access_token"])}
+        with local_s3():
+            upload = self.upload(headers, "profileImage", "me.png")
+            assert self.user_service.get_user_by_id(user_dict["user"].id).image_url == upload["fileUrl"]
+
+            # only analysts upload exhibits
+            response = self.client.post('/uploads', data=json.dumps(
+                {"kind": "exhibit", "filename": "chart.png", "contentType": "image/png"}),
+                content_type="application/json", headers=headers)
+            assert response.status_code == 400
+            response = self.client.post('/uploads', data=json.dumps({"kind": "profileImage"}),
+                                        content_type="application/json", headers=headers)
+            assert response.status_code == 400
+            response = self.client.post('/uploads/confirm', data=json.dumps({"key": "user_images/someone.png"}),
+                                        content_type="application/json", headers=headers)
+            assert response.status_code == 404
+
+    def test_new_idea_with_uploaded_exhibits(self, mock) -> None:
+        register_mock_iex(mock)
+        analyst_dict = self.create_user("email@email.com", "analyst", is_analyst=True)
+        headers = {"Authorization": "Bearer {}".format(analyst_dict["access_token"])}
+        data = {
+            "symbol": "AAPL",
+            "positionType": "long",
+            "agreedToTerms": True,
+            "priceTarget": 400,
+            "entryPrice": 313.40,
+            "thesisSummary": "Test Thesis Summary",
+            "fullReport": "Test Full Report"
+        }
+        with local_s3():
+            uploads = [self.upload(headers, "exhibit", f"exhibit{i}.png") for i in range(2)]
+            response = self.client.post('/new-idea', data={**data, "exhibitUploads": json.dumps(
+                [{"key": upload["key"], "title": f"Exhibit {i}"} for i, upload in enumerate(uploads)])},
+                content_type="multipart/form-data", headers=headers)
+            assert response.status_code == 201
+            exhibits = json.loads(json.loads(response.data)["exhibits"])
+            assert exhibits == [{"url": upload["fileUrl"], "title": f"Exhibit {i}"} for i, upload in enumerate(uploads)]
+
+            # keys that weren't uploaded and confirmed are rejected
+            response = self.client.post('/new-idea', data={**data, "exhibitUploads": json.dumps(
+                [{"key": "report_exhibits/other.png", "title": "Exhibit 1"}])},
+                content_type="multipart/form-data", headers=headers)
+            assert response.status_code == 400
+            response = self.client.post('/new-idea', data={**data, "exhibitUploads": "not json"},
+                                        content_type="multipart/form-data", headers=headers)
+            assert response.status_code == 400
+
+    def tearDown(self) -> None:
+        db.session.remove()
+        db.drop_all()
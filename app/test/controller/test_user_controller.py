@@ -1,3 +1,4 @@
+import datetime
 import json
 import unittest
 import requests_mock
@@ -8,14 +9,20 @@ from main.libs.strings import get_text
 from main.libs.util import create_image_file
 from main.service.user_service import UserService
 from main.service.follow_service import FollowService
-from test.conftest import flask_test_client, services_for_test, register_mock_mailgun
+from main.service.idea_service import IdeaService
+from main.service.upvote_service import UpvoteService
+from main.service.leaderboard_service import LeaderboardService
+from main.service.job_service import JobService
+from test.conftest import flask_test_client, services_for_test, register_mock_mailgun, register_mock_iex
+from main.libs.util import create_idea
 
 
 @requests_mock.Mocker()
 class TestUserController(unittest.TestCase):
     def setUp(self) -> None:
+        self.leaderboard_service = LeaderboardService()
         self.client = flask_test_client(services_for_test(
-            user=UserService(), follow=FollowService()))
+            user=UserService(), follow=FollowService(), idea=IdeaService(), leaderboard=self.leaderboard_service))
         self.user_service = UserService()
         self.follow_service = FollowService()
         db.create_all()
@@ -170,6 +177,56 @@ class TestUserController(unittest.TestCase):
         assert data["errors"][0]["detail"] == get_text("not_found").format("User")
         assert response.status_code == 404
 
+    def test_get_user_compact(self, mock) -> None:
+        register_mock_mailgun(mock)
+        register_mock_iex(mock)
+
+        analyst = self.user_service.save_new_user("analyst@email.com", "analyst", "password", is_analyst=True)
+        users = [self.user_service.save_new_user(f"email{i}@email.com", f"username{i}", "password")
+                 for i in range(3)]
+        for user in users:
+            self.follow_service.save_new_follow(user.id, analyst.id)
+        ideas = [create_idea(analyst.id, symbol, False) for symbol in ["aapl", "gm", "aapl"]]
+        UpvoteService().save_new_upvote(analyst.id, ideas[0].id)
+        headers = {'Authorization': 'Bearer {}'.format(self.login("analyst", "password"))}
+
+        response = self.client.get('/user/analyst?compact=true&pageSize=2', headers=headers)
+        assert response.status_code == 200
+        user = json.loads(response.data)
+        assert user["numFollowers"] == 3
+        assert user["numIdeas"] == 3
+        assert user["numUpvotes"] == 1
+        assert user["numBookmarks"] == 0
+        # first page inline, most recent first
+        assert [follower["id"] for follower in user["followers"]] == [users[2].id, users[1].id]
+        assert [idea["id"] for idea in user["ideas"]] == [ideas[2].id, ideas[1].id]
+        assert len(user["upvotes"]) == 1
+        assert user["nextCursors"]["upvotes"] is None
+        assert user["nextCursors"]["following"] is None
+
+        # the rest come from the paginated endpoints
+        response = self.client.get(
+            f'/analyst/{analyst.id}/followers?pageSize=2&cursor={user["nextCursors"]["followers"]}',
+            headers=headers)
+        data = json.loads(response.data)
+        assert [follower["id"] for follower in data["followers"]] == [users[0].id]
+        assert data["nextCursor"] is None
+        response = self.client.get(
+            f'/user/{analyst.id}/ideas?pageSize=2&cursor={user["nextCursors"]["ideas"]}',
+            headers=headers)
+        data = json.loads(response.data)
+        assert [idea["id"] for idea in data["ideas"]] == [ideas[0].id]
+        assert data["nextCursor"] is None
+
+        # login takes the same option
+        response = self.client.post('/login?compact=true', data=json.dumps(dict(
+            emailOrUsername="analyst",
+            password="password"
+        )), content_type='application/json')
+        data = json.loads(response.data)
+        assert len(data["user"]["followers"]) == 3
+        assert "nextCursors" in data["user"]
+
     def test_edit_user_put(self, mock) -> None:
         register_mock_mailgun(mock)
 
@@ -332,6 +389,39 @@ class TestUserController(unittest.TestCase):
         analysts = json.loads(response.data)
         assert analysts[0]["id"] == analyst1.id
         assert analysts[1]["id"] == analyst2.id
+        etag = response.headers["ETag"]
+        # no performance update has run yet
+        assert response.headers["X-Leaderboard-Version"] == "0"
+
+        # served from the snapshot until the next rebuild
+        analyst3.num_ideas = 1
+        self.user_service.save_changes(analyst3)
+        response = self.client.get(
+            '/leaderboard?pageSize=1&page=1',
+            headers={'Authorization': 'Bearer {}'.format(access_token)})
+        analysts = json.loads(response.data)
+        assert [analyst["id"] for analyst in analysts] == [analyst1.id]
+        response = self.client.get(
+            '/leaderboard',
+            headers={'Authorization': 'Bearer {}'.format(access_token), 'If-None-Match': etag})
+        assert response.status_code == 304
+
+        # a performance update in any worker is picked up on the next check
+        JobService.run_exclusively("update_performance", lambda: None, datetime.timedelta(0))
+        self.leaderboard_service.checked_at = 0
+        response = self.client.get(
+            '/leaderboard',
+            headers={'Authorization': 'Bearer {}'.format(access_token), 'If-None-Match': etag})
+        assert response.status_code == 200
+        version = LeaderboardService.current_version()
+        assert version > 0
+        assert response.headers["X-Leaderboard-Version"] == str(version)
+        assert len(json.loads(response.data)) == 3
+
+        response = self.client.get(
+            '/leaderboard?sortColumn=password_hash',
+            headers={'Authorization': 'Bearer {}'.format(access_token)})
+        assert response.status_code == 400
 
     def tearDown(self) -> None:
         db.session.remove()
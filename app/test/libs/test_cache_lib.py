@@ -0,0 +1,177 @@
+import fnmatch
+import os
+import socketserver
+import tempfile
+import threading
+import time
+import unittest
+from main.libs.cache import Cache, CacheError, MemoryBackend, MmapBackend, RedisBackend, RespConnection, \
+    backend_from_url
+
+
+class RespStandIn(socketserver.ThreadingTCPServer):
+    """Local server for the handful of Redis commands RedisBackend uses"""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        self.data = {}
+        self.lock = threading.Lock()
+        super().__init__(("127.0.0.1", 0), RespHandler)
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    def execute(self, command: list) -> bytes:
+        name = command[0].upper()
+        now = time.time()
+        with self.lock:
+            for key in [key for key, (_, expires_at) in self.data.items() if expires_at and expires_at <= now]:
+                del self.data[key]
+            if name == b"GET":
+                entry = self.data.get(command[1])
+                return b"$-1\r\n" if entry is None else b"$%d\r\n%s\r\n" % (len(entry[0]), entry[0])
+            if name == b"SET":
+                ttl = int(command[4]) / 1000 if len(command) > 4 and command[3].upper() == b"PX" else None
+                self.data[command[1]] = (command[2], now + ttl if ttl else None)
+                return b"+OK\r\n"
+            if name == b"DEL":
+                return b":%d\r\n" % sum(self.data.pop(key, None) is not None for key in command[1:])
+            if name == b"SCAN":
+                pattern = command[command.index(b"MATCH") + 1].decode()
+                keys = [key for key in self.data if fnmatch.fnmatch(key.decode(), pattern)]
+                return b"*2\r\n$1\r\n0\r\n*%d\r\n" % len(keys) + b"".join(
+                    b"$%d\r\n%s\r\n" % (len(key), key) for key in keys)
+        return b"-ERR unknown command\r\n"
+
+
+class RespHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        reader = RespConnection(self.request)
+        reader.reader = self.rfile
+        while True:
+            try:
+                command = reader.read_reply()
+            except CacheError:
+                return
+            self.wfile.write(self.server.execute(command))
+
+
+class BackendTests:
+    """Behaviour every backend shares, mixed into a TestCase per backend"""
+
+    def test_get_set_delete(self) -> None:
+        assert self.backend.get("quote:AAPL") is None
+        self.backend.set("quote:AAPL", b'{"latestPrice": 313.49}', ttl=60)
+        assert self.backend.get("quote:AAPL") == b'{"latestPrice": 313.49}'
+        self.backend.set("quote:AAPL", b"{}", ttl=60)
+        assert self.backend.get("quote:AAPL") == b"{}"
+        self.backend.delete("quote:AAPL")
+        assert self.backend.get("quote:AAPL") is None
+
+    def test_entries_expire(self) -> None:
+        self.backend.set("quote:AAPL", b"{}", ttl=0.05)
+        assert self.backend.get("quote:AAPL") == b"{}"
+        time.sleep(0.1)
+        assert self.backend.get("quote:AAPL") is None
+
+    def test_clear(self) -> None:
+        for symbol in ("AAPL", "GM"):
+            self.backend.set(f"company:{symbol}", b"{}", ttl=60)
+        self.backend.clear()
+        assert self.backend.get("company:AAPL") is None
+        assert self.backend.get("company:GM") is None
+
+
+class TestMemoryBackend(BackendTests, unittest.TestCase):
+    def setUp(self) -> None:
+        self.backend = MemoryBackend(max_entries=2)
+
+    def test_least_recently_used_is_evicted(self) -> None:
+        self.backend.set("a", b"1", ttl=60)
+        self.backend.set("b", b"2", ttl=60)
+        self.backend.get("a")
+        self.backend.set("c", b"3", ttl=60)
+        assert self.backend.get("b") is None
+        assert self.backend.get("a") == b"1"
+        assert self.backend.get("c") == b"3"
+
+
+class TestMmapBackend(BackendTests, unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "cache")
+        self.backend = MmapBackend(self.path, num_sets=4, ways=2, slot_size=256)
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_shared_between_processes(self) -> None:
+        self.backend.set("company:AAPL", b'{"companyName": "Apple, Inc."}', ttl=60)
+        pid = os.fork()
+        if pid == 0:
+            # a separate mapping of the same file, as another worker would have
+            other = MmapBackend(self.path, num_sets=4, ways=2, slot_size=256)
+            ok = other.get("company:AAPL") == b'{"companyName": "Apple, Inc."}'
+            other.set("company:GM", b"{}", ttl=60)
+            os._exit(0 if ok else 1)
+        _, status = os.waitpid(pid, 0)
+        assert status == 0
+        assert self.backend.get("company:GM") == b"{}"
+
+    def test_size_is_bounded(self) -> None:
+        for i in range(100):
+            self.backend.set(f"quote:S{i}", b"{}", ttl=60 + i)
+        assert os.path.getsize(self.path) == 4 * 2 * 256
+        assert sum(self.backend.get(f"quote:S{i}") is not None for i in range(100)) <= 8
+        # values that don't fit a slot aren't cached
+        self.backend.set("chart:AAPL", b"x" * 256, ttl=60)
+        assert self.backend.get("chart:AAPL") is None
+
+
+class TestRedisBackend(BackendTests, unittest.TestCase):
+    def setUp(self) -> None:
+        self.server = RespStandIn()
+        host, port = self.server.server_address
+        self.backend = backend_from_url(f"redis://{host}:{port}/0?prefix=test:")
+
+    def tearDown(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_keys_are_prefixed(self) -> None:
+        self.backend.set("quote:AAPL", b"{}", ttl=60)
+        assert list(self.server.data) == [b"test:quote:AAPL"]
+
+    def test_unavailable_server_is_a_miss(self) -> None:
+        cache = Cache(self.backend)
+        self.server.shutdown()
+        self.server.server_close()
+        self.backend.pool.queue.clear()
+        assert cache.get_or_load("quote:AAPL", 60, lambda: {"latestPrice": 1}) == {"latestPrice": 1}
+        assert cache.stats()["errors"] == 2
+
+
+class TestCache(unittest.TestCase):
+    def test_get_or_load_counts_hits_and_misses(self) -> None:
+        cache = Cache(MemoryBackend())
+        calls = []
+
+        def load():
+            calls.append(1)
+            return {"latestPrice": 313.49}
+
+        for _ in range(3):
+            assert cache.get_or_load("quote:AAPL", 60, load) == {"latestPrice": 313.49}
+        assert len(calls) == 1
+        assert cache.stats() == {"backend": "MemoryBackend", "hits": 2, "misses": 1, "errors": 0}
+
+    def test_backend_from_url(self) -> None:
+        assert isinstance(backend_from_url("memory://?max_entries=10"), MemoryBackend)
+        assert backend_from_url("memory://?max_entries=10").max_entries == 10
+        backend = backend_from_url("redis://:secret@cache.internal:6380/2")
+        assert (backend.address, backend.db, backend.password) == (("cache.internal", 6380), 2, "secret")
+        backend = backend_from_url("redis://cache.internal?timeout=0.25&pool_size=4&prefix=quotes:")
+        assert (backend.timeout, backend.pool.maxsize, backend.prefix) == (0.25, 4, "quotes:")
+        for bad_url in ("memcached://localhost", "redis://localhost?timeout=soon", "redis://localhost?ttl=60",
+                        "redis://localhost/first", "memory://?max_entries=many"):
+            with self.assertRaises(CacheError):
+                backend_from_url(bad_url)
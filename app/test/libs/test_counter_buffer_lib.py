@@ -0,0 +1,71 @@
+import threading
+import unittest
+from main.libs.counter_buffer import CounterBuffer
+
+
+class TestCounterBuffer(unittest.TestCase):
+    def setUp(self) -> None:
+        self.flushed = []
+        self.fail = False
+        self.flushed_event = threading.Event()
+
+        def flush(deltas, committing):
+            if self.fail:
+                raise RuntimeError("database down")
+            with committing():
+                self.flushed.append({key: dict(row) for key, row in deltas.items()})
+            self.flushed_event.set()
+
+        self.flush = flush
+
+    def test_sums_deltas_until_flushed(self) -> None:
+        buffer = CounterBuffer(self.flush, interval=60)
+        buffer.add("ideas", 1, {"num_upvotes": 1, "score": 1})
+        buffer.add("ideas", 1, {"num_downvotes": 1, "score": -1})
+        buffer.add("ideas", 2, {"num_upvotes": 1, "score": 1})
+        assert buffer.pending("ideas", 1) == {"num_upvotes": 1, "num_downvotes": 1, "score": 0}
+        assert buffer.pending("ideas", 3) == {}
+
+        buffer.flush()
+        assert self.flushed == [{
+            ("ideas", 1): {"num_upvotes": 1, "num_downvotes": 1, "score": 0},
+            ("ideas", 2): {"num_upvotes": 1, "score": 1}
+        }]
+        assert buffer.pending("ideas", 1) == {}
+        buffer.flush()
+        assert len(self.flushed) == 1
+
+    def test_failed_flush_is_retried(self) -> None:
+        buffer = CounterBuffer(self.flush, interval=60)
+        buffer.add("ideas", 1, {"score": 1})
+        self.fail = True
+        with self.assertRaises(RuntimeError):
+            buffer.flush()
+        assert buffer.pending("ideas", 1) == {"score": 1}
+
+        self.fail = False
+        buffer.add("ideas", 1, {"score": 1})
+        buffer.flush()
+        assert self.flushed == [{("ideas", 1): {"score": 2}}]
+
+    def test_not_pending_once_committed(self) -> None:
+        seen = []
+
+        def flush(deltas, committing):
+            seen.append(buffer.pending("ideas", 1))
+            with committing():
+                pass
+            # e.g. a read between the commit and the flush returning
+            seen.append(buffer.pending("ideas", 1))
+
+        buffer = CounterBuffer(flush, interval=60)
+        buffer.add("ideas", 1, {"score": 1})
+        buffer.flush()
+        assert seen == [{"score": 1}, {}]
+
+    def test_flushes_after_max_events(self) -> None:
+        buffer = CounterBuffer(self.flush, interval=60, max_events=3)
+        for _ in range(3):
+            buffer.add("ideas", 1, {"score": 1})
+        assert self.flushed_event.wait(5)
+        assert self.flushed == [{("ideas", 1): {"score": 3}}]
@@ -1,8 +1,9 @@
+import json
 import unittest
 import requests_mock
 
-from main.libs.email import Email
-from test.conftest import register_mock_mailgun
+from main.libs.email import Email, EmailException
+from test.conftest import register_mock_mailgun, local_mailgun
 
 
 class TestEmailLib(unittest.TestCase):
@@ -17,6 +18,21 @@ class TestEmailLib(unittest.TestCase):
         response = Email.send_email([email], subject, text, html)
         assert response.status_code == 200
 
+    def test_send_batch(self) -> None:
+        with local_mailgun() as server:
+            variables = {"a@email.com": {"code": "123456"}, "b@email.com": {"code": "654321"}}
+            response = Email.send_batch(variables, "Your code", "Code: %recipient.code%", "<html></html>")
+            assert response.json()["id"] == "<1@mg.test>"
+            assert server.requests[0]["to"] == ["a@email.com", "b@email.com"]
+            assert json.loads(server.requests[0]["recipient-variables"][0]) == variables
+
+            # only rate limits and server errors are worth retrying
+            for status, retryable in ((500, True), (429, True), (400, False)):
+                server.statuses = [status]
+                with self.assertRaises(EmailException) as context:
+                    Email.send_batch(variables, "Your code", "Code: %recipient.code%", "<html></html>")
+                assert context.exception.retryable is retryable
+
     # def test_exception_thrown_without_api_key(self):
     #     email = Email()
     #
@@ -0,0 +1,51 @@
+import io
+import unittest
+from PIL import Image
+from main.libs.images import ImageError, make_variants, sniff_format
+
+
+def encode(image: Image.Image, image_format: str, **kwargs) -> bytes:
+    output = io.BytesIO()
+    image.save(output, image_format, **kwargs)
+    return output.getvalue()
+
+
+class TestImages(unittest.TestCase):
+    def test_sniff_format(self) -> None:
+        assert sniff_format(encode(Image.new("RGB", (4, 4)), "PNG")) == "png"
+        assert sniff_format(encode(Image.new("RGB", (4, 4)), "JPEG")) == "jpeg"
+        assert sniff_format(encode(Image.new("RGB", (4, 4)), "GIF")) is None
+        assert sniff_format(b"<svg xmlns='http://www.w3.org/2000/svg'/>") is None
+
+    def test_variants_without_metadata(self) -> None:
+        exif = Image.Exif()
+        exif[0x0112] = 6  # orientation: rotated 90 degrees
+        exif[0x010f] = "Camera maker"
+        data = encode(Image.new("RGB", (1200, 600), (200, 60, 20)), "JPEG", exif=exif)
+
+        stripped, variants = make_variants(data, (64, 256, 1000), square=True)
+        original = Image.open(io.BytesIO(stripped))
+        assert original.format == "JPEG"
+        assert not original.getexif()
+        # the orientation is applied to the pixels
+        assert original.size == (600, 1200)
+        sizes = {size: Image.open(io.BytesIO(variant)) for size, variant in variants.items()}
+        assert all(variant.format == "WEBP" for variant in sizes.values())
+        assert {size: variant.size for size, variant in sizes.items()} == {
+            64: (64, 64), 256: (256, 256), 1000: (600, 600)}
+
+        _, variants = make_variants(data, (320, 2000), square=False)
+        assert {size: Image.open(io.BytesIO(variant)).size for size, variant in variants.items()} == {
+            320: (320, 640), 2000: (600, 1200)}
+
+    def test_transparency_is_kept(self) -> None:
+        data = encode(Image.new("RGBA", (100, 100), (0, 0, 0, 0)), "PNG")
+        stripped, variants = make_variants(data, (64,), square=False)
+        assert Image.open(io.BytesIO(stripped)).format == "PNG"
+        assert Image.open(io.BytesIO(variants[64])).mode == "RGBA"
+
+    def test_invalid_images(self) -> None:
+        png = encode(Image.new("RGB", (100, 100)), "PNG")
+        for data in (b"abcdef", encode(Image.new("RGB", (4, 4)), "GIF"), png[:40]):
+            with self.assertRaises(ImageError):
+                make_variants(data, (64,), square=True)
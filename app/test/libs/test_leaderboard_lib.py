@@ -0,0 +1,39 @@
+import unittest
+from main.libs.leaderboard import LeaderboardSnapshot
+
+
+class TestLeaderboard(unittest.TestCase):
+    def setUp(self) -> None:
+        self.analysts = [
+            {"id": 1, "analystRank": 3, "successRate": 0.5, "avgReturn": 0.1, "numIdeas": 4,
+             "avgHoldingPeriod": 10.0, "numFollowers": 0},
+            {"id": 2, "analystRank": 1, "successRate": None, "avgReturn": 0.3, "numIdeas": 4,
+             "avgHoldingPeriod": 5.0, "numFollowers": 7},
+            {"id": 3, "analystRank": 2, "successRate": 0.9, "avgReturn": -0.2, "numIdeas": 1,
+             "avgHoldingPeriod": None, "numFollowers": 2},
+        ]
+        self.snapshot = LeaderboardSnapshot(self.analysts, version=4)
+
+    def ids(self, rows) -> list:
+        return [row["id"] for row in rows]
+
+    def test_sorted_pages(self) -> None:
+        assert len(self.snapshot) == 3
+        assert self.ids(self.snapshot.page()) == [2, 3, 1]
+        assert self.ids(self.snapshot.page("avg_return", descending=True)) == [2, 1, 3]
+        # ties are broken by id in both directions
+        assert self.ids(self.snapshot.page("num_ideas")) == [3, 1, 2]
+        assert self.ids(self.snapshot.page("num_ideas", descending=True)) == [1, 2, 3]
+        # analysts without a value come last either way
+        assert self.ids(self.snapshot.page("success_rate")) == [1, 3, 2]
+        assert self.ids(self.snapshot.page("success_rate", descending=True)) == [3, 1, 2]
+
+        assert self.ids(self.snapshot.page("num_followers", page=0, page_size=2)) == [1, 3]
+        assert self.ids(self.snapshot.page("num_followers", page=1, page_size=2)) == [2]
+        assert self.snapshot.page("num_followers", page=2, page_size=2) == []
+
+    def test_etag_follows_content(self) -> None:
+        assert self.snapshot.version == 4
+        assert LeaderboardSnapshot(list(self.analysts), version=5).etag == self.snapshot.etag
+        changed = [dict(self.analysts[0], numFollowers=1)] + self.analysts[1:]
+        assert LeaderboardSnapshot(changed, version=5).etag != self.snapshot.etag
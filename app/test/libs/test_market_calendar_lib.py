@@ -0,0 +1,40 @@
+import datetime
+import unittest
+from main.libs.market_calendar import MARKET_TIMEZONE, holidays, is_trading_day, close_time, is_open, \
+    next_close, EARLY_CLOSE, MARKET_CLOSE
+
+
+def eastern(*args) -> datetime.datetime:
+    return MARKET_TIMEZONE.localize(datetime.datetime(*args))
+
+
+class TestMarketCalendar(unittest.TestCase):
+    def test_holidays(self) -> None:
+        # published NYSE holidays
+        assert sorted(holidays(2021)) == [datetime.date(2021, month, day) for month, day in (
+            (1, 1), (1, 18), (2, 15), (4, 2), (5, 31), (7, 5), (9, 6), (11, 25), (12, 24))]
+        assert sorted(holidays(2022)) == [datetime.date(2022, month, day) for month, day in (
+            (1, 17), (2, 21), (4, 15), (5, 30), (6, 20), (7, 4), (9, 5), (11, 24), (12, 26))]
+        assert not is_trading_day(datetime.date(2020, 4, 10))
+        assert not is_trading_day(datetime.date(2020, 4, 11))
+        assert is_trading_day(datetime.date(2020, 4, 13))
+
+    def test_early_closes(self) -> None:
+        assert close_time(datetime.date(2020, 11, 27)) == EARLY_CLOSE
+        assert close_time(datetime.date(2020, 12, 24)) == EARLY_CLOSE
+        assert close_time(datetime.date(2019, 7, 3)) == EARLY_CLOSE
+        assert close_time(datetime.date(2020, 12, 23)) == MARKET_CLOSE
+        assert close_time(datetime.date(2020, 12, 25)) is None
+
+    def test_is_open(self) -> None:
+        assert not is_open(eastern(2020, 6, 3, 9, 29))
+        assert is_open(eastern(2020, 6, 3, 9, 30))
+        assert not is_open(eastern(2020, 6, 3, 16))
+        assert not is_open(eastern(2020, 11, 27, 13, 30))
+        assert not is_open(eastern(2020, 11, 26, 12))
+
+    def test_next_close(self) -> None:
+        assert next_close(eastern(2020, 6, 3, 12)) == eastern(2020, 6, 3, 16)
+        # Thursday evening before Good Friday
+        assert next_close(eastern(2020, 4, 9, 17)) == eastern(2020, 4, 13, 16)
+        assert next_close(eastern(2020, 11, 26, 12)) == eastern(2020, 11, 27, 13)
@@ -0,0 +1,40 @@
+import base64
+import datetime
+import unittest
+from main.libs.pagination import encode_cursor, decode_cursor, parse_page_size, CursorException, \
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+
+
+class TestPagination(unittest.TestCase):
+    def test_cursor_round_trip(self) -> None:
+        values = [12, datetime.datetime(2020, 6, 18, 16, 46, 6, 829222), 7]
+        cursor = encode_cursor(values)
+        assert isinstance(cursor, str)
+        assert decode_cursor(cursor, 3) == values
+
+    def test_decode_invalid_cursor(self) -> None:
+        for cursor in ["not-a-cursor", encode_cursor([1, 2]), "e30="]:
+            with self.assertRaises(CursorException):
+                decode_cursor(cursor, 3)
+        # a datetime that isn't a string
+        with self.assertRaises(CursorException):
+            decode_cursor(base64.urlsafe_b64encode(b'[{"datetime": 5}, 1]').decode(), 2)
+
+    def test_decode_cursor_checks_types(self) -> None:
+        types = [int, datetime.datetime, int]
+        values = [12, datetime.datetime(2020, 6, 18, 16, 46, 6, 829222), 7]
+        assert decode_cursor(encode_cursor(values), 3, types) == values
+        assert decode_cursor(encode_cursor([1.5, 2]), 2, [float, int]) == [1.5, 2]
+        # e.g. a "latest" cursor (created_at, id) sent with sort=top (score, created_at, id)
+        latest = [datetime.datetime(2020, 6, 18), 7]
+        for values, types in ((latest, [int, datetime.datetime]), ([{"a": 1}, 7], [datetime.datetime, int]),
+                              ([True, 7], [int, int]), (["7", 7], [int, int])):
+            with self.assertRaises(CursorException):
+                decode_cursor(encode_cursor(values), 2, types)
+
+    def test_parse_page_size(self) -> None:
+        assert parse_page_size(None) == DEFAULT_PAGE_SIZE
+        assert parse_page_size("abc") == DEFAULT_PAGE_SIZE
+        assert parse_page_size("5") == 5
+        assert parse_page_size("0") == 1
+        assert parse_page_size("100000") == MAX_PAGE_SIZE
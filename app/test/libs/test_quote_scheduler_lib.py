@@ -0,0 +1,33 @@
+import unittest
+from main.libs.quote_scheduler import plan_intervals, hourly_cost, symbol_weight
+
+
+class TestQuoteScheduler(unittest.TestCase):
+    def test_everything_at_min_interval_within_budget(self) -> None:
+        intervals = plan_intervals({"AAPL": 10, "GM": 1}, credits_per_hour=1000)
+        assert intervals == {"AAPL": 60, "GM": 60}
+
+    def test_hot_symbols_refresh_more_often_within_budget(self) -> None:
+        weights = {f"S{i}": symbol_weight(num_ideas, 0) for i, num_ideas in enumerate([50, 20] + [1] * 200)}
+        intervals = plan_intervals(weights, credits_per_hour=600)
+        assert 599 < hourly_cost(intervals) <= 600
+        assert 60 < intervals["S0"] < intervals["S1"] < intervals["S2"] < 3600
+        assert intervals["S2"] == intervals["S3"]
+        # the budget is shared out in proportion to the square root of the weights
+        assert round(intervals["S2"] / intervals["S0"] / 50 ** 0.5, 6) == 1
+
+    def test_intervals_are_clamped(self) -> None:
+        intervals = plan_intervals({"HOT": 10000, **{f"S{i}": 1 for i in range(100)}}, credits_per_hour=200)
+        assert intervals["HOT"] == 60
+        intervals = plan_intervals({"HOT": 10000, "COLD": 0}, credits_per_hour=61)
+        assert intervals == {"HOT": 60, "COLD": 3600}
+
+    def test_volatility_raises_priority(self) -> None:
+        intervals = plan_intervals({"CALM": symbol_weight(5, 0.001), "WILD": symbol_weight(5, 0.03),
+                                    **{f"S{i}": 1 for i in range(100)}}, credits_per_hour=300)
+        assert intervals["WILD"] < intervals["CALM"]
+
+    def test_over_budget_falls_back_to_max_interval(self) -> None:
+        intervals = plan_intervals({f"S{i}": 1 for i in range(100)}, credits_per_hour=10)
+        assert set(intervals.values()) == {3600}
+        assert plan_intervals({}, credits_per_hour=10) == {}
@@ -1,6 +1,12 @@
+import io
+import os
+import time
 import unittest
+from unittest.mock import patch
 
+from boto3.s3.transfer import TransferConfig
 from main.libs.s3 import S3
+from test.conftest import local_s3, post_form
 
 
 class TestS3Lib(unittest.TestCase):
@@ -8,3 +14,51 @@ class TestS3Lib(unittest.TestCase):
     def test_get_client(cls):
         client = S3.get_client()
         assert str(type(client)) == "<class 'botocore.client.S3'>"
+        assert S3.get_client() is client
+
+
+class TestS3Uploads(unittest.TestCase):
+    def setUp(self) -> None:
+        self.local_s3 = local_s3()
+        self.server = self.local_s3.__enter__()
+
+    def tearDown(self) -> None:
+        self.local_s3.__exit__(None, None, None)
+
+    def test_upload_fileobj(self) -> None:
+        url = S3.upload_fileobj(io.BytesIO(b"abcdef"), "report_exhibits/test.png", "image/png")
+        assert url == f"{S3.S3_ENDPOINT_URL}/report_exhibits/test.png"
+        assert self.server.objects[("bucket", "report_exhibits/test.png")] == b"abcdef"
+        assert [command for command, _, _ in self.server.requests] == ["PUT"]
+
+    def test_large_files_are_uploaded_in_parts(self) -> None:
+        # parts are at least 5MB, S3's minimum
+        data = os.urandom(11 * 1024 * 1024)
+        config = TransferConfig(multipart_threshold=5 * 1024 * 1024, multipart_chunksize=5 * 1024 * 1024)
+        with patch.object(S3, "TRANSFER_CONFIG", config):
+            S3.upload_fileobj(io.BytesIO(data), "report_exhibits/large.png", "image/png")
+        assert self.server.objects[("bucket", "report_exhibits/large.png")] == data
+        part_uploads = [query for command, _, query in self.server.requests if "partNumber" in query]
+        assert len(part_uploads) == 3
+
+    def test_uploads_run_concurrently(self) -> None:
+        self.server.delay = 0.2
+        start = time.monotonic()
+        futures = [S3.get_executor().submit(S3.upload_fileobj, io.BytesIO(b"abcdef"), f"report_exhibits/{i}.png",
+                                            "image/png") for i in range(5)]
+        for future in futures:
+            future.result()
+        assert time.monotonic() - start < 0.6
+        assert len(self.server.objects) == 5
+
+    def test_presigned_post(self) -> None:
+        post = S3.presigned_post("user_images/test.png", "image/png", max_size=1024, expires_in=600)
+        assert post["url"] == f"{self.server.url}/bucket"
+        assert post["fields"]["key"] == "user_images/test.png"
+        assert post["fields"]["Content-Type"] == "image/png"
+        assert "policy" in post["fields"]
+        assert S3.head_object("user_images/test.png") is None
+
+        assert post_form(post["url"], post["fields"], b"abcdef") == 204
+        head = S3.head_object("user_images/test.png")
+        assert (head["ContentLength"], head["ContentType"]) == (6, "image/png")
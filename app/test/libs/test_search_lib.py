@@ -0,0 +1,38 @@
+import unittest
+from main.libs.search import SearchIndex
+
+
+class TestSearch(unittest.TestCase):
+    def setUp(self) -> None:
+        self.index = SearchIndex(
+            stocks=[
+                {"symbol": "GM", "company_name": "General Motors Company", "num_ideas": 2},
+                {"symbol": "AAPL", "company_name": "Apple Inc.", "num_ideas": 5},
+                {"symbol": "APD", "company_name": "Air Products and Chemicals, Inc.", "num_ideas": 1},
+                {"symbol": "GE", "company_name": "General Electric Company", "num_ideas": 3},
+                {"symbol": "A", "company_name": "Agilent Technologies, Inc.", "num_ideas": 1},
+            ],
+            analysts=["analyst10", "Analyst1", "bob", "analyst2"])
+
+    def symbols(self, query: str, limit: int = 10) -> list:
+        return [stock["symbol"] for stock in self.index.search_stocks(query, limit)]
+
+    def test_search_stocks(self) -> None:
+        # exact symbol, then symbol and name prefixes, then word prefixes, ties by number of ideas
+        assert self.symbols("a") == ["A", "AAPL", "APD"]
+        assert self.symbols("gm") == ["GM"]
+        assert self.symbols("Gen") == ["GE", "GM"]
+        assert self.symbols("motors") == ["GM"]
+        # substrings need 3 characters
+        assert self.symbols("ompan") == ["GE", "GM"]
+        assert self.symbols("ec") == []
+        assert self.symbols("ppl") == ["AAPL"]
+        assert self.symbols("inc", limit=2) == ["AAPL", "A"]
+        assert self.symbols("  ") == []
+        assert self.index.search_stocks("aapl") == [{"symbol": "AAPL", "companyName": "Apple Inc."}]
+
+    def test_search_analysts(self) -> None:
+        assert self.index.search_analysts("ANALYST") == [
+            {"username": "Analyst1"}, {"username": "analyst2"}, {"username": "analyst10"}]
+        assert self.index.search_analysts("analyst1", limit=1) == [{"username": "Analyst1"}]
+        assert self.index.search_analysts("z") == []
@@ -0,0 +1,65 @@
+import datetime
+import unittest
+from main.db import db
+from main.libs.serializer import compile_schema, CompiledSchema
+from main.model.idea import IdeaModel
+from main.model.user import UserModel
+from main.schema.idea_schema import IdeaSchema, idea_list_schema
+from main.schema.user_schema import UserSchema, user_follow_list_schema, analyst_leaderboard_schema
+from test.conftest import flask_test_client
+
+NUM_IDEAS = 1000
+
+
+class TestSerializer(unittest.TestCase):
+    def setUp(self) -> None:
+        self.app = flask_test_client()
+        db.create_all()
+        self.seed()
+
+    @staticmethod
+    def seed() -> None:
+        now = datetime.datetime.utcnow()
+        db.session.execute(UserModel.__table__.insert(), [
+            {"id": i, "email": f"user{i}@email.com", "username": f"user{i}", "password_hash": "hash",
+             "is_analyst": i % 2 == 0, "num_ideas": 10, "analyst_rank": i if i % 3 else None,
+             "avg_return": 0.1 * i, "pro_tier_status": False}
+            for i in range(1, 51)])
+        db.session.execute(IdeaModel.__table__.insert(), [
+            {"id": i, "created_at": now - datetime.timedelta(minutes=i), "symbol": "AAPL",
+             "position_type": "long", "agreed_to_terms": True, "price_target": 100, "company_name": "Apple Inc.",
+             "market_cap": 1000000000, "sector": "technology", "entry_price": 90.5, "last_price": 95,
+             "closed_date": now if i % 4 == 0 else None, "score": i, "thesis_summary": "summary",
+             "full_report": "report", "analyst_id": i % 50 + 1}
+            for i in range(1, NUM_IDEAS + 1)])
+        db.session.commit()
+
+    def test_output_matches_marshmallow(self) -> None:
+        ideas = IdeaModel.query.all()
+        users = UserModel.query.all()
+        cases = [
+            (idea_list_schema, IdeaSchema(many=True, exclude=("full_report", "exhibits", "comments")), ideas),
+            (user_follow_list_schema, UserSchema(many=True, only=(
+                "id", "username", "image_url", "image_variants", "is_analyst")),
+             users),
+            (analyst_leaderboard_schema, UserSchema(many=True, exclude=('upvotes', 'downvotes', 'bookmarks')),
+             users),
+        ]
+        for compiled, schema, objects in cases:
+            assert isinstance(compiled, CompiledSchema)
+            assert compiled.dump(objects) == schema.dump(objects)
+            assert compiled.dump(objects[0], many=False) == schema.dump(objects[0], many=False)
+
+        # nested objects that aren't loaded serialize as None
+        idea = IdeaModel(symbol="GM", score=None)
+        schema = IdeaSchema(exclude=("comments",))
+        assert compile_schema(schema).dump(idea) == schema.dump(idea)
+
+        # so do plain dicts
+        user = {"id": 1, "username": "user", "image_url": None, "is_analyst": 1}
+        assert user_follow_list_schema.dump([user]) == [{"id": 1, "username": "user", "imageUrl": None,
+                                                         "isAnalyst": True}]
+
+    def tearDown(self) -> None:
+        db.session.remove()
+        db.drop_all()
@@ -0,0 +1,80 @@
+import tempfile
+import threading
+import time
+import unittest
+from main.libs.single_flight import SingleFlight
+
+
+class TestSingleFlight(unittest.TestCase):
+    def setUp(self) -> None:
+        self.shared_dir = tempfile.TemporaryDirectory()
+        self.calls = 0
+
+    def tearDown(self) -> None:
+        self.shared_dir.cleanup()
+
+    def slow_call(self, value="value", delay=0.2):
+        def call():
+            self.calls += 1
+            time.sleep(delay)
+            return value
+        return call
+
+    def run_concurrently(self, calls) -> list:
+        results = [None] * len(calls)
+
+        def run(idx):
+            results[idx] = calls[idx]()
+
+        threads = [threading.Thread(target=run, args=(idx,)) for idx in range(len(calls))]
+        for thread in threads:
+            thread.start()
+            time.sleep(0.01)
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_concurrent_calls_share_one_call(self) -> None:
+        flights = SingleFlight()
+        results = self.run_concurrently([lambda: flights.do(("quote", "AAPL"), self.slow_call())] * 10)
+        assert results == ["value"] * 10
+        assert self.calls == 1
+        assert flights.stats() == {"calls": 10, "executed": 1, "deduplicated": 9, "shared": 0}
+
+        # finished calls aren't cached
+        flights.do(("quote", "AAPL"), self.slow_call(delay=0))
+        assert self.calls == 2
+
+    def test_different_keys_are_not_coalesced(self) -> None:
+        flights = SingleFlight()
+        self.run_concurrently([lambda: flights.do(("quote", "AAPL"), self.slow_call()),
+                               lambda: flights.do(("company", "AAPL"), self.slow_call())])
+        assert self.calls == 2
+
+    def test_errors_are_shared_with_waiting_callers(self) -> None:
+        flights = SingleFlight()
+
+        def fail():
+            time.sleep(0.2)
+            raise ValueError("upstream down")
+
+        def call():
+            try:
+                return flights.do("key", fail)
+            except ValueError as e:
+                return str(e)
+
+        assert self.run_concurrently([call] * 3) == ["upstream down"] * 3
+        assert flights.in_flight == {}
+
+    def test_calls_are_shared_across_workers(self) -> None:
+        # separate instances stand in for separate processes, they only share the lock files
+        workers = [SingleFlight(shared_dir=self.shared_dir.name) for _ in range(3)]
+        results = self.run_concurrently([lambda worker=worker: worker.do(("quote", "AAPL"), self.slow_call({"a": 1}))
+                                         for worker in workers])
+        assert results == [{"a": 1}] * 3
+        assert self.calls == 1
+        assert sum(worker.stats()["shared"] for worker in workers) == 2
+
+        # a later call doesn't reuse the result
+        assert workers[1].do(("quote", "AAPL"), self.slow_call({"a": 2}, delay=0)) == {"a": 2}
@@ -0,0 +1,112 @@
+import datetime
+import time
+import unittest
+import pytz
+import requests_mock
+from requests.exceptions import ConnectTimeout
+
+from main.libs.stock import Stock, StockException, seconds_until_next_close
+from test.conftest import IEX_URL, register_mock_iex
+from test.mock_responses import aapl_chart, aapl_quote
+
+
+class TestStockLib(unittest.TestCase):
+    def setUp(self) -> None:
+        Stock.clear_caches()
+
+    @requests_mock.Mocker()
+    def test_fetch_batch_quotes(self, mock):
+        register_mock_iex(mock)
+        quotes = Stock.fetch_batch_quotes(["aapl", "AAPL", "gm"])
+        assert set(quotes.keys()) == {"AAPL", "GM"}
+        assert quotes["AAPL"]["latestPrice"] == 313.49
+        assert mock.call_count == 1
+        assert mock.last_request.qs["symbols"] == ["aapl,gm"]
+
+    @requests_mock.Mocker()
+    def test_fetch_batch_quotes_is_chunked(self, mock):
+        mock.get(IEX_URL + '/market/batch', json={})
+        symbols = [f"S{i}" for i in range(Stock.BATCH_SYMBOL_LIMIT * 2 + 1)]
+        Stock.fetch_batch_quotes(symbols)
+        assert mock.call_count == 3
+
+    @requests_mock.Mocker()
+    def test_fetch_stock_data(self, mock):
+        register_mock_iex(mock)
+        mock.get(IEX_URL + '/AAPL/chart/1y', json=aapl_chart)
+        responses = Stock.fetch_stock_data("AAPL", with_chart=True)
+        assert responses["quote"]["latestPrice"] == 313.49
+        assert responses["company"]["companyName"] == "Apple, Inc."
+        assert len(responses["chart"]) > 0
+        assert "chart" not in Stock.fetch_stock_data("AAPL")
+
+    def test_fetch_concurrently_runs_calls_in_parallel(self):
+        def slow_call():
+            time.sleep(0.2)
+            return {}
+
+        start = time.time()
+        results = Stock.fetch_concurrently({"a": slow_call, "b": slow_call, "c": slow_call})
+        assert set(results.keys()) == {"a", "b", "c"}
+        assert time.time() - start < 0.5
+
+    @requests_mock.Mocker()
+    def test_concurrent_quotes_share_one_request(self, mock):
+        def slow_quote(request, context):
+            time.sleep(0.2)
+            return aapl_quote
+
+        mock.get(IEX_URL + '/AAPL/quote', json=slow_quote)
+        before = Stock.FLIGHTS.stats()
+        results = Stock.fetch_concurrently({str(i): lambda: Stock.fetch_stock_quote("aapl") for i in range(5)})
+        assert all(quote["latestPrice"] == 313.49 for quote in results.values())
+        assert mock.call_count == 1
+        assert Stock.FLIGHTS.stats()["deduplicated"] - before["deduplicated"] == 4
+
+    @requests_mock.Mocker()
+    def test_fetch_financial_metrics_is_cached(self, mock):
+        register_mock_iex(mock)
+        metrics = Stock.fetch_financial_metrics("aapl")
+        assert metrics["forwardPE"] == 18.14
+        assert metrics["latestPrice"] == 313.49
+        assert mock.call_count == 2
+        assert Stock.fetch_financial_metrics("AAPL") == metrics
+        assert mock.call_count == 2
+
+        # price fields expire long before fundamentals
+        Stock.PRICE_METRICS.clear()
+        Stock.CACHE.clear()
+        assert Stock.fetch_financial_metrics("AAPL") == metrics
+        assert mock.call_count == 3
+        assert mock.last_request.path.endswith("/aapl/quote")
+
+    @requests_mock.Mocker()
+    def test_responses_are_cached_per_endpoint(self, mock):
+        register_mock_iex(mock)
+        mock.get(IEX_URL + '/AAPL/chart/1y', json=aapl_chart)
+        hits = Stock.CACHE.stats()["hits"]
+        for _ in range(2):
+            Stock.fetch_stock_data("aapl", with_chart=True)
+        assert mock.call_count == 3
+        assert Stock.CACHE.stats()["hits"] - hits == 3
+
+        # quotes only live for seconds
+        Stock.CACHE.backend.set("quote:AAPL", b'{"latestPrice": 1}', ttl=0.01)
+        time.sleep(0.02)
+        assert Stock.fetch_stock_quote("AAPL")["latestPrice"] == 313.49
+        assert mock.call_count == 4
+
+    def test_seconds_until_next_close(self):
+        eastern = pytz.timezone("America/New_York")
+        # Wednesday morning, Wednesday after the close and Saturday
+        wednesday = eastern.localize(datetime.datetime(2020, 6, 3, 9, 30))
+        assert seconds_until_next_close(wednesday) == 6.5 * 3600
+        assert seconds_until_next_close(wednesday + datetime.timedelta(hours=7)) == 23.5 * 3600
+        saturday = eastern.localize(datetime.datetime(2020, 6, 6, 12))
+        assert seconds_until_next_close(saturday) == (48 + 4) * 3600
+
+    @requests_mock.Mocker()
+    def test_upstream_timeout_raises_stock_exception(self, mock):
+        mock.get(IEX_URL + '/AAPL/quote', exc=ConnectTimeout)
+        with self.assertRaises(StockException):
+            Stock.fetch_stock_quote("AAPL")
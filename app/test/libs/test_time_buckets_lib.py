@@ -0,0 +1,60 @@
+import datetime
+import random
+import unittest
+from main.libs.time_buckets import HOUR, DAY, PERIOD_LENGTHS, bucket_start, bucket_starts, split_range
+
+
+class TestTimeBuckets(unittest.TestCase):
+    def count(self, times, start, end) -> int:
+        """Counts times in start < t < end the way a caller of split_range would"""
+        split = split_range(start, end)
+        count = 0
+        for low, inclusive, high in split.raw:
+            count += sum(1 for time in times if (time >= low if inclusive else time > low) and time < high)
+        for period, ranges in ((HOUR, split.hours), (DAY, split.days)):
+            for low, high in ranges:
+                count += sum(1 for time in times
+                             if (low is None or bucket_start(time, period) >= low)
+                             and (high is None or bucket_start(time, period) < high))
+        return count
+
+    def test_bucket_start(self) -> None:
+        time = datetime.datetime(2020, 5, 17, 13, 45, 12, 5)
+        assert bucket_start(time, HOUR) == datetime.datetime(2020, 5, 17, 13)
+        assert bucket_start(time, DAY) == datetime.datetime(2020, 5, 17)
+        assert bucket_starts(time, datetime.datetime(2020, 5, 17, 16), HOUR) == [
+            datetime.datetime(2020, 5, 17, hour) for hour in (13, 14, 15)]
+
+    def test_split_range_matches_raw_count(self) -> None:
+        random.seed(7)
+        origin = datetime.datetime(2020, 5, 1)
+        span = datetime.timedelta(days=10)
+        times = [origin + span * random.random() for _ in range(300)]
+        # rows exactly on bucket boundaries
+        times += [datetime.datetime(2020, 5, 3), datetime.datetime(2020, 5, 3, 4)]
+        bounds = times[:40] + [None, origin, datetime.datetime(2020, 5, 3), datetime.datetime(2020, 5, 3, 4),
+                               datetime.datetime(2020, 5, 3, 4, 30)]
+        for start in bounds:
+            for end in bounds:
+                expected = sum(1 for time in times
+                               if (start is None or time > start) and (end is None or time < end))
+                assert self.count(times, start, end) == expected, (start, end)
+
+    def test_split_range_uses_whole_buckets(self) -> None:
+        start = datetime.datetime(2020, 5, 1, 22, 30)
+        end = datetime.datetime(2020, 5, 9, 2, 15)
+        split = split_range(start, end)
+        assert split.raw == [(start, False, datetime.datetime(2020, 5, 1, 23)),
+                             (datetime.datetime(2020, 5, 9, 2), True, end)]
+        assert split.hours == [(datetime.datetime(2020, 5, 1, 23), datetime.datetime(2020, 5, 2)),
+                               (datetime.datetime(2020, 5, 9), datetime.datetime(2020, 5, 9, 2))]
+        assert split.days == [(datetime.datetime(2020, 5, 2), datetime.datetime(2020, 5, 9))]
+        # buckets stay bounded by days in the range, not by its length in hours
+        num_hours = sum((high - low) / PERIOD_LENGTHS[HOUR] for low, high in split.hours)
+        assert num_hours == 3
+
+    def test_split_range_without_bounds(self) -> None:
+        assert split_range(None, None) == ([], [], [(None, None)])
+        time = datetime.datetime(2020, 5, 1, 10)
+        assert split_range(time, time) == ([], [], [])
+        assert split_range(time, time - PERIOD_LENGTHS[HOUR]) == ([], [], [])
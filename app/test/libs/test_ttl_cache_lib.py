@@ -0,0 +1,99 @@
+import threading
+import time
+import unittest
+from main.libs.ttl_cache import TTLCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestTTLCache(unittest.TestCase):
+    def setUp(self) -> None:
+        self.clock = Clock()
+        self.cache = TTLCache(ttl=10, stale_ttl=20, clock=self.clock)
+        self.calls = 0
+
+    def load(self, value="value"):
+        def load():
+            self.calls += 1
+            return value
+        return load
+
+    def wait_for_refresh(self, key) -> None:
+        deadline = time.time() + 2
+        while key in self.cache.in_flight and time.time() < deadline:
+            time.sleep(0.01)
+
+    def test_fresh_values_are_cached(self) -> None:
+        assert self.cache.get("aapl", self.load()) == "value"
+        self.clock.now = 9
+        assert self.cache.get("aapl", self.load("new")) == "value"
+        assert self.calls == 1
+
+    def test_stale_values_are_served_while_refreshing(self) -> None:
+        self.cache.get("aapl", self.load())
+        self.clock.now = 15
+        assert "aapl" in self.cache
+        assert self.cache.get("aapl", self.load("new")) == "value"
+        self.wait_for_refresh("aapl")
+        assert self.cache.get("aapl", self.load("newer")) == "new"
+        assert self.calls == 2
+
+        # past the stale window the caller waits for a new value
+        self.clock.now = 15 + 10 + 20
+        assert "aapl" not in self.cache
+        assert self.cache.get("aapl", self.load("newest")) == "newest"
+
+    def test_failed_refresh_keeps_stale_value(self) -> None:
+        self.cache.get("aapl", self.load())
+        self.clock.now = 15
+
+        def fail():
+            raise ValueError("upstream down")
+
+        assert self.cache.get("aapl", fail) == "value"
+        self.wait_for_refresh("aapl")
+        assert self.cache.get("aapl", self.load("new")) in ("value", "new")
+
+    def test_errors_are_not_cached(self) -> None:
+        def fail():
+            raise ValueError("upstream down")
+
+        with self.assertRaises(ValueError):
+            self.cache.get("aapl", fail)
+        assert self.cache.get("aapl", self.load()) == "value"
+
+    def test_concurrent_misses_share_one_load(self) -> None:
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow_load():
+            self.calls += 1
+            started.set()
+            release.wait(2)
+            return "value"
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.cache.get("aapl", slow_load)))
+                   for _ in range(20)]
+        threads[0].start()
+        started.wait(2)
+        for thread in threads[1:]:
+            thread.start()
+        release.set()
+        for thread in threads:
+            thread.join()
+        assert results == ["value"] * 20
+        assert self.calls == 1
+
+    def test_max_entries(self) -> None:
+        cache = TTLCache(ttl=10, max_entries=2, clock=self.clock)
+        for key in ("a", "b", "c"):
+            cache.get(key, self.load(key))
+        assert "a" not in cache
+        assert "b" in cache and "c" in cache
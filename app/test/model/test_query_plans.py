@@ -0,0 +1,134 @@
+import datetime
+import random
+import unittest
+from main.db import db
+from test.conftest import flask_test_client, QueryPlanChecker
+from main.model.user import UserModel
+from main.model.idea import IdeaModel
+from main.model.follow import FollowModel
+from main.model.upvote import UpvoteModel
+from main.model.downvote import DownvoteModel
+from main.model.bookmark import BookmarkModel
+from main.model.comment import CommentModel
+from main.model.download import DownloadModel
+from main.model.review import ReviewModel
+from main.model.timeline import TimelineModel
+from main.service.user_service import UserService
+from main.service.idea_service import IdeaService
+from main.service.follow_service import FollowService
+from main.service.upvote_service import UpvoteService
+from main.service.downvote_service import DownvoteService
+from main.service.bookmark_service import BookmarkService
+from main.service.comment_service import CommentService
+from main.service.download_service import DownloadService
+from main.service.review_service import ReviewService
+
+NUM_USERS = 500
+NUM_IDEAS = 5000
+NUM_ROWS_PER_TABLE = 10000
+
+
+def random_pairs(count: int, num_left: int, num_right: int) -> set:
+    pairs = set()
+    while len(pairs) < count:
+        pairs.add((random.randint(1, num_left), random.randint(1, num_right)))
+    return pairs
+
+
+class TestQueryPlans(unittest.TestCase):
+    def setUp(self) -> None:
+        self.app = flask_test_client()
+        db.create_all()
+        self.seed()
+
+    @staticmethod
+    def seed() -> None:
+        """
+        Inserts enough rows that a missing index shows up as a full table scan.
+        The tables are new, so users and ideas get the ids 1 to NUM_USERS and 1 to NUM_IDEAS the other rows use.
+        """
+        random.seed(0)
+        now = datetime.datetime.utcnow()
+
+        def created_at(i):
+            return now - datetime.timedelta(minutes=i)
+
+        db.session.execute(UserModel.__table__.insert(), [
+            {"email": f"user{i}@email.com", "username": f"user{i}", "password_hash": "hash",
+             "stripe_cust_id": f"cus_{i}", "is_analyst": True, "num_ideas": 10}
+            for i in range(1, NUM_USERS + 1)])
+        db.session.execute(IdeaModel.__table__.insert(), [
+            {"created_at": created_at(i), "symbol": random.choice(["AAPL", "GM", "TSLA", "MSFT"]),
+             "position_type": "long", "agreed_to_terms": True, "price_target": 100, "company_name": "Company",
+             "market_cap": 1000000000, "sector": "technology", "entry_price": 90, "last_price": 95,
+             "score": random.randint(-10, 100), "thesis_summary": "summary", "full_report": "report",
+             "analyst_id": random.randint(1, NUM_USERS)}
+            for i in range(1, NUM_IDEAS + 1)])
+        db.session.execute(FollowModel.__table__.insert(), [
+            {"user_id": user_id, "analyst_id": analyst_id, "created_at": created_at(i)}
+            for i, (user_id, analyst_id) in enumerate(random_pairs(NUM_ROWS_PER_TABLE, NUM_USERS, NUM_USERS))])
+        for model in (UpvoteModel, DownvoteModel, BookmarkModel, DownloadModel):
+            db.session.execute(model.__table__.insert(), [
+                {"user_id": user_id, "idea_id": idea_id, "created_at": created_at(i)}
+                for i, (user_id, idea_id) in enumerate(random_pairs(NUM_ROWS_PER_TABLE, NUM_USERS, NUM_IDEAS))])
+        db.session.execute(TimelineModel.__table__.insert(), [
+            {"user_id": user_id, "idea_id": idea_id, "analyst_id": 1, "created_at": created_at(idea_id)}
+            for user_id, idea_id in random_pairs(NUM_ROWS_PER_TABLE, NUM_USERS, NUM_IDEAS)])
+        db.session.execute(CommentModel.__table__.insert(), [
+            {"user_id": user_id, "idea_id": idea_id, "body": "comment", "created_at": created_at(i)}
+            for i, (user_id, idea_id) in enumerate(random_pairs(NUM_ROWS_PER_TABLE, NUM_USERS, NUM_IDEAS))])
+        db.session.execute(ReviewModel.__table__.insert(), [
+            {"user_id": user_id, "analyst_id": analyst_id, "title": "title", "body": "body", "stars": 5,
+             "created_at": created_at(i)}
+            for i, (user_id, analyst_id) in enumerate(random_pairs(NUM_ROWS_PER_TABLE, NUM_USERS, NUM_USERS))])
+        db.session.commit()
+        # refresh planner statistics, as autovacuum would in production
+        db.session.execute("ANALYZE")
+        db.session.commit()
+
+    def test_hot_lookups_use_indexes(self) -> None:
+        with QueryPlanChecker(db.engine) as checker:
+            UserService.get_user_by_username("USER7")
+            UserService.get_user_by_email("User7@Email.com")
+            UserService.get_user_by_stripe_cust_id("CUS_7")
+
+            IdeaService.query_ideas(page_size=20)
+            IdeaService.query_ideas(query_string={"sort": "top"}, page_size=20)
+            IdeaService.query_ideas(analyst_ids=[3, 5, 8], page_size=20)
+            IdeaService.query_ideas(query_string={"symbol": "aapl"}, page_size=20)
+            IdeaService.query_following_page(user_id=3, page_size=20)
+
+            FollowService.get_follow_by_user_and_analyst(user_id=3, analyst_id=5)
+            FollowService.get_followers(5)
+            FollowService.get_following(3)
+
+            UpvoteService.get_upvote_by_user_and_idea(user_id=3, idea_id=7)
+            UpvoteService.get_all_upvotes_for_idea(7)
+            UpvoteService.get_users_upvoted_ideas(3)
+            DownvoteService.get_downvote_by_user_and_idea(user_id=3, idea_id=7)
+            DownvoteService.get_all_downvotes_for_idea(7)
+            BookmarkService.get_bookmark_by_user_and_idea(user_id=3, idea_id=7)
+            BookmarkService.get_users_bookmarked_ideas(3)
+            CommentService.get_all_comments_for_idea(7)
+
+            DownloadService.get_idea_download_count(7)
+            DownloadService.get_user_download_count(3)
+            DownloadService.get_analyst_download_count(5)
+
+            ReviewService.get_review_by_user_and_analyst(user_id=3, analyst_id=5)
+            ReviewService.get_all_reviews_for_analyst(5)
+
+        assert len(checker.statements) > 0
+        assert checker.full_table_scans() == []
+
+    def test_checker_reports_full_table_scans(self) -> None:
+        with QueryPlanChecker(db.engine) as checker:
+            IdeaModel.query.filter(IdeaModel.thesis_summary == "summary").first()
+
+        scans = checker.full_table_scans()
+        assert len(scans) == 1
+        assert "ideas" in scans[0][1]
+
+    def tearDown(self) -> None:
+        db.session.remove()
+        db.drop_all()
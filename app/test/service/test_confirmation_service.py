@@ -18,8 +18,11 @@ class TestConfirmationService(unittest.TestCase):
     def test_send_confirmation_email(self, mock) -> None:
         register_mock_mailgun(mock)
         self.user_service.save_new_user("email@email.com", "user1", "password")
-        response = self.confirmation_service.send_confirmation_email(1)
-        assert response.status_code == 200
+        message = self.confirmation_service.send_confirmation_email(1)
+        # queued, Mailgun isn't called in the request
+        assert not mock.called
+        assert message.status == "pending"
+        assert message.variables["code"] == self.confirmation_service.get_confirmation_by_id(1).code
 
     def test_get_confirmation_by_id(self, mock) -> None:
         register_mock_mailgun(mock)
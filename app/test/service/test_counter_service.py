@@ -0,0 +1,105 @@
+import threading
+import unittest
+import requests_mock
+from main.db import db
+from main.model.idea import IdeaModel
+from main.model.user import UserModel
+from main.service.user_service import UserService
+from main.service.upvote_service import UpvoteService
+from main.service.downvote_service import DownvoteService
+from main.service.follow_service import FollowService
+from main.service.counter_service import CounterService
+from test.conftest import flask_test_client, register_mock_iex, register_mock_mailgun
+from main.libs.util import create_idea
+
+NUM_VOTERS = 50
+
+
+@requests_mock.Mocker()
+class TestCounterService(unittest.TestCase):
+    def setUp(self) -> None:
+        self.user_service = UserService()
+        self.client = flask_test_client()
+        db.create_all()
+
+    def test_increment(self, mock) -> None:
+        register_mock_iex(mock)
+        register_mock_mailgun(mock)
+
+        analyst = self.user_service.save_new_user("email1@email.com", "analyst1", "password", is_analyst=True)
+        idea = create_idea(analyst.id, "aapl", False)
+        CounterService.increment(IdeaModel, idea.id, num_upvotes=3, score=2)
+        # objects already in the session see the new values
+        assert (idea.num_upvotes, idea.score) == (3, 2)
+        CounterService.increment(IdeaModel, idea.id, num_upvotes=-1)
+        assert IdeaModel.query.filter_by(id=idea.id).first().num_upvotes == 2
+
+        with self.assertRaises(ValueError):
+            CounterService.increment(IdeaModel, idea.id + 1, num_upvotes=1)
+
+    def test_reconcile(self, mock) -> None:
+        register_mock_iex(mock)
+        register_mock_mailgun(mock)
+
+        user = self.user_service.save_new_user("user@email.com", "user", "password")
+        analyst = self.user_service.save_new_user("email1@email.com", "analyst1", "password", is_analyst=True)
+        idea = create_idea(analyst.id, "aapl", False)
+        UpvoteService().save_new_upvote(user.id, idea.id)
+        DownvoteService().save_new_downvote(analyst.id, idea.id)
+        FollowService().save_new_follow(user.id, analyst.id)
+        assert CounterService.reconcile() == []
+
+        idea.num_upvotes = 5
+        user.num_following = 0
+        db.session.commit()
+        drift = CounterService.reconcile(fix=False)
+        assert sorted((row["table"], row["column"], row["stored"], row["actual"]) for row in drift) == [
+            ("ideas", "num_upvotes", 5, 1), ("users", "num_following", 0, 1)]
+        assert len(CounterService.reconcile()) == 2
+        assert CounterService.reconcile() == []
+        assert IdeaModel.query.filter_by(id=idea.id).first().num_upvotes == 1
+
+    def test_concurrent_votes_are_not_lost(self, mock) -> None:
+        register_mock_iex(mock)
+        register_mock_mailgun(mock)
+
+        analyst = self.user_service.save_new_user("email1@email.com", "analyst1", "password", is_analyst=True)
+        idea_id = create_idea(analyst.id, "aapl", False).id
+        db.session.execute(UserModel.__table__.insert(), [
+            {"email": f"voter{i}@email.com", "username": f"voter{i}", "password_hash": "hash",
+             "num_following": 0, "num_followers": 0}
+            for i in range(NUM_VOTERS)])
+        db.session.commit()
+        voter_ids = [user_id for user_id, in db.session.query(UserModel.id).filter(UserModel.id != analyst.id)]
+
+        app = self.client.application
+        start = threading.Barrier(NUM_VOTERS)
+        errors = []
+
+        def vote(user_id: int) -> None:
+            with app.app_context():
+                start.wait()
+                try:
+                    UpvoteService().save_new_upvote(user_id, idea_id)
+                    FollowService().save_new_follow(user_id, analyst.id)
+                except Exception as e:
+                    errors.append(e)
+                finally:
+                    db.session.remove()
+
+        voters = [threading.Thread(target=vote, args=(user_id,)) for user_id in voter_ids]
+        for voter in voters:
+            voter.start()
+        for voter in voters:
+            voter.join()
+
+        assert errors == []
+        db.session.expire_all()
+        idea = IdeaModel.query.filter_by(id=idea_id).first()
+        assert (idea.num_upvotes, idea.score) == (NUM_VOTERS, NUM_VOTERS)
+        assert UserModel.query.filter_by(id=analyst.id).first().num_followers == NUM_VOTERS
+        assert CounterService.reconcile(fix=False) == []
+
+    def tearDown(self) -> None:
+        db.session.remove()
+        db.drop_all()
@@ -7,6 +7,8 @@ from main.service.user_service import UserService
 from main.service.idea_service import IdeaService
 from main.service.download_service import DownloadService
 from main.model.idea import IdeaModel
+from main.model.download import DownloadModel
+from main.model.download_rollup import IdeaDownloadRollupModel, UserDownloadRollupModel
 from main.libs.util import create_idea
 
 
@@ -99,6 +101,81 @@ class TestDownloadService(unittest.TestCase):
         count = self.download_service.get_analyst_download_count(analyst.id)
         assert count == 2
 
+    def rollup_rows(self) -> set:
+        return {(row.idea_id, row.analyst_id, row.period, row.bucket, row.count)
+                for row in IdeaDownloadRollupModel.query.all()} | \
+               {(row.user_id, row.period, row.bucket, row.count) for row in UserDownloadRollupModel.query.all()}
+
+    def test_rollups_are_maintained_on_insert(self, mock) -> None:
+        register_mock_iex(mock)
+        register_mock_mailgun(mock)
+
+        user = self.user_service.save_new_user("user@email.com", "user", "password")
+        analyst = self.user_service.save_new_user("analyst@email.com", "analyst", "password", is_analyst=True)
+        ideas = [create_idea(analyst.id, symbol, False) for symbol in ("aapl", "gm")]
+        for idea in ideas + ideas[:1]:
+            self.download_service.save_new_download(user.id, idea.id)
+        self.download_service.save_new_download(analyst.id, ideas[1].id)
+
+        rows = self.rollup_rows()
+        assert len(IdeaDownloadRollupModel.query.all()) == 4
+        assert sum(row.count for row in IdeaDownloadRollupModel.query.filter_by(period="day")) == 4
+        assert self.download_service.rebuild_rollups() == (4, 4)
+        assert self.rollup_rows() == rows
+
+    def test_counts_sum_buckets_over_date_ranges(self, mock) -> None:
+        register_mock_iex(mock)
+        register_mock_mailgun(mock)
+
+        user = self.user_service.save_new_user("user@email.com", "user", "password")
+        analyst = self.user_service.save_new_user("analyst@email.com", "analyst", "password", is_analyst=True)
+        ideas = [create_idea(analyst.id, symbol, False) for symbol in ("aapl", "gm")]
+        origin = datetime.datetime(2020, 5, 1, 9, 30)
+        times = [origin + datetime.timedelta(hours=7 * i, minutes=13 * i) for i in range(40)]
+        db.session.execute(DownloadModel.__table__.insert(), [
+            {"idea_id": ideas[i % 2].id, "user_id": user.id, "created_at": time} for i, time in enumerate(times)])
+        db.session.commit()
+        self.download_service.rebuild_rollups()
+
+        bounds = [None, times[3], times[3] + datetime.timedelta(minutes=1), datetime.datetime(2020, 5, 4),
+                  datetime.datetime(2020, 5, 6, 17), times[30], times[-1]]
+        for start in bounds:
+            for end in bounds:
+                in_range = [i for i, time in enumerate(times)
+                            if (start is None or time > start) and (end is None or time < end)]
+                assert self.download_service.get_idea_download_count(ideas[0].id, start, end) == \
+                    len([i for i in in_range if i % 2 == 0])
+                assert self.download_service.get_user_download_count(user.id, start, end) == len(in_range)
+                assert self.download_service.get_analyst_download_count(analyst.id, start, end) == len(in_range)
+
+        series = self.download_service.get_analyst_download_series(
+            analyst.id, "day", datetime.datetime(2020, 5, 1, 12), datetime.datetime(2020, 5, 4))
+        assert [point["bucket"] for point in series] == [datetime.datetime(2020, 5, day) for day in (1, 2, 3)]
+        assert [point["count"] for point in series] == [
+            len([time for time in times if time.day == day]) for day in (1, 2, 3)]
+        series = self.download_service.get_idea_download_series(
+            ideas[0].id, "hour", origin, origin + datetime.timedelta(hours=3))
+        # from the hour holding start up to end
+        assert [point["bucket"].hour for point in series] == [9, 10, 11, 12]
+        assert [point["count"] for point in series] == [1, 0, 0, 0]
+
+    def test_deleting_ideas_removes_their_downloads_from_rollups(self, mock) -> None:
+        register_mock_iex(mock)
+        register_mock_mailgun(mock)
+
+        user = self.user_service.save_new_user("user@email.com", "user", "password")
+        analyst = self.user_service.save_new_user("analyst@email.com", "analyst", "password", is_analyst=True)
+        ideas = [create_idea(analyst.id, symbol, False) for symbol in ("aapl", "gm")]
+        for idea in ideas + ideas:
+            self.download_service.save_new_download(user.id, idea.id)
+
+        self.idea_service.delete_idea_by_id(ideas[0].id)
+        assert self.download_service.get_user_download_count(user.id) == 2
+        assert self.download_service.get_analyst_download_count(analyst.id) == 2
+        rows = self.rollup_rows()
+        self.download_service.rebuild_rollups()
+        assert self.rollup_rows() == rows
+
     def tearDown(self) -> None:
         db.session.remove()
         db.drop_all()
@@ -0,0 +1,116 @@
+import datetime
+import json
+import time
+import unittest
+from unittest.mock import patch
+from main.db import db, unit_of_work
+from main.model.email_outbox import EmailOutboxModel
+from main.service.confirmation_service import ConfirmationService
+from main.service.email_service import EmailService
+from main.service.password_reset_service import PasswordResetService
+from main.service.user_service import UserService
+from test.conftest import flask_test_client, local_mailgun
+
+
+class TestEmailService(unittest.TestCase):
+    def setUp(self) -> None:
+        self.app = flask_test_client()
+        db.create_all()
+        self.user_service = UserService()
+
+    def test_enqueue_doesnt_send(self) -> None:
+        user = self.user_service.save_new_user("email@email.com", "user1", "password")
+        with local_mailgun() as server:
+            message = ConfirmationService.send_confirmation_email(user.id)
+            assert server.requests == []
+        assert message.status == EmailOutboxModel.PENDING
+        assert message.to_address == "email@email.com"
+        assert message.variables == {"username": "user1", "code": user.most_recent_confirmation.code}
+
+    def test_messages_are_batched(self) -> None:
+        users = [self.user_service.save_new_user(f"email{i}@email.com", f"user{i}", "password") for i in range(3)]
+        for user in users:
+            ConfirmationService.send_confirmation_email(user.id)
+        PasswordResetService().save_new_password_reset(users[0].id)
+        PasswordResetService.send_password_reset_email(users[0].id)
+        # a second email to the same address goes in another batch
+        ConfirmationService.send_confirmation_email(users[0].id)
+        with local_mailgun() as server:
+            assert EmailService.send_pending() == 5
+            assert len(server.requests) == 3
+            confirmations = server.requests[0]
+            assert confirmations["to"] == ["email0@email.com", "email1@email.com", "email2@email.com"]
+            assert confirmations["subject"] == ["Hi %recipient.username%! Please confirm your registration"]
+            assert json.loads(confirmations["recipient-variables"][0])["email1@email.com"] == {
+                "username": "user1", "code": users[1].most_recent_confirmation.code}
+            assert server.requests[1]["to"] == ["email0@email.com"]
+            assert server.requests[1]["subject"] == confirmations["subject"]
+            assert server.requests[2]["to"] == ["email0@email.com"]
+            assert "%recipient.link%" in server.requests[2]["text"][0]
+            assert EmailService.send_pending() == 0
+        messages = EmailOutboxModel.query.order_by(EmailOutboxModel.id).all()
+        assert [message.status for message in messages] == [EmailOutboxModel.SENT] * 5
+        assert [message.provider_id for message in messages] == ["<1@mg.test>"] * 3 + ["<3@mg.test>", "<2@mg.test>"]
+
+    def test_failures_are_retried_with_backoff(self) -> None:
+        message = EmailService.enqueue("email@email.com", "Subject", "Text", "<html>Text</html>")
+        with local_mailgun() as server:
+            server.statuses = [503, 429]
+            assert EmailService.send_pending() == 0
+            assert message.status == EmailOutboxModel.PENDING
+            assert message.attempts == 1
+            assert message.last_error
+            delay = message.next_attempt_at - datetime.datetime.utcnow()
+            assert EmailService.RETRY_DELAY - datetime.timedelta(seconds=5) < delay <= EmailService.RETRY_DELAY
+            # not due yet
+            assert EmailService.send_pending() == 0
+            assert len(server.requests) == 1
+
+            message.next_attempt_at = datetime.datetime.utcnow()
+            EmailService.save_changes(message)
+            assert EmailService.send_pending() == 0
+            assert message.next_attempt_at - datetime.datetime.utcnow() > EmailService.RETRY_DELAY
+
+            message.next_attempt_at = datetime.datetime.utcnow()
+            EmailService.save_changes(message)
+            assert EmailService.send_pending() == 1
+            assert len(server.requests) == 3
+        assert (message.status, message.attempts) == (EmailOutboxModel.SENT, 3)
+
+    def test_failures_are_given_up_on(self) -> None:
+        rejected = EmailService.enqueue("email@email.com", "Subject", "Text", "<html>Text</html>")
+        with local_mailgun() as server:
+            # a bad request won't succeed later
+            server.statuses = [400]
+            EmailService.send_pending()
+            assert (rejected.status, rejected.attempts) == (EmailOutboxModel.FAILED, 1)
+
+            message = EmailService.enqueue("email@email.com", "Subject", "Text", "<html>Text</html>")
+            server.statuses = [500, 500]
+            with patch.object(EmailService, "MAX_ATTEMPTS", 2):
+                EmailService.send_pending()
+                message.next_attempt_at = datetime.datetime.utcnow()
+                EmailService.save_changes(message)
+                EmailService.send_pending()
+        assert (message.status, message.attempts) == (EmailOutboxModel.FAILED, 2)
+        assert EmailService.stats() == {"pending": 0, "sent": 0, "failed": 2, "oldestPendingSeconds": None}
+
+    def test_sent_in_background_after_commit(self) -> None:
+        self.app.application.config["EMAIL_DELIVERY_ENABLED"] = True
+        with local_mailgun() as server:
+            with unit_of_work():
+                message = EmailService.enqueue("email@email.com", "Subject", "Text", "<html>Text</html>")
+                time.sleep(0.2)
+                assert server.requests == []
+            message_id = message.id
+            deadline = time.time() + 10
+            while EmailService.get_message_by_id(message_id).status != EmailOutboxModel.SENT \
+                    and time.time() < deadline:
+                time.sleep(0.05)
+                db.session.remove()
+            assert len(server.requests) == 1
+        assert EmailService.get_message_by_id(message_id).status == EmailOutboxModel.SENT
+
+    def tearDown(self) -> None:
+        db.session.remove()
+        db.drop_all()
@@ -0,0 +1,81 @@
+import csv
+import gzip
+import io
+import json
+import unittest
+import requests_mock
+from main.db import db
+from main.libs import streaming
+from main.service.user_service import UserService
+from main.service.upvote_service import UpvoteService
+from main.service.downvote_service import DownvoteService
+from main.service.download_service import DownloadService
+from main.service.export_service import ExportService
+from test.conftest import flask_test_client, register_mock_iex
+from main.libs.util import create_idea
+
+
+@requests_mock.Mocker()
+class TestExportService(unittest.TestCase):
+    def setUp(self) -> None:
+        self.app = flask_test_client()
+        db.create_all()
+        self.user_service = UserService()
+
+    def create_rows(self, mock):
+        register_mock_iex(mock)
+        analyst = self.user_service.save_new_user("analyst@email.com", "analyst", "password", is_analyst=True)
+        user = self.user_service.save_new_user("user@email.com", "user", "password")
+        ideas = [create_idea(analyst.id, symbol, False) for symbol in ("aapl", "gm", "aapl")]
+        UpvoteService().save_new_upvote(user.id, ideas[0].id)
+        DownvoteService().save_new_downvote(user.id, ideas[1].id)
+        DownloadService().save_new_download(user.id, ideas[2].id)
+        return analyst, user, ideas
+
+    def test_ndjson(self, mock) -> None:
+        analyst, user, ideas = self.create_rows(mock)
+        lines = b"".join(ExportService.stream("ideas")).decode().splitlines()
+        rows = [json.loads(line) for line in lines]
+        assert [row["id"] for row in rows] == [idea.id for idea in ideas]
+        assert rows[1]["symbol"] == "GM"
+        assert rows[0]["created_at"] == ideas[0].created_at.isoformat()
+
+        votes = [json.loads(line) for line in b"".join(ExportService.stream("votes")).decode().splitlines()]
+        assert [(vote["idea_id"], vote["vote"]) for vote in votes] == [(ideas[0].id, "up"), (ideas[1].id, "down")]
+
+        analysts = [json.loads(line) for line in b"".join(ExportService.stream("analysts")).decode().splitlines()]
+        assert [row["username"] for row in analysts] == ["analyst"]
+        assert "email" not in analysts[0]
+
+    def test_csv_gzipped(self, mock) -> None:
+        analyst, user, ideas = self.create_rows(mock)
+        data = gzip.decompress(b"".join(ExportService.stream("downloads", "csv", compress=True)))
+        rows = list(csv.DictReader(io.StringIO(data.decode())))
+        assert len(rows) == 1
+        assert rows[0]["idea_id"] == str(ideas[2].id)
+        assert rows[0]["user_id"] == str(user.id)
+        with self.assertRaises(ValueError):
+            ExportService.stream("users")
+
+    def test_rows_are_streamed_in_chunks(self, mock) -> None:
+        rows = ({"id": i, "symbol": "AAPL"} for i in range(20000))
+        chunks = list(streaming.ndjson_chunks(rows))
+        assert len(chunks) > 1
+        assert all(len(chunk) < 2 * streaming.CHUNK_SIZE for chunk in chunks)
+        compressed = list(streaming.gzip_chunks(iter(chunks)))
+        assert gzip.decompress(b"".join(compressed)) == b"".join(chunks)
+
+        # the source is only read as far as the chunks taken
+        consumed = []
+
+        def source():
+            for i in range(100000):
+                consumed.append(i)
+                yield {"id": i}
+
+        next(streaming.csv_chunks(source(), ["id"]))
+        assert len(consumed) < 100000
+
+    def tearDown(self) -> None:
+        db.session.remove()
+        db.drop_all()
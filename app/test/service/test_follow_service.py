@@ -33,6 +33,17 @@ class TestFollowService(unittest.TestCase):
         not_found = self.follow_service.get_follow_by_id(10)
         assert not_found is None
 
+    def test_save_new_follow_is_all_or_nothing(self, mock) -> None:
+        register_mock_mailgun(mock)
+
+        user = self.user_service.save_new_user("user@email.com", "user", "password")
+        # analyst doesn't exist, so the follow fails after the user's count was incremented
+        with self.assertRaises(ValueError):
+            self.follow_service.save_new_follow(user_id=user.id, analyst_id=10)
+        user = self.user_service.get_user_by_id(user.id)
+        assert user.num_following == 0
+        assert self.follow_service.get_follow_by_user_and_analyst(user_id=user.id, analyst_id=10) is None
+
     def test_get_follow_by_user_and_analyst(self, mock) -> None:
         register_mock_mailgun(mock)
 
@@ -1,15 +1,26 @@
 import datetime
 import json
+import time
 import unittest
 
 import requests_mock
 
+from sqlalchemy import event
+
 from main.db import db
+from main.model.analyst_stats import AnalystStatsModel
+from main.model.bookmark import BookmarkModel
+from main.model.comment import CommentModel
+from main.model.download import DownloadModel
+from main.model.downvote import DownvoteModel
+from main.model.timeline import TimelineModel
+from main.model.upvote import UpvoteModel
+from main.model.user import UserModel
 from main.libs.s3 import S3
 from main.libs.util import create_image_file
 from main.service.idea_service import IdeaService
 from main.service.user_service import UserService
-from test.conftest import flask_test_client, register_mock_iex
+from test.conftest import flask_test_client, register_mock_iex, local_s3
 from main.libs.util import create_idea
 
 
@@ -67,6 +78,33 @@ class TestIdeaService(unittest.TestCase):
         assert new_idea.created_at < datetime.datetime.utcnow()
         assert str(type(new_idea.analyst)) == "<class 'main.model.user.UserModel'>"
 
+    @requests_mock.Mocker()
+    def test_exhibits_upload_concurrently(self, mock) -> None:
+        register_mock_iex(mock)
+        analyst = self.user_service.save_new_user("email@email.com", "analyst", "password", is_analyst=True)
+        with local_s3(delay=0.3) as server:
+            def save(exhibit_names):
+                return self.idea_service.save_new_idea(
+                    analyst_id=analyst.id, symbol="AAPL", position_type="long", agreed_to_terms=True,
+                    price_target=400, entry_price=313.49, thesis_summary="My Thesis Summary",
+                    full_report="My Full Report",
+                    exhibits=[create_image_file(name, "image/png") for name in exhibit_names],
+                    exhibit_title_map={name: f"Exhibit {i}" for i, name in enumerate(exhibit_names)})
+
+            # nothing is uploaded if any exhibit is invalid
+            with self.assertRaises(ValueError):
+                save(["exhibit0.png", "exhibit1.gif"])
+            assert server.objects == {}
+
+            start = time.monotonic()
+            new_idea = save([f"exhibit{i}.png" for i in range(5)])
+            # about as long as one upload, not five
+            assert time.monotonic() - start < 0.9
+            exhibits = json.loads(new_idea.exhibits)
+            assert [exhibit["title"] for exhibit in exhibits] == [f"Exhibit {i}" for i in range(5)]
+            assert len(server.objects) == 5
+            assert all(body.startswith(b"\x89PNG") for body in server.objects.values())
+
     def test_upload_exhibit(self):
         image = create_image_file("test.png", "image/png")
         response_dict = self.idea_service.upload_exhibit("Title", "test.png", image)
@@ -114,6 +152,49 @@ class TestIdeaService(unittest.TestCase):
         idea = self.idea_service.get_idea_by_id(new_idea.id)
         assert idea is None
 
+    @requests_mock.Mocker()
+    def test_delete_ideas(self, mock) -> None:
+        register_mock_iex(mock)
+
+        analyst = self.user_service \
+            .save_new_user("email@email.com", "analyst", "password", is_analyst=True)
+        ideas = [create_idea(analyst.id, symbol, False) for symbol in ("aapl", "aapl", "gm")]
+        db.session.execute(UserModel.__table__.insert(), [
+            {"email": f"user{i}@email.com", "username": f"user{i}", "password_hash": "hash"} for i in range(500)])
+        user_ids = [user_id for user_id, in db.session.query(UserModel.id)]
+        for num_rows, idea in zip((10, 500, 1), ideas):
+            for model in (DownloadModel, UpvoteModel, DownvoteModel, BookmarkModel, CommentModel):
+                db.session.execute(model.__table__.insert(), [
+                    {"user_id": user_id, "idea_id": idea.id, "body": "comment", "created_at": datetime.datetime.utcnow()}
+                    if model is CommentModel else {"user_id": user_id, "idea_id": idea.id}
+                    for user_id in user_ids[:num_rows]])
+        db.session.commit()
+
+        def count_statements(delete) -> int:
+            statements = []
+            listener = lambda *args: statements.append(args[2])
+            event.listen(db.engine, "before_cursor_execute", listener)
+            try:
+                delete()
+            finally:
+                event.remove(db.engine, "before_cursor_execute", listener)
+            return len(statements)
+
+        # round trips don't depend on how many rows reference the idea
+        small = count_statements(lambda: self.idea_service.delete_idea_by_id(ideas[0].id))
+        large = count_statements(lambda: self.idea_service.delete_idea_by_id(ideas[1].id))
+        assert small == large
+
+        assert self.idea_service.get_idea_by_id(ideas[1].id) is None
+        for model in (DownloadModel, UpvoteModel, DownvoteModel, BookmarkModel, CommentModel, TimelineModel):
+            assert {row.idea_id for row in model.query.all()} <= {ideas[2].id}
+        assert self.user_service.get_user_by_id(analyst.id).num_ideas == 1
+        assert AnalystStatsModel.query.filter_by(analyst_id=analyst.id).first().num_ideas == 1
+
+        assert self.idea_service.delete_ideas([ideas[2].id, 1000]) == 1
+        assert self.idea_service.delete_ideas([ideas[2].id]) == 0
+        assert self.user_service.get_user_by_id(analyst.id).num_ideas == 0
+
     @requests_mock.Mocker()
     def test_query_ideas(self, mock) -> None:
         register_mock_iex(mock)
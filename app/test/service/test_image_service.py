@@ -0,0 +1,92 @@
+import io
+import json
+import time
+import unittest
+import requests_mock
+from PIL import Image
+from main.db import db, unit_of_work, after_commit
+from main.libs.s3 import S3
+from main.libs.util import create_image_file, create_idea
+from main.model.idea import IdeaModel
+from main.service.image_service import ImageService
+from main.service.user_service import UserService
+from test.conftest import flask_test_client, local_s3, register_mock_iex
+
+
+class TestImageService(unittest.TestCase):
+    def setUp(self) -> None:
+        self.app = flask_test_client()
+        self.app.application.config["IMAGE_PROCESSING_ENABLED"] = True
+        db.create_all()
+        self.user_service = UserService()
+
+    def test_check_image(self) -> None:
+        assert ImageService.check_file(create_image_file("a.png", "image/png")) == "image/png"
+        # the name and declared type don't matter
+        assert ImageService.check_file(create_image_file("a.jpeg", "image/png")) == "image/jpeg"
+        with self.assertRaises(ValueError):
+            ImageService.check_file(create_image_file("a.png.html", "image/png"))
+
+    def test_profile_image_variants(self) -> None:
+        user = self.user_service.save_new_user("user@email.com", "user", "password")
+        with local_s3() as server:
+            exif = Image.Exif()
+            exif[0x010f] = "Camera maker"
+            image = io.BytesIO()
+            Image.new("RGB", (500, 400)).save(image, "JPEG", exif=exif)
+            image.seek(0)
+            image.filename, image.content_type = "me.jpg", "image/jpeg"
+            self.app.application.config["IMAGE_PROCESSING_ENABLED"] = False
+            self.user_service.change_user_image(user.id, image, "user-profile-image.jpg")
+            self.app.application.config["IMAGE_PROCESSING_ENABLED"] = True
+
+            urls = ImageService.process_profile_image(user.id, "user_images/user-profile-image.jpg").result(timeout=30)
+            assert urls == {str(size): f"{S3.S3_ENDPOINT_URL}/user_images/user-profile-image-{size}.webp"
+                            for size in ImageService.PROFILE_IMAGE_SIZES}
+            db.session.expire_all()
+            assert self.user_service.get_user_by_id(user.id).image_variants == urls
+            original = Image.open(io.BytesIO(server.objects[("bucket", "user_images/user-profile-image.jpg")]))
+            assert not original.getexif()
+            variant = Image.open(io.BytesIO(server.objects[("bucket", "user_images/user-profile-image-64.webp")]))
+            assert (variant.format, variant.size) == ("WEBP", (64, 64))
+            assert server.content_types[("bucket", "user_images/user-profile-image-64.webp")] == "image/webp"
+
+    @requests_mock.Mocker()
+    def test_exhibit_variants(self, mock) -> None:
+        register_mock_iex(mock)
+        analyst = self.user_service.save_new_user("analyst@email.com", "analyst", "password", is_analyst=True)
+        with local_s3() as server:
+            idea = create_idea(analyst.id, "aapl", True)
+            # processed in the background once the idea is saved
+            deadline = time.monotonic() + 30
+            while True:
+                db.session.expire_all()
+                exhibits = json.loads(IdeaModel.query.get(idea.id).exhibits)
+                if all("variants" in exhibit for exhibit in exhibits) or time.monotonic() > deadline:
+                    break
+                time.sleep(0.05)
+            assert len(exhibits) == 2
+            for exhibit in exhibits:
+                assert sorted(exhibit["variants"], key=int) == [str(width) for width in ImageService.EXHIBIT_WIDTHS]
+                key = exhibit["variants"]["320"][len(S3.S3_ENDPOINT_URL) + 1:]
+                assert Image.open(io.BytesIO(server.objects[("bucket", key)])).format == "WEBP"
+
+    def test_jobs_wait_for_commit(self) -> None:
+        calls = []
+        with self.app.application.app_context():
+            with unit_of_work():
+                after_commit(lambda: calls.append("committed"))
+                assert calls == []
+            assert calls == ["committed"]
+            with self.assertRaises(ValueError):
+                with unit_of_work():
+                    after_commit(lambda: calls.append("rolled back"))
+                    raise ValueError()
+        assert calls == ["committed"]
+        assert ImageService.process_exhibits(1, []) is None
+        self.app.application.config["IMAGE_PROCESSING_ENABLED"] = False
+        assert ImageService.process_profile_image(1, "user_images/user.png") is None
+
+    def tearDown(self) -> None:
+        db.session.remove()
+        db.drop_all()
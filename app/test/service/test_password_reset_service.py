@@ -18,9 +18,11 @@ class TestPasswordResetService(unittest.TestCase):
     def test_send_password_reset_email(self, mock) -> None:
         register_mock_mailgun(mock)
         user = self.user_service.save_new_user("michaelmcguiness123@gmail.com", "user1", "password")
-        self.password_reset_service.save_new_password_reset(user.id)
-        response = self.password_reset_service.send_password_reset_email(user.id)
-        assert response.status_code == 200
+        password_reset = self.password_reset_service.save_new_password_reset(user.id)
+        message = self.password_reset_service.send_password_reset_email(user.id)
+        assert not mock.called
+        assert message.status == "pending"
+        assert message.variables["link"].endswith(f"/password-reset/{password_reset.id}")
 
     def test_get_password_reset_by_id(self, mock) -> None:
         register_mock_mailgun(mock)
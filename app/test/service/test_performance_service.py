@@ -1,12 +1,19 @@
 import unittest
 import datetime
+import random
+from types import SimpleNamespace
+from unittest.mock import patch
 
 import requests_mock
 from main.db import db
+from main.model.idea import IdeaModel
+from main.model.analyst_stats import epoch_day
 from main.service.user_service import UserService
 from main.service.idea_service import IdeaService
-from main.service.performance_service import PerformanceService
-from test.conftest import flask_test_client, register_mock_iex
+from main.service.performance_service import PerformanceService, calc_analyst_metrics, calc_idea_return, \
+    calc_pt_capture, calc_idea_profitability, calc_holding_period
+from test.conftest import flask_test_client, register_mock_iex, IEX_URL
+from test.mock_responses import aapl_quote, gm_quote
 from main.libs.util import create_idea
 
 
@@ -92,3 +99,146 @@ class TestPerformanceService(unittest.TestCase):
         assert abs(analyst2.analyst_rank_percentile - 0.67) < 0.01
         assert analyst3.analyst_rank_percentile == 1
 
+
+    @requests_mock.Mocker()
+    def test_refresh_last_prices(self, mock) -> None:
+        register_mock_iex(mock)
+
+        analyst = self.user_service \
+            .save_new_user("email1@email.com", "analyst1", "password", is_analyst=True)
+        open_idea = create_idea(analyst.id, "aapl", False)
+        open_idea2 = create_idea(analyst.id, "aapl", False)
+        closed_idea = create_idea(analyst.id, "gm", False)
+        open_idea.last_price = 1
+        open_idea2.last_price = 2
+        closed_idea.last_price = 3
+        closed_idea.closed_date = datetime.datetime.utcnow()
+        self.idea_service.save_changes(open_idea)
+        self.idea_service.save_changes(open_idea2)
+        self.idea_service.save_changes(closed_idea)
+        mock.reset_mock()
+
+        assert self.performance_service.refresh_last_prices() == 2
+        # both AAPL ideas priced with one upstream call
+        assert mock.call_count == 1
+        assert IdeaModel.query.get(open_idea.id).last_price == 313.49
+        assert IdeaModel.query.get(open_idea2.id).last_price == 313.49
+        assert IdeaModel.query.get(closed_idea.id).last_price == 3
+
+    @requests_mock.Mocker()
+    def test_prices_and_stats_are_committed_together(self, mock) -> None:
+        register_mock_iex(mock)
+
+        analyst = self.user_service \
+            .save_new_user("email1@email.com", "analyst1", "password", is_analyst=True)
+        idea = create_idea(analyst.id, "aapl", False)
+        idea.last_price = 1
+        self.idea_service.save_changes(idea)
+
+        with patch.object(PerformanceService, "apply_stats_deltas", side_effect=RuntimeError("stats")):
+            with self.assertRaises(RuntimeError):
+                self.performance_service.update_performance(incremental=True)
+        db.session.expire_all()
+        assert IdeaModel.query.get(idea.id).last_price == 1
+
+        self.performance_service.update_performance(incremental=True)
+        assert IdeaModel.query.get(idea.id).last_price == 313.49
+
+    @requests_mock.Mocker()
+    def test_load_idea_columns_in_epoch_days(self, mock) -> None:
+        register_mock_iex(mock)
+
+        analyst = self.user_service \
+            .save_new_user("email1@email.com", "analyst1", "password", is_analyst=True)
+        open_idea = create_idea(analyst.id, "aapl", False)
+        closed_idea = create_idea(analyst.id, "gm", False)
+        open_idea.created_at = datetime.datetime(1969, 12, 31, 23, 59, 59)
+        closed_idea.created_at = datetime.datetime(2020, 2, 29, 0, 0, 1)
+        closed_idea.closed_date = datetime.datetime(2020, 3, 1, 23, 59, 59, 999999)
+        self.idea_service.save_changes(open_idea)
+        self.idea_service.save_changes(closed_idea)
+
+        columns = self.performance_service.load_idea_columns()
+        assert list(columns["created_days"]) == [-1, epoch_day(datetime.date(2020, 2, 29))]
+        assert list(columns["closed_days"]) == [None, epoch_day(datetime.date(2020, 3, 1))]
+
+    def test_calc_analyst_metrics_matches_calc_helpers(self) -> None:
+        rng = random.Random(42)
+        now = datetime.datetime.utcnow()
+        ideas = []
+        for idea_id in range(500):
+            created_at = now - datetime.timedelta(days=rng.randint(0, 400), hours=rng.randint(0, 23))
+            ideas.append(SimpleNamespace(
+                analyst_id=rng.randint(1, 20),
+                position_type=rng.choice(["long", "short", "Long"]),
+                entry_price=rng.uniform(1, 500),
+                last_price=rng.uniform(1, 500),
+                price_target=rng.uniform(1, 500),
+                created_at=created_at,
+                closed_date=rng.choice([None, created_at + datetime.timedelta(days=rng.randint(0, 30))])))
+
+        metrics = calc_analyst_metrics(
+            analyst_ids=[idea.analyst_id for idea in ideas],
+            is_long=[idea.position_type.lower() == "long" for idea in ideas],
+            entry_prices=[idea.entry_price for idea in ideas],
+            last_prices=[idea.last_price for idea in ideas],
+            price_targets=[idea.price_target for idea in ideas],
+            created_days=[epoch_day(idea.created_at.date()) for idea in ideas],
+            closed_days=[epoch_day(idea.closed_date.date()) if idea.closed_date else None for idea in ideas])
+
+        for idx, analyst_id in enumerate(metrics["analyst_id"]):
+            analyst_ideas = [idea for idea in ideas if idea.analyst_id == analyst_id]
+            n = len(analyst_ideas)
+            assert metrics["num_ideas"][idx] == n
+            assert abs(metrics["avg_return"][idx] - sum(map(calc_idea_return, analyst_ideas)) / n) < 1e-12
+            assert abs(metrics["avg_price_target_capture"][idx]
+                       - sum(map(calc_pt_capture, analyst_ideas)) / n) < 1e-12
+            assert metrics["success_rate"][idx] == sum(map(calc_idea_profitability, analyst_ideas)) / n
+            assert metrics["avg_holding_period"][idx] == sum(map(calc_holding_period, analyst_ideas)) / n
+
+    @requests_mock.Mocker()
+    def test_incremental_update_matches_full_update(self, mock) -> None:
+        register_mock_iex(mock)
+
+        analyst1 = self.user_service \
+            .save_new_user("email1@email.com", "analyst1", "password", is_analyst=True)
+        analyst2 = self.user_service \
+            .save_new_user("email2@email.com", "analyst2", "password", is_analyst=True)
+        idea1 = create_idea(analyst1.id, "aapl", False)
+        idea2 = create_idea(analyst1.id, "gm", False)
+        create_idea(analyst2.id, "aapl", False)
+        idea2.created_at = idea2.created_at - datetime.timedelta(days=30)
+        self.idea_service.save_changes(idea2)
+
+        # a full run seeds the running sums
+        self.performance_service.update_performance()
+        self.performance_service.update_performance(incremental=True)
+        assert self.performance_service.apply_changed_stats() == {}
+
+        # prices move, then an idea is closed, one is created and one is deleted
+        mock.get(IEX_URL + '/market/batch', json={
+            "AAPL": {"quote": {**aapl_quote, "latestPrice": 350}},
+            "GM": {"quote": {**gm_quote, "latestPrice": 20}}
+        })
+        self.performance_service.refresh_last_prices()
+        self.idea_service.close_idea_by_id(idea2.id)
+        create_idea(analyst2.id, "gm", False)
+        self.idea_service.delete_idea_by_id(idea1.id)
+
+        def metrics(analyst):
+            return [analyst.avg_return, analyst.avg_price_target_capture, analyst.success_rate,
+                    analyst.avg_holding_period, analyst.avg_return_percentile, analyst.analyst_rank]
+
+        self.performance_service.update_performance(incremental=True)
+        incremental_metrics = [metrics(analyst1), metrics(analyst2)]
+        self.performance_service.update_performance()
+        full_metrics = [metrics(analyst1), metrics(analyst2)]
+
+        for incremental_values, full_values in zip(incremental_metrics, full_metrics):
+            for incremental_value, full_value in zip(incremental_values, full_values):
+                assert abs(incremental_value - full_value) < 1e-9
+        assert abs(analyst1.avg_holding_period - 30) < 1
+
+    def tearDown(self) -> None:
+        db.session.remove()
+        db.drop_all()
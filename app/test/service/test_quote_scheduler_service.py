@@ -0,0 +1,78 @@
+import datetime
+import threading
+import unittest
+import requests_mock
+from main.db import db, advisory_lock
+from main.model.quote_schedule import QuoteScheduleModel
+from main.service.user_service import UserService
+from main.service.job_service import JobService
+from main.service.quote_scheduler_service import QuoteSchedulerService
+from test.conftest import flask_test_client, register_mock_iex, IEX_URL
+from test.mock_responses import aapl_quote
+from main.libs.util import create_idea
+
+# a Wednesday at 11am in New York
+MARKET_HOURS = datetime.datetime(2020, 6, 3, 15)
+
+
+class TestQuoteSchedulerService(unittest.TestCase):
+    def setUp(self) -> None:
+        self.app = flask_test_client()
+        db.create_all()
+        self.user_service = UserService()
+        self.app.application.config["QUOTE_CREDITS_PER_HOUR"] = 60 + 1
+
+    @requests_mock.Mocker()
+    def test_refresh_due_quotes(self, mock) -> None:
+        register_mock_iex(mock)
+        analyst = self.user_service.save_new_user("analyst@email.com", "analyst", "password", is_analyst=True)
+        for symbol in ("aapl", "aapl", "aapl", "gm"):
+            create_idea(analyst.id, symbol, False)
+
+        # AAPL has three times the open ideas so is refreshed sqrt(3) times as often
+        intervals = QuoteSchedulerService.plan()
+        assert round(intervals["GM"] / intervals["AAPL"], 6) == round(3 ** 0.5, 6)
+        assert 93 < intervals["AAPL"] < 94
+        assert QuoteSchedulerService.refresh_due_quotes(MARKET_HOURS) == ["AAPL", "GM"]
+        assert QuoteSchedulerService.refresh_due_quotes(MARKET_HOURS + datetime.timedelta(seconds=30)) == []
+        mock.get(IEX_URL + '/market/batch', json={"AAPL": {"quote": {**aapl_quote, "latestPrice": 320}}})
+        assert QuoteSchedulerService.refresh_due_quotes(MARKET_HOURS + datetime.timedelta(seconds=100)) == ["AAPL"]
+        assert mock.last_request.qs["symbols"] == ["aapl"]
+
+        aapl = QuoteScheduleModel.query.get("AAPL")
+        assert aapl.last_price == 320
+        assert aapl.volatility > 0
+        assert QuoteScheduleModel.query.get("GM").volatility is None
+
+        # nothing while the market is closed
+        assert QuoteSchedulerService.refresh_due_quotes(datetime.datetime(2020, 6, 6, 15)) == []
+
+    def test_jobs_run_in_one_worker(self) -> None:
+        runs = []
+        gap = datetime.timedelta(minutes=1)
+        assert JobService.run_exclusively("test_job", lambda: runs.append(1), gap)
+        # already ran within min_gap in some worker
+        assert not JobService.run_exclusively("test_job", lambda: runs.append(1), gap)
+        assert runs == [1]
+
+        # another worker holds the lock
+        taken, release = threading.Event(), threading.Event()
+
+        def hold_lock():
+            with self.app.application.app_context(), advisory_lock("scheduled-job:other_job") as acquired:
+                assert acquired
+                taken.set()
+                release.wait(2)
+
+        thread = threading.Thread(target=hold_lock)
+        thread.start()
+        taken.wait(2)
+        assert not JobService.run_exclusively("other_job", lambda: runs.append(2), gap)
+        release.set()
+        thread.join()
+        assert JobService.run_exclusively("other_job", lambda: runs.append(2), gap)
+        assert runs == [1, 2]
+
+    def tearDown(self) -> None:
+        db.session.remove()
+        db.drop_all()
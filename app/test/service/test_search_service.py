@@ -0,0 +1,63 @@
+import unittest
+from unittest.mock import patch
+import requests_mock
+from sqlalchemy.orm import Query
+from main.db import db
+from main.model.search_symbol import SearchSymbolModel
+from main.service.user_service import UserService
+from main.service.idea_service import IdeaService
+from main.service.search_service import SearchService
+from test.conftest import flask_test_client, register_mock_iex, register_mock_mailgun
+from main.libs.util import create_idea
+
+
+@requests_mock.Mocker()
+class TestSearchService(unittest.TestCase):
+    def setUp(self) -> None:
+        self.user_service = UserService()
+        self.idea_service = IdeaService()
+        self.app = flask_test_client()
+        db.create_all()
+
+    def test_search_follows_ideas_and_analysts(self, mock) -> None:
+        register_mock_iex(mock)
+        register_mock_mailgun(mock)
+
+        assert SearchService.search("a") == {"stocks": [], "analysts": []}
+        analyst = self.user_service.save_new_user("email1@email.com", "analyst1", "password", is_analyst=True)
+        self.user_service.save_new_user("user@email.com", "apple_fan", "password")
+        idea1 = create_idea(analyst.id, "aapl", False)
+        idea2 = create_idea(analyst.id, "aapl", False)
+        create_idea(analyst.id, "gm", False)
+
+        assert SearchSymbolModel.query.filter_by(symbol="AAPL").first().num_ideas == 2
+        results = SearchService.search("a")
+        assert results["stocks"] == [{"symbol": "AAPL", "companyName": idea1.company_name}]
+        assert results["analysts"] == [{"username": "analyst1"}]
+        assert [stock["symbol"] for stock in SearchService.search("motor")["stocks"]] == ["GM"]
+
+        # symbols stay until their last idea is deleted
+        self.idea_service.delete_idea_by_id(idea1.id)
+        assert [stock["symbol"] for stock in SearchService.search("aapl")["stocks"]] == ["AAPL"]
+        self.idea_service.delete_idea_by_id(idea2.id)
+        assert SearchService.search("aapl")["stocks"] == []
+        assert SearchSymbolModel.query.filter_by(symbol="AAPL").first() is None
+
+    def test_add_symbol_added_concurrently(self, mock) -> None:
+        SearchService.add_symbol("AAPL", "Apple Inc.")
+        update = Query.update
+        calls = []
+
+        def missed_first_update(query, *args, **kwargs):
+            # as if another idea inserted the symbol between our update and insert
+            calls.append(1)
+            return 0 if len(calls) == 1 else update(query, *args, **kwargs)
+
+        with patch.object(Query, "update", missed_first_update):
+            SearchService.add_symbol("AAPL", "Apple Inc.")
+        assert len(calls) == 2
+        assert SearchSymbolModel.query.filter_by(symbol="AAPL").one().num_ideas == 2
+
+    def tearDown(self) -> None:
+        db.session.remove()
+        db.drop_all()
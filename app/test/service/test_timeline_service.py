@@ -0,0 +1,89 @@
+import unittest
+import requests_mock
+from main.db import db
+from main.model.timeline import TimelineModel
+from main.service.user_service import UserService
+from main.service.idea_service import IdeaService
+from main.service.follow_service import FollowService
+from test.conftest import flask_test_client, register_mock_iex
+from main.libs.util import create_idea
+
+
+@requests_mock.Mocker()
+class TestTimelineService(unittest.TestCase):
+    def setUp(self) -> None:
+        self.user_service = UserService()
+        self.idea_service = IdeaService()
+        self.follow_service = FollowService()
+        self.app = flask_test_client()
+        db.create_all()
+
+    def timeline_idea_ids(self, user_id: int) -> set:
+        return {row.idea_id for row in TimelineModel.query.filter_by(user_id=user_id)}
+
+    def test_timeline_follows_ideas_and_follows(self, mock) -> None:
+        register_mock_iex(mock)
+
+        user = self.user_service.save_new_user("user@email.com", "user", "password")
+        analyst1 = self.user_service.save_new_user("email1@email.com", "analyst1", "password", is_analyst=True)
+        analyst2 = self.user_service.save_new_user("email2@email.com", "analyst2", "password", is_analyst=True)
+        idea1 = create_idea(analyst1.id, "aapl", False)
+        idea2 = create_idea(analyst2.id, "gm", False)
+
+        # analysts see their own ideas
+        assert self.timeline_idea_ids(analyst1.id) == {idea1.id}
+        assert self.timeline_idea_ids(user.id) == set()
+
+        # following backfills existing ideas, new ideas are pushed
+        follow = self.follow_service.save_new_follow(user.id, analyst1.id)
+        assert self.timeline_idea_ids(user.id) == {idea1.id}
+        idea3 = create_idea(analyst1.id, "gm", False)
+        assert self.timeline_idea_ids(user.id) == {idea1.id, idea3.id}
+        assert self.timeline_idea_ids(analyst2.id) == {idea2.id}
+
+        # deleting an idea removes it everywhere
+        self.idea_service.delete_idea_by_id(idea1.id)
+        assert self.timeline_idea_ids(user.id) == {idea3.id}
+        assert self.timeline_idea_ids(analyst1.id) == {idea3.id}
+
+        # unfollowing prunes the analyst's ideas
+        self.follow_service.delete_follow(follow.id)
+        assert self.timeline_idea_ids(user.id) == set()
+
+    def test_analyst_following_themselves(self, mock) -> None:
+        register_mock_iex(mock)
+
+        analyst = self.user_service.save_new_user("email1@email.com", "analyst1", "password", is_analyst=True)
+        idea1 = create_idea(analyst.id, "aapl", False)
+        follow = self.follow_service.save_new_follow(analyst.id, analyst.id)
+        idea2 = create_idea(analyst.id, "gm", False)
+        assert self.timeline_idea_ids(analyst.id) == {idea1.id, idea2.id}
+
+        # their own ideas stay on their timeline
+        self.follow_service.delete_follow(follow.id)
+        assert self.timeline_idea_ids(analyst.id) == {idea1.id, idea2.id}
+
+    def test_query_following_page(self, mock) -> None:
+        register_mock_iex(mock)
+
+        user = self.user_service.save_new_user("user@email.com", "user", "password", is_analyst=True)
+        analyst = self.user_service.save_new_user("email1@email.com", "analyst1", "password", is_analyst=True)
+        other = self.user_service.save_new_user("email2@email.com", "analyst2", "password", is_analyst=True)
+        self.follow_service.save_new_follow(user.id, analyst.id)
+        ideas = [create_idea(analyst.id, "aapl", False), create_idea(user.id, "gm", False),
+                 create_idea(analyst.id, "gm", False)]
+        create_idea(other.id, "aapl", False)
+
+        page, next_cursor = self.idea_service.query_following_page(user.id, page_size=2)
+        assert [idea.id for idea in page] == [ideas[2].id, ideas[1].id]
+        page, next_cursor = self.idea_service.query_following_page(user.id, cursor=next_cursor, page_size=2)
+        assert [idea.id for idea in page] == [ideas[0].id]
+        assert next_cursor is None
+
+        # filters still apply
+        page, _ = self.idea_service.query_following_page(user.id, query_string={"symbol": "gm"})
+        assert [idea.id for idea in page] == [ideas[2].id, ideas[1].id]
+
+    def tearDown(self) -> None:
+        db.session.remove()
+        db.drop_all()
@@ -0,0 +1,75 @@
+import unittest
+from main.db import db
+from main.libs.util import create_image_file
+from main.libs.s3 import S3
+from main.model.upload import UploadModel
+from main.service.upload_service import UploadService
+from main.service.user_service import UserService
+from test.conftest import flask_test_client, local_s3, post_form
+
+
+PNG = create_image_file("image.png", "image/png").getvalue()
+JPEG = create_image_file("image.jpg", "image/jpeg").getvalue()
+
+
+class TestUploadService(unittest.TestCase):
+    def setUp(self) -> None:
+        self.app = flask_test_client()
+        db.create_all()
+        self.user_service = UserService()
+        self.upload_service = UploadService()
+
+    def test_profile_image_upload(self) -> None:
+        user = self.user_service.save_new_user("user@email.com", "user", "password")
+        other_user = self.user_service.save_new_user("other@email.com", "other", "password")
+        with local_s3() as server:
+            upload = self.upload_service.create_upload(user, "profileImage", "me.JPG", "image/jpeg")
+            assert upload["key"].startswith("user_images/user-") and upload["key"].endswith(".jpg")
+            assert upload["fileUrl"] == S3.public_url(upload["key"])
+            assert upload["fields"]["key"] == upload["key"]
+
+            # not uploaded yet
+            with self.assertRaises(ValueError):
+                self.upload_service.confirm_upload(user.id, upload["key"])
+            # not what it was declared as
+            assert post_form(upload["url"], upload["fields"], PNG) == 204
+            with self.assertRaises(ValueError):
+                self.upload_service.confirm_upload(user.id, upload["key"])
+            assert post_form(upload["url"], upload["fields"], JPEG) == 204
+            # someone else's upload
+            assert self.upload_service.confirm_upload(other_user.id, upload["key"]) is None
+
+            confirmed = self.upload_service.confirm_upload(user.id, upload["key"])
+            assert confirmed.confirmed_at is not None
+            assert self.user_service.get_user_by_id(user.id).image_url == upload["fileUrl"]
+            # confirming twice doesn't check S3 again
+            num_requests = len(server.requests)
+            assert self.upload_service.confirm_upload(user.id, upload["key"]).id == confirmed.id
+            assert len(server.requests) == num_requests
+
+    def test_invalid_uploads(self) -> None:
+        user = self.user_service.save_new_user("user@email.com", "user", "password", is_analyst=True)
+        with local_s3() as server:
+            for kind, filename, content_type in (("banner", "a.png", "image/png"), ("exhibit", "a.gif", "image/gif"),
+                                                 ("exhibit", "a.png", "text/html")):
+                with self.assertRaises(ValueError):
+                    self.upload_service.create_upload(user, kind, filename, content_type)
+            assert UploadModel.query.count() == 0
+
+            # uploaded as something else than requested
+            upload = self.upload_service.create_upload(user, "exhibit", "chart.png", "image/png")
+            fields = {**upload["fields"], "Content-Type": "text/html"}
+            post_form(upload["url"], fields, b"<script></script>")
+            with self.assertRaises(ValueError):
+                self.upload_service.confirm_upload(user.id, upload["key"])
+            with self.assertRaises(ValueError):
+                UploadService.confirmed_exhibit_urls(user.id, [upload["key"]])
+
+            post_form(upload["url"], upload["fields"], PNG)
+            self.upload_service.confirm_upload(user.id, upload["key"])
+            assert UploadService.confirmed_exhibit_urls(user.id, [upload["key"]]) == [upload["fileUrl"]]
+            assert ("bucket", upload["key"]) in server.objects
+
+    def tearDown(self) -> None:
+        db.session.remove()
+        db.drop_all()
@@ -0,0 +1,66 @@
+import unittest
+import requests_mock
+from main.db import db
+from main.model.idea import IdeaModel
+from main.service.user_service import UserService
+from main.service.upvote_service import UpvoteService
+from main.service.downvote_service import DownvoteService
+from main.service.counter_service import CounterService, init_counter_buffer
+from test.conftest import flask_test_client, register_mock_iex, register_mock_mailgun
+from main.libs.util import create_idea
+
+
+@requests_mock.Mocker()
+class TestVoteBuffer(unittest.TestCase):
+    def setUp(self) -> None:
+        self.client = flask_test_client()
+        self.app = self.client.application
+        # only flush when told to
+        self.app.config["VOTE_FLUSH_INTERVAL_MS"] = 60000
+        self.buffer = init_counter_buffer(self.app)
+        self.user_service = UserService()
+        db.create_all()
+
+    def stored_counters(self, idea_id: int) -> tuple:
+        return tuple(db.session.execute(
+            "SELECT num_upvotes, num_downvotes, score FROM ideas WHERE id = :id", {"id": idea_id}).first())
+
+    def loaded_counters(self, idea_id: int) -> tuple:
+        db.session.expire_all()
+        idea = IdeaModel.query.filter_by(id=idea_id).first()
+        return idea.num_upvotes, idea.num_downvotes, idea.score
+
+    def test_votes_are_written_behind(self, mock) -> None:
+        register_mock_iex(mock)
+        register_mock_mailgun(mock)
+
+        user = self.user_service.save_new_user("user@email.com", "user", "password")
+        analyst = self.user_service.save_new_user("email1@email.com", "analyst1", "password", is_analyst=True)
+        idea = create_idea(analyst.id, "aapl", False)
+
+        UpvoteService().save_new_upvote(user.id, idea.id)
+        # the voter sees the vote straight away, the idea row is only updated by the flush
+        assert (idea.num_upvotes, idea.score) == (1, 1)
+        assert self.stored_counters(idea.id) == (0, 0, 0)
+        assert self.loaded_counters(idea.id) == (1, 0, 1)
+
+        UpvoteService().delete_upvote_by_user_and_idea_if_exists(user.id, idea.id)
+        DownvoteService().save_new_downvote(user.id, idea.id)
+        DownvoteService().save_new_downvote(analyst.id, idea.id)
+        assert self.loaded_counters(idea.id) == (0, 2, -2)
+
+        # deltas of a transaction that rolls back never reach the buffer
+        CounterService.increment_later(IdeaModel, idea.id, num_upvotes=1, score=1)
+        assert self.loaded_counters(idea.id) == (1, 2, -1)
+        db.session.rollback()
+        assert self.loaded_counters(idea.id) == (0, 2, -2)
+
+        self.buffer.flush()
+        assert self.stored_counters(idea.id) == (0, 2, -2)
+        assert self.loaded_counters(idea.id) == (0, 2, -2)
+        assert CounterService.reconcile(fix=False) == []
+
+    def tearDown(self) -> None:
+        self.buffer.flush()
+        db.session.remove()
+        db.drop_all()
@@ -23,6 +23,9 @@ class TestEndpointsConfiguration(unittest.TestCase):
         assert '/new-idea' in self.endpoints
         assert '/idea/<int:idea_id>' in self.endpoints
         assert '/idea/<int:idea_id>/download' in self.endpoints
+        assert '/idea/<int:idea_id>/downloads' in self.endpoints
+        assert '/analyst/<int:analyst_id>/downloads' in self.endpoints
+        assert '/admin/ideas' in self.endpoints
         assert '/analyst/<int:analyst_id>/follow' in self.endpoints
         assert '/user/<int:user_id>/following' in self.endpoints
         assert '/analyst/<int:analyst_id>/followers' in self.endpoints